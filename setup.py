@@ -45,6 +45,10 @@ setup(
                 stationverification.bin.stationverification_latency:main',
             'stationverificationCN = \
                 stationverification.bin.stationverification_CN:main',
+            'stationverificationbatch = \
+                stationverification.bin.stationverification_batch:main',
+            'stationverificationispaq = \
+                stationverification.bin.ispaq_worker:main',
             'uploadreport = \
                 stationverification.bin.upload_report_to_gitlab:main',
             'fetchStationXml = \
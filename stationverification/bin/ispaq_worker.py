@@ -0,0 +1,62 @@
+'''
+Python script starting the ISPAQ worker, a long-lived process running the
+ISPAQ commands of the validations with Python, obspy, rpy2 and R already
+loaded. The validations submit their ISPAQ commands to the worker when
+VALIDATION_ISPAQ_WORKER_SOCKET is set to the socket it listens on. The
+worker runs ISPAQ with its own python, so it must be started from the
+environment of ISPAQ, with stationverification installed in it. It stops at
+once if it can not import the modules ISPAQ uses.
+
+usage: stationverificationispaq [-h] [-s SOCKET] [-i ISPAQLOCATION]
+
+optional arguments:
+    -h, --help            show this help message and exit
+    -s SOCKET, --socket SOCKET
+                        The Unix socket the worker listens on. Defaults to
+                        VALIDATION_ISPAQ_WORKER_SOCKET
+    -i ISPAQLOCATION, --ispaqlocation ISPAQLOCATION
+                        The path to run_ispaq.py. Defaults to
+                        VALIDATION_ISPAQ_LOCATION
+
+Functions:
+----------
+main()
+    The main fuction, which runs the worker until it is terminated
+'''
+import argparse
+import logging
+
+from stationverification.config import get_default_parameters
+from stationverification.utilities.ispaq_worker import serve_ispaq_jobs
+
+logging.basicConfig(
+    format='%(asctime)s ISPAQ Worker: %(message)s',
+    level=logging.INFO,
+    datefmt='%Y-%m-%d %H:%M:%S')
+
+
+def main():
+    '''
+    The Main function.
+    '''
+    argsparser = argparse.ArgumentParser()
+    argsparser.add_argument(
+        "-s",
+        "--socket",
+        help="The Unix socket the worker listens on",
+        type=str,
+        default=get_default_parameters().ISPAQ_WORKER_SOCKET
+    )
+    argsparser.add_argument(
+        "-i",
+        "--ispaqlocation",
+        help="The path to run_ispaq.py",
+        type=str,
+        default=get_default_parameters().ISPAQ_LOCATION
+    )
+    args = argsparser.parse_args()
+    if not args.socket:
+        argsparser.error(
+            'the socket is required, set --socket or '
+            'VALIDATION_ISPAQ_WORKER_SOCKET')
+    serve_ispaq_jobs(socket_path=args.socket, ispaqloc=args.ispaqlocation)
@@ -37,15 +37,11 @@ main()
     running ISPAQ
 '''
 import logging
-from multiprocessing import Process
-from stationverification.utilities.cleanup_directory import cleanup_directory
-from stationverification.utilities.fetch_arguments_CN import fetch_arguments_CN
 
-from stationverification.utilities.generate_plots import (PlotParameters,
-                                                          plot_metrics)
-from stationverification.utilities.generate_report import gather_stats
-from stationverification.utilities.handle_running_ispaq_command_CN import \
-    handle_running_ispaq_command_CN
+from stationverification.utilities.fetch_arguments_CN import fetch_arguments_CN
+from stationverification.utilities.pipeline import run_pipeline
+from stationverification.utilities.validation_stages import \
+    station_validation_stages_CN
 
 logging.basicConfig(
     format='%(asctime)s Station Validation: %(message)s',
@@ -65,57 +61,4 @@ def main():
     '''
     user_inputs = fetch_arguments_CN()
 
-    # Run ISPAQ
-    logging.info("Process 1: Generating ISPAQ results..")
-    process_one = Process(
-        target=handle_running_ispaq_command_CN, args=(
-            user_inputs.ispaqloc,
-            user_inputs.metrics,
-            user_inputs.startdate,
-            user_inputs.enddate,
-            user_inputs.pfile,
-            user_inputs.pdfinterval,
-            user_inputs.miniseedarchive,
-            user_inputs.network,
-            user_inputs.station,
-        ))
-    process_one.start()
-    process_one.join()
-    logging.info("Finished Process 1: Generating ISPAQ results")
-
-    # Read the files generated from ISPAQ and populate the dictionary object
-    if user_inputs.location is None:
-        snlc = f'{user_inputs.network}.{user_inputs.station}.x.xxx'
-    else:
-        snlc = f'{user_inputs.network}.\
-{user_inputs.station}.{user_inputs.location}.xxx'
-
-    stationMetricData = gather_stats(
-        snlc=snlc,
-        start=user_inputs.startdate,
-        stop=user_inputs.enddate,
-        metrics=user_inputs.metrics)
-    logging.info("Plotting metrics..")
-
-    for channel in stationMetricData.get_channels(
-        network=user_inputs.network,
-        station=user_inputs.station
-    ):
-        plot_metrics(
-            PlotParameters(network=user_inputs.network,
-                           station=user_inputs.station,
-                           location=user_inputs.location,
-                           channel=channel,
-                           stationMetricData=stationMetricData,
-                           start=user_inputs.startdate,
-                           stop=user_inputs.enddate)
-        )
-
-    # Delete temporary files and links and package the output in a tarball
-    logging.info("Cleaning up directory..")
-    cleanup_directory(
-        network=user_inputs.network,
-        station=user_inputs.station,
-        startdate=user_inputs.startdate,
-        enddate=user_inputs.enddate,
-        outputdir=user_inputs.outputdir)
+    run_pipeline(station_validation_stages_CN(user_inputs))
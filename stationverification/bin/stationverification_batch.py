@@ -0,0 +1,354 @@
+'''
+Python script used to validate several EEW Stations of a network at once,
+running ISPAQ a single time for all of them.
+
+usage: stationverificationbatch [-h] -N NETWORK -S STATIONS -d STARTDATE
+                                -e ENDDATE
+                                [same options as stationverification]
+
+    -S STATIONS, --station STATIONS
+                        Comma separated station codes or wildcards matched
+                        against the stations of the network in the station
+                        xml. Ex: QCC01,QCC02 or QCC*
+
+The results of each station are placed in the same directory as a
+stationverification run of that station: {outputdir}/{network}/{station}/...
+
+Functions:
+----------
+main()
+    The main fuction, which takes care of calling the other functions and
+    running ISPAQ
+'''
+import logging
+import os
+import shutil
+
+from contextlib import contextmanager
+from datetime import date
+from multiprocessing import Pool, Process
+from queue import Queue
+from typing import Iterator, List, Optional, Tuple
+
+from stationverification.config import get_default_parameters
+from stationverification.utilities.cleanup_directory import \
+    cleanup_directory, get_validation_output_directory, initialize_directory
+from stationverification.utilities.fetch_arguments import UserInput
+from stationverification.utilities.fetch_arguments_batch import \
+    fetch_batch_arguments
+from stationverification.utilities.generate_latency_results import \
+    generate_latency_results
+from stationverification.utilities.generate_plots import (
+    PlotParameters, plot_metrics_of_channels)
+from stationverification.utilities.generate_report import \
+    StationMetricData, gather_stats, report
+from stationverification.utilities.generate_soh_results import \
+    generate_soh_results
+from stationverification.utilities.handle_running_ispaq_command import \
+    ispaq_output_snlc, ispaq_snlc
+from stationverification.utilities.run_ispaq_in_chunks import \
+    run_ispaq_in_chunks
+from stationverification.utilities.scan_miniseed_headers import \
+    miniseed_data_period
+from stationverification.utilities.timely_availability_plot import \
+    timely_availability_plot
+from stationverification.utilities.update_station_xml import update_station_xml
+from stationverification.utilities.upload_results_to_s3 import \
+    upload_results_to_s3
+
+# The working directories of the stations, under the current directory
+BATCH_DIRECTORY = 'stationvalidation_batch'
+
+
+def main():
+    '''
+    The Main function.
+
+    Returns
+    -------
+    {station}_results.json
+        For each station, a json file containing the results of the
+        stationvalidation tests.
+
+    '''
+    list_of_user_inputs = fetch_batch_arguments()
+
+    initialize_directory()
+    if list_of_user_inputs[0].updateStationXml:
+        # Fetching the updated station xml for QW network
+        update_station_xml()
+    batch_validation(list_of_user_inputs=list_of_user_inputs)
+
+
+def batch_validation(list_of_user_inputs: List[UserInput],
+                     workers: Optional[int] = None):
+    '''
+    Validate several stations sharing the same validation period and
+    options. ISPAQ is run once for all the stations, while the latency and
+    SOH results of the stations are generated in a pool of processes. The
+    ISPAQ results are then split by station, and the plots and report of
+    each station are generated in the pool.
+
+    Parameters
+    ----------
+    list_of_user_inputs: list
+        The UserInput of each station
+    workers: int, optional
+        The number of stations processed at once. Defaults to
+        VALIDATION_STATION_WORKERS, or to the number of cores if it is not
+        set.
+    '''
+    user_inputs = list_of_user_inputs[0]
+    if workers is None:
+        workers = get_default_parameters().STATION_WORKERS or \
+            os.cpu_count() or 1
+    workers = max(1, min(workers, len(list_of_user_inputs)))
+    # With VALIDATION_MINISEED_PRECHECK set, the stations without miniSEED
+    # data are left out of ISPAQ, and its period is trimmed to the days with
+    # data. Otherwise ISPAQ runs over every station for the whole period
+    data_periods = [
+        miniseed_data_period(miniseed_directory=station_inputs.miniseedarchive,
+                             network=station_inputs.network,
+                             station=station_inputs.station,
+                             startdate=station_inputs.startdate,
+                             enddate=station_inputs.enddate,
+                             location=station_inputs.location)
+        for station_inputs in list_of_user_inputs]
+    snlc = ','.join(ispaq_snlc(network=station_inputs.network,
+                               station=station_inputs.station,
+                               location=station_inputs.location)
+                    for station_inputs, period in zip(list_of_user_inputs,
+                                                      data_periods)
+                    if period is not None)
+    periods_with_data = [period for period in data_periods
+                         if period is not None]
+    ispaq_startdate = min((period[0] for period in periods_with_data),
+                          default=user_inputs.startdate)
+    ispaq_enddate = max((period[1] for period in periods_with_data),
+                        default=user_inputs.enddate)
+
+    # Run ISPAQ once for all the stations
+    ispaq_process = None
+    if snlc:
+        logging.info(f"Process 1: Generating ISPAQ results for {snlc}..")
+        ispaq_process = Process(
+            target=run_ispaq_in_chunks, kwargs=dict(
+                ispaqloc=user_inputs.ispaqloc,
+                metrics=user_inputs.metrics,
+                startdate=ispaq_startdate,
+                enddate=ispaq_enddate,
+                pfile=user_inputs.pfile,
+                pdfinterval=user_inputs.pdfinterval,
+                miniseedarchive=user_inputs.miniseedarchive,
+                station_url=user_inputs.station_url,
+                snlc=snlc))
+        ispaq_process.start()
+    else:
+        logging.warning("No miniSEED data found. Skipping ISPAQ..")
+
+    with Pool(processes=workers) as pool:
+        logging.info(
+            f"Generating latency and SOH results of \
+{len(list_of_user_inputs)} stations with {workers} workers..")
+        latency_results_of_stations = pool.map_async(
+            generate_station_latency_results, list_of_user_inputs)
+        soh_results_of_stations = pool.map_async(
+            generate_station_soh_results, list_of_user_inputs)
+
+        if ispaq_process is not None:
+            ispaq_process.join()
+            logging.info("Finished Process 1: Generating ISPAQ results")
+        list_of_latency_results = latency_results_of_stations.get()
+        list_of_soh_results = soh_results_of_stations.get()
+
+        # Read the files generated from ISPAQ for all the stations at once
+        stationMetricData = gather_stats(
+            snlc=ispaq_output_snlc(snlc),
+            start=ispaq_startdate,
+            stop=ispaq_enddate,
+            metrics=user_inputs.metrics,
+            pfile=user_inputs.pfile)
+
+        logging.info("Generating plots and reports..")
+        pool.starmap(generate_station_report, [
+            (station_inputs,
+             stationMetricData.select(network=station_inputs.network,
+                                      station=station_inputs.station),
+             latency_results,
+             soh_results,
+             (ispaq_startdate, ispaq_enddate))
+            for station_inputs, latency_results, soh_results in zip(
+                list_of_user_inputs, list_of_latency_results,
+                list_of_soh_results)])
+
+    # Delete temporary files and links and move the output of each station
+    # to its own directory
+    logging.info("Cleaning up directory..")
+    for station_inputs in list_of_user_inputs:
+        shutil.rmtree('stationvalidation_output', ignore_errors=True)
+        station_output = os.path.join(
+            station_directory(station_inputs), 'stationvalidation_output')
+        if os.path.isdir(station_output):
+            shutil.move(station_output, 'stationvalidation_output')
+        cleanup_directory(
+            network=station_inputs.network,
+            station=station_inputs.station,
+            startdate=station_inputs.startdate,
+            enddate=station_inputs.enddate,
+            outputdir=station_inputs.outputdir,
+            instrumentGain=station_inputs.instrument_gain,
+            keep_ispaq_outputs=True)
+
+        if station_inputs.uploadresultstos3 is True:
+            upload_results_to_s3(
+                path_of_folder_to_upload=get_validation_output_directory(
+                    network=station_inputs.network,
+                    station=station_inputs.station,
+                    startdate=station_inputs.startdate,
+                    enddate=station_inputs.enddate,
+                    outputdir=station_inputs.outputdir),
+                bucketName=station_inputs.bucketName,
+                s3directory=station_inputs.s3directory)
+    shutil.rmtree('ispaq_outputs', ignore_errors=True)
+    shutil.rmtree(BATCH_DIRECTORY, ignore_errors=True)
+    if os.path.exists('ISPAQ_TRANSCRIPT.log'):
+        os.remove('ISPAQ_TRANSCRIPT.log')
+
+
+def station_directory(user_inputs: UserInput) -> str:
+    '''
+    Returns the working directory of a station during a batch validation
+    '''
+    return os.path.abspath(os.path.join(
+        BATCH_DIRECTORY, f'{user_inputs.network}.{user_inputs.station}'))
+
+
+@contextmanager
+def station_working_directory(user_inputs: UserInput) -> Iterator[str]:
+    '''
+    Run from the working directory of a station, so that the outputs the
+    station writes to ./stationvalidation_output are kept apart from the
+    outputs of the stations processed at the same time
+    '''
+    directory = station_directory(user_inputs)
+    os.makedirs(directory, exist_ok=True)
+    previous_directory = os.getcwd()
+    os.chdir(directory)
+    try:
+        yield directory
+    finally:
+        os.chdir(previous_directory)
+
+
+def generate_station_latency_results(user_inputs: UserInput) -> list:
+    '''
+    Generate the latency results and plots of a station
+
+    Returns
+    -------
+    list:
+        The combined latency dataframe for all days, and the array of daily
+        latency dataframes of the station
+    '''
+    queue: Queue = Queue()
+    with station_working_directory(user_inputs):
+        generate_latency_results(
+            typeofinstrument=user_inputs.typeofinstrument,
+            network=user_inputs.network,
+            station=user_inputs.station,
+            startdate=user_inputs.startdate,
+            enddate=user_inputs.enddate,
+            path=user_inputs.latencyFiles,
+            timely_threshold=user_inputs.thresholds.getfloat(
+                'thresholds', 'data_timeliness', fallback=3),
+            location=user_inputs.location,
+            queue=queue,
+            # The stations are already processed in parallel, and pool
+            # workers can not start pools of their own
+            latency_workers=1)
+    return queue.get()
+
+
+def generate_station_soh_results(user_inputs: UserInput) -> dict:
+    '''
+    Generate the SOH report entries and plots of a station
+
+    Returns
+    -------
+    dict:
+        The SOH entries of the report of the station
+    '''
+    with station_working_directory(user_inputs):
+        return generate_soh_results(
+            typeofinstrument=user_inputs.typeofinstrument,
+            network=user_inputs.network,
+            station=user_inputs.station,
+            location=user_inputs.location,
+            startdate=user_inputs.startdate,
+            enddate=user_inputs.enddate,
+            soh_directory=user_inputs.soharchive,
+            miniseed_directory=user_inputs.miniseedarchive,
+            thresholds=user_inputs.thresholds,
+            timingSource=user_inputs.timingSource,
+            # The stations are already processed in parallel
+            workers=1)
+
+
+def generate_station_report(user_inputs: UserInput,
+                            stationMetricData: StationMetricData,
+                            latency_results: list,
+                            soh_results: Optional[dict] = None,
+                            ispaq_period: Optional[Tuple[date, date]] = None):
+    '''
+    Generate the metric plots, timely availability plot and report of a
+    station
+    '''
+    combined_latency_dataframe_for_all_days, \
+        latency_summary = latency_results
+    if ispaq_period is None:
+        ispaq_period = (user_inputs.startdate, user_inputs.enddate)
+    with station_working_directory(user_inputs):
+        plot_metrics_of_channels([
+            PlotParameters(network=user_inputs.network,
+                           station=user_inputs.station,
+                           location=user_inputs.location,
+                           channel=channel,
+                           stationMetricData=stationMetricData,
+                           start=ispaq_period[0],
+                           stop=ispaq_period[1])
+            for channel in stationMetricData.get_channels(
+                network=user_inputs.network,
+                station=user_inputs.station)])
+        logging.info(
+            f"Generating timely availability plot of {user_inputs.station}..")
+        timely_availability_plot(
+            latencies=combined_latency_dataframe_for_all_days,
+            stationMetricData=stationMetricData,
+            station=user_inputs.station,
+            startdate=user_inputs.startdate,
+            enddate=user_inputs.enddate,
+            network=user_inputs.network,
+            timely_threshold=user_inputs.thresholds
+            .getfloat('thresholds',
+                      'data_timeliness',
+                      fallback=3),
+            location=user_inputs.location
+        )
+        logging.info(f"Generating report of {user_inputs.station}..")
+        report(
+            combined_latency_dataframe_for_all_days=combined_latency_dataframe_for_all_days,  # noqa
+            typeofinstrument=user_inputs.typeofinstrument,
+            network=user_inputs.network,
+            station=user_inputs.station,
+            location=user_inputs.location,
+            stationmetricdata=stationMetricData,
+            start=user_inputs.startdate,
+            end=user_inputs.enddate,
+            thresholds=user_inputs.thresholds,
+            soharchive=user_inputs.soharchive,
+            miniseed_directory=user_inputs.miniseedarchive,
+            timingSource=user_inputs.timingSource,
+            latency_summary=latency_summary,
+            soh_results=soh_results,
+            metric_start=ispaq_period[0]
+        )
@@ -34,18 +34,13 @@ Functions:
 main()
     The main fuction, which takes care of calling the other functions
 '''
-import logging
-
-from datetime import timedelta
-from stationverification.utilities.cleanup_directory \
-    import cleanup_directory_after_latency_call, initialize_directory
-
+from stationverification.utilities.cleanup_directory import \
+    initialize_directory
 from stationverification.utilities.fetch_arguments import fetch_arguments
-from stationverification.utilities.generate_latency_results \
-    import generate_latency_results
-from stationverification.utilities.upload_results_to_s3 import \
-    upload_results_to_s3
+from stationverification.utilities.pipeline import run_pipeline
 from stationverification.utilities.update_station_xml import update_station_xml
+from stationverification.utilities.validation_stages import \
+    latency_validation_stages
 
 
 def main():
@@ -67,31 +62,4 @@ def main():
     update_station_xml()
     user_inputs = fetch_arguments()
 
-    generate_latency_results(typeofinstrument=user_inputs.typeofinstrument,
-                             network=user_inputs.network,
-                             station=user_inputs.station,
-                             startdate=user_inputs.startdate,
-                             enddate=user_inputs.enddate,
-                             path=user_inputs.latencyFiles,
-                             timely_threshold=user_inputs.thresholds
-                             .getfloat(
-                                 'thresholds', 'data_timeliness',
-                                 fallback=3))
-    logging.info("Cleaning up directory..")
-
-    cleanup_directory_after_latency_call(startdate=user_inputs.startdate,
-                                         enddate=user_inputs.enddate,
-                                         network=user_inputs.network,
-                                         station=user_inputs.station,
-                                         outputdir=user_inputs.outputdir)
-    if user_inputs.uploadresultstos3 is True:
-        logging.info("Uploading to S3 bucket..")
-        if user_inputs.startdate == user_inputs.enddate - timedelta(days=1):
-            validation_output_directory = f'{user_inputs.outputdir}/{user_inputs.network}/{user_inputs.station}/\
-{user_inputs.startdate}'
-        else:
-            validation_output_directory = f'{user_inputs.outputdir}/{user_inputs.network}/{user_inputs.station}/\
-{user_inputs.startdate}-{user_inputs.enddate}'
-        upload_results_to_s3(path_of_folder_to_upload=validation_output_directory,  # noqa
-                             bucketName=user_inputs.bucketName,
-                             s3directory=user_inputs.s3directory)
+    run_pipeline(latency_validation_stages(user_inputs))
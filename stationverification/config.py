@@ -1,6 +1,6 @@
 # flake8:noqa
 from functools import lru_cache
-from typing import Any
+from typing import Any, List, Optional
 from pydantic import BaseSettings
 from stationverification import CONFIG, ISPAQ_PREF, ISPAQ_PREF_CN
 
@@ -25,6 +25,49 @@ class BaseAppSettings(BaseSettings):
     S3_DIRECTORY: str = "validation_results"
     OUTPUT_DIRECTORY: str = "/validation"
     TIMING_SOURCE: str = "GNSS"
+    # Optional on-disk cache of the archive directory listings
+    ARCHIVE_INDEX_CACHE: Optional[str] = None
+    # Number of processes parsing the daily latency files, defaults to the
+    # number of cores
+    LATENCY_WORKERS: Optional[int] = None
+    # Number of stations validated at once in batch mode, defaults to the
+    # number of cores
+    STATION_WORKERS: Optional[int] = None
+    # RESP files converted from the station xml, cached by inventory hash
+    RESP_CACHE: str = "stationverification/data/resp_cache"
+    # Number of processes rendering the plots, defaults to the number of
+    # cores
+    PLOT_WORKERS: Optional[int] = None
+    # Cache the parsed ISPAQ csv files next to them, as numpy archives
+    ISPAQ_CSV_CACHE: bool = False
+    # Optional on-disk cache directory of the decoded SOH files
+    SOH_CACHE: Optional[str] = None
+    # Number of processes evaluating the SOH channels, defaults to the cores
+    SOH_WORKERS: Optional[int] = None
+    # Scan the miniSEED headers first, so that ISPAQ skips the days without
+    # data at the start and end of the validation period
+    MINISEED_PRECHECK: bool = False
+    # Days of the chunks ISPAQ is run in, e.g. 1 or 7 to run it by day or by
+    # week. 0 runs ISPAQ once over the whole validation period
+    ISPAQ_CHUNK_DAYS: int = 0
+    # Number of ISPAQ chunks run at once, defaults to the number of cores
+    ISPAQ_WORKERS: Optional[int] = None
+    # Optional cache directory of the ISPAQ metrics of each SNCL and day, so
+    # that ISPAQ only runs over the days not computed yet
+    ISPAQ_METRIC_CACHE: Optional[str] = None
+    # Optional SQLite database ISPAQ writes its metrics to instead of csv
+    # files, accumulating the metrics of every run
+    ISPAQ_DATABASE: Optional[str] = None
+    # Unix socket of the ISPAQ worker started with stationverificationispaq,
+    # ISPAQ is run as a subprocess when the worker is not running
+    ISPAQ_WORKER_SOCKET: Optional[str] = None
+    # Pool the stages of a validation run in, "process" or "thread"
+    PIPELINE_EXECUTOR: str = "process"
+    # Number of validation stages run at once, defaults to the number of
+    # cores
+    PIPELINE_WORKERS: Optional[int] = None
+    # Latency percentiles added to the report, e.g. [50, 95, 99]
+    LATENCY_PERCENTILES: List[float] = []
     # Default Config Files
 
     STATION_URL: str = "stationverification/data/QW.xml"
@@ -0,0 +1,255 @@
+'''
+This module indexes the daily files of a YYYY/MM/DD archive (latency, SOH or
+miniSEED) in a single pass, so that files can be looked up from memory instead
+of listing the archive for every day and channel.
+
+Classes
+-------
+ArchiveIndex:
+    In-memory index of the files stored in an archive for a date range
+
+Functions
+---------
+get_archive_index:
+    Returns the ArchiveIndex of an archive, building it only once per process
+
+parse_archive_filename:
+    Splits an archive file name into its network, station, location, channel,
+    year, julian day and extension
+'''
+import json
+import logging
+import os
+from datetime import date, timedelta
+from fnmatch import fnmatchcase
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
+
+from stationverification.config import get_default_parameters
+from stationverification.utilities.file_fingerprint import \
+    write_file_atomically
+
+# (network, station, location, channel, year, julian day, extension)
+ParsedFilename = Tuple[str, str, Optional[str], Optional[str], str, str, str]
+
+CACHE_VERSION = 1
+
+
+def parse_archive_filename(name: str) -> Optional[ParsedFilename]:
+    '''
+    Split the name of an archive file into its components. The following
+    naming schemes are supported:
+
+        Apollo latency: NET.STA.YYYY.JJJ.json
+        Guralp latency: NET_STA_LOC_CHA_YYYY_JJJ.csv
+        SOH and miniSEED: NET.STA.LOC.CHA.YYYY.JJJ
+
+    Parameters
+    ----------
+    name: str
+        The file name, without its directory
+
+    Returns
+    -------
+    tuple:
+        (network, station, location, channel, year, julian day, extension),
+        location and channel being None for station-wide files. None if the
+        file name does not follow any of the naming schemes
+    '''
+    stem, extension = name, ''
+    if name.endswith(('.json', '.csv')):
+        stem, extension = os.path.splitext(name)
+    parts = stem.split('_' if extension == '.csv' else '.')
+    if len(parts) == 4:
+        network, station, year, julian_day = parts
+        return network, station, None, None, year, julian_day, extension
+    if len(parts) == 6:
+        network, station, location, channel, year, julian_day = parts
+        return network, station, location, channel, year, julian_day, \
+            extension
+    return None
+
+
+class ArchiveIndex():
+    '''
+    In-memory index of the files of a YYYY/MM/DD archive for a date range.
+
+    The day directories of the date range are listed once with os.scandir
+    when the index is created. If a cache file is given, the listing of each
+    day directory is saved to it, and reused on the next run as long as the
+    modification time of the directory has not changed.
+
+    Properties
+    ----------
+    path: str
+        The root directory of the archive
+    startdate: date
+        The first day indexed
+    enddate: date
+        The end of the indexed period, non-inclusive
+    cache_file: str, optional
+        The path to the on-disk cache of the directory listings
+
+    Functions
+    ---------
+    find:
+        Returns the files of a day matching a network, station, location and
+        channel
+    '''
+
+    def __init__(
+        self,
+        path: str,
+        startdate: date,
+        enddate: date,
+        cache_file: Optional[str] = None
+    ):
+        self.path = path
+        self.startdate = startdate
+        self.enddate = enddate
+        self.cache_file = cache_file
+        # (day, network, station) -> [(location, channel, extension, path)]
+        self._entries: Dict[Tuple[Any, str, str],
+                            List[Tuple[Optional[str], Optional[str], str,
+                                       str]]] = {}
+        self._build()
+
+    def _build(self):
+        cached_directories = self._read_cache()
+        scanned_directories: Dict[str, dict] = {}
+        iterdate = self.startdate
+        while iterdate < self.enddate:
+            directory = f'{self.path}/{iterdate.strftime("%Y/%m/%d")}'
+            names = self._list_directory(
+                directory, cached_directories, scanned_directories)
+            year = f'{iterdate.year}'
+            julian_day = "%03d" % iterdate.timetuple().tm_yday
+            for name in names:
+                parsed = parse_archive_filename(name)
+                # Only keep the files named after the day they are stored in
+                if parsed is None or parsed[4:6] != (year, julian_day):
+                    continue
+                network, station, location, channel, _, _, extension = parsed
+                self._entries.setdefault(
+                    (iterdate, network, station), []).append(
+                        (location, channel, extension,
+                         f'{directory}/{name}'))
+            iterdate += timedelta(days=+1)
+        if self.cache_file is not None and scanned_directories:
+            cached_directories.update(scanned_directories)
+            self._write_cache(cached_directories)
+
+    def _list_directory(
+        self,
+        directory: str,
+        cached_directories: Dict[str, dict],
+        scanned_directories: Dict[str, dict]
+    ) -> List[str]:
+        try:
+            mtime = os.stat(directory).st_mtime_ns
+        except (FileNotFoundError, NotADirectoryError):
+            logging.debug(f'{directory} does not exist')
+            return []
+        key = os.path.abspath(directory)
+        cached = cached_directories.get(key)
+        if cached is not None and cached['mtime_ns'] == mtime:
+            return cached['names']
+        with os.scandir(directory) as iterator:
+            names = sorted(entry.name for entry in iterator
+                           if entry.is_file())
+        scanned_directories[key] = {'mtime_ns': mtime, 'names': names}
+        return names
+
+    def _read_cache(self) -> Dict[str, dict]:
+        if self.cache_file is None or not os.path.isfile(self.cache_file):
+            return {}
+        try:
+            with open(self.cache_file) as file:
+                cache = json.load(file)
+        except (OSError, ValueError) as e:
+            logging.warning(f'Ignoring archive index cache: {e}')
+            return {}
+        if cache.get('version') != CACHE_VERSION:
+            return {}
+        return cache.get('directories', {})
+
+    def _write_cache(self, directories: Dict[str, dict]):
+        if self.cache_file is None:
+            return
+        try:
+            with write_file_atomically(self.cache_file, mode='w') as file:
+                json.dump({'version': CACHE_VERSION,
+                           'directories': directories}, file)
+        except OSError as e:
+            logging.warning(f'Could not write archive index cache: {e}')
+
+    def find(
+        self,
+        day: date,
+        network: str,
+        station: str,
+        location: Optional[str] = None,
+        channel: Optional[str] = None,
+        extension: str = ''
+    ) -> List[str]:
+        '''
+        Get the files of a day for a network and station
+
+        Parameters
+        ----------
+        day: date
+            The day to get the files for
+        network: str
+            Network code
+        station: str
+            Station code
+        location: str, optional
+            Location code. If None, files of every location are returned
+        channel: str, optional
+            Channel code, which may contain wildcards such as 'H??'. If None,
+            files of every channel are returned
+        extension: str
+            The file extension, '.json' and '.csv' for latency files or ''
+            for SOH and miniSEED files
+
+        Returns
+        -------
+        list:
+            The paths of the matching files, sorted by name
+        '''
+        return [path for entry_location, entry_channel, entry_extension, path
+                in self._entries.get((day, network, station), [])
+                if entry_extension == extension
+                and (location is None or entry_location == location)
+                and (channel is None or (
+                    entry_channel is not None
+                    and fnmatchcase(entry_channel, channel)))]
+
+
+@lru_cache()
+def get_archive_index(path: str, startdate: date, enddate: date) \
+        -> ArchiveIndex:
+    '''
+    Get the index of an archive for a date range. The index is built once per
+    process and shared between all the lookups on the same archive. The
+    on-disk cache is enabled by setting VALIDATION_ARCHIVE_INDEX_CACHE.
+
+    Parameters
+    ----------
+    path: str
+        The root directory of the archive
+    startdate: date
+        The first day to index
+    enddate: date
+        The end of the period to index, non-inclusive
+
+    Returns
+    -------
+    ArchiveIndex:
+        The index of the archive
+    '''
+    return ArchiveIndex(
+        path=path,
+        startdate=startdate,
+        enddate=enddate,
+        cache_file=get_default_parameters().ARCHIVE_INDEX_CACHE)
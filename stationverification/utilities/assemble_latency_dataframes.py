@@ -0,0 +1,204 @@
+'''
+This module assembles latency DataFrames read file by file into a single
+DataFrame with explicit dtypes, concatenating the data only once.
+
+Functions
+---------
+with_latency_dtypes:
+    Restricts a latency DataFrame to the latency columns, with their dtypes
+empty_latency_dataframe:
+    Returns a latency DataFrame without any rows
+assemble_latency_dataframe:
+    Concatenates latency DataFrames in a single step
+iterate_daily_latency_dataframes:
+    Reads latency files one day at a time
+split_latency_dataframe_by_day:
+    Splits a latency DataFrame into one DataFrame for each day
+latency_start_times:
+    Returns the start times of a latency DataFrame as datetime64 values
+latency_day:
+    Returns the day of the first start time of a latency DataFrame
+'''
+import itertools
+import os
+
+from datetime import date
+from typing import Callable, Iterable, Iterator, List
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import is_datetime64_dtype, union_categoricals
+from pandas.core.frame import DataFrame
+
+from stationverification.utilities.latency_table import LATENCY_COLUMNS
+
+CATEGORICAL_LATENCY_COLUMNS = ('network', 'station', 'channel')
+
+LATENCY_DTYPES = {'network': 'category',
+                  'station': 'category',
+                  'channel': 'category',
+                  'startTime': 'datetime64[ns]',
+                  'data_latency': np.float32}
+
+
+def with_latency_dtypes(latency_dataframe: DataFrame) -> DataFrame:
+    '''
+    Get the latency columns of a DataFrame with their explicit dtypes:
+    categorical network, station and channel codes, datetime64 start times
+    and float32 latencies
+
+    Parameters
+    ----------
+    latency_dataframe: DataFrame
+        A DataFrame that contains at least the 'network', 'station',
+        'channel', 'startTime' and 'data_latency' columns
+
+    Returns
+    -------
+    DataFrame:
+        A DataFrame with only the latency columns
+    '''
+    return latency_dataframe[list(LATENCY_COLUMNS)].astype(LATENCY_DTYPES)
+
+
+def empty_latency_dataframe() -> DataFrame:
+    '''
+    Get a latency DataFrame without any rows, with the latency dtypes
+    '''
+    return pd.DataFrame(
+        {'network': pd.Categorical([]),
+         'station': pd.Categorical([]),
+         'channel': pd.Categorical([]),
+         'startTime': np.array([], dtype='datetime64[ns]'),
+         'data_latency': np.array([], dtype=np.float32)},
+        columns=LATENCY_COLUMNS)
+
+
+def assemble_latency_dataframe(
+        latency_dataframes: Iterable[DataFrame]) -> DataFrame:
+    '''
+    Concatenate latency DataFrames into one DataFrame. The columns are
+    gathered as arrays and concatenated once, instead of growing a DataFrame
+    for every file.
+
+    Parameters
+    ----------
+    latency_dataframes: iterable of DataFrames
+        DataFrames with the latency dtypes, as returned by with_latency_dtypes
+
+    Returns
+    -------
+    DataFrame:
+        All the latency values, in the order of the DataFrames given
+    '''
+    latency_dataframes = list(latency_dataframes)
+    if not latency_dataframes:
+        return empty_latency_dataframe()
+    columns = {}
+    for column in CATEGORICAL_LATENCY_COLUMNS:
+        columns[column] = union_categoricals(
+            [latency_dataframe[column]
+             for latency_dataframe in latency_dataframes])
+    columns['startTime'] = np.concatenate(
+        [latency_dataframe['startTime'].values
+         for latency_dataframe in latency_dataframes])
+    columns['data_latency'] = np.concatenate(
+        [latency_dataframe['data_latency'].values
+         for latency_dataframe in latency_dataframes]).astype(
+             np.float32, copy=False)
+    return pd.DataFrame(columns, columns=LATENCY_COLUMNS)
+
+
+def iterate_daily_latency_dataframes(
+        files: List[str],
+        read_latency_file: Callable[[str], DataFrame]) -> Iterator[DataFrame]:
+    '''
+    Read latency files one day at a time. Files are expected in date order,
+    as returned by get_latency_files, and are grouped by the day directory
+    they are stored in, so only one day of data is held in memory at once.
+
+    Parameters
+    ----------
+    files: list
+        The latency files, in date order
+    read_latency_file: function
+        Reads a single latency file into a DataFrame with the latency dtypes
+
+    Yields
+    ------
+    DataFrame:
+        The latency values of the files of one day
+    '''
+    for _, files_of_day in itertools.groupby(files, key=os.path.dirname):
+        yield assemble_latency_dataframe(
+            read_latency_file(file) for file in files_of_day)
+
+
+def split_latency_dataframe_by_day(
+        latency_dataframe: DataFrame,
+        startdate: date,
+        enddate: date) -> List[DataFrame]:
+    '''
+    Split a latency DataFrame into one DataFrame for each day of the
+    validation period, based on the date of the start time of each row. Days
+    without latency values get an empty DataFrame.
+
+    Parameters
+    ----------
+    latency_dataframe: DataFrame
+        Latency values with a datetime64 'startTime' column
+    startdate: date
+        The first day of the validation period
+    enddate: date
+        The end of the validation period, non-inclusive
+
+    Returns
+    -------
+    list:
+        A list of DataFrames, one for each day, in date order
+    '''
+    number_of_days = (enddate - startdate).days
+    day_offsets = (
+        latency_dataframe['startTime'].values.astype('datetime64[D]')
+        - np.datetime64(startdate, 'D')).astype(np.int64)
+    # A stable sort keeps the rows of each day in their original order
+    order = np.argsort(day_offsets, kind='stable')
+    boundaries = np.searchsorted(
+        day_offsets[order], np.arange(number_of_days + 1))
+    return [latency_dataframe.iloc[order[boundaries[day]:
+                                         boundaries[day + 1]]]
+            for day in range(number_of_days)]
+
+
+def latency_start_times(latency_dataframe: DataFrame) -> np.ndarray:
+    '''
+    Get the start times of a latency DataFrame as a datetime64[ns] array, to
+    be used directly for plotting and grouping. Start times read with the
+    latency dtypes are returned as they are, while other start times, such
+    as ISO 8601 strings, are parsed in bulk.
+
+    Parameters
+    ----------
+    latency_dataframe: DataFrame
+        A DataFrame with a 'startTime' column
+
+    Returns
+    -------
+    numpy array:
+        The naive UTC start times
+    '''
+    start_times = latency_dataframe['startTime']
+    if is_datetime64_dtype(start_times):
+        return start_times.values
+    return np.asarray(
+        pd.to_datetime(start_times, utc=True).dt.tz_convert(None),
+        dtype='datetime64[ns]')
+
+
+def latency_day(latency_dataframe: DataFrame) -> date:
+    '''
+    Get the day of the first start time of a non empty latency DataFrame,
+    such as one of the DataFrames returned by split_latency_dataframe_by_day
+    '''
+    return latency_start_times(latency_dataframe)[0].astype(
+        'datetime64[D]').item()
@@ -2,6 +2,8 @@
 
 import json
 import math
+from typing import List
+
 from stationverification.utilities import exceptions
 
 
@@ -15,6 +17,80 @@ def calculate_total_availability_for_nanometrics(files: list) -> float:
     files: list
         List of file paths to nanometric latency jsons
 
+    Outputs
+    -------
+    Total Availability Percentage to two decimal places
+    '''
+    list_of_channel_percent_availability_for_all_files = []
+    for file in files:
+        with open(file) as json_latency_file:
+            try:
+                latency_dict = json.load(json_latency_file)
+            except json.decoder.JSONDecodeError:
+                raise exceptions.LatencyFileError(
+                    f'Problem detected in latency file: {file}')
+        list_of_channel_percent_availability_for_all_files.append(
+            channel_percent_availability(latency_dict))
+    return total_availability_from_channel_percent_availability(
+        list_of_channel_percent_availability_for_all_files)
+
+
+def channel_percent_availability(latency_dict: dict) -> List[float]:
+    '''
+    Calculates the average percent availability of each channel of a
+    Nanometrics latency file
+
+    Parameters
+    ---------
+    latency_dict: dict
+        The content of a nanometrics latency json
+
+    Outputs
+    -------
+    The average percent availability of each channel, HNN, HNZ, and HNE, of
+    every station in the file
+    '''
+    return [average_channel_percent_availability(current_channel)
+            for current_channel in latency_dict["availability"]]
+
+
+def average_channel_percent_availability(current_channel: dict) -> float:
+    '''
+    Calculates the average percent availability of a channel of a
+    Nanometrics latency file
+
+    Parameters
+    ---------
+    current_channel: dict
+        An entry of the availability array of a nanometrics latency json
+
+    Outputs
+    -------
+    The average percent availability of the intervals of the channel
+    '''
+    sum_of_current_channels_percent_availability = 0
+    number_of_latency_objects_in_current_channel = \
+        len(current_channel["intervals"])
+    for latency_object in current_channel["intervals"]:
+        sum_of_current_channels_percent_availability += \
+            latency_object["percentAvailability"]
+    return sum_of_current_channels_percent_availability / \
+        number_of_latency_objects_in_current_channel
+
+
+def total_availability_from_channel_percent_availability(
+        list_of_channel_percent_availability_for_all_files: List[List[float]]) -> float:
+    '''
+    Calculates the total availability percentage from the average percent
+    availability of the channels of each latency file. Each file is weighted
+    equally, regardless of its number of channels.
+
+    Parameters
+    ---------
+    list_of_channel_percent_availability_for_all_files: list
+        For each latency file, the average percent availability of each of
+        its channels
+
     Outputs
     -------
     Total Availability Percentage to two decimal places
@@ -22,36 +98,14 @@ def calculate_total_availability_for_nanometrics(files: list) -> float:
     # The sum of the average percent availability of all files, to be divided by the number of files to get the final average percent availiablity
     total_sum_of_percent_availability_for_all_files = 0.
     # The number of latency files. Used to get the average percent availability
-    number_of_latency_files = len(files)
-    # final_average_percent_availability_for_all_files = total_sum_of_percent_availability_for_all_files / number_of_latency_files
-    final_average_percent_availability_for_all_files = 0.
-
-    for file in files:
-        # Getting the average percent availability for each file
-        json_latency_file = open(file)
-        try:
-            latency_dict = json.load(json_latency_file)
-        except json.decoder.JSONDecodeError:
-            raise exceptions.LatencyFileError(
-                f'Problem detected in latency file: {file}')
-        array_of_channels_in_current_latency_file = latency_dict["availability"]
-        number_of_channels = len(latency_dict["availability"])
-        sum_of_percent_availability_for_all_channels = 0.
-        # Iterating over each channel, HNN, HNZ, and HNE, and getting the average percent availability
-        for current_channel in array_of_channels_in_current_latency_file:
-            sum_of_current_channels_percent_availability = 0
-            number_of_latency_objects_in_current_channel = \
-                len(current_channel["intervals"])
-            average_percent_availability_for_current_channel = 0.
-            for latency_object in current_channel["intervals"]:
-                sum_of_current_channels_percent_availability += \
-                    latency_object["percentAvailability"]
-            average_percent_availability_for_current_channel = sum_of_current_channels_percent_availability / \
-                number_of_latency_objects_in_current_channel
-            sum_of_percent_availability_for_all_channels += average_percent_availability_for_current_channel
+    number_of_latency_files = len(
+        list_of_channel_percent_availability_for_all_files)
+    for channel_percent_availability_for_file in \
+            list_of_channel_percent_availability_for_all_files:
+        number_of_channels = len(channel_percent_availability_for_file)
         if number_of_channels > 0:
-            average_percent_availability_for_file = sum_of_percent_availability_for_all_channels / \
-                number_of_channels
+            average_percent_availability_for_file = sum(
+                channel_percent_availability_for_file) / number_of_channels
         else:
             average_percent_availability_for_file = 0
         total_sum_of_percent_availability_for_all_files += average_percent_availability_for_file
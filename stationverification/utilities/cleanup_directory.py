@@ -14,7 +14,8 @@ def cleanup_directory(
     startdate: date,
     enddate: date,
     outputdir: str,
-    instrumentGain: Optional[str] = None
+    instrumentGain: Optional[str] = None,
+    keep_ispaq_outputs: bool = False
 ):
     '''
     Function to clean up after the program runs.
@@ -36,14 +37,19 @@ def cleanup_directory(
     outputdir: string
         Path to the directory to deposit output tarball in. Default = None
 
+    keep_ispaq_outputs: bool
+        If True, the ISPAQ outputs and transcript are left in place for the
+        other stations of a batch validation, and the transcript is copied
+        instead of moved. Default = False
+
     '''
     # Create the final directory that the data will be placed in
-    if startdate == enddate - timedelta(days=1):
-        validation_output_directory = f'{outputdir}/{network}/{station}/\
-{startdate}'
-    else:
-        validation_output_directory = f'{outputdir}/{network}/{station}/\
-{startdate}-{enddate - timedelta(days=1)}'
+    validation_output_directory = get_validation_output_directory(
+        network=network,
+        station=station,
+        startdate=startdate,
+        enddate=enddate,
+        outputdir=outputdir)
     # Create the directory if it doesn't already exist
     if not os.path.isdir(validation_output_directory):
         subprocess.getoutput(
@@ -64,6 +70,11 @@ def cleanup_directory(
     subprocess.getoutput(
         "rm -rf stationvalidation_output")
 
+    if keep_ispaq_outputs:
+        subprocess.getoutput(
+            f"cp ISPAQ_TRANSCRIPT.log {validation_output_directory}")
+        return
+
     subprocess.getoutput(
         f"mv ISPAQ_TRANSCRIPT.log {validation_output_directory}")
 
@@ -71,6 +82,22 @@ def cleanup_directory(
         "rm -rf ispaq_outputs")
 
 
+def get_validation_output_directory(network: str,
+                                    station: str,
+                                    startdate: date,
+                                    enddate: date,
+                                    outputdir: str) -> str:
+    '''
+    Returns the directory the results of a station are placed in:
+    {outputdir}/{network}/{station}/{startdate}, or
+    {outputdir}/{network}/{station}/{startdate}-{last day} for more than a day
+    '''
+    if startdate == enddate - timedelta(days=1):
+        return f'{outputdir}/{network}/{station}/{startdate}'
+    return f'{outputdir}/{network}/{station}/\
+{startdate}-{enddate - timedelta(days=1)}'
+
+
 def cleanup_directory_after_latency_call(startdate: date,
                                          enddate: date,
                                          outputdir: str,
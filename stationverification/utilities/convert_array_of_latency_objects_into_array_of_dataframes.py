@@ -3,6 +3,9 @@ from typing import List
 import pandas as pd
 from pandas.core.frame import DataFrame
 
+from stationverification.utilities.assemble_latency_dataframes import \
+    latency_start_times
+
 
 def convert_array_of_latency_objects_into_array_of_dataframes(
         array_of_latencies: list):
@@ -10,6 +13,15 @@ def convert_array_of_latency_objects_into_array_of_dataframes(
                'startTime', 'data_latency')
     array_of_latency_dataframes: List[DataFrame] = []
     for latency_object in array_of_latencies:
-        array_of_latency_dataframes.append(pd.DataFrame(
-            data=latency_object, index=columns).T)
+        # Latencies parsed into a LatencyTable are already DataFrames
+        if isinstance(latency_object, DataFrame):
+            array_of_latency_dataframes.append(latency_object)
+            continue
+        latency_dataframe = pd.DataFrame(
+            data=latency_object, index=columns).T
+        # Parse the start times once, for the plots and daily statistics
+        if not latency_dataframe.empty:
+            latency_dataframe['startTime'] = latency_start_times(
+                latency_dataframe)
+        array_of_latency_dataframes.append(latency_dataframe)
     return array_of_latency_dataframes
@@ -36,3 +36,24 @@ class MissingConfigOrStationxml(Exception):
     Exception to be raised if either the stationXML or stationconfig file
     are not included
     '''
+
+
+class StationNotFoundError(Exception):
+    '''
+    Exception to be raised if no station of the network matches the stations
+    requested for a batch validation
+    '''
+
+
+class PipelineError(Exception):
+    '''
+    Exception to be raised if the stages of a validation do not form a valid
+    graph, or if one of them failed
+    '''
+
+
+class ISPAQWorkerError(Exception):
+    '''
+    Exception to be raised if the ISPAQ worker can not import the modules
+    ISPAQ uses, e.g. when it is not started with the python of ISPAQ
+    '''
@@ -111,6 +111,11 @@ class UserInput(dict):
 
 
 def fetch_arguments() -> UserInput:
+    args = build_argument_parser().parse_args()
+    return user_input_from_arguments(args=args, station=args.station)
+
+
+def build_argument_parser() -> argparse.ArgumentParser:
     # Create argparse object to handle user arguments
     argsparser = argparse.ArgumentParser()
     argsparser.add_argument(
@@ -286,11 +291,14 @@ fetched from the FDSN. Defaults to False',
         default=False
 
     )
-    args = argsparser.parse_args()
+    return argsparser
+
+
+def user_input_from_arguments(args: argparse.Namespace,
+                              station: str) -> UserInput:
     default_parameters = get_default_parameters()
 
     # Parameters required on every script call, with no default values
-    station = args.station
     network = args.network
     startdate = (dateparser.parse(args.startdate, yearfirst=True)).date()
     enddate = (dateparser.parse(args.enddate, yearfirst=True)).date()
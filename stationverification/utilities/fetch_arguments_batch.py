@@ -0,0 +1,95 @@
+import os
+
+from fnmatch import fnmatchcase
+from typing import List
+
+import obspy
+
+from stationverification.config import get_default_parameters
+from stationverification.utilities import exceptions
+from stationverification.utilities.fetch_arguments import UserInput, \
+    build_argument_parser, user_input_from_arguments
+
+
+def fetch_batch_arguments() -> List[UserInput]:
+    '''
+    Fetch the arguments of a batch validation. The arguments are the same as
+    for a single station, except that -S accepts a comma separated list of
+    station codes and wildcards, such as "QCC01,QCC02" or "QCC*", which are
+    expanded against the stations of the network in the station xml.
+    --psdOnly is rejected, as a batch always runs the full validation.
+
+    Returns
+    -------
+    list:
+        The UserInput of each station to validate, in the order they were
+        requested
+    '''
+    argsparser = build_argument_parser()
+    args = argsparser.parse_args()
+    if args.psdOnly:
+        argsparser.error('--psdOnly is not supported by a batch validation, \
+run stationverification for each station instead')
+    station_url = args.station_url if args.station_url is not None\
+        else get_default_parameters().STATION_URL
+    stations = expand_station_selection(network=args.network,
+                                        station_selection=args.station,
+                                        station_xml=station_url)
+    if not stations:
+        raise exceptions.StationNotFoundError(
+            f'No station of {args.network} matches {args.station} in \
+{station_url}')
+    list_of_user_inputs = []
+    for station in stations:
+        user_inputs = user_input_from_arguments(args=args, station=station)
+        # The stations are validated from their own working directory, so
+        # the paths given relative to the current directory are made absolute
+        for key in ('latencyFiles', 'miniseedarchive', 'soharchive',
+                    'outputdir'):
+            user_inputs[key] = os.path.abspath(user_inputs[key])
+        list_of_user_inputs.append(user_inputs)
+    return list_of_user_inputs
+
+
+def expand_station_selection(network: str,
+                             station_selection: str,
+                             station_xml: str) -> List[str]:
+    '''
+    Expand a comma separated list of station codes and wildcards into the
+    matching stations of a network
+
+    Parameters
+    ----------
+    network: str
+        The network code. Ex: QW
+    station_selection: str
+        Comma separated station codes or wildcards. Ex: QCC01,QCN*
+    station_xml: str
+        The station xml file, or FDSN webservice, listing the stations
+
+    Returns
+    -------
+    list:
+        The matching station codes, without duplicates, in the order of the
+        selection, and in the order of the station xml for each wildcard
+    '''
+    patterns = [pattern.strip().upper()
+                for pattern in station_selection.split(',') if pattern.strip()]
+    inventory_stations: List[str] = []
+    if any(any(character in pattern for character in '*?[')
+           for pattern in patterns):
+        inventory = obspy.read_inventory(station_xml)
+        inventory_stations = [
+            station.code
+            for inventory_network in inventory.select(network=network.upper())
+            for station in inventory_network]
+    stations: List[str] = []
+    for pattern in patterns:
+        if any(character in pattern for character in '*?['):
+            matches = [station for station in inventory_stations
+                       if fnmatchcase(station, pattern)]
+        else:
+            matches = [pattern]
+        stations.extend(station for station in matches
+                        if station not in stations)
+    return stations
@@ -0,0 +1,73 @@
+'''
+This module holds the file helpers shared by the caches: the fingerprint of
+the files a cache is built from, by their size and modification time, so that
+a cache entry is invalidated when its file changes without reading the file,
+and the atomic writing of the cache files.
+
+Functions
+---------
+file_fingerprint:
+    Returns the size and modification time of a file
+write_file_atomically:
+    Opens a temporary file that replaces a file once it is written
+'''
+import os
+import tempfile
+
+from contextlib import contextmanager
+from typing import IO, Iterator, List
+
+
+def file_fingerprint(file: str) -> List[int]:
+    '''
+    Returns the fingerprint of a file, its size in bytes and its modification
+    time in nanoseconds
+
+    Parameters
+    ----------
+    file: str
+        The path to the file
+
+    Returns
+    -------
+    list:
+        The size and modification time of the file
+    '''
+    status = os.stat(file)
+    return [status.st_size, status.st_mtime_ns]
+
+
+@contextmanager
+def write_file_atomically(file: str, mode: str = 'wb') -> Iterator[IO]:
+    '''
+    Opens a temporary file in the directory of a file, creating the
+    directory if needed. Once written, the temporary file replaces the file,
+    so that concurrent readers never see a partially written file. The
+    temporary file is removed if the writing fails.
+
+    Parameters
+    ----------
+    file: str
+        The path to the file
+    mode: str
+        The mode the temporary file is opened in, "wb" or "w"
+
+    Raises
+    ------
+    OSError:
+        If the temporary file can not be created, written or moved
+    '''
+    directory = os.path.dirname(os.path.abspath(file))
+    os.makedirs(directory, exist_ok=True)
+    file_descriptor, temporary_file = tempfile.mkstemp(
+        dir=directory, prefix='.', suffix='.tmp')
+    try:
+        with os.fdopen(file_descriptor, mode) as temporary:
+            yield temporary
+        os.replace(temporary_file, file)
+    except BaseException:
+        try:
+            os.remove(temporary_file)
+        except OSError:
+            pass
+        raise
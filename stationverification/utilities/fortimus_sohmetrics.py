@@ -1,5 +1,4 @@
 import logging
-import subprocess
 import re
 import numpy as np
 from configparser import ConfigParser
@@ -7,6 +6,7 @@ from datetime import date, timedelta
 from typing import Any, List
 from . import sohmetrics
 from stationverification.utilities import exceptions
+from stationverification.utilities.archive_index import get_archive_index
 from stationverification.utilities.plot_clock_offset import plot_clock_offset
 from stationverification.utilities.plot_DAC_voltage import plot_DAC_voltage
 
@@ -51,24 +51,16 @@ def get_fortimus_soh_files(
         period
     '''
     files: List[str] = []
+    archive_index = get_archive_index(soh_directory, startdate, enddate)
     iterdate = startdate
-    if location is None:
-        snlc = f'{network}.{station}.*.SOH'
-    else:
-        snlc = f'{network}.{station}.{location}.SOH'
     # Loop through all the dates
     while iterdate < enddate:
-        # Get the julian day and convert it to a 3 digit string
-        jday = "%03d" % iterdate.timetuple().tm_yday
         # Search for the file for the specific day
-        command = f'ls {soh_directory}/{iterdate.strftime("%Y/%m/%d")}/{snlc}\
-.{iterdate.year}.{jday} 2>/dev/null'
-        logging.debug(command)
-        output = subprocess.getoutput(command)
-        if len(output) > 0:
-            # Add the file to a list
-            files = files + output.split('\n')
-
+        files = files + archive_index.find(day=iterdate,
+                                           network=network,
+                                           station=station,
+                                           location=location,
+                                           channel="SOH")
         iterdate = iterdate + timedelta(days=+1)
     # Raise an error if no files were collected
     if len(files) < 1:
@@ -110,6 +102,39 @@ def handle_fortimus_soh_miniseed_metrics(
     Tuple
         Results from each miniseed files used for SOH metrics
     '''
+    json_dict = handle_fortimus_clock_offset_metric(
+        network=network,
+        station=station,
+        startdate=startdate,
+        enddate=enddate,
+        miniseed_directory=miniseed_directory,
+        json_dict=json_dict,
+        timingSource=timingSource,
+        location=location)
+    handle_fortimus_DAC_voltage_plot(
+        network=network,
+        station=station,
+        startdate=startdate,
+        enddate=enddate,
+        miniseed_directory=miniseed_directory,
+        location=location)
+    return json_dict
+
+
+def handle_fortimus_clock_offset_metric(
+        network: str,
+        station: str,
+        startdate: date,
+        enddate: date,
+        miniseed_directory: str,
+        json_dict: dict,
+        timingSource: str,
+        location: Any = None) -> dict:
+    '''
+    Validates and plots the clock offset of the LEO channel, or of the LEP
+    channel if the timing source is not GNSS, and adds its result to the
+    report
+    '''
     try:
         clock_offset_sohfiles = \
             sohmetrics.getsohfiles(network=network,
@@ -144,6 +169,19 @@ def handle_fortimus_soh_miniseed_metrics(
         logging.error(e)
         logging.warning(
             'LEO data does not exist. Skipping clock offset metric.')
+    return json_dict
+
+
+def handle_fortimus_DAC_voltage_plot(
+        network: str,
+        station: str,
+        startdate: date,
+        enddate: date,
+        miniseed_directory: str,
+        location: Any = None):
+    '''
+    Plots the DAC voltage of the LED channel
+    '''
     try:
         DAC_voltage_sohfiles = \
             sohmetrics.getsohfiles(network=network,
@@ -161,7 +199,6 @@ def handle_fortimus_soh_miniseed_metrics(
         logging.error(e)
         logging.warning(
             'LED data does not exist. Skipping DAC Voltage Plot.')
-    return json_dict
 
 
 def validate_clock_offset_metric(
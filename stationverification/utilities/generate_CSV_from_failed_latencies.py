@@ -3,6 +3,9 @@ import os
 from datetime import date, timedelta
 from typing import Any, Optional
 
+from stationverification.utilities.latency_statistics import \
+    LatencySummary, summarize_latencies
+
 
 def generate_CSV_from_failed_latencies(latency_dataframe: Any,
                                        station: str,
@@ -11,6 +14,8 @@ def generate_CSV_from_failed_latencies(latency_dataframe: Any,
                                        enddate: date,
                                        timely_threshold: float,
                                        location: Optional[str] = None,
+                                       latency_summary: Optional[
+                                           LatencySummary] = None,
                                        ):
     if location is None:
         snlc = f'{network}.{station}..'
@@ -22,9 +27,12 @@ def generate_CSV_from_failed_latencies(latency_dataframe: Any,
         filename = f'{snlc}.{startdate}_\
 {enddate - timedelta(days=1)}'
 
-    latencies_above_three = latency_dataframe.loc[
-        latency_dataframe.data_latency
-        > timely_threshold]
+    if latency_summary is None or \
+            latency_summary.timely_threshold != timely_threshold:
+        latency_summary = summarize_latencies(
+            latency_dataframe, timely_threshold=timely_threshold)
+    # A weighted latency value is written once for each packet it stands for
+    latencies_above_three = latency_dataframe.iloc[latency_summary.late_rows]
     # This part is specifically for Guralp Latencies.
     # Need to look into if its neccessary
     # if 'date' in latencies.columns:
@@ -40,8 +48,7 @@ def generate_CSV_from_failed_latencies(latency_dataframe: Any,
     latencies_above_three_rounded["data_latency"] = round(
         latencies_above_three_rounded.data_latency.astype(float), 1)
 
-    if not os.path.isdir('./stationvalidation_output/'):
-        os.mkdir('./stationvalidation_output/')
+    os.makedirs('./stationvalidation_output/', exist_ok=True)
     latencies_above_three_rounded.to_csv(
         f'./stationvalidation_output/{filename}.failed_latencies.csv',
         index=False)
@@ -4,9 +4,12 @@ import pandas as pd
 
 def generate_combined_latency_dataframe_for_all_days(
         list_of_latencies_for_all_days: list) -> DataFrame:
-    latency_dataframe = pd.DataFrame(
-        data=[])
-    for latency in list_of_latencies_for_all_days:
-        latency_dataframe = latency_dataframe.append(
-            latency, ignore_index=True)
-    return latency_dataframe
+    # Concatenating once, rather than appending each day to a growing
+    # DataFrame, which copies every previous day again on each iteration
+    list_of_latencies_for_all_days = [
+        latency if isinstance(latency, DataFrame) else DataFrame(latency)
+        for latency in list_of_latencies_for_all_days]
+    if not list_of_latencies_for_all_days:
+        return pd.DataFrame(data=[])
+    return pd.concat(list_of_latencies_for_all_days, ignore_index=True,
+                     sort=False)
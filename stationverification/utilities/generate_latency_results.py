@@ -3,21 +3,16 @@ from datetime import date
 from typing import Any, Optional
 
 from pandas.core.frame import DataFrame
-from stationverification.utilities.\
-    calculate_total_availability_for_nanometrics import \
-    calculate_total_availability_for_nanometrics
-from stationverification.utilities.\
-    convert_array_of_latency_objects_into_array_of_dataframes import \
-    convert_array_of_latency_objects_into_array_of_dataframes
 from stationverification.utilities.generate_CSV_from_failed_latencies import \
     generate_CSV_from_failed_latencies
 from stationverification.utilities.get_latencies import get_latencies
 from stationverification.utilities.get_latency_files import get_latency_files
+from stationverification.utilities.ingest_apollo_latency_files import \
+    ingest_apollo_latency_files
 from stationverification.utilities.latency_line_plot import latency_line_plot
 from stationverification.utilities.latency_log_plot import latency_log_plot
-from stationverification.utilities.\
-    generate_combined_latency_dataframe_for_all_days \
-    import generate_combined_latency_dataframe_for_all_days
+from stationverification.utilities.latency_statistics import \
+    summarize_latencies
 logging.basicConfig(
     format='%(asctime)s Station Validation: %(message)s',
     level=logging.INFO,
@@ -32,7 +27,9 @@ def generate_latency_results(typeofinstrument: str,
                              path: str,
                              timely_threshold: float,
                              location: Optional[str] = None,
-                             queue: Optional[Any] = False,) -> DataFrame:
+                             queue: Optional[Any] = False,
+                             latency_workers: Optional[int] = None) \
+        -> DataFrame:
     logging.info("Fetching latency files..")
     try:
         files = get_latency_files(typeofinstrument=typeofinstrument,
@@ -43,41 +40,46 @@ def generate_latency_results(typeofinstrument: str,
         logging.info("Populating latency data..")
 
         # Gather the latency information for the station
-        list_of_latencies_for_all_days, \
-            array_of_daily_latency_objects_max_latency_only, \
-            array_of_daily_latency_objects_all_latencies = get_latencies(
-                typeofinstrument=typeofinstrument,
+        total_availability = None
+        if typeofinstrument.lower() == "titansma":
+            # Each daily file is parsed once for both the latencies and the
+            # total availability. The combined and max latencies data are
+            # views of the same latency table
+            latency_ingestion = ingest_apollo_latency_files(
                 files=files,
                 network=network,
                 station=station,
-                startdate=startdate,
-                enddate=enddate)
-        # Produce latency plots
-        total_availability = None
-        if typeofinstrument.lower() == "titansma":
-            logging.info("Calculating total availability..")
-            total_availability = calculate_total_availability_for_nanometrics(
-                files)
+                workers=latency_workers)
+            latency_table = latency_ingestion.latency_table
+            total_availability = latency_ingestion.total_availability
             logging.info("Generating max daily latencies..")
             array_of_daily_latency_dataframes_max_latency_only = \
-                convert_array_of_latency_objects_into_array_of_dataframes(
-                    array_of_latencies=array_of_daily_latency_objects_max_latency_only)  # noqa
-            logging.info("Generating all daily latencies..")
-            array_of_daily_latency_dataframes_all_latencies = \
-                convert_array_of_latency_objects_into_array_of_dataframes(
-                    array_of_latencies=array_of_daily_latency_objects_all_latencies)  # noqa
+                latency_table.daily_dataframes(max_latency_only=True)
             logging.info("Generating all latencies dataframe..")
             combined_latency_dataframe_for_all_days = \
-                generate_combined_latency_dataframe_for_all_days(
-                    list_of_latencies_for_all_days=array_of_daily_latency_dataframes_all_latencies)  # noqa
+                latency_table.to_dataframe()
+            list_of_latencies_for_all_days = \
+                combined_latency_dataframe_for_all_days
         elif typeofinstrument.lower() == "fortimus":
+            list_of_latencies_for_all_days, \
+                array_of_daily_latency_objects_max_latency_only, \
+                array_of_daily_latency_objects_all_latencies = get_latencies(
+                    typeofinstrument=typeofinstrument,
+                    files=files,
+                    network=network,
+                    station=station,
+                    startdate=startdate,
+                    enddate=enddate)
             array_of_daily_latency_dataframes_max_latency_only = \
                 array_of_daily_latency_objects_all_latencies
-            array_of_daily_latency_dataframes_all_latencies = \
-                array_of_daily_latency_objects_all_latencies
             combined_latency_dataframe_for_all_days = \
                 list_of_latencies_for_all_days
 
+        logging.info("Computing latency statistics..")
+        latency_summary = summarize_latencies(
+            combined_latency_dataframe_for_all_days,
+            timely_threshold=timely_threshold)
+
         logging.info("Generating latency log plots..")
 
         latency_log_plot(latencies=list_of_latencies_for_all_days,  # noqa
@@ -88,7 +90,8 @@ def generate_latency_results(typeofinstrument: str,
                          network=network,
                          timely_threshold=timely_threshold,
                          total_availability=total_availability,
-                         location=location
+                         location=location,
+                         latency_summary=latency_summary
                          )
         logging.info("Generating latency line plots..")
 
@@ -108,11 +111,12 @@ def generate_latency_results(typeofinstrument: str,
             startdate=startdate,
             enddate=enddate,
             timely_threshold=timely_threshold,
-            location=location
+            location=location,
+            latency_summary=latency_summary
         )
         tuple_of_data_to_return = [
             combined_latency_dataframe_for_all_days,
-            array_of_daily_latency_dataframes_all_latencies]
+            latency_summary]
         if queue:
             queue.put(tuple_of_data_to_return)
         return combined_latency_dataframe_for_all_days
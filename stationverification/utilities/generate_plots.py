@@ -4,6 +4,13 @@ This module generates plots to be used in the station verification process
 Functions
 ---------
 
+plot_metrics:
+    Plots the metrics of a channel
+plot_metrics_of_channels:
+    Plots the metrics of several channels at once, in a pool of processes
+metric_plot_jobs:
+    Returns the plot jobs of the metrics of a channel
+
 plot_psd:
     Plots probabilistic spectral density data against the 2g and 4g noise
     curves
@@ -36,16 +43,18 @@ from configparser import ConfigParser
 import logging
 import os
 from datetime import date, timedelta
+from typing import List, Optional
 import numpy as np
 
 import matplotlib
-import matplotlib.pyplot as plt
+from matplotlib.figure import Figure
 import matplotlib.ticker as ticker
 import matplotlib.ticker as plticker
 import matplotlib.dates as mdates
 
 
 from .generate_report import StationMetricData
+from .render_plots import PlotJob, render_plots
 from stationverification import CONFIG
 
 
@@ -85,21 +94,49 @@ class PlotParameters(dict):
         return thresholds
 
 
-def plot_metrics(plotParameters: PlotParameters):
-    if not os.path.isdir("./stationvalidation_output"):
-        os.mkdir('./stationvalidation_output')
-    ADC_plot(plotParameters)
-    max_gap_plot(plotParameters)
-    num_gaps_plot(plotParameters)
-    num_overlaps_plot(plotParameters)
-
-    spikes_plot(plotParameters)
-    # percent_availability_plot(plotParameters)
-    pct_above_nhnm_plot(plotParameters)
-    pct_below_nlnm_plot(plotParameters)
-
-    # dead_channel_lin_plot(plotParameters)
-    # dead_channel_gsn_plot(plotParameters)
+def plot_metrics(plotParameters: PlotParameters,
+                 workers: Optional[int] = None):
+    '''
+    Plot the metrics of a channel, rendering the plots in a pool of processes
+    '''
+    plot_metrics_of_channels([plotParameters], workers=workers)
+
+
+def plot_metrics_of_channels(list_of_plotParameters: List[PlotParameters],
+                             workers: Optional[int] = None):
+    '''
+    Plot the metrics of several channels, rendering the plots of all the
+    channels in the same pool of processes
+
+    Parameters
+    ----------
+    list_of_plotParameters: list
+        The PlotParameters of each channel
+    workers: int, optional
+        The number of processes rendering the plots. Defaults to
+        VALIDATION_PLOT_WORKERS
+    '''
+    os.makedirs('./stationvalidation_output', exist_ok=True)
+    jobs = []
+    for plotParameters in list_of_plotParameters:
+        jobs.extend(metric_plot_jobs(plotParameters))
+    render_plots(jobs, workers=workers)
+
+
+def metric_plot_jobs(plotParameters: PlotParameters) -> List[PlotJob]:
+    '''
+    Get the plot jobs of the metrics of a channel. Each job only carries the
+    metric data of the channel, rather than the results of every station.
+    '''
+    channel_plotParameters = PlotParameters(
+        plotParameters,
+        stationMetricData=plotParameters.stationMetricData.select(
+            network=plotParameters.network,
+            station=plotParameters.station,
+            channel=plotParameters.channel))
+    return [PlotJob(render=plot, arguments=dict(
+        plotParameters=channel_plotParameters))
+        for plot in METRIC_PLOTS]
 
 # Function to graph the ADC plot for visual representation
 # Since what values are normal for these metrics seems to differ from one
@@ -130,7 +167,7 @@ def ADC_plot(
     x_axis = np.arange(0, difference.days, 1)
 
     # Create plot
-    fig = plt.figure()
+    fig = Figure()
     ax = fig.add_subplot(111)
 
     # Plot the min, max and median normalized to the mean. This makes it
@@ -165,9 +202,9 @@ def ADC_plot(
                 'sample_rms', network, station, channel),
             marker='o', label='Sample RMS')
 
-        legend = plt.legend(fancybox=True, framealpha=0.2,
-                            bbox_to_anchor=(1.4, 1.0),
-                            loc='upper right', fontsize="9")
+        legend = ax.legend(fancybox=True, framealpha=0.2,
+                           bbox_to_anchor=(1.4, 1.0),
+                           loc='upper right', fontsize="9")
 
         # Function for formatting the x values to actually be dates
         def timeTicks(x, pos):
@@ -179,13 +216,13 @@ def ADC_plot(
         ax.xaxis.set_major_formatter(formatter)
         locator = mdates.DayLocator()
         ax.xaxis.set_major_locator(locator)
-        plt.xticks(rotation=90)
-        plt.title(
+        ax.tick_params(axis='x', labelrotation=90)
+        ax.set_title(
             f'{snlc} - \
 ADC Count (range: [0, +/- 8,388,608])', pad=20)
-        plt.ylabel('Amplitude value')
+        ax.set_ylabel('Amplitude value')
         ax.set_axisbelow(True)
-        plt.grid(visible=True, which='both', axis='both', linewidth=0.5)
+        ax.grid(visible=True, which='both', axis='both', linewidth=0.5)
 
         # Save the plot to file and then close it so the next channel's metrics
         # aren't plotted on the same plot
@@ -195,11 +232,10 @@ ADC Count (range: [0, +/- 8,388,608])', pad=20)
             plot_filename = f'{snlc}.{start}_\
 {(stop + timedelta(days=-1))}.adc_count'
         # Write the plot to the output directory
-        plt.savefig(f'stationvalidation_output/{plot_filename}.png',
+        fig.savefig(f'stationvalidation_output/{plot_filename}.png',
                     dpi=300,
                     bbox_extra_artists=(legend,),
                     bbox_inches='tight')
-    plt.close()
 
 
 def num_overlaps_plot(
@@ -225,7 +261,7 @@ def num_overlaps_plot(
     x_axis = np.arange(0, difference.days, 1)
 
     # Create plot
-    fig = plt.figure()
+    fig = Figure()
     ax = fig.add_subplot(111)
     loc = plticker.MultipleLocator(base=1)
     ax.yaxis.set_major_locator(loc)
@@ -251,14 +287,14 @@ def num_overlaps_plot(
         ax.xaxis.set_major_formatter(formatter)
         locator = mdates.DayLocator()
         ax.xaxis.set_major_locator(locator)
-        plt.xticks(rotation=90)
+        ax.tick_params(axis='x', labelrotation=90)
 
         ax.set_title(f'{snlc} - Number of overlaps', pad=20)
-        plt.ylabel('Overlaps')
+        ax.set_ylabel('Overlaps')
 
         # Add a grid to the plot to make the symmetry more obvious
         ax.set_axisbelow(True)
-        plt.grid(visible=True, which='both', axis='both', linewidth=0.5)
+        ax.grid(visible=True, which='both', axis='both', linewidth=0.5)
         ax.axhline(number_overlaps_threshold, color='r', linewidth="2",
                    linestyle='--',
                    label=f"Maximum number of overlaps threshold: \
@@ -276,10 +312,9 @@ def num_overlaps_plot(
 {(stop + timedelta(days=-1))}.num_overlaps'
 
         # Write the plot to the output directory
-        plt.savefig(f'stationvalidation_output/{plot_filename}.png',
+        fig.savefig(f'stationvalidation_output/{plot_filename}.png',
                     dpi=300, bbox_extra_artists=(legend,), bbox_inches='tight')
         logging.info(f'{plot_filename} created.')
-    plt.close()
 
 
 def num_gaps_plot(
@@ -305,7 +340,7 @@ def num_gaps_plot(
     x_axis = np.arange(0, difference.days, 1)
 
     # Create plot
-    fig = plt.figure()
+    fig = Figure()
     ax = fig.add_subplot(111)
     # this locator puts ticks at regular intervals in setps of "base"
     loc = plticker.MultipleLocator(base=1)
@@ -332,15 +367,15 @@ def num_gaps_plot(
         # Format the x axis values to be dates and rotate them 90 degrees
         formatter = matplotlib.ticker.FuncFormatter(timeTicks)
         ax.xaxis.set_major_formatter(formatter)
-        plt.xticks(rotation=90)
+        ax.tick_params(axis='x', labelrotation=90)
         locator = mdates.DayLocator()
         ax.xaxis.set_major_locator(locator)
         ax.set_title(f'{snlc} - Number of Gaps', pad=20)
-        plt.ylabel('Gaps')
+        ax.set_ylabel('Gaps')
 
         # Add a grid to the plot to make the symmetry more obvious
         ax.set_axisbelow(True)
-        plt.grid(visible=True, which='both', axis='both', linewidth=0.5)
+        ax.grid(visible=True, which='both', axis='both', linewidth=0.5)
         # Adding the threshold line
         ax.axhline(num_gaps_threshold, color='r', linewidth="1",
                    linestyle='--',
@@ -357,10 +392,9 @@ def num_gaps_plot(
             plot_filename = f'{snlc}.{start}_\
 {(stop + timedelta(days=-1))}.num_gaps'
         # Write the plot to the output directory
-        plt.savefig(f'stationvalidation_output/{plot_filename}.png',
+        fig.savefig(f'stationvalidation_output/{plot_filename}.png',
                     dpi=300, bbox_extra_artists=(legend,), bbox_inches='tight')
         logging.info(f'{plot_filename} created.')
-    plt.close()
 
 
 def max_gap_plot(
@@ -385,7 +419,7 @@ def max_gap_plot(
     x_axis = np.arange(0, difference.days, 1)
 
     # Create plot
-    fig = plt.figure()
+    fig = Figure()
     ax = fig.add_subplot(111)
     # this locator puts ticks at regular intervals in setps of "base"
     loc = plticker.MultipleLocator(base=1)
@@ -414,14 +448,14 @@ def max_gap_plot(
         ax.xaxis.set_major_formatter(formatter)
         locator = mdates.DayLocator()
         ax.xaxis.set_major_locator(locator)
-        plt.xticks(rotation=90)
+        ax.tick_params(axis='x', labelrotation=90)
 
         ax.set_title(f'{snlc} - Max Gaps', pad=20)
-        plt.ylabel('Gap size (Seconds)')
+        ax.set_ylabel('Gap size (Seconds)')
 
         # Add a grid to the plot to make the symmetry more obvious
         ax.set_axisbelow(True)
-        plt.grid(visible=True, which='both', axis='both', linewidth=0.5)
+        ax.grid(visible=True, which='both', axis='both', linewidth=0.5)
         ax.axhline(size_of_gaps_threshold, color='r', linewidth="1",
                    linestyle='--',
                    label=f"Maximum size of gaps: \
@@ -437,10 +471,9 @@ def max_gap_plot(
             plot_filename = f'{snlc}.{start}_\
 {(stop + timedelta(days=-1))}.max_gap'
         # Write the plot to the output directory
-        plt.savefig(f'stationvalidation_output/{plot_filename}.png',
+        fig.savefig(f'stationvalidation_output/{plot_filename}.png',
                     dpi=300, bbox_extra_artists=(legend,), bbox_inches='tight')
         logging.info(f'{plot_filename} created.')
-    plt.close()
 
 
 def spikes_plot(
@@ -466,7 +499,7 @@ def spikes_plot(
     x_axis = np.arange(0, difference.days, 1)
 
     # Create plot
-    fig = plt.figure()
+    fig = Figure()
     ax = fig.add_subplot(111)
     # this locator puts ticks at regular intervals in setps of "base"
     loc = plticker.MultipleLocator(base=1.0)
@@ -503,14 +536,14 @@ def spikes_plot(
         ax.xaxis.set_major_formatter(formatter)
         locator = mdates.DayLocator()
         ax.xaxis.set_major_locator(locator)
-        plt.xticks(rotation=90)
+        ax.tick_params(axis='x', labelrotation=90)
 
         ax.set_title(f'{snlc} - Spikes', pad=20)
-        plt.ylabel('Spikes')
+        ax.set_ylabel('Spikes')
 
         # Add a grid to the plot to make the symmetry more obvious
         ax.set_axisbelow(True)
-        plt.grid(visible=True, which='both', axis='both', linewidth=0.5)
+        ax.grid(visible=True, which='both', axis='both', linewidth=0.5)
 
         # Save the plot to file and then close it so the next channel's metrics
         # aren't plotted on the same plot
@@ -520,10 +553,9 @@ def spikes_plot(
             plot_filename = f'{snlc}.{start}_\
 {(stop + timedelta(days=-1))}.spikes'
         # Write the plot to the output directory
-        plt.savefig(f'stationvalidation_output/{plot_filename}.png',
+        fig.savefig(f'stationvalidation_output/{plot_filename}.png',
                     dpi=300, bbox_extra_artists=(legend,), bbox_inches='tight')
         logging.info(f'{plot_filename} created.')
-    plt.close()
 
 
 def pct_above_nhnm_plot(
@@ -548,7 +580,7 @@ def pct_above_nhnm_plot(
     x_axis = np.arange(0, difference.days, 1)
 
     # Create plot
-    fig = plt.figure()
+    fig = Figure()
     ax = fig.add_subplot(111)
     # this locator puts ticks at regular intervals in setps of "base"
     loc = plticker.MultipleLocator(base=10.0)
@@ -566,7 +598,7 @@ def pct_above_nhnm_plot(
             x_axis, y_axis_rounded, width=0.1)
         ax.bar_label(bars)
 
-        # legend = plt.legend(fancybox=True, framealpha=0.2,
+        # legend = ax.legend(fancybox=True, framealpha=0.2,
         #                     loc='upper right', fontsize="9")
         # Function for formatting the x values to actually be dates
 
@@ -579,16 +611,16 @@ def pct_above_nhnm_plot(
         ax.xaxis.set_major_formatter(formatter)
         locator = mdates.DayLocator()
         ax.xaxis.set_major_locator(locator)
-        plt.xticks(rotation=90)
+        ax.tick_params(axis='x', labelrotation=90)
 
         ax.set_title(
             f'{snlc} - \
 Percent above New High Noise Model', pad=20)
-        plt.ylabel('Percentage')
+        ax.set_ylabel('Percentage')
         ax.yaxis.set_major_formatter(ticker.PercentFormatter(xmax=100))
         # Add a grid to the plot to make the symmetry more obvious
         ax.set_axisbelow(True)
-        plt.grid(visible=True, which='both', axis='both', linewidth=0.5)
+        ax.grid(visible=True, which='both', axis='both', linewidth=0.5)
         ax.axhline(pct_above_nhnm_threshold, color='r', linewidth="1",
                    linestyle='--',
                    label=f"Percent Above New High Noise Modal threshold: \
@@ -605,10 +637,9 @@ Percent above New High Noise Model', pad=20)
             plot_filename = f'{snlc}.{start}_\
 {(stop + timedelta(days=-1))}.pct_above_nhnm'
         # Write the plot to the output directory
-        plt.savefig(f'stationvalidation_output/{plot_filename}.png',
+        fig.savefig(f'stationvalidation_output/{plot_filename}.png',
                     dpi=300, bbox_extra_artists=(legend,), bbox_inches='tight')
         logging.info(f'{plot_filename} created.')
-    plt.close()
 
 
 def pct_below_nlnm_plot(
@@ -634,7 +665,7 @@ def pct_below_nlnm_plot(
     x_axis = np.arange(0, difference.days, 1)
 
     # Create plot
-    fig = plt.figure()
+    fig = Figure()
     ax = fig.add_subplot(111)
     # this locator puts ticks at regular intervals in setps of "base"
     loc = plticker.MultipleLocator(base=10.0)
@@ -670,16 +701,16 @@ def pct_below_nlnm_plot(
         ax.xaxis.set_major_formatter(formatter)
         locator = mdates.DayLocator()
         ax.xaxis.set_major_locator(locator)
-        plt.xticks(rotation=90)
+        ax.tick_params(axis='x', labelrotation=90)
 
         ax.set_title(
             f'{snlc} - \
 Percent below New Low Noise Model', pad=20)
-        plt.ylabel('Percentage')
+        ax.set_ylabel('Percentage')
         ax.yaxis.set_major_formatter(ticker.PercentFormatter(xmax=100))
         # Add a grid to the plot to make the symmetry more obvious
         ax.set_axisbelow(True)
-        plt.grid(visible=True, which='both', axis='both', linewidth=0.5)
+        ax.grid(visible=True, which='both', axis='both', linewidth=0.5)
 
         # Save the plot to file and then close it so the next channel's metrics
         # aren't plotted on the same plot
@@ -690,7 +721,21 @@ Percent below New Low Noise Model', pad=20)
             plot_filename = f'{snlc}.{start}_\
 {(stop + timedelta(days=-1))}.pct_below_nlnm'
         # Write the plot to the output directory
-        plt.savefig(f'stationvalidation_output/{plot_filename}.png',
+        fig.savefig(f'stationvalidation_output/{plot_filename}.png',
                     dpi=300, bbox_extra_artists=(legend,), bbox_inches='tight')
         logging.info(f'{plot_filename} created.')
-    plt.close()
+
+
+# The plots generated for each channel by plot_metrics
+METRIC_PLOTS = (
+    ADC_plot,
+    max_gap_plot,
+    num_gaps_plot,
+    num_overlaps_plot,
+    spikes_plot,
+    # percent_availability_plot,
+    pct_above_nhnm_plot,
+    pct_below_nlnm_plot,
+    # dead_channel_lin_plot,
+    # dead_channel_gsn_plot,
+)
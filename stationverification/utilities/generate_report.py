@@ -21,6 +21,7 @@ report:
 '''
 from datetime import date, timedelta
 import os
+from stationverification.config import get_default_parameters
 from stationverification.utilities.add_soh_results_to_report \
     import add_soh_results_to_report
 
@@ -31,8 +32,15 @@ import logging
 import pandas as pd
 from pandas.core.frame import DataFrame
 from .latency import latencyreport
+from .latency_statistics import LatencySummary
+from .read_ispaq_metric_files import \
+    assemble_metric_dataframe, read_ispaq_metric_files
+from .handle_running_ispaq_command import ISPAQ_CSV_SUFFIXES
+from .ispaq_metric_database import read_ispaq_metric_database
+from .run_ispaq_in_chunks import ispaq_csv_filename, ispaq_metric_names
+import numpy as np
 from configparser import ConfigParser
-from typing import Any, Dict
+from typing import Any, Dict, List
 
 
 class StationMetricData():
@@ -40,12 +48,17 @@ class StationMetricData():
     This class is used to retrieve metric data from the csv files that are
     generated by ISPAQ and grant access to it on-demand.
 
+    The results are indexed by metric, network, station and channel the
+    first time they are queried after being loaded, so that looking up the
+    values of a channel does not scan the whole results Dataframe.
+
     Properties
     ----------
     station: str
         The station code for the station whose metric data is stored within
     results: Dataframe
-        A pandas dataframe to store the data from ISPAQ-generated CSV files
+        A pandas dataframe to store the data from ISPAQ-generated CSV files.
+        Assigning new results resets the index.
 
     Functions
     ---------
@@ -53,6 +66,12 @@ class StationMetricData():
         Initialize the class by passing it a station name
     populate:
         Load a CSV file and concatinate the data into the results Dataframe
+    load:
+        Load several CSV files and concatinate the data into the results
+        Dataframe at once
+    load_database:
+        Load the metrics of SNCLs over a period from an ISPAQ metric database
+        into the results Dataframe
     get_networks:
         Returns a list of networks from the ISPAQ results
     get_stations:
@@ -63,6 +82,8 @@ class StationMetricData():
         Returns a list of metrics that have values stored in the Datafame
     get_values:
         Return the values for a given metric for a given channel
+    select:
+        Returns the metric data of a single station
 
     '''
 
@@ -72,6 +93,24 @@ class StationMetricData():
         '''
         self.results: DataFrame = pd.DataFrame()
 
+    @property
+    def results(self) -> DataFrame:
+        return self._results
+
+    @results.setter
+    def results(self, results: DataFrame):
+        self._results = results
+        self._index: Optional[StationMetricIndex] = None
+
+    def _get_index(self, column: str) -> 'StationMetricIndex':
+        # Raise an exception if the column is not present in the df
+        if column not in self.results:
+            raise ValueError(
+                'Failed to load results from Ispaq. Check csv folder')
+        if self._index is None:
+            self._index = StationMetricIndex(self.results)
+        return self._index
+
     def populate(
         self,
         filename: str
@@ -85,25 +124,61 @@ class StationMetricData():
         filename: str
             The path to the csv file to process
         '''
-        # Read the specified csv file into a dataframe
-        filedf = pd.read_csv(
-            filename,
-            # Use the start date as the index
-            index_col='start',
-            parse_dates=['start']
-        )
+        self.load([filename])
 
-        # Split the target field
-        filedf[['network', 'station', 'location', 'channel', 'quality']] = \
-            filedf['target'].str.split('.', expand=True)
+    def load(
+        self,
+        filenames: List[str],
+        cache: Optional[bool] = None
+    ):
+        '''
+        Load several csv files and concatinate the data within to the results
+        Dataframe in a single step
 
-        # Drop the end, target, location and quality fields
-        filedf.drop(
-            ['end', 'target', 'location', 'quality'], axis=1, inplace=True)
+        Parameters
+        ----------
+        filenames: list
+            The paths to the csv files to process
+        cache: bool, optional
+            Whether to cache the parsed csv files next to them. Defaults to
+            VALIDATION_ISPAQ_CSV_CACHE
+        '''
+        self.results = assemble_metric_dataframe([
+            self.results,
+            read_ispaq_metric_files(filenames=filenames, cache=cache)])
 
-        # Concatinate the results to the dataframe
-        self.results = pd.concat([self.results, filedf], sort=False)
-        self.results.dropna(subset=['value'], inplace=True)
+    def load_database(
+        self,
+        database: str,
+        snlc: str,
+        start: date,
+        stop: date,
+        metric_names: Optional[List[str]] = None
+    ):
+        '''
+        Load the metrics of SNCLs over a period from an ISPAQ metric database
+        and concatinate them to the results Dataframe
+
+        Parameters
+        ----------
+        database: str
+            The path to the SQLite database
+        snlc: str
+            The SNCLs, as in the names of the csv files generated by ISPAQ
+        start: date
+            The first day of the period
+        stop: date
+            The day after the last day of the period
+        metric_names: list, optional
+            The metrics to load. Defaults to all the metrics of the database
+        '''
+        self.results = assemble_metric_dataframe([
+            self.results,
+            read_ispaq_metric_database(database=database,
+                                       snlc=snlc,
+                                       start=start,
+                                       stop=stop,
+                                       metric_names=metric_names)])
 
     def get_networks(self) -> list:
         '''
@@ -114,15 +189,9 @@ class StationMetricData():
         list:
             A list of all the networks stored in the dataframe
         '''
-        # Raise an exception if no network column is found in the df
-        if 'network' not in self.results:
-            raise ValueError(
-                'Failed to load results from Ispaq. Check csv folder')
-        else:
-            # Get a list of all values of the networks column, excluding
-            # duplicates
-            networks = list(set(self.results['network']))
-            return networks
+        # Get a list of all values of the networks column, excluding
+        # duplicates
+        return list(self._get_index('network').stations)
 
     def get_stations(self, network: str) -> list:
         '''
@@ -138,16 +207,9 @@ class StationMetricData():
         list:
             A list of the stations in a network
         '''
-        # Raise an exception if no station column is found
-        if 'station' not in self.results:
-            raise ValueError(
-                'Failed to load results from Ispaq. Check csv folder')
-        else:
-            # Get a list of all unique values in the station column, filtered
-            # by a specific network code
-            df = self.results[self.results.network == network]
-            stations = list(set(df['station']))
-            return stations
+        # Get a list of all unique values in the station column, filtered
+        # by a specific network code
+        return list(self._get_index('station').stations.get(network, ()))
 
     def get_channels(self, network: str, station: str) -> list:
         '''
@@ -166,16 +228,9 @@ class StationMetricData():
         list:
             A list of the channels at the station
         '''
-        # Raise an exception if the channel column is not present
-        if 'channel' not in self.results:
-            raise ValueError(
-                'Failed to load results from Ispaq. Check csv folder')
-        else:
-            # Get a list of all channels for the specified station
-            df = self.results[self.results['network'] == network]
-            df = df[df['station'] == station]
-            channels = list(set(df['channel']))
-            return channels
+        # Get a list of all channels for the specified station
+        return list(self._get_index('channel').channels.get(
+            (network, station), ()))
 
     def get_metricNames(self) -> list:
         '''
@@ -186,15 +241,9 @@ class StationMetricData():
         list:
             A list of the metrics ISPAQ returned values for
         '''
-        # Raise an exception if the metricName column is missing
-        if 'metricName' not in self.results:
-            raise ValueError(
-                'Failed to load results from Ispaq. Check csv folder')
-        else:
-            # Get a list of the values in the metricName column, excluding
-            # duplicates
-            metricNames = list(set(self.results['metricName']))
-            return metricNames
+        # Get a list of the values in the metricName column, excluding
+        # duplicates
+        return list(self._get_index('metricName').metric_positions)
 
     def get_values(
         self,
@@ -221,21 +270,128 @@ class StationMetricData():
             A list of the values that ISPAQ returned for the specific metric
             and channel specified
         '''
-        # Filter the df by the metricName specified
-        results = self.results[self.results.metricName == metric]
+        if self.results.empty:
+            return []
+        return self._get_index('metricName').get_values(
+            metric=metric, network=network, station=station, channel=channel)
+
+    def select(self,
+               network: str,
+               station: str,
+               channel: Optional[str] = None) -> 'StationMetricData':
+        '''
+        Get the metric data of a single station, to report on the stations of
+        an ISPAQ run covering several of them separately
 
-        # If a network is specified, filter by the network code
-        if network is not None:
-            results = results[results.network == network]
+        Parameters
+        ----------
+        network: str
+            The network code of the station
 
-        # If a station is specified, filter by the station code
-        if station is not None:
-            results = results[results.station == station]
+        station: str
+            The station code of the station
 
-        # If a channel is specified, filter by the channel code
+        channel: str, optional
+            Only keep the results of this channel of the station
+
+        Returns
+        -------
+        StationMetricData:
+            A StationMetricData object holding only the results of the station
+        '''
+        selection = (self.results.network == network) \
+            & (self.results.station == station)
         if channel is not None:
-            results = results[results.channel == channel]
-        return list(results.value)
+            selection &= self.results.channel == channel
+        station_metric_data = StationMetricData()
+        station_metric_data.results = self.results[selection]
+        return station_metric_data
+
+
+class StationMetricIndex():
+    '''
+    Index of the results of a StationMetricData object, built in a single
+    pass over the results.
+
+    Properties
+    ----------
+    values: numpy array
+        The values of the results, in the order of the results
+    metric_positions: dict
+        For each metric, a dictionary of the positions of the values of each
+        (network, station, channel) in the values array
+    stations: dict
+        The set of stations of each network
+    channels: dict
+        The set of channels of each (network, station)
+
+    Functions
+    ---------
+    get_values:
+        Return the values for a given metric, optionally restricted to a
+        network, station and channel
+    '''
+
+    def __init__(self, results: DataFrame):
+        self.values = results['value'].values \
+            if 'value' in results else np.array([])
+        self.metric_positions: Dict[str, Dict[tuple, np.ndarray]] = {}
+        self.stations: Dict[str, set] = {}
+        self.channels: Dict[tuple, set] = {}
+        key_columns = ['metricName', 'network', 'station', 'channel']
+        if results.empty or not set(key_columns).issubset(results.columns):
+            return
+        # The positions of the rows of each metric, network, station and
+        # channel, in the order of the results
+        groups = results.reset_index(drop=True).groupby(
+            key_columns, sort=False, observed=True).indices
+        for (metric, network, station, channel), positions in \
+                groups.items():
+            self.metric_positions.setdefault(metric, {})[
+                (network, station, channel)] = positions
+            self.stations.setdefault(network, set()).add(station)
+            self.channels.setdefault((network, station), set()).add(channel)
+
+    def get_values(
+        self,
+        metric: str,
+        network: str = None,
+        station: str = None,
+        channel: str = None
+    ) -> list:
+        '''
+        Get the values of a metric, in the order of the results
+
+        Parameters
+        ----------
+        metric: str
+            The name of the metric to find results for
+        network, station, channel: str, optional
+            The codes to restrict the results to
+
+        Returns
+        -------
+        list:
+            The values of the metric
+        '''
+        positions_by_channel = self.metric_positions.get(metric, {})
+        if network is not None and station is not None and \
+                channel is not None:
+            positions = positions_by_channel.get((network, station, channel))
+            if positions is None:
+                return []
+            return self.values[positions].tolist()
+        matching_positions = [
+            positions for (current_network, current_station,
+                           current_channel), positions
+            in positions_by_channel.items()
+            if (network is None or current_network == network)
+            and (station is None or current_station == station)
+            and (channel is None or current_channel == channel)]
+        if not matching_positions:
+            return []
+        return self.values[
+            np.sort(np.concatenate(matching_positions))].tolist()
 
 
 def gather_stats(
@@ -244,10 +400,13 @@ def gather_stats(
     stop: date = None,
     metrics: Optional[str] = 'eew_test',
     ispaq_output_directory: Optional[str] = './ispaq_outputs',
+    database: Optional[str] = None,
+    pfile: Optional[str] = None,
 ) -> StationMetricData:
     '''
     This function locates the csv files that were generated by running ISPAQ
-    and then calls populate_dict for each one
+    and then calls populate_dict for each one. With an ISPAQ metric
+    database, the metrics are read from the database instead.
 
     Parameters
     ----------
@@ -264,9 +423,16 @@ def gather_stats(
         files. This is also part of the filename for the csv files generated.
         Unless the -M option is specified when running the program, the
         default is used.
-        Default: eew_test
+        Default: eew_test. None for VALIDATION_METRICS
     ispaqoutdir: str, Optional
         The directory to check for a csv folder. Only implemented for testing
+    database: str, optional
+        The SQLite database ISPAQ metrics are stored in. Defaults to
+        VALIDATION_ISPAQ_DATABASE, the csv files are read if it is not set
+    pfile: str, optional
+        The ISPAQ preference file defining the metrics alias, only the
+        metrics of the alias being read from the database, which holds those
+        of every run. Defaults to VALIDATION_PREFERENCE_FILE
 
     Returns
     -------
@@ -274,43 +440,56 @@ def gather_stats(
         A class that contains a dataframe full of the results from running
         ISPAQ
     '''
-    ispaqoutdir = ispaq_output_directory
-    # Determine the filenames of the files generated.
-    if (stop and start == stop + timedelta(days=-1)) or stop is None:
-        # If the time period is only one day, the filenames only contain
-        #  a single date
-        basic_filename = f'{ispaqoutdir}/csv/{metrics}_{snlc}_{start}_\
-simpleMetrics.csv'
-        psd_filename = f'{ispaqoutdir}/csv/{metrics}_{snlc}_{start}_\
-PSDMetrics.csv'
-        sample_filename = f'{ispaqoutdir}/csv/{metrics}_{snlc}_{start}_\
-sampleRateMetrics.csv'
-    else:
-        # If the time period is more than one day, filenames contain start and
-        #  end date
-        basic_filename = f'{ispaqoutdir}/csv/{metrics}_{snlc}_{start}_\
-{(stop + timedelta(days=-1))}_simpleMetrics.csv'
-        psd_filename = f'{ispaqoutdir}/csv/{metrics}_{snlc}_{start}_\
-{(stop + timedelta(days=-1))}_PSDMetrics.csv'
-        sample_filename = f'{ispaqoutdir}csv/{metrics}_{snlc}_{start}_\
-{(stop + timedelta(days=-1))}_sampleRateMetrics.csv'
+    if metrics is None:
+        metrics = get_default_parameters().METRICS
+    if database is None:
+        database = get_default_parameters().ISPAQ_DATABASE
+    if database:
+        smd = StationMetricData()
+        smd.load_database(database=database,
+                          snlc=snlc,
+                          start=start,
+                          stop=stop or start + timedelta(days=1),
+                          metric_names=ispaq_metric_names(
+                              pfile=pfile or
+                              get_default_parameters().PREFERENCE_FILE,
+                              metrics=metrics))
+        if len(smd.get_metricNames()) < 1:
+            raise FileNotFoundError(
+                f'No results from Ispaq found in {database}. Please check \
+ISPAQ_TRANSCRIPT.log')
+        return smd
+
+    ispaqoutdir = ispaq_output_directory or './ispaq_outputs'
+    # Determine the filenames of the files generated. If the time period is
+    # more than one day, filenames contain start and end date
+    basic_filename, psd_filename, sample_filename = [
+        ispaq_csv_filename(ispaq_output_directory=ispaqoutdir,
+                           metrics=metrics,
+                           snlc=snlc,
+                           start=start,
+                           stop=stop,
+                           suffix=suffix)
+        for suffix in ISPAQ_CSV_SUFFIXES]
 
     # Initialize the StationMetricData object that will contain the data
     smd = StationMetricData()
 
-    # If a file exists with the basic_filename, gather the data from it
+    # Gather the data from the files that exist, all at once
+    filenames = []
     if os.path.exists(basic_filename):
-        smd.populate(basic_filename)
+        filenames.append(basic_filename)
     else:
         logging.warning(f'{basic_filename} not found. Check that \
 basicStats metrics are specified in ispaq preference file under {metrics}')
     if os.path.exists(psd_filename):
-        smd.populate(psd_filename)
+        filenames.append(psd_filename)
     else:
         logging.warning(f'{psd_filename} not found. Check that psd_derived \
 metrics are specified in ispaq preference file under {metrics}')
     if os.path.exists(sample_filename):
-        smd.populate(sample_filename)
+        filenames.append(sample_filename)
+    smd.load(filenames)
 
     if len(smd.get_metricNames()) < 1:
         raise FileNotFoundError(
@@ -332,6 +511,9 @@ def report(
     miniseed_directory: str,
     timingSource: str,
     location: Optional[str] = None,
+    latency_summary: Optional[LatencySummary] = None,
+    soh_results: Optional[dict] = None,
+    metric_start: Optional[date] = None,
 ) -> dict:
     '''
     Function used to generate a report about station data quality, evaluating
@@ -364,6 +546,17 @@ def report(
     soharchive: str
         The path to the soh files driectory
 
+    latency_summary: LatencySummary, optional
+        The latency statistics computed with the latency results
+
+    soh_results: dict, optional
+        The SOH entries of the report, if they were generated concurrently
+        with the other stages. They are generated here otherwise
+
+    metric_start: date, optional
+        The first day of the ISPAQ results, if ISPAQ skipped the days
+        without data at the start of the test period. Defaults to start
+
     Returns
     -------
     dict:
@@ -399,7 +592,7 @@ def report(
                 channel=channel,
                 metric=metric)
             result = metric_handler(
-                metric, values, start, thresholds)
+                metric, values, metric_start or start, thresholds)
             logging.info(f"Metric being ran: {metric}")
             logging.info(f"Values being ran: {values}")
             logging.info(f"Outputted results: {result}")
@@ -424,23 +617,28 @@ def report(
                 'thresholds', 'data_timeliness', fallback=3),
             timely_percent=thresholds.getfloat(
                 'thresholds', 'timely_data_percentage', fallback=98.0),
+            latency_summary=latency_summary,
         )
     except FileNotFoundError as e:
         logging.error(e)
         logging.warning('Skipping latency report.')
 
-    json_report_with_soh_results = \
-        add_soh_results_to_report(network=network,
-                                  station=station,
-                                  location=location,
-                                  startdate=start,
-                                  enddate=end,
-                                  soh_directory=soharchive,
-                                  miniseed_directory=miniseed_directory,
-                                  typeofinstrument=typeofinstrument,
-                                  json_dict=json_dict,
-                                  thresholds=thresholds,
-                                  timingSource=timingSource)
+    if soh_results is not None:
+        json_dict.update(soh_results)
+        json_report_with_soh_results = json_dict
+    else:
+        json_report_with_soh_results = \
+            add_soh_results_to_report(network=network,
+                                      station=station,
+                                      location=location,
+                                      startdate=start,
+                                      enddate=end,
+                                      soh_directory=soharchive,
+                                      miniseed_directory=miniseed_directory,
+                                      typeofinstrument=typeofinstrument,
+                                      json_dict=json_dict,
+                                      thresholds=thresholds,
+                                      timingSource=timingSource)
     # Setup JSson report
     if location is None:
         snlc = f'{network}.{station}..'
@@ -454,8 +652,7 @@ def report(
 .validation_results.json'
 
     # Write the json dictionary to a json file
-    if not os.path.isdir('./stationvalidation_output'):
-        os.mkdir('./stationvalidation_output')
+    os.makedirs('./stationvalidation_output', exist_ok=True)
     with open(f'./stationvalidation_output/{filename}', 'w+') as file:
         json.dump(json_report_with_soh_results, file, indent=2)
 
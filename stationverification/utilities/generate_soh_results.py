@@ -0,0 +1,468 @@
+'''
+This module generates the SOH results of a station: the SOH metrics added to
+the report and the SOH plots. The SOH inputs do not depend on the ISPAQ or
+latency results, so the SOH results can be generated in their own process,
+at the same time as the other stages, and merged into the report at the end.
+
+Each SOH channel (LCE, GST, LCQ and GNS for the Nanometrics instruments, the
+SOH files, LEO/LEP and LED for the Fortimus instruments) is evaluated by its
+own function, and the channels are evaluated in a pool of processes.
+
+Classes
+-------
+SOHChannelTask:
+    A SOH channel evaluation function and the keyword arguments it is
+    called with
+SOHChannelResults:
+    The report entries and the daily data of a SOH channel
+
+Functions
+---------
+generate_soh_results:
+    Generates the SOH report entries and plots of a station
+evaluate_soh_channel:
+    Evaluates a single SOH channel task
+'''
+import logging
+import os
+
+from datetime import date
+from configparser import ConfigParser
+from multiprocessing import Pool, current_process
+from typing import Any, Callable, List, Optional, Tuple
+
+from stationverification.config import get_default_parameters
+from stationverification.utilities import exceptions
+from stationverification.utilities import fortimus_sohmetrics
+from stationverification.utilities import sohmetrics
+from stationverification.utilities.handle_fortimus_soh_files \
+    import handle_fortimus_soh_files
+from stationverification.utilities.plot_timing_error import plot_timing_error
+
+
+class SOHChannelTask(dict):
+    '''
+    A SOH channel to evaluate. The evaluation function must be defined at
+    the top level of a module to be sent to the workers.
+    '''
+    @property
+    def evaluate(self) -> Callable:
+        return self["evaluate"]
+
+    @property
+    def arguments(self) -> dict:
+        return self["arguments"]
+
+
+class SOHChannelResults(dict):
+    '''
+    The report entries of a SOH channel, and its daily data if other SOH
+    plots need it
+    '''
+    @property
+    def results(self) -> dict:
+        return self["results"]
+
+    @property
+    def data(self) -> Optional[List[Any]]:
+        return self.get("data")
+
+
+def generate_soh_results(typeofinstrument: str,
+                         network: str,
+                         station: str,
+                         location: Any,
+                         startdate: date,
+                         enddate: date,
+                         soh_directory: str,
+                         miniseed_directory: str,
+                         thresholds: ConfigParser,
+                         timingSource: str,
+                         queue: Optional[Any] = False,
+                         workers: Optional[int] = None) -> dict:
+    '''
+    Generate the SOH report entries and plots of a station, evaluating its
+    SOH channels in a pool of processes
+
+    Parameters
+    ----------
+    typeofinstrument: str
+        "titansma" or "fortimus"
+    network, station, location: str
+        The codes of the station
+    startdate: date
+        The first day of the validation period
+    enddate: date
+        The end of the validation period, non-inclusive
+    soh_directory: str
+        The directory of the SOH archive
+    miniseed_directory: str
+        The directory of the miniSEED archive, for the Fortimus SOH channels
+    thresholds: ConfigParser
+        The thresholds of the SOH metrics
+    timingSource: str
+        The timing source of a Fortimus station, "GNSS" or "PTP"
+    queue: Queue, optional
+        If given, the SOH report entries are also put on this queue
+    workers: int, optional
+        The number of processes evaluating the channels. Defaults to
+        VALIDATION_SOH_WORKERS, or to the number of cores if it is not set
+
+    Returns
+    -------
+    dict:
+        The SOH entries of the report, in the order of the channels
+    '''
+    soh_results: dict = {}
+    evaluations: Tuple[Callable[..., SOHChannelResults], ...]
+    if typeofinstrument.lower() == "titansma":
+        evaluations = NANOMETRICS_SOH_CHANNELS
+    elif typeofinstrument.lower() == "fortimus":
+        evaluations = FORTIMUS_SOH_CHANNELS
+    else:
+        evaluations = ()
+    arguments = dict(network=network,
+                     station=station,
+                     location=location,
+                     startdate=startdate,
+                     enddate=enddate,
+                     soh_directory=soh_directory,
+                     miniseed_directory=miniseed_directory,
+                     thresholds=thresholds,
+                     timingSource=timingSource)
+    tasks = [SOHChannelTask(evaluate=evaluate, arguments=arguments)
+             for evaluate in evaluations]
+    logging.info(f'Generating SOH results of {station}..')
+    try:
+        channel_results = _evaluate_soh_channels(tasks, workers)
+        for results in channel_results:
+            soh_results.update(results.results)
+
+        # The timing error plot needs both the clock locked and offset data
+        if typeofinstrument.lower() == "titansma":
+            clock_offset_data = channel_results[0].data
+            clock_locked_data = channel_results[1].data
+            if clock_locked_data is not None and \
+                    clock_offset_data is not None:
+                plot_timing_error(
+                    network=network,
+                    station=station,
+                    startdate=startdate,
+                    enddate=enddate,
+                    results=(clock_locked_data, clock_offset_data),
+                    threshold=thresholds.getfloat(
+                        'thresholds', 'clock_offset', fallback=1),
+                    location=location
+                )
+    finally:
+        # The report waits on the queue, so it is given the results
+        # gathered so far even if a channel failed
+        if queue:
+            queue.put(soh_results)
+    return soh_results
+
+
+def evaluate_soh_channel(task: SOHChannelTask) -> SOHChannelResults:
+    '''
+    Evaluate a single SOH channel task in the current process
+    '''
+    return task.evaluate(**task.arguments)
+
+
+def _evaluate_soh_channels(tasks: List[SOHChannelTask],
+                           workers: Optional[int]) \
+        -> List[SOHChannelResults]:
+    # Pool workers can not start pools of their own, so the channels are
+    # evaluated one after another inside of them
+    if workers is None:
+        workers = get_default_parameters().SOH_WORKERS or \
+            os.cpu_count() or 1
+    workers = max(1, min(workers, len(tasks)))
+    if workers == 1 or current_process().daemon:
+        return [evaluate_soh_channel(task) for task in tasks]
+    logging.info(f'Evaluating {len(tasks)} SOH channels with {workers} \
+workers..')
+    with Pool(processes=workers) as pool:
+        return pool.map(evaluate_soh_channel, tasks, chunksize=1)
+
+
+def clock_offset_soh_results(network: str,
+                             station: str,
+                             location: Any,
+                             startdate: date,
+                             enddate: date,
+                             soh_directory: str,
+                             thresholds: ConfigParser,
+                             **kwargs) -> SOHChannelResults:
+    '''
+    Check the daily average clock offset of the LCE channel
+    '''
+    json_dict: dict = {}
+    clock_offset_data = None
+    try:
+        clock_offset_sohfiles = \
+            sohmetrics.getsohfiles(network=network,
+                                   station=station,
+                                   location=location,
+                                   startdate=startdate,
+                                   enddate=enddate,
+                                   channel="LCE",
+                                   soh_directory=soh_directory)
+        clock_offset_merged_streams =\
+            sohmetrics.get_list_of_streams_from_list_of_files(
+                clock_offset_sohfiles)
+        clock_offset_data = sohmetrics.get_list_of_data_from_list_of_streams(
+            clock_offset_merged_streams)
+        clock_offset_results = sohmetrics.check_clock_offset(
+            list_of_streams=clock_offset_merged_streams,
+            threshold=thresholds.getfloat(
+                'thresholds', 'clock_offset', fallback=1),
+            startdate=startdate)
+
+        if clock_offset_results is not None:
+            json_dict['clock_offset'] = {}
+            json_dict['clock_offset']['passed'] = clock_offset_results.passed
+            json_dict['clock_offset']['values'] = clock_offset_results.results
+            if clock_offset_results.passed is False:
+                json_dict['clock_offset']['details'] = \
+                    clock_offset_results.details
+    except exceptions.StreamError as e:
+        logging.error(e)
+        logging.warning(
+            'LCE data does not exist. Skipping clock offset metric.')
+    return SOHChannelResults(results=json_dict, data=clock_offset_data)
+
+
+def clock_locked_soh_results(network: str,
+                             station: str,
+                             location: Any,
+                             startdate: date,
+                             enddate: date,
+                             soh_directory: str,
+                             thresholds: ConfigParser,
+                             **kwargs) -> SOHChannelResults:
+    '''
+    Check the number of times the clock is locked each day on the GST
+    channel
+    '''
+    json_dict: dict = {}
+    clock_locked_data = None
+    try:
+        check_clock_locked_sohfiles = \
+            sohmetrics.getsohfiles(network=network,
+                                   station=station,
+                                   location=location,
+                                   startdate=startdate,
+                                   enddate=enddate,
+                                   channel="GST",
+                                   soh_directory=soh_directory)
+        check_clock_locked_merged_streams =\
+            sohmetrics.get_list_of_streams_from_list_of_files(
+                check_clock_locked_sohfiles)
+        clock_locked_data = sohmetrics.get_list_of_data_from_list_of_streams(
+            check_clock_locked_merged_streams)
+        clock_locked_results = sohmetrics.check_clock_locked(
+            list_of_streams=check_clock_locked_merged_streams,
+            threshold=thresholds.getfloat(
+                'thresholds', 'clock_locked', fallback=6),
+            startdate=startdate
+        )
+
+        if clock_locked_results is not None:
+            json_dict['clock_locked'] = {}
+            json_dict['clock_locked']['passed'] = clock_locked_results.passed
+            json_dict['clock_locked']['values'] = clock_locked_results.results
+            if clock_locked_results.passed is False:
+                json_dict['clock_locked']['details'] = \
+                    clock_locked_results.details
+    except exceptions.StreamError as e:
+        logging.error(e)
+        logging.warning(
+            'GST data does not exist. Skipping clock locked metric.')
+    return SOHChannelResults(results=json_dict, data=clock_locked_data)
+
+
+def timing_quality_soh_results(network: str,
+                               station: str,
+                               location: Any,
+                               startdate: date,
+                               enddate: date,
+                               soh_directory: str,
+                               thresholds: ConfigParser,
+                               **kwargs) -> SOHChannelResults:
+    '''
+    Check and plot the daily average timing quality of the LCQ channel
+    '''
+    json_dict: dict = {}
+    try:
+        timing_quality_sohfiles = \
+            sohmetrics.getsohfiles(network=network,
+                                   station=station,
+                                   location=location,
+                                   startdate=startdate,
+                                   enddate=enddate,
+                                   channel="LCQ",
+                                   soh_directory=soh_directory)
+        timing_quality_merged_streams =\
+            sohmetrics.get_list_of_streams_from_list_of_files(
+                timing_quality_sohfiles)
+        results = sohmetrics.check_timing_quality(
+            list_of_streams=timing_quality_merged_streams,
+            threshold=thresholds.getfloat(
+                'thresholds', 'timing_quality', fallback=70.0),
+            startdate=startdate, enddate=enddate, network=network,
+            station=station,
+            location=location
+
+        )
+
+        if results is not None:
+            json_dict['timing_quality'] = {}
+            json_dict['timing_quality']['passed'] = results.passed
+            json_dict['timing_quality']['values'] = results.results
+            if results.passed is False:
+                json_dict['timing_quality']['details'] = results.details
+
+    except exceptions.StreamError as e:
+        logging.error(e)
+        logging.warning(
+            'LCQ data does not exist. Skipping timing quality metric.')
+    return SOHChannelResults(results=json_dict)
+
+
+def satellites_locked_soh_results(network: str,
+                                  station: str,
+                                  location: Any,
+                                  startdate: date,
+                                  enddate: date,
+                                  soh_directory: str,
+                                  thresholds: ConfigParser,
+                                  **kwargs) -> SOHChannelResults:
+    '''
+    Check the daily average number of satellites of the GNS channel
+    '''
+    json_dict: dict = {}
+    try:
+        check_number_of_satellites_sohfiles = \
+            sohmetrics.getsohfiles(network=network,
+                                   station=station,
+                                   location=location,
+                                   startdate=startdate,
+                                   enddate=enddate,
+                                   channel="GNS",
+                                   soh_directory=soh_directory)
+        check_number_of_satellites_merged_streams =\
+            sohmetrics.get_list_of_streams_from_list_of_files(
+                check_number_of_satellites_sohfiles)
+        results = sohmetrics.check_number_of_satellites(
+            list_of_streams=check_number_of_satellites_merged_streams,
+            threshold=thresholds.getfloat(
+                'thresholds', 'satellites_locked', fallback=6),
+            startdate=startdate
+        )
+
+        if results is not None:
+            json_dict['satellites_locked'] = {}
+            json_dict['satellites_locked']['passed'] = results.passed
+            json_dict['satellites_locked']['values'] = results.results
+            if results.passed is False:
+                json_dict['satellites_locked']['details'] = results.details
+    except exceptions.StreamError as e:
+        logging.error(e)
+        logging.warning(
+            'GNS data does not exist. Skipping number of satellites metric.')
+    return SOHChannelResults(results=json_dict)
+
+
+def fortimus_soh_file_results(network: str,
+                              station: str,
+                              location: Any,
+                              startdate: date,
+                              enddate: date,
+                              soh_directory: str,
+                              thresholds: ConfigParser,
+                              **kwargs) -> SOHChannelResults:
+    '''
+    Check the number of satellites, clock quality and lock status found in
+    the Fortimus SOH files
+    '''
+    json_dict: dict = {}
+    fortimus_soh_files = \
+        fortimus_sohmetrics.get_fortimus_soh_files(network=network,
+                                                   station=station,
+                                                   location=location,
+                                                   startdate=startdate,
+                                                   enddate=enddate,
+                                                   soh_directory=soh_directory)
+    if fortimus_soh_files is not None and location is not None:
+        fortimus_soh_metrics_list \
+            = handle_fortimus_soh_files(fortimus_soh_files=fortimus_soh_files,
+                                        station=station,
+                                        location=location)
+        json_dict = \
+            fortimus_sohmetrics.add_fortimus_soh_metric_results_to_json(
+                soh_data=fortimus_soh_metrics_list,
+                json_dict=json_dict,
+                thresholds=thresholds)
+    else:
+        logging.warning(
+            'Location code is not provided. Skipping Fortimus SOH file check.')
+    return SOHChannelResults(results=json_dict)
+
+
+def fortimus_clock_offset_soh_results(network: str,
+                                      station: str,
+                                      location: Any,
+                                      startdate: date,
+                                      enddate: date,
+                                      miniseed_directory: str,
+                                      timingSource: str,
+                                      **kwargs) -> SOHChannelResults:
+    '''
+    Check and plot the clock offset of the Fortimus LEO or LEP channel
+    '''
+    return SOHChannelResults(
+        results=fortimus_sohmetrics.handle_fortimus_clock_offset_metric(
+            network=network,
+            station=station,
+            startdate=startdate,
+            enddate=enddate,
+            miniseed_directory=miniseed_directory,
+            json_dict={},
+            timingSource=timingSource,
+            location=location))
+
+
+def fortimus_DAC_voltage_soh_results(network: str,
+                                     station: str,
+                                     location: Any,
+                                     startdate: date,
+                                     enddate: date,
+                                     miniseed_directory: str,
+                                     **kwargs) -> SOHChannelResults:
+    '''
+    Plot the DAC voltage of the Fortimus LED channel
+    '''
+    fortimus_sohmetrics.handle_fortimus_DAC_voltage_plot(
+        network=network,
+        station=station,
+        startdate=startdate,
+        enddate=enddate,
+        miniseed_directory=miniseed_directory,
+        location=location)
+    return SOHChannelResults(results={})
+
+
+# The evaluation functions of the SOH channels of each instrument, in the
+# order their entries are added to the report. The timing error plot relies
+# on the LCE and GST channels coming first.
+NANOMETRICS_SOH_CHANNELS: Tuple[Callable[..., SOHChannelResults], ...] = (
+    clock_offset_soh_results,
+    clock_locked_soh_results,
+    timing_quality_soh_results,
+    satellites_locked_soh_results)
+
+FORTIMUS_SOH_CHANNELS: Tuple[Callable[..., SOHChannelResults], ...] = (
+    fortimus_soh_file_results,
+    fortimus_clock_offset_soh_results,
+    fortimus_DAC_voltage_soh_results)
@@ -1,13 +1,20 @@
 import json
 import logging
 
-from typing import Any, List, Tuple
+from typing import Any, Dict, List, Tuple
 
 import pandas as pd
 import numpy as np
 from pandas.core.frame import DataFrame
 
 from stationverification.utilities import exceptions
+from stationverification.utilities.\
+    calculate_total_availability_for_nanometrics import \
+    average_channel_percent_availability
+from stationverification.utilities.scan_apollo_latency_file import \
+    average_percent_availability_of_entry_text, \
+    iterate_apollo_availability_entries
+from stationverification.utilities.latency_table import LatencyTable
 
 # flake8: noqa
 
@@ -16,331 +23,290 @@ def get_latencies_from_apollo(files: list,
                               network: str,
                               station: str) -> Tuple[Any, Any, Any]:
     logging.info("Generating latencies from Apollo files...")
-    combined_latency_data_for_all_days, \
-        array_of_daily_latency_objects_max_latency_only,\
-        array_of_daily_latency_objects_all_latencies = get_latencies_from_apollo_files(
-            files=files, network=network, station=station)
-
-    list_of_latencies_for_all_days = optimize_creating_list_of_latencies(
-        latency_data=combined_latency_data_for_all_days)
+    latency_table = get_latency_table_from_apollo_files(
+        files=files, network=network, station=station)
 
     logging.info("Finished creating list of latencies for all days")
 
-    return list_of_latencies_for_all_days, \
-        array_of_daily_latency_objects_max_latency_only,\
-        array_of_daily_latency_objects_all_latencies
-
-
-def get_latencies_from_apollo_files(files: list,
-                                    network: str,
-                                    station: str) -> Tuple[Any, Any, Any]:
-    # Storing the data of all the latency files
-    combined_latency_data_for_all_days: dict = {}
-    # Storing the data of all the latency files seperated into current day
-    array_of_daily_latency_objects_max_latency_only: List[Any] = []
-    array_of_daily_latency_objects_all_latencies: List[Any] = []
-    for file in files:
-        logging.info(f"Generating latency from: {file}")
-        # Opening JSON file
-        json_latency_file = open(file)
+    return latency_table.to_dataframe(), \
+        latency_table.daily_dataframes(max_latency_only=True),\
+        latency_table.daily_dataframes()
+
+
+def get_latency_table_from_apollo_files(files: list,
+                                        network: str,
+                                        station: str) -> LatencyTable:
+    '''
+    Parses Apollo latency JSON files into a single LatencyTable, with one day
+    per file.
+
+    Parameters
+    ----------
+    files: list
+        The Apollo latency JSON files, one for each day, in date order
+    network: str
+        The network code of the station
+    station: str
+        The station code of the station
+
+    Returns
+    -------
+    LatencyTable:
+        The latency values of the station for all the files
+    '''
+    return merge_apollo_latency_files(
+        [parse_apollo_latency_file(file=file, network=network,
+                                   station=station)
+         for file in files])
+
+
+class ApolloLatencyFile(dict):
+    '''
+    The content of a single Apollo latency JSON file that the validation
+    needs, gathered in one pass over the file.
+
+    Properties
+    ----------
+    channels: list
+        For each channel of the station, a tuple of (network, station,
+        channel, max latencies, other latencies), the latencies being
+        (start times, latencies, weights) tuples as returned by
+        expand_apollo_intervals
+    channel_percent_availability: list
+        The average percentAvailability of each channel in the file, for all
+        the stations of the file
+    '''
+    @property
+    def channels(self) -> List[tuple]:
+        return self["channels"]
+
+    @property
+    def channel_percent_availability(self) -> List[float]:
+        return self["channel_percent_availability"]
+
+
+def parse_apollo_latency_file(file: str,
+                              network: str,
+                              station: str) -> ApolloLatencyFile:
+    '''
+    Parses an Apollo latency JSON file once, getting both the latency values
+    of the station and the percent availability of every channel. Only the
+    entries of the station are decoded, the availability of the other
+    entries is read from their raw text.
+
+    Parameters
+    ----------
+    file: str
+        The Apollo latency JSON file
+    network: str
+        The network code of the station
+    station: str
+        The station code of the station
+
+    Returns
+    -------
+    ApolloLatencyFile:
+        The latencies and channel availabilities of the file
+    '''
+    logging.info(f"Generating latency from: {file}")
+    channels = []
+    list_of_channel_percent_availability = []
+    # Iterating through the json availability array which a string "id",
+    # and an array of latency data "Intervals". The file contains all the
+    # network and stations for that specific day, so the entries are
+    # scanned one at a time and only those of the required network station
+    # combo are decoded.
+    for current_id, current_NSC_text in \
+            iterate_apollo_availability_entries(file):
+        network_station = [network, station]
+        if not all(x in current_id for x in network_station):
+            list_of_channel_percent_availability.append(
+                average_percent_availability_of_entry_text(current_NSC_text))
+            continue
         try:
-            latency_data = json.load(json_latency_file)
+            current_NSC = json.loads(current_NSC_text)
         except json.decoder.JSONDecodeError:
             raise exceptions.LatencyFileError(
                 f'Problem detected in latency file: {file}')
-        # Storing the data of the current days JSON latency file
-        current_day_max_latencies: dict = {}
-        current_day_all_latencies: dict = {}
-        # Iterating through the json availability array which a string "id",
-        # and an array of latency data "Intervals"
-        for current_NSC in latency_data['availability']:
-            current_id = current_NSC["id"]
-            network_station = [network, station]
-
-            # making sure we are looping over the required network station
-            # combo, as the current iteration of the latency JSON files,
-            # contained all the network and stations in one JSON file
-            # for that specific day.
-            if all(x in current_id for x in network_station):
-                # splitting the id column and fetching the network, station
-                # and channel values, id originally looks like the following :
-                # "QW.QCC01.HNN"
-                id_split = current_NSC['id'].split('.')
-                if len(id_split) == 3:
-                    current_network, current_station,\
-                        current_channel = id_split
-                elif len(id_split) == 4:
-                    current_network, current_station, current_location,\
-                        current_channel = id_split
-                # looping over the intervals array, which contains all the
-                # latency objects a specific NSC
-                for current_latency in current_NSC['intervals']:
-                    combined_latency_data_for_all_days, \
-                        current_day_max_latencies, current_day_all_latencies \
-                        = get_latency_value_for_current_timestamp(
-                            current_latency=current_latency,
-                            combined_latency_data_for_all_days=combined_latency_data_for_all_days,  # noqa
-                            current_day_max_latencies=current_day_max_latencies,  # noqa
-                            current_day_all_latencies=current_day_all_latencies,  # noqa
-                            current_network=current_network,
-                            current_station=current_station,
-                            current_channel=current_channel)
-        json_latency_file.close()
-
-        array_of_daily_latency_objects_max_latency_only.append(
-            current_day_max_latencies)
-
-        array_of_daily_latency_objects_all_latencies.append(
-            current_day_all_latencies)
-    return combined_latency_data_for_all_days, \
-        array_of_daily_latency_objects_max_latency_only,\
-        array_of_daily_latency_objects_all_latencies
-
-
-def optimize_creating_list_of_latencies(latency_data: dict) -> list:
-    list_of_combined_latencies = []
-    for key, value in latency_data.items():
-        list_of_combined_latencies.append(np.float16(value["data_latency"]))
-    return list_of_combined_latencies
+        list_of_channel_percent_availability.append(
+            average_channel_percent_availability(current_NSC))
+        # id originally looks like the following : "QW.QCC01.HNN", or
+        # "QW.QCC01.00.HNN" when it includes a location code
+        id_split = current_id.split('.')
+        max_latencies, other_latencies = \
+            expand_apollo_intervals(current_NSC['intervals'])
+        channels.append((id_split[0], id_split[1], id_split[-1],
+                         max_latencies, other_latencies))
+    return ApolloLatencyFile(
+        channels=channels,
+        channel_percent_availability=list_of_channel_percent_availability)
+
+
+def merge_apollo_latency_files(latency_files: List[ApolloLatencyFile]) \
+        -> LatencyTable:
+    '''
+    Merges parsed Apollo latency files into a single LatencyTable, with one
+    day per file, in the order the files are given
+
+    Parameters
+    ----------
+    latency_files: list
+        The parsed Apollo latency files, in date order
+
+    Returns
+    -------
+    LatencyTable:
+        The latency values of all the files
+    '''
+    categories: Dict[str, Dict[str, int]] = {
+        'network': {}, 'station': {}, 'channel': {}}
+    # Column chunks, in the order their rows appear in the final table
+    chunks: Dict[str, List[np.ndarray]] = {
+        'network': [], 'station': [], 'channel': [], 'startTime': [],
+        'data_latency': [], 'weight': []}
+    day_boundaries = [0]
+    max_latency_counts = []
+    for latency_file in latency_files:
+        max_latency_chunks = []
+        other_latency_chunks = []
+        for current_network, current_station, current_channel, \
+                max_latencies, other_latencies in latency_file.channels:
+            codes = (
+                category_code(categories['network'], current_network),
+                category_code(categories['station'], current_station),
+                category_code(categories['channel'], current_channel))
+            max_latency_chunks.append((codes, max_latencies))
+            other_latency_chunks.append((codes, other_latencies))
+
+        number_of_rows_for_current_day = 0
+        for codes, (start_times, latencies, weights) in \
+                max_latency_chunks + other_latency_chunks:
+            number_of_rows = len(latencies)
+            for column, code in zip(('network', 'station', 'channel'),
+                                    codes):
+                chunks[column].append(
+                    np.full(number_of_rows, code, dtype=np.int16))
+            chunks['startTime'].append(start_times)
+            chunks['data_latency'].append(latencies)
+            chunks['weight'].append(weights)
+            number_of_rows_for_current_day += number_of_rows
+        max_latency_counts.append(
+            sum(len(latencies)
+                for _, (_, latencies, _) in max_latency_chunks))
+        day_boundaries.append(
+            day_boundaries[-1] + number_of_rows_for_current_day)
+
+    columns = {}
+    for column in ('network', 'station', 'channel'):
+        column_codes = np.concatenate(chunks[column]) if chunks[column] \
+            else np.array([], dtype=np.int16)
+        columns[column] = pd.Categorical.from_codes(
+            column_codes, categories=list(categories[column]))
+    return LatencyTable(
+        network=columns['network'],
+        station=columns['station'],
+        channel=columns['channel'],
+        startTime=np.concatenate(chunks['startTime'])
+        if chunks['startTime'] else np.array([], dtype='datetime64[ns]'),
+        data_latency=np.concatenate(chunks['data_latency'])
+        if chunks['data_latency'] else np.array([], dtype=np.float32),
+        weight=np.concatenate(chunks['weight'])
+        if chunks['weight'] else np.array([], dtype=np.int32),
+        day_boundaries=np.array(day_boundaries, dtype=np.int64),
+        max_latency_counts=np.array(max_latency_counts, dtype=np.int64))
+
+
+def category_code(category: Dict[str, int], value: str) -> int:
+    '''
+    Returns the categorical code of a value, registering the value as a new
+    category if it has not been seen before
+    '''
+    if value not in category:
+        category[value] = len(category)
+    return category[value]
+
+
+def expand_apollo_intervals(intervals: List[dict]) -> \
+        Tuple[Tuple[np.ndarray, np.ndarray, np.ndarray],
+              Tuple[np.ndarray, np.ndarray, np.ndarray]]:
+    '''
+    Expands the latency intervals of one channel into weighted latency
+    values, based on the number of packets received in each interval:
+
+        1 packet: the maximum latency
+        2 packets: the maximum and minimum latencies
+        3 packets: the maximum and minimum latencies, and the third latency
+            calculated from the average
+        more than 3 packets: the maximum and minimum latencies, and the
+            average latency once, weighted by the number of remaining
+            packets
+
+    Values of -1 are missing values and are skipped.
+
+    Parameters
+    ----------
+    intervals: list
+        The "intervals" array of a channel from an Apollo latency JSON file
+
+    Returns
+    -------
+    tuple:
+        (start times, latencies, weights) of the max latencies, and (start
+        times, latencies, weights) of the remaining latencies, each in
+        interval order
+    '''
+    number_of_intervals = len(intervals)
+    start_times = np.asarray(pd.to_datetime(
+        [interval['startTime'] for interval in intervals],
+        utc=True).tz_convert(None), dtype='datetime64[ns]')
+    maximum = np.fromiter(
+        (interval['latency']['maximum'] for interval in intervals),
+        dtype=np.float64, count=number_of_intervals)
+    minimum = np.fromiter(
+        (interval['latency']['minimum'] for interval in intervals),
+        dtype=np.float64, count=number_of_intervals)
+    average = np.fromiter(
+        (interval['latency']['average'] for interval in intervals),
+        dtype=np.float64, count=number_of_intervals)
+    all_packets = np.fromiter(
+        (interval['retx']['allPackets'] for interval in intervals),
+        dtype=np.int64, count=number_of_intervals)
+
+    max_index = np.flatnonzero((all_packets >= 1) & (maximum != -1))
+
+    min_index = np.flatnonzero((all_packets >= 2) & (minimum != -1))
+    # With exactly 3 packets, the unknown latency is recovered from the
+    # average of the three
+    three_packets_index = np.flatnonzero(
+        (all_packets == 3) & (average != -1))
+    # With more than 3 packets, the average stands in for every packet that
+    # is not the minimum or the maximum
+    many_packets_index = np.flatnonzero((all_packets > 3) & (average != -1))
+
+    other_index = np.concatenate(
+        (min_index, three_packets_index, many_packets_index))
+    other_latencies = np.concatenate((
+        minimum[min_index],
+        3 * average[three_packets_index] - minimum[three_packets_index]
+        - maximum[three_packets_index],
+        average[many_packets_index]))
+    other_weights = np.concatenate((
+        np.ones(len(min_index) + len(three_packets_index), dtype=np.int32),
+        (all_packets[many_packets_index] - 2).astype(np.int32)))
+    # A stable sort keeps the minimum ahead of the average of its interval
+    order = np.argsort(other_index, kind='stable')
+    other_index = other_index[order]
+
+    return (start_times[max_index],
+            maximum[max_index].astype(np.float32),
+            np.ones(len(max_index), dtype=np.int32)), \
+        (start_times[other_index],
+         other_latencies[order].astype(np.float32),
+         other_weights[order])
 
 
 def create_latency_dataframe_from_csv_file(path_to_csv_file: str) -> DataFrame:
-    combined_latency_dataframe_for_all_days_dataframe = pd.DataFrame(
-        {'network': [], 'station': [], 'channel': [], "startTime": [],
-         'data_latency': []})
     combined_latency_dataframe_for_all_days_dataframe = pd.read_csv(
         path_to_csv_file, dtype={'data_latency': np.float16})
 
     return combined_latency_dataframe_for_all_days_dataframe
-
-
-def get_latency_value_for_current_timestamp(current_latency: dict,
-                                            combined_latency_data_for_all_days:
-                                            dict,
-                                            current_day_max_latencies: dict,
-                                            current_day_all_latencies: dict,
-                                            current_network: str,
-                                            current_station: str,
-                                            current_channel: str) -> \
-        Tuple[dict, dict, dict]:
-    if current_latency["retx"]["allPackets"] == 1:
-        if current_latency["latency"]["maximum"] != -1:
-            append_to_latency_objects(
-                append_to_current_day_max_latencies=True,
-                append_to_combined_latency_data_for_all_days=True,
-                append_to_current_day_all_latencies=True,
-                current_latency=current_latency["latency"]["maximum"],
-                combined_latency_data_for_all_days=combined_latency_data_for_all_days,  # noqa
-                current_day_max_latencies=current_day_max_latencies,
-                current_day_all_latencies=current_day_all_latencies,
-                current_network=current_network,
-                current_station=current_station,
-                current_channel=current_channel,
-                start_time=current_latency[
-                    'startTime'],
-                packet_id="max")
-
-    elif current_latency["retx"]["allPackets"] == 2:
-        if current_latency["latency"]["maximum"] != -1:
-            append_to_latency_objects(
-                append_to_current_day_max_latencies=True,
-                append_to_combined_latency_data_for_all_days=True,
-                append_to_current_day_all_latencies=True,
-                current_latency=current_latency["latency"]["maximum"],
-                combined_latency_data_for_all_days=combined_latency_data_for_all_days,  # noqa
-                current_day_max_latencies=current_day_max_latencies,
-                current_day_all_latencies=current_day_all_latencies,
-                current_network=current_network,
-                current_station=current_station,
-                current_channel=current_channel,
-                start_time=current_latency[
-                    'startTime'],
-                packet_id="max")
-
-        if current_latency["latency"]["minimum"] != -1:
-            append_to_latency_objects(
-                append_to_current_day_max_latencies=False,
-                append_to_combined_latency_data_for_all_days=True,
-                append_to_current_day_all_latencies=True,
-                current_latency=current_latency["latency"]["minimum"],
-                combined_latency_data_for_all_days=combined_latency_data_for_all_days,  # noqa
-                current_day_max_latencies=current_day_max_latencies,
-                current_day_all_latencies=current_day_all_latencies,
-                current_network=current_network,
-                current_station=current_station,
-                current_channel=current_channel,
-                start_time=current_latency[
-                    'startTime'],
-                packet_id="min")
-
-    elif current_latency["retx"]["allPackets"] == 3:
-        if current_latency["latency"]["maximum"] != -1:
-            append_to_latency_objects(
-                append_to_current_day_max_latencies=True,
-                append_to_combined_latency_data_for_all_days=True,
-                append_to_current_day_all_latencies=True,
-                current_latency=current_latency["latency"]["maximum"],
-                combined_latency_data_for_all_days=combined_latency_data_for_all_days,  # noqa
-                current_day_max_latencies=current_day_max_latencies,
-                current_day_all_latencies=current_day_all_latencies,
-                current_network=current_network,
-                current_station=current_station,
-                current_channel=current_channel,
-                start_time=current_latency[
-                    'startTime'],
-                packet_id="max")
-
-        if current_latency["latency"]["minimum"] != -1:
-            append_to_latency_objects(
-                append_to_current_day_max_latencies=False,
-                append_to_combined_latency_data_for_all_days=True,
-                append_to_current_day_all_latencies=True,
-                current_latency=current_latency["latency"]["minimum"],
-                combined_latency_data_for_all_days=combined_latency_data_for_all_days,  # noqa
-                current_day_max_latencies=current_day_max_latencies,
-                current_day_all_latencies=current_day_all_latencies,
-                current_network=current_network,
-                current_station=current_station,
-                current_channel=current_channel,
-                start_time=current_latency[
-                    'startTime'],
-                packet_id="min")
-
-        if current_latency["latency"]["average"] != -1:
-            calculated_unkown_latency_value_prep = 3 * \
-                current_latency["latency"]["average"]
-            calculated_unkown_latency_value = calculated_unkown_latency_value_prep - current_latency["latency"]["minimum"] - current_latency["latency"]["maximum"]  # noqa
-            append_to_latency_objects(
-                append_to_current_day_max_latencies=False,
-                append_to_combined_latency_data_for_all_days=True,
-                append_to_current_day_all_latencies=True,
-                current_latency=calculated_unkown_latency_value,
-                combined_latency_data_for_all_days=combined_latency_data_for_all_days,  # noqa
-                current_day_max_latencies=current_day_max_latencies,
-                current_day_all_latencies=current_day_all_latencies,
-                current_network=current_network,
-                current_station=current_station,
-                current_channel=current_channel,
-                start_time=current_latency[
-                       'startTime'],
-                packet_id="average")
-
-    elif current_latency["retx"]["allPackets"] > 3:
-        if current_latency["latency"]["maximum"] != -1:
-            append_to_latency_objects(
-                append_to_current_day_max_latencies=True,
-                append_to_combined_latency_data_for_all_days=True,
-                append_to_current_day_all_latencies=True,
-                current_latency=current_latency["latency"]["maximum"],
-                combined_latency_data_for_all_days=combined_latency_data_for_all_days,  # noqa
-                current_day_max_latencies=current_day_max_latencies,
-                current_day_all_latencies=current_day_all_latencies,
-                current_network=current_network,
-                current_station=current_station,
-                current_channel=current_channel,
-                start_time=current_latency[
-                    'startTime'],
-                packet_id="max")
-
-        if current_latency["latency"]["minimum"] != -1:
-            append_to_latency_objects(
-                append_to_current_day_max_latencies=False,
-                append_to_combined_latency_data_for_all_days=True,
-                append_to_current_day_all_latencies=True,
-                current_latency=current_latency["latency"]["minimum"],
-                combined_latency_data_for_all_days=combined_latency_data_for_all_days,  # noqa
-                current_day_max_latencies=current_day_max_latencies,
-                current_day_all_latencies=current_day_all_latencies,
-                current_network=current_network,
-                current_station=current_station,
-                current_channel=current_channel,
-                start_time=current_latency[
-                    'startTime'],
-                packet_id="min")
-
-        if current_latency["latency"]["average"] != -1:
-            number_of_times_to_append_to_latencies = current_latency["retx"]["allPackets"] - 2
-            for iteration in range(number_of_times_to_append_to_latencies):
-                append_to_latency_objects(
-                    append_to_current_day_max_latencies=False,
-                    append_to_combined_latency_data_for_all_days=True,
-                    append_to_current_day_all_latencies=True,
-                    current_latency=current_latency["latency"]["average"],
-                    combined_latency_data_for_all_days=combined_latency_data_for_all_days,  # noqa
-                    current_day_max_latencies=current_day_max_latencies,
-                    current_day_all_latencies=current_day_all_latencies,
-                    current_network=current_network,
-                    current_station=current_station,
-                    current_channel=current_channel,
-                    start_time=current_latency[
-                        'startTime'],
-                    packet_id=f"average{iteration+1}")
-    return combined_latency_data_for_all_days,\
-        current_day_max_latencies, \
-        current_day_all_latencies
-
-
-def append_to_latency_objects(
-        append_to_current_day_max_latencies: bool,
-        append_to_combined_latency_data_for_all_days: bool,
-        append_to_current_day_all_latencies: bool,
-        current_latency: float,
-        combined_latency_data_for_all_days: dict,
-        current_day_max_latencies: dict,
-        current_day_all_latencies: dict,
-        current_network: str,
-        current_station: str,
-        current_channel: str,
-        start_time: str,
-        packet_id: str):
-    # One dataframe that holds all the latency data, used in Latency Log plot
-    if append_to_combined_latency_data_for_all_days is True:
-        combined_latency_data_for_all_days[current_network +
-                                           "."+current_station
-                                           +
-                                           "."+current_channel
-                                           +
-                                           "." + start_time
-                                           +
-                                           "." + packet_id] = {'network':
-                                                               current_network,
-                                                               'station':
-                                                               current_station,
-                                                               'channel':
-                                                               current_channel,
-                                                               'startTime':
-                                                               start_time,
-                                                               'data_latency':
-                                                               current_latency
-                                                               }
-    if append_to_current_day_all_latencies is True:
-        # An array of dataframes, for each day in the validation period. \
-        # Has all the latency values for that day, used in \
-        # timely_availability_plot
-        current_day_all_latencies[current_network +
-                                  "."+current_station +
-                                  "."+current_channel +
-                                  "." +
-                                  start_time +
-                                  "." + packet_id] = {'network': current_network,
-                                                      'station': current_station,
-                                                      'channel': current_channel,
-                                                      'startTime': start_time,
-                                                      'data_latency':
-                                                      current_latency
-                                                      }
-    if append_to_current_day_max_latencies is True:
-        # An array of dataframes, for each day in the validation period. \
-        # Only includes the max latency values, used in the latency line plot
-        current_day_max_latencies[current_network +
-                                  "."+current_station +
-                                  "."+current_channel +
-                                  "." +
-                                  start_time +
-                                  "." + packet_id] = {'network': current_network,
-                                                      'station': current_station,
-                                                      'channel': current_channel,
-                                                      'startTime': start_time,
-                                                      'data_latency':
-                                                      current_latency
-                                                      }
@@ -1,11 +1,9 @@
 import logging
-import subprocess
 
 from typing import List
 from datetime import date, timedelta
 
-from stationverification.utilities.julian_day_converter import \
-    datetime_to_year_and_julian_day
+from stationverification.utilities.archive_index import get_archive_index
 
 
 def get_latency_files(
@@ -47,26 +45,25 @@ def get_latency_files(
         A list of the files for the specified date range
     '''
     files: list = []
+    archive_index = get_archive_index(path, startdate, enddate)
     iterdate = startdate
     # Iterate through all the dates in the verification period and collect a
     # list of the associated files
     while iterdate < enddate:
         logging.debug(f'Looking for files for date {iterdate}')
         if typeofinstrument.lower() == "titansma":
-            cmd = f'ls {path}/{iterdate.strftime("%Y/%m/%d")}/\
-{network}.{station}.\
-{datetime_to_year_and_julian_day(iterdate, typeofinstrument)}.json 2>/dev/null'
+            output = archive_index.find(day=iterdate,
+                                        network=network,
+                                        station=station,
+                                        extension='.json')
         elif typeofinstrument.lower() == "fortimus":
-            cmd = f'ls {path}/{iterdate.strftime("%Y/%m/%d")}/{network}_\
-{station}_*_H??_\
-{datetime_to_year_and_julian_day(iterdate, typeofinstrument)}.csv \
-2>/dev/null'
+            output = archive_index.find(day=iterdate,
+                                        network=network,
+                                        station=station,
+                                        channel='H??',
+                                        extension='.csv')
 
-        output = subprocess.getoutput(
-            cmd
-        ).split('\n')
-
-        if not output == ['']:
+        if output:
             files.extend(output)
         else:
             logging.warning(f'No Latency file found for {iterdate}')
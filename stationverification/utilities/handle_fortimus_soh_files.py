@@ -1,108 +1,228 @@
-import re
-import tempfile
-from typing import Any, List
+'''
+This module parses the daily Fortimus SOH files. A Fortimus SOH file is a
+miniSEED file of ASCII log records, whose text lists the status of the
+instrument every few minutes. The status of the clock is found between the
+'GNSS status' and 'PTP status' lines of each status report.
+
+The files are parsed in a single pass: the records are read one at a time,
+their text is fed to a small state machine, and the number of satellites
+used, clock quality and clock status are extracted from the lines of each
+GNSS section as they are read.
+
+Classes
+-------
+FortimusSOHParser:
+    State machine extracting the clock status from the text of a SOH file
+
+Functions
+---------
+handle_fortimus_soh_files:
+    Parses the clock status of a list of daily Fortimus SOH files
+parse_fortimus_soh_file:
+    Parses the clock status of a daily Fortimus SOH file
+read_fortimus_soh_records:
+    Yields the text of the SOH records of a station, one record at a time
+'''
+import codecs
+import os
+import struct
+from typing import Any, BinaryIO, Iterator, List, Optional
+
+from stationverification.utilities.scan_miniseed_headers import \
+    FIXED_HEADER_LENGTH, miniseed_byte_order, miniseed_record_length
+
+# Text delimiting the clock status of a status report
+GNSS_SECTION_START = 'GNSS status'
+GNSS_SECTION_END = 'PTP status'
+
+# Fields of the clock status, as they appear in the GNSS section
+SATELLITES_USED_FIELD = 'Satellites used'
+CLOCK_QUALITY_FIELD = 'Clock quality'
+CLOCK_STATUS_FIELD = 'Status'
+
+
+class FortimusSOHParser():
+    '''
+    State machine extracting the clock status from the text of a Fortimus
+    SOH file, fed in pieces of any length.
+
+    Outside of a GNSS section, the parser only searches for the start of the
+    next section. Inside of a section, the fields of each complete line are
+    kept until the end of the section is found, so that a section cut short
+    by the end of the file is ignored.
+    '''
+
+    def __init__(self):
+        self.number_of_satellites_used: List[int] = []
+        self.timing_quality: List[str] = []
+        self.clock_locked_status: List[str] = []
+        self._in_gnss_section = False
+        self._text = ''
+        self._section: List[List[Any]] = [[], [], []]
+
+    def feed(self, text: str):
+        '''
+        Parse a piece of text. The text that can not be parsed yet, a
+        partial line or marker, is kept for the next piece.
+        '''
+        text = self._text + text
+        while True:
+            if not self._in_gnss_section:
+                start = text.find(GNSS_SECTION_START)
+                if start < 0:
+                    self._text = text[1 - len(GNSS_SECTION_START):]
+                    return
+                self._in_gnss_section = True
+                self._section = [[], [], []]
+                text = text[start + len(GNSS_SECTION_START):]
+            end = text.find(GNSS_SECTION_END)
+            if end < 0:
+                end_of_lines = text.rfind('\n') + 1
+                self._parse_section_lines(text[:end_of_lines])
+                self._text = text[end_of_lines:]
+                return
+            # The text before the end marker is the last line of the section
+            self._parse_section_lines(text[:end])
+            self.number_of_satellites_used.extend(self._section[0])
+            self.timing_quality.extend(self._section[1])
+            self.clock_locked_status.extend(self._section[2])
+            self._in_gnss_section = False
+            text = text[end + len(GNSS_SECTION_END):]
+
+    def close(self):
+        '''
+        Discard the text left, which can only be part of an incomplete
+        section
+        '''
+        self._text = ''
+        self._in_gnss_section = False
+
+    def _parse_section_lines(self, text: str):
+        for line in text.split('\n'):
+            satellites_used = _field_value(line, SATELLITES_USED_FIELD)
+            if satellites_used is not None:
+                self._section[0].append(int(satellites_used))
+            clock_quality = _field_value(line, CLOCK_QUALITY_FIELD)
+            if clock_quality is not None:
+                self._section[1].append(clock_quality)
+            clock_status = _field_value(line, CLOCK_STATUS_FIELD)
+            if clock_status is not None:
+                self._section[2].append(clock_status)
 
 
 def handle_fortimus_soh_files(fortimus_soh_files: List[str],
                               station: str,
                               location: str) -> List[Any]:
-    fortimus_soh_metrics_results_for_validation_period = []
-    for file in fortimus_soh_files:
-        final_formatted_response = fortimus_soh_file_to_string_format(
-            path_of_file=file,
-            station=station,
-            location=location)
-
-        fortimus_soh_metrics_result_for_current_day \
-            = get_fortimus_soh_metrics_results_for_current_day(
-                data=final_formatted_response,
-                file=file)
-        fortimus_soh_metrics_results_for_validation_period.append(
-            fortimus_soh_metrics_result_for_current_day)
-    return fortimus_soh_metrics_results_for_validation_period
-
-
-def fortimus_soh_file_to_string_format(
-        path_of_file: str,
-        station: str,
-        location: str) -> str:
+    '''
+    Parse the clock status of daily Fortimus SOH files
+
+    Parameters
+    ----------
+    fortimus_soh_files: list
+        The paths of the daily SOH files
+    station: str
+        The station code of the SOH records
+    location: str
+        The location code of the SOH records
+
+    Returns
+    -------
+    list:
+        For each file, a dictionary with the number of satellites used, the
+        clock quality and the clock status of each status report, and the
+        name of the file
+    '''
+    return [parse_fortimus_soh_file(path_of_file=file,
+                                    station=station,
+                                    location=location)
+            for file in fortimus_soh_files]
+
+
+def parse_fortimus_soh_file(path_of_file: str,
+                            station: str,
+                            location: str) -> dict:
+    '''
+    Parse the clock status of a daily Fortimus SOH file in a single pass
+
+    Parameters
+    ----------
+    path_of_file: str
+        The path of the SOH file
+    station: str
+        The station code of the SOH records
+    location: str
+        The location code of the SOH records
+
+    Returns
+    -------
+    dict:
+        The number of satellites used, clock quality and clock status of each
+        status report of the file, and the name of the file
+    '''
+    parser = FortimusSOHParser()
     with open(path_of_file, 'rb') as fp:
-        content = fp.read()
-
-    response = []
-    split_by = f'{station.upper()}{location.upper()}SOH'.encode()
-
-    for line in content.split(split_by):
-        response.append((line[46:-8]))
-
-    final_formatted_response = b''.join(
-        response).decode('utf-8', errors="ignore")
-
-    return final_formatted_response
-
-
-def get_fortimus_soh_metrics_results_for_current_day(data: str, file: str):
-    start = 'GNSS status'
-    end = 'PTP status'
-    name_of_file = re.findall("([^\/]+$)", file)[0]  # noqa
-    result = re.findall('%s((.|\n)*?)(?=%s)' %
-                        (start, end), data)
-
-    temp = tempfile.TemporaryFile(mode='w+t')
-    list_of_daily_number_of_satellites_used = []
-    list_of_daily_timing_quality = []
-    list_of_daily_clock_locked_status = []
-
-    try:
-        for index, iteration in enumerate(result):
-            temp.writelines(result[index][0])
-        temp.seek(0)
-        lines = temp.readlines()
-
-        list_of_daily_number_of_satellites_used = get_number_of_satelites_used(
-            data=lines)
-        list_of_daily_timing_quality = get_timing_quality(
-            data=lines)
-        list_of_daily_clock_locked_status = get_clock_locked_status(
-            data=lines
-        )
-    finally:
-        temp.close()
-    return {"number_of_satellites_used":
-            list_of_daily_number_of_satellites_used,
-            "timing_quality": list_of_daily_timing_quality,
-            "clock_locked_status": list_of_daily_clock_locked_status,
-            "file": name_of_file}
-
-
-def get_number_of_satelites_used(data: List[str]) -> List[int]:
-    list_of_satellites_used = []
-    for line in data:
-        if("Satellites used" in line):
-            line = line.strip()
-            number_of_satellites_used = re.search(  # type: ignore
-                '((?<=%s).*)' % ("Satellites used:"), line).group()
-            list_of_satellites_used.append(int(number_of_satellites_used))
-    return list_of_satellites_used
-
-
-def get_timing_quality(data: List[str]) -> List[str]:
-    list_of_timing_quality = []
-    for line in data:
-        if("Clock quality" in line):
-            line = line.strip()
-            timing_quality = re.search(  # type: ignore
-                '((?<=%s).*)' % ("Clock quality:"), line).group()
-            list_of_timing_quality.append(timing_quality.strip())
-    return list_of_timing_quality
-
-
-def get_clock_locked_status(data: List[str]) -> List[str]:
-    list_of_clock_locked_status = []
-    for line in data:
-        if("Status" in line):
-            line = line.strip()
-            clock_locked_status = re.search(  # type: ignore
-                '((?<=%s).*)' % ("Status:"), line).group()
-            list_of_clock_locked_status.append(clock_locked_status.strip())
-    return list_of_clock_locked_status
+        for text in read_fortimus_soh_records(fp=fp,
+                                              station=station,
+                                              location=location):
+            parser.feed(text)
+    parser.close()
+    return {"number_of_satellites_used": parser.number_of_satellites_used,
+            "timing_quality": parser.timing_quality,
+            "clock_locked_status": parser.clock_locked_status,
+            "file": os.path.basename(path_of_file)}
+
+
+def read_fortimus_soh_records(fp: BinaryIO,
+                              station: str,
+                              location: str) -> Iterator[str]:
+    '''
+    Read the SOH records of a station from a miniSEED file, one record at a
+    time, and yield their text. The records of other stations, locations or
+    channels are skipped.
+
+    Parameters
+    ----------
+    fp: file object
+        The miniSEED file, opened in binary mode
+    station: str
+        The station code of the SOH records
+    location: str
+        The location code of the SOH records
+
+    Yields
+    ------
+    str:
+        The text of each SOH record of the station
+    '''
+    codes = (station.upper(), location.upper(), 'SOH')
+    # Characters split between two records are decoded with the second one
+    decoder = codecs.getincrementaldecoder('utf-8')(errors='ignore')
+    while True:
+        header = fp.read(FIXED_HEADER_LENGTH)
+        if len(header) < FIXED_HEADER_LENGTH:
+            break
+        byte_order = miniseed_byte_order(header)
+        number_of_samples, = struct.unpack(f'{byte_order}H', header[30:32])
+        data_offset, = struct.unpack(f'{byte_order}H', header[44:46])
+        blockettes = fp.read(max(data_offset - FIXED_HEADER_LENGTH, 0))
+        record_length = miniseed_record_length(header + blockettes,
+                                               byte_order)
+        data = fp.read(max(
+            record_length - FIXED_HEADER_LENGTH - len(blockettes), 0))
+        record_codes = (header[8:13].decode('ascii', errors='ignore').strip(),
+                        header[13:15].decode('ascii', errors='ignore').strip(),
+                        header[15:18].decode('ascii', errors='ignore'))
+        if record_codes != codes:
+            continue
+        yield decoder.decode(data[:number_of_samples])
+    yield decoder.decode(b'', final=True)
+
+
+def _field_value(line: str, field: str) -> Optional[str]:
+    # The value follows the first 'field:' of the line
+    if field not in line:
+        return None
+    start = line.find(f'{field}:')
+    if start < 0:
+        return None
+    return line[start + len(field) + 1:].strip()
@@ -1,13 +1,15 @@
-import subprocess
-import os
 import tempfile
 
 from datetime import date
-from obspy.io.xseed import Parser
-from stationverification import XML_CONVERTER
 from configparser import ConfigParser
 from stationverification.utilities.prepare_ispaq import \
     InvalidConfigFile, prepare_ispaq_local
+from stationverification.utilities.ispaq_worker import run_ispaq_command
+from stationverification.utilities.resp_cache import get_resp_directory
+
+# Endings of the names of the csv files written by ISPAQ
+ISPAQ_CSV_SUFFIXES = ('simpleMetrics.csv', 'PSDMetrics.csv',
+                      'sampleRateMetrics.csv')
 
 
 def handle_running_ispaq_command(
@@ -22,28 +24,36 @@ def handle_running_ispaq_command(
         station: str = None,
         location: str = None,
         station_url: str = None,
-        stationconf: str = None):
+        stationconf: str = None,
+        snlc: str = None) -> int:
+    '''
+    Run ISPAQ, with the metadata of the station xml or of a station config
+    file, and return its exit status
+    '''
     if stationconf is None:
-        run_ispaq_command_with_stationXML(ispaqloc=ispaqloc,
-                                          metrics=metrics,
-                                          startdate=startdate,
-                                          enddate=enddate,
-                                          pfile=pfile,
-                                          pdfinterval=pdfinterval,
-                                          miniseedarchive=miniseedarchive,
-                                          network=network,
-                                          station=station,
-                                          location=location,
-                                          station_url=station_url)  # type: ignore # noqa
+        return run_ispaq_command_with_stationXML(
+            ispaqloc=ispaqloc,
+            metrics=metrics,
+            startdate=startdate,
+            enddate=enddate,
+            pfile=pfile,
+            pdfinterval=pdfinterval,
+            miniseedarchive=miniseedarchive,
+            network=network,
+            station=station,
+            location=location,
+            station_url=station_url,  # type: ignore
+            snlc=snlc)
     else:
-        run_ispaq_command_with_configfile(ispaqloc=ispaqloc,
-                                          metrics=metrics,
-                                          startdate=startdate,
-                                          enddate=enddate,
-                                          pfile=pfile,
-                                          pdfinterval=pdfinterval,
-                                          miniseedarchive=miniseedarchive,
-                                          stationconf=stationconf)
+        return run_ispaq_command_with_configfile(
+            ispaqloc=ispaqloc,
+            metrics=metrics,
+            startdate=startdate,
+            enddate=enddate,
+            pfile=pfile,
+            pdfinterval=pdfinterval,
+            miniseedarchive=miniseedarchive,
+            stationconf=stationconf)
 
 
 def run_ispaq_command_with_stationXML(
@@ -58,23 +68,30 @@ def run_ispaq_command_with_stationXML(
         network: str = None,
         station: str = None,
         location: str = None,
-        resp_dir: str = None):
+        resp_dir: str = None,
+        snlc: str = None) -> int:
 
     station_url_path = "stationverification/data/QW.xml"
 
-    if location is None:
-        snlc = f'{network}.{station}.*.H**'
+    if snlc is None:
+        if network is None or station is None:
+            raise ValueError(
+                'ISPAQ needs either an snlc, or a network and a station')
+        snlc = ispaq_snlc(network=network, station=station,
+                          location=location)
+    # Only the responses of the stations being validated are converted
+    snlc_network_station = {tuple(sncl.split('.')[:2])
+                            for sncl in snlc.split(',')}
+    networks = {sncl_network for sncl_network, _ in snlc_network_station}
+    stations = sorted(sncl_station
+                      for _, sncl_station in snlc_network_station)
+    if len(networks) == 1 and not any(
+            character in ''.join(stations) for character in '*?'):
+        resp_dir = get_resp_directory(station_xml=station_url_path,
+                                      network=networks.pop(),
+                                      stations=stations)
     else:
-        snlc = f'{network}.{station}.{location}.H**'
-    subprocess.getoutput(f'java -jar {XML_CONVERTER} --input \
-    {station_url_path} --output stationverification/data/stationXML.dataless')
-    pars = Parser("stationverification/data/stationXML.dataless")
-    if not os.path.isdir("stationverification/data/resp_files"):
-        os.mkdir('stationverification/data/resp_files')
-    pars.write_resp(
-        folder="stationverification/data/resp_files/", zipped=False)
-
-    resp_dir = "stationverification/data/resp_files/"
+        resp_dir = get_resp_directory(station_xml=station_url_path)
 
     cmd = f'{ispaqloc} -M {metrics} \
         --starttime={startdate} --endtime={enddate} \
@@ -83,12 +100,26 @@ def run_ispaq_command_with_stationXML(
             --station_url {station_url_path} \
             --dataselect_url {miniseedarchive}\
             --resp_dir {resp_dir}'
-    print("ISPAQ:", cmd)
-    proc = subprocess.Popen(
-        cmd,
-        shell=True
-    )
-    proc.wait()
+    return run_ispaq_command(cmd)
+
+
+def ispaq_snlc(network: str, station: str, location: str = None) -> str:
+    '''
+    Returns the SNCL ISPAQ is run with for the high rate channels of a
+    station. Several of them can be joined with commas to run ISPAQ once for
+    multiple stations.
+    '''
+    if location is None:
+        return f'{network}.{station}.*.H**'
+    return f'{network}.{station}.{location}.H**'
+
+
+def ispaq_output_snlc(snlc: str) -> str:
+    '''
+    Returns the SNCL as it appears in the names of the csv files written by
+    ISPAQ, which replaces the wildcards with x
+    '''
+    return snlc.replace('*', 'x').replace('?', 'x')
 
 
 def run_ispaq_command_with_configfile(
@@ -99,7 +130,7 @@ def run_ispaq_command_with_configfile(
         pfile: str,
         pdfinterval: str,
         miniseedarchive: str,
-        stationconf: str):
+        stationconf: str) -> int:
 
     stationconfiguration = ConfigParser()
     stationconfiguration.read(stationconf)
@@ -123,9 +154,4 @@ def run_ispaq_command_with_configfile(
 
     cmd = f'{ispaqloc} -M {metrics} -S {station} --starttime={startdate} \
 --endtime={enddate} -P {preffile} --pdf_interval {pdfinterval}'
-    print("ISPAQ:", cmd)
-    proc = subprocess.Popen(
-        cmd,
-        shell=True
-    )
-    proc.wait()
+    return run_ispaq_command(cmd)
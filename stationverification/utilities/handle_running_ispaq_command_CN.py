@@ -1,9 +1,7 @@
-import subprocess
-import os
 
 from datetime import date
-from obspy.io.xseed import Parser
-from stationverification import XML_CONVERTER
+from stationverification.utilities.ispaq_worker import run_ispaq_command
+from stationverification.utilities.resp_cache import get_resp_directory
 
 
 def handle_running_ispaq_command_CN(
@@ -15,16 +13,28 @@ def handle_running_ispaq_command_CN(
         pdfinterval: str,
         miniseedarchive: str,
         network: str = None,
-        station: str = None):
-    run_ispaq_command_with_stationXML(ispaqloc=ispaqloc,
-                                      metrics=metrics,
-                                      startdate=startdate,
-                                      enddate=enddate,
-                                      pfile=pfile,
-                                      pdfinterval=pdfinterval,
-                                      miniseedarchive=miniseedarchive,
-                                      network=network,
-                                      station=station)
+        station: str = None,
+        location: str = None,
+        station_url: str = None,
+        stationconf: str = None,
+        snlc: str = None) -> int:
+    '''
+    Run ISPAQ with the metadata of the CN station xml, and return its exit
+    status. The location, station_url and stationconf arguments are only
+    accepted so that it can be run in place of handle_running_ispaq_command,
+    as every location of the station is validated against the CN station
+    xml.
+    '''
+    return run_ispaq_command_with_stationXML(ispaqloc=ispaqloc,
+                                             metrics=metrics,
+                                             startdate=startdate,
+                                             enddate=enddate,
+                                             pfile=pfile,
+                                             pdfinterval=pdfinterval,
+                                             miniseedarchive=miniseedarchive,
+                                             network=network,
+                                             station=station,
+                                             snlc=snlc)
 
 
 def run_ispaq_command_with_stationXML(
@@ -36,21 +46,20 @@ def run_ispaq_command_with_stationXML(
         pdfinterval: str,
         miniseedarchive: str,
         network: str = None,
-        station: str = None):
+        station: str = None,
+        snlc: str = None) -> int:
 
     station_url_path = "stationverification/data/CN.xml"
 
-    snlc = f'{network}.{station}.*.***'
+    if snlc is None:
+        snlc = f'{network}.{station}.*.***'
 
-    subprocess.getoutput(f'java -jar {XML_CONVERTER} --input \
-    {station_url_path} --output stationverification/data/stationXML.dataless')
-    pars = Parser("stationverification/data/stationXML.dataless")
-    if not os.path.isdir("stationverification/data/resp_files"):
-        os.mkdir('stationverification/data/resp_files')
-    pars.write_resp(
-        folder="stationverification/data/resp_files/", zipped=False)
-
-    resp_dir = "stationverification/data/resp_files/"
+    # Only the responses of the station are converted, or those of the
+    # whole inventory when the station is not given
+    resp_dir = get_resp_directory(
+        station_xml=station_url_path,
+        network=network,
+        stations=None if station is None else [station])
 
     cmd = f'{ispaqloc} -M {metrics} \
         --starttime={startdate} --endtime={enddate} \
@@ -59,9 +68,4 @@ def run_ispaq_command_with_stationXML(
             --station_url {station_url_path} \
             --dataselect_url {miniseedarchive}\
             --resp_dir {resp_dir}'
-    print("ISPAQ:", cmd)
-    proc = subprocess.Popen(
-        cmd,
-        shell=True
-    )
-    proc.wait()
+    return run_ispaq_command(cmd)
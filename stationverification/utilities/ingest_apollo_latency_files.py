@@ -0,0 +1,85 @@
+import logging
+import os
+
+from functools import partial
+from multiprocessing import Pool
+from typing import Optional
+
+from stationverification.config import get_default_parameters
+from stationverification.utilities.\
+    calculate_total_availability_for_nanometrics import \
+    total_availability_from_channel_percent_availability
+from stationverification.utilities.get_latencies_from_apollo import \
+    merge_apollo_latency_files, parse_apollo_latency_file
+from stationverification.utilities.latency_table import LatencyTable
+
+
+class ApolloLatencyIngestion(dict):
+    '''
+    The latency values and total availability of a station, gathered from
+    its Apollo latency files
+
+    Properties
+    ----------
+    latency_table: LatencyTable
+        The latency values of the station, with one day per file
+    total_availability: float
+        The total availability percentage, to two decimal places
+    '''
+    @property
+    def latency_table(self) -> LatencyTable:
+        return self["latency_table"]
+
+    @property
+    def total_availability(self) -> float:
+        return self["total_availability"]
+
+
+def ingest_apollo_latency_files(files: list,
+                                network: str,
+                                station: str,
+                                workers: Optional[int] = None) \
+        -> ApolloLatencyIngestion:
+    '''
+    Parses the daily Apollo latency files of a station in a pool of worker
+    processes, reading each file exactly once for both the latency values
+    and the availability. The results are merged in the order of the files.
+
+    Parameters
+    ----------
+    files: list
+        The Apollo latency JSON files, one for each day, in date order
+    network: str
+        The network code of the station
+    station: str
+        The station code of the station
+    workers: int, optional
+        The number of worker processes. Defaults to
+        VALIDATION_LATENCY_WORKERS, or to the number of cores if it is not
+        set. With a single worker, the files are parsed in this process.
+
+    Returns
+    -------
+    ApolloLatencyIngestion:
+        The latency table and total availability of the station
+    '''
+    if workers is None:
+        workers = get_default_parameters().LATENCY_WORKERS or \
+            os.cpu_count() or 1
+    workers = max(1, min(workers, len(files)))
+    parse = partial(parse_apollo_latency_file, network=network,
+                    station=station)
+    logging.info(
+        f"Parsing {len(files)} latency files with {workers} workers..")
+    if workers == 1:
+        latency_files = [parse(file) for file in files]
+    else:
+        with Pool(processes=workers) as pool:
+            # map returns the results in the order of the files, whichever
+            # worker finishes first
+            latency_files = pool.map(parse, files)
+    return ApolloLatencyIngestion(
+        latency_table=merge_apollo_latency_files(latency_files),
+        total_availability=total_availability_from_channel_percent_availability(  # noqa
+            [latency_file.channel_percent_availability
+             for latency_file in latency_files]))
@@ -0,0 +1,278 @@
+'''
+This module caches the ISPAQ metrics of each SNCL and day, so that a
+validation only runs ISPAQ over the days it has not computed yet. An entry
+of the cache holds the rows of the ISPAQ csv files and the PSD files of a
+SNCL for a day, and a fingerprint of what they were computed from: the
+metric set, the hash of the preference file, and the size and modification
+time of the miniSEED files of the day. An entry whose fingerprint no longer
+matches is stale, and the day is computed again.
+
+The entries are laid out as {cache}/{metrics}/{snlc}/{day}. Each entry is
+written to a temporary directory that is renamed into the cache once
+complete, its fingerprint last, so that an interrupted run never leaves a
+partial entry behind.
+
+Functions
+---------
+ispaq_cache_fingerprints:
+    Returns the fingerprints of the SNCLs and days of a validation
+stale_ispaq_days:
+    Returns the days that are missing from the cache or stale
+store_ispaq_chunk_outputs:
+    Stores the outputs of an ISPAQ run in the cache, by SNCL and day
+restore_ispaq_cache_entries:
+    Copies the entries of the cache to directories laid out like the outputs
+    of ISPAQ runs
+'''
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+
+from datetime import date, timedelta
+from fnmatch import fnmatchcase
+from typing import Dict, List, Optional, Tuple
+
+import pandas as pd
+
+from stationverification.utilities.archive_index import get_archive_index
+from stationverification.utilities.file_fingerprint import file_fingerprint
+from stationverification.utilities.handle_running_ispaq_command import \
+    ISPAQ_CSV_SUFFIXES, ispaq_output_snlc
+
+CACHE_VERSION = 1
+# Written last to each entry of the cache
+FINGERPRINT_FILE = 'fingerprint.json'
+
+
+def ispaq_cache_fingerprints(snlcs: List[str],
+                             metrics: str,
+                             pfile: str,
+                             miniseedarchive: str,
+                             startdate: date,
+                             enddate: date) -> Dict[Tuple[str, date],
+                                                    Optional[list]]:
+    '''
+    Get the fingerprints of the ISPAQ metrics of SNCLs over a period. The
+    fingerprints are taken before ISPAQ runs, so that miniSEED files changed
+    during the run are computed again by the next one.
+
+    Parameters
+    ----------
+    snlcs: list
+        The SNCLs ISPAQ is run with, such as QW.QCC02.*.H**
+    metrics: str
+        The metric set ISPAQ is run with
+    pfile: str
+        The preference file ISPAQ is run with
+    miniseedarchive: str
+        The miniSEED archive, as a YYYY/MM/DD directory tree
+    startdate: date
+        The first day of the period
+    enddate: date
+        The day after the last day of the period
+
+    Returns
+    -------
+    dict:
+        The fingerprint of each SNCL and day. SNCLs with wildcards in their
+        network or station codes can not be matched to miniSEED files, and
+        their fingerprint is None, so they are never cached.
+    '''
+    with open(pfile, 'rb') as file:
+        preference_hash = hashlib.sha1(file.read()).hexdigest()
+    archive_index = get_archive_index(miniseedarchive, startdate, enddate)
+    fingerprints: Dict[Tuple[str, date], Optional[list]] = {}
+    for snlc in snlcs:
+        network, station, location, channel = snlc.split('.')
+        cacheable = not any(character in network + station
+                            for character in '*?')
+        day = startdate
+        while day < enddate:
+            fingerprints[(snlc, day)] = None
+            if cacheable:
+                files = archive_index.find(
+                    day=day,
+                    network=network,
+                    station=station,
+                    location=None if location == '*' else location,
+                    channel=channel)
+                fingerprints[(snlc, day)] = [
+                    CACHE_VERSION, metrics, preference_hash,
+                    [[os.path.basename(file), *file_fingerprint(file)]
+                     for file in files]]
+            day += timedelta(days=1)
+    return fingerprints
+
+
+def stale_ispaq_days(cache_directory: str,
+                     metrics: str,
+                     fingerprints: Dict[Tuple[str, date], Optional[list]]) \
+        -> List[date]:
+    '''
+    Returns the days, in order, for which the entry of at least one SNCL is
+    missing from the cache or has a different fingerprint
+    '''
+    days = {day for (snlc, day), fingerprint in fingerprints.items()
+            if fingerprint is None or _read_fingerprint(
+                _entry_directory(cache_directory, metrics, snlc, day))
+            != fingerprint}
+    logging.info(f'{len({day for _, day in fingerprints}) - len(days)} days \
+of ISPAQ metrics found in the cache')
+    return sorted(days)
+
+
+def store_ispaq_chunk_outputs(cache_directory: str,
+                              chunk_directory: str,
+                              metrics: str,
+                              fingerprints: Dict[Tuple[str, date],
+                                                 Optional[list]],
+                              startdate: date,
+                              enddate: date):
+    '''
+    Store the outputs of an ISPAQ run in the cache, split by SNCL and day
+
+    Parameters
+    ----------
+    cache_directory: str
+        The directory of the cache
+    chunk_directory: str
+        The directory of the run, with the csv and PSDs directories set in
+        its preference file
+    metrics: str
+        The metric set of the validation
+    fingerprints: dict
+        The fingerprint of each SNCL and day, from ispaq_cache_fingerprints
+    startdate: date
+        The first day of the run
+    enddate: date
+        The day after the last day of the run
+    '''
+    csv_directory = os.path.join(chunk_directory, 'csv')
+    metric_files = {}
+    for suffix in ISPAQ_CSV_SUFFIXES:
+        files = [os.path.join(csv_directory, filename)
+                 for filename in sorted(os.listdir(csv_directory))
+                 if filename.endswith(f'_{suffix}')] \
+            if os.path.isdir(csv_directory) else []
+        if files:
+            # The values are kept as they were written by ISPAQ
+            metric_files[suffix] = pd.concat(
+                [pd.read_csv(file, dtype=str, keep_default_na=False)
+                 for file in files], ignore_index=True, sort=False)
+    psd_directory = os.path.join(chunk_directory, 'PSDs')
+    psd_files = [os.path.relpath(os.path.join(directory, filename),
+                                 psd_directory)
+                 for directory, _, filenames in os.walk(psd_directory)
+                 for filename in filenames]
+
+    for (snlc, day), fingerprint in fingerprints.items():
+        if fingerprint is None or not startdate <= day < enddate:
+            continue
+        parent = os.path.dirname(
+            _entry_directory(cache_directory, metrics, snlc, day))
+        os.makedirs(parent, exist_ok=True)
+        temporary_directory = tempfile.mkdtemp(dir=parent, prefix='.')
+        try:
+            for suffix, rows in metric_files.items():
+                selected = rows[
+                    rows['target'].map(lambda target: _matches(target, snlc))
+                    & (rows['start'].str[:10] == str(day))]
+                if not selected.empty:
+                    selected.to_csv(os.path.join(temporary_directory, suffix),
+                                    index=False)
+            for psd_file in psd_files:
+                target, _, rest = os.path.basename(psd_file).partition('_')
+                if not _matches(target, snlc) or \
+                        not rest.startswith(f'{day}_'):
+                    continue
+                os.makedirs(os.path.join(temporary_directory, 'PSDs',
+                                         os.path.dirname(psd_file)),
+                            exist_ok=True)
+                shutil.copy2(os.path.join(psd_directory, psd_file),
+                             os.path.join(temporary_directory, 'PSDs',
+                                          psd_file))
+            with open(os.path.join(temporary_directory, FINGERPRINT_FILE),
+                      'w') as file:
+                json.dump(fingerprint, file)
+            entry_directory = _entry_directory(cache_directory, metrics,
+                                               snlc, day)
+            shutil.rmtree(entry_directory, ignore_errors=True)
+            os.replace(temporary_directory, entry_directory)
+        except OSError as error:
+            logging.warning(f'Unable to cache the ISPAQ metrics of {snlc} \
+on {day}: {error}')
+        finally:
+            shutil.rmtree(temporary_directory, ignore_errors=True)
+
+
+def restore_ispaq_cache_entries(cache_directory: str,
+                                metrics: str,
+                                fingerprints: Dict[Tuple[str, date],
+                                                   Optional[list]],
+                                directory: str) -> List[str]:
+    '''
+    Copy the entries of the cache matching their fingerprints to a directory
+    per day, laid out like the output directory of an ISPAQ run
+
+    Parameters
+    ----------
+    cache_directory: str
+        The directory of the cache
+    metrics: str
+        The metric set of the validation
+    fingerprints: dict
+        The fingerprint of each SNCL and day, from ispaq_cache_fingerprints
+    directory: str
+        The directory the days are copied to
+
+    Returns
+    -------
+    list:
+        The directories of the days, in order
+    '''
+    day_directories = []
+    for day in sorted({day for _, day in fingerprints}):
+        day_directory = os.path.join(directory, str(day))
+        for snlc in sorted({snlc for snlc, _ in fingerprints}):
+            entry_directory = _entry_directory(cache_directory, metrics,
+                                               snlc, day)
+            fingerprint = fingerprints[(snlc, day)]
+            if fingerprint is None or \
+                    _read_fingerprint(entry_directory) != fingerprint:
+                continue
+            os.makedirs(os.path.join(day_directory, 'csv'), exist_ok=True)
+            for suffix in ISPAQ_CSV_SUFFIXES:
+                if os.path.exists(os.path.join(entry_directory, suffix)):
+                    shutil.copy2(os.path.join(entry_directory, suffix),
+                                 os.path.join(
+                                     day_directory, 'csv',
+                                     f'{ispaq_output_snlc(snlc)}_{suffix}'))
+            if os.path.isdir(os.path.join(entry_directory, 'PSDs')):
+                shutil.copytree(os.path.join(entry_directory, 'PSDs'),
+                                os.path.join(day_directory, 'PSDs'),
+                                dirs_exist_ok=True)
+        if os.path.isdir(day_directory):
+            day_directories.append(day_directory)
+    return day_directories
+
+
+def _entry_directory(cache_directory: str, metrics: str, snlc: str,
+                     day: date) -> str:
+    return os.path.join(cache_directory, metrics, ispaq_output_snlc(snlc),
+                        str(day))
+
+
+def _read_fingerprint(entry_directory: str) -> Optional[list]:
+    try:
+        with open(os.path.join(entry_directory, FINGERPRINT_FILE)) as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return None
+
+
+def _matches(target: str, snlc: str) -> bool:
+    # ISPAQ targets are N.S.L.C.Q, with an empty location written as ''
+    return fnmatchcase('.'.join(target.split('.')[:4]), snlc)
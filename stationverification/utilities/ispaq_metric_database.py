@@ -0,0 +1,160 @@
+'''
+This module keeps the ISPAQ metrics in a SQLite database. ISPAQ writes its
+metrics to a SQLite database instead of csv files when the output preference
+is db, with one table per metric:
+
+    CREATE TABLE num_gaps (target TEXT, start TEXT, end TEXT, value,
+                           lddate TEXT)
+
+Each ISPAQ run writes a database of its own, which is then merged into a
+long-term database accumulating the metrics of every run. The metrics of a
+station over a period are read back from it with indexed queries, instead of
+reading the csv files of a single run.
+
+Functions
+---------
+merge_ispaq_database:
+    Merges the metrics of the database of an ISPAQ run into a database
+read_ispaq_metric_database:
+    Reads the metrics of SNCLs over a period from a database
+ispaq_metric_tables:
+    Returns the names of the metric tables of a database
+'''
+import logging
+import sqlite3
+
+from datetime import date
+from typing import List, Optional
+
+import pandas as pd
+from pandas.core.frame import DataFrame
+
+from stationverification.utilities.read_ispaq_metric_files import \
+    assemble_metric_dataframe, metric_columns, metric_dataframe
+
+# The columns of the metric tables the metrics are read from
+METRIC_TABLE_COLUMNS = ('target', 'start', 'value')
+
+
+def merge_ispaq_database(source: str, database: str):
+    '''
+    Merge the metric tables of the database of an ISPAQ run into a database.
+    The metrics the run computed again replace those of previous runs, and
+    the tables are indexed by target and start time.
+
+    Parameters
+    ----------
+    source: str
+        The path to the database written by the ISPAQ run
+    database: str
+        The path to the database the metrics are merged into, created if it
+        does not exist
+    '''
+    with sqlite3.connect(database) as connection:
+        connection.execute('ATTACH DATABASE ? AS source', (source,))
+        try:
+            for table in ispaq_metric_tables(connection, schema='source'):
+                connection.execute(
+                    f'CREATE TABLE IF NOT EXISTS main."{table}" AS \
+SELECT * FROM source."{table}" WHERE 0')
+                connection.execute(
+                    f'CREATE INDEX IF NOT EXISTS main."{table}_target_start" \
+ON "{table}" (target, start)')
+                connection.execute(
+                    f'DELETE FROM main."{table}" WHERE EXISTS (SELECT 1 FROM \
+source."{table}" AS run WHERE run.target = main."{table}".target AND \
+run.start = main."{table}".start)')
+                columns = ', '.join(
+                    f'"{column}"' for column in _table_columns(
+                        connection, table, schema='source'))
+                connection.execute(
+                    f'INSERT INTO main."{table}" ({columns}) SELECT {columns} \
+FROM source."{table}"')
+            connection.commit()
+        finally:
+            connection.execute('DETACH DATABASE source')
+
+
+def read_ispaq_metric_database(database: str,
+                               snlc: str,
+                               start: date,
+                               stop: date,
+                               metric_names: Optional[List[str]] = None) \
+        -> DataFrame:
+    '''
+    Read the metrics of SNCLs over a period from a database, in the layout of
+    read_ispaq_metric_files
+
+    Parameters
+    ----------
+    database: str
+        The path to the database
+    snlc: str
+        Comma separated SNCLs, as in the names of the csv files written by
+        ISPAQ, where x stands for any character, e.g. QW.QCC02.x.Hxx
+    start: date
+        The first day of the period
+    stop: date
+        The day after the last day of the period
+    metric_names: list, optional
+        The metrics to read. Defaults to all the metric tables
+
+    Returns
+    -------
+    DataFrame:
+        The metric values, indexed by start time
+    '''
+    patterns = [_target_pattern(sncl) for sncl in snlc.split(',')]
+    metrics = []
+    with sqlite3.connect(database) as connection:
+        tables = ispaq_metric_tables(connection)
+        if metric_names is not None:
+            tables = [table for table in tables if table in metric_names]
+        for table in tables:
+            condition = ' OR '.join(['target GLOB ?'] * len(patterns))
+            metrics.append(pd.read_sql_query(
+                f'SELECT target, start, value, ? AS metricName \
+FROM "{table}" WHERE ({condition}) AND start >= ? AND start < ? \
+ORDER BY start, target',
+                connection,
+                params=[table, *patterns, str(start), str(stop)]))
+    logging.info(f'Read {sum(len(rows) for rows in metrics)} ISPAQ metrics \
+of {snlc} from {database}')
+    if not metrics:
+        return pd.DataFrame()
+    metrics_of_tables = pd.concat(metrics, ignore_index=True)
+    # Values can be stored as text, missing values become NaN and are dropped
+    metrics_of_tables['value'] = pd.to_numeric(metrics_of_tables['value'],
+                                               errors='coerce')
+    metrics_of_tables['start'] = metrics_of_tables['start'].str.replace(
+        ' ', 'T', regex=False)
+    return assemble_metric_dataframe([
+        metric_dataframe(metric_columns(metrics_of_tables))])
+
+
+def ispaq_metric_tables(connection: sqlite3.Connection,
+                        schema: str = 'main') -> List[str]:
+    '''
+    Returns the names of the tables of a database holding metrics, which
+    have the target, start and value columns
+    '''
+    tables = [name for name, in connection.execute(
+        f'SELECT name FROM {schema}.sqlite_master WHERE type = \'table\' \
+AND name NOT LIKE \'sqlite_%\' ORDER BY name')]
+    return [table for table in tables
+            if set(METRIC_TABLE_COLUMNS).issubset(
+                _table_columns(connection, table, schema=schema))]
+
+
+def _table_columns(connection: sqlite3.Connection, table: str,
+                   schema: str = 'main') -> List[str]:
+    return [row[1] for row in connection.execute(
+        f'PRAGMA {schema}.table_info("{table}")')]
+
+
+def _target_pattern(sncl: str) -> str:
+    # ISPAQ names its files with x in place of the wildcards of the SNCL,
+    # while the codes themselves are upper case
+    network, station, location, channel = sncl.split('.')
+    return '.'.join(code.replace('x', '*')
+                    for code in (network, station, location, channel)) + '.*'
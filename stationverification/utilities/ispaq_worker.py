@@ -0,0 +1,266 @@
+'''
+This module runs ISPAQ in a long-lived worker process, so that each run does
+not pay for starting Python, importing obspy, pandas and rpy2, and starting R
+with the IRIS R packages. The worker loads them once, then listens on a Unix
+socket for ISPAQ jobs, the command line of a run and the directory it is run
+from. Each job is run in a child forked from the worker, which starts with
+everything already loaded and leaves the worker unchanged, so that jobs can
+run at the same time.
+
+A job is a line of JSON, answered by a line of JSON with the exit status of
+ISPAQ:
+
+    {"argv": ["/home/ec2-user/ispaq/run_ispaq.py", "-M", "eew_test", ...],
+     "cwd": "/validation/run"}
+    {"status": 0}
+
+ISPAQ commands are submitted to the worker when VALIDATION_ISPAQ_WORKER_SOCKET
+is set and the worker is running, and are otherwise run as a subprocess.
+The jobs run run_ispaq.py with the python of the worker, so the worker must
+be started with the python of ISPAQ, with stationverification installed in
+its environment. It does not start if the modules ISPAQ uses can not be
+imported.
+
+Classes
+-------
+ISPAQJob:
+    The command line of an ISPAQ run and the directory it is run from
+
+Functions
+---------
+run_ispaq_command:
+    Runs an ISPAQ command in the worker, or as a subprocess
+submit_ispaq_job:
+    Submits an ISPAQ job to the worker and waits for its exit status
+serve_ispaq_jobs:
+    Runs the worker, until it is interrupted or terminated
+preload_ispaq:
+    Imports the modules ISPAQ uses and starts R
+'''
+import importlib
+import json
+import logging
+import os
+import runpy
+import shlex
+import signal
+import socket
+import subprocess
+import sys
+
+from typing import List, Optional
+
+from stationverification.config import get_default_parameters
+from stationverification.utilities.exceptions import ISPAQWorkerError
+
+# Modules imported by the worker before it accepts jobs. The ispaq modules
+# are found next to run_ispaq.py, and load the IRIS R packages through rpy2
+PRELOADED_MODULES = ('numpy', 'pandas', 'obspy', 'obspy.signal',
+                     'rpy2.robjects', 'ispaq.irisseismic',
+                     'ispaq.irismustangmetrics', 'ispaq.concierge',
+                     'ispaq.user_request', 'ispaq.utils')
+# Seconds the worker waits for a job before reaping the finished children
+ACCEPT_TIMEOUT = 1.0
+
+
+class ISPAQJob(dict):
+    '''
+    An ISPAQ run, the command line it is started with and the directory it
+    is run from
+    '''
+    @property
+    def argv(self) -> List[str]:
+        return self["argv"]
+
+    @property
+    def cwd(self) -> str:
+        return self["cwd"]
+
+
+def run_ispaq_command(cmd: str, socket_path: Optional[str] = None) -> int:
+    '''
+    Run an ISPAQ command, in the worker if it is running, or as a subprocess
+    otherwise
+
+    Parameters
+    ----------
+    cmd: str
+        The ISPAQ command line, starting with the path to run_ispaq.py
+    socket_path: str, optional
+        The Unix socket of the worker. Defaults to
+        VALIDATION_ISPAQ_WORKER_SOCKET
+
+    Returns
+    -------
+    int:
+        The exit status of ISPAQ
+    '''
+    if socket_path is None:
+        socket_path = get_default_parameters().ISPAQ_WORKER_SOCKET
+    print("ISPAQ:", cmd)
+    if socket_path:
+        status = submit_ispaq_job(
+            ISPAQJob(argv=shlex.split(cmd), cwd=os.getcwd()),
+            socket_path=socket_path)
+        if status is not None:
+            return status
+        logging.info(f'No ISPAQ worker on {socket_path}, running ISPAQ as a \
+subprocess')
+    proc = subprocess.Popen(
+        cmd,
+        shell=True
+    )
+    return proc.wait()
+
+
+def submit_ispaq_job(job: ISPAQJob, socket_path: str) -> Optional[int]:
+    '''
+    Submit an ISPAQ job to the worker and wait for it to finish
+
+    Returns
+    -------
+    int or None:
+        The exit status of ISPAQ, or None if the worker is not running. If
+        the worker stops during the job, the job failed with status 1.
+    '''
+    try:
+        connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        connection.connect(socket_path)
+    except OSError:
+        return None
+    with connection, connection.makefile('rw') as stream:
+        try:
+            stream.write(json.dumps(job) + '\n')
+            stream.flush()
+            return int(json.loads(stream.readline())['status'])
+        except (OSError, ValueError, KeyError) as error:
+            logging.error(f'The ISPAQ worker on {socket_path} stopped during \
+the job: {error}')
+            return 1
+
+
+def serve_ispaq_jobs(socket_path: str,
+                     ispaqloc: str,
+                     preload: bool = True):
+    '''
+    Run the ISPAQ worker, until it is interrupted or terminated
+
+    Parameters
+    ----------
+    socket_path: str
+        The Unix socket the worker listens on
+    ispaqloc: str
+        The path to run_ispaq.py, next to the ispaq modules
+    preload: bool, optional
+        Whether to import the modules ISPAQ uses before accepting jobs
+
+    Raises
+    ------
+    ISPAQWorkerError:
+        If the modules ISPAQ uses can not be imported
+    '''
+    if os.path.exists(socket_path):
+        probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        with probe:
+            if probe.connect_ex(socket_path) == 0:
+                raise RuntimeError(
+                    f'An ISPAQ worker is already running on {socket_path}')
+        # Left behind by a worker that did not stop cleanly
+        os.remove(socket_path)
+    if preload:
+        preload_ispaq(ispaqloc)
+    listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    listener.bind(socket_path)
+    listener.listen()
+    listener.settimeout(ACCEPT_TIMEOUT)
+    # Stop on SIGTERM as on an interruption, removing the socket
+    signal.signal(signal.SIGTERM, _interrupt)
+    logging.info(f'ISPAQ worker listening on {socket_path}')
+    try:
+        while True:
+            _reap_children()
+            try:
+                connection, _ = listener.accept()
+            except socket.timeout:
+                continue
+            if os.fork() == 0:
+                listener.close()
+                _run_job(connection)
+            connection.close()
+    except KeyboardInterrupt:
+        logging.info('Stopping the ISPAQ worker')
+    finally:
+        listener.close()
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
+
+
+def preload_ispaq(ispaqloc: str):
+    '''
+    Import the modules ISPAQ uses, starting R with the IRIS R packages, so
+    that the jobs forked from the worker start with them loaded
+
+    Raises
+    ------
+    ISPAQWorkerError:
+        If a module can not be imported, as every job would then fail
+    '''
+    sys.path.insert(0, os.path.dirname(os.path.abspath(ispaqloc)))
+    for module in PRELOADED_MODULES:
+        try:
+            importlib.import_module(module)
+        except Exception as error:
+            raise ISPAQWorkerError(f'Unable to import {module}, the ISPAQ \
+worker must be started with the python of ISPAQ: {error}') from error
+
+
+def _run_job(connection: socket.socket):
+    # Runs in a child of the worker, and never returns
+    status = 1
+    try:
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        with connection, connection.makefile('rw') as stream:
+            line = stream.readline()
+            job = ISPAQJob(json.loads(line)) if line.strip() else None
+            if job is not None and job.argv:
+                status = _run_ispaq(job)
+                stream.write(json.dumps({'status': status}) + '\n')
+                stream.flush()
+    except Exception:
+        logging.exception('ISPAQ job failed')
+    finally:
+        sys.stdout.flush()
+        sys.stderr.flush()
+        os._exit(status)
+
+
+def _run_ispaq(job: ISPAQJob) -> int:
+    # Run run_ispaq.py as the __main__ module, as python would
+    os.chdir(job.cwd)
+    script = job.argv[0]
+    sys.argv = list(job.argv)
+    sys.path.insert(0, os.path.dirname(os.path.abspath(script)))
+    try:
+        runpy.run_path(script, run_name='__main__')
+    except SystemExit as exit:
+        if exit.code is None:
+            return 0
+        return exit.code if isinstance(exit.code, int) else 1
+    except Exception:
+        logging.exception(f'ISPAQ failed: {shlex.join(job.argv)}')
+        return 1
+    return 0
+
+
+def _reap_children():
+    while True:
+        try:
+            pid, _ = os.waitpid(-1, os.WNOHANG)
+        except ChildProcessError:
+            return
+        if pid == 0:
+            return
+
+
+def _interrupt(signum, frame):
+    raise KeyboardInterrupt
@@ -5,10 +5,13 @@ files and report on them
 import logging
 
 import numpy as np
-from typing import Any
+from typing import Any, Dict, Optional
 
 from pandas.core.frame import DataFrame
 
+from stationverification.utilities.latency_statistics import \
+    LatencyStatistics, LatencySummary, summarize_latencies
+
 
 def latencyreport(
         combined_latency_dataframe_for_all_days: DataFrame,
@@ -16,7 +19,8 @@ def latencyreport(
         station: str,
         json_dict: dict,
         timely_threshold: float,
-        timely_percent: float
+        timely_percent: float,
+        latency_summary: Optional[LatencySummary] = None
 ) -> dict:
     '''
     Function to report on latency information about a station
@@ -51,6 +55,9 @@ def latencyreport(
     json_dict: str
         The dictionary object to store the results of the report in
 
+    latency_summary: LatencySummary, optional
+        The latency statistics of the station, if already computed
+
     Returns
     -------
         dict: The dictionary object containing the results of the report
@@ -65,6 +72,7 @@ def latencyreport(
         station=station,
         timely_threshold=timely_threshold,
         timely_percent=timely_percent,
+        latency_summary=latency_summary,
     )
     return final_json_dict
 
@@ -76,73 +84,67 @@ def populate_json_with_latency_info(
         station: str,
         timely_threshold: float,
         timely_percent: float,
+        latency_summary: Optional[LatencySummary] = None,
 ):
     if combined_latency_dataframe_for_all_days is None:
         return json_dict
     else:
+        # All the statistics are computed in one pass over the latencies
+        if latency_summary is None or \
+                latency_summary.timely_threshold != timely_threshold:
+            latency_summary = summarize_latencies(
+                combined_latency_dataframe_for_all_days,
+                timely_threshold=timely_threshold)
 
         channels = json_dict['channels'].keys()
         logging.debug(f'List of channels in the json_dict: {channels}')
         # Calculate average latency for the individual channels and\
         #  timely_percentage and failed latencies
         for channel in channels:
-            average = combined_latency_dataframe_for_all_days[
-                combined_latency_dataframe_for_all_days.channel
-                == channel].data_latency.mean()
+            statistics = latency_summary.channel(channel)
             logging.info(
                 f'Average latency for channel {channel} is \
-    {round(float(average), 3)} seconds')  # :.3f
-            json_dict['channels'][channel]['latency'] = {}
-            json_dict['channels'][channel]['latency']['average_latency'] = \
-                round(float(average), 2)
-            below_threshold = percentbelowthreshold(
-                f'{station}.{channel}',
-                combined_latency_dataframe_for_all_days
-                [combined_latency_dataframe_for_all_days.channel ==
-                 channel].data_latency,
-                timely_threshold)
-            json_dict['channels'][channel]['latency']['timely_availability'] = round(float(below_threshold), 2)  # noqa
-            latencies_for_current_channel = \
-                combined_latency_dataframe_for_all_days[
-                    combined_latency_dataframe_for_all_days.channel
-                    == channel]
-            number_of_latencies_for_current_channel = \
-                latencies_for_current_channel.data_latency.size
-            number_of_failed_latencies_for_current_channel = \
-                latencies_for_current_channel[
-                    latencies_for_current_channel["data_latency"] > 3]\
-                .data_latency.size
+    {round(statistics.mean, 3)} seconds')  # :.3f
+            if statistics.count == 0:
+                logging.warning(
+                    f"Skipping Timely Availability calculation for \
+{station}.{channel}. Please check the latency files.")
+            json_dict['channels'][channel]['latency'] = \
+                _latency_json(statistics)
             json_dict['channels'][channel]['latency']['total_latencies'] = \
-                number_of_latencies_for_current_channel
+                statistics.count
             json_dict['channels'][channel]['latency']['failed_latencies'] = \
-                number_of_failed_latencies_for_current_channel
+                statistics.failed_count
 
         # JSON report calculations
-        average = \
-            combined_latency_dataframe_for_all_days.data_latency.mean()
+        statistics = latency_summary.station
         logging.info(
             f'Overall average latency for {network}-{station} is \
-    {round(float(average), 2)} seconds')
-        json_dict['station_latency'] = {}
-        json_dict['station_latency']['average_latency'] = round(
-            float(average), 2)
-        below_threshold = percentbelowthreshold(
-            station,
-            combined_latency_dataframe_for_all_days.data_latency,
-            timely_threshold)
-        json_dict['station_latency']['timely_availability'] = round(
-            float(below_threshold), 2)
-        if below_threshold >= timely_percent:
+    {round(statistics.mean, 2)} seconds')
+        json_dict['station_latency'] = _latency_json(statistics)
+        if statistics.timely_percentage >= timely_percent:
             json_dict['station_latency']['timely_passed'] = True
         else:
             json_dict['station_latency']['timely_passed'] = False
         return json_dict
 
 
+def _latency_json(statistics: LatencyStatistics) -> dict:
+    latency_json: Dict[str, Any] = {
+        'average_latency': round(statistics.mean, 2),
+        'timely_availability': round(statistics.timely_percentage, 2)}
+    if statistics.percentiles:
+        latency_json['percentiles'] = {
+            f'p{percentile:g}': round(value, 2)
+            for percentile, value in statistics.percentiles.items()}
+    return latency_json
+
+
 def percentbelowthreshold(
     station: str,
     latencies: Any,
-    threshold: float
+    threshold: float,
+    weights: Optional[np.ndarray] = None
 ) -> float:
     '''
     Function that calculates the percentage of values in an array of latency
@@ -156,6 +158,9 @@ def percentbelowthreshold(
         The latency values to test against the threshold
     threshold: float
         The maximum latency to test against
+    weights: Numpy Array, optional
+        The number of packets each latency value stands for. Each value
+        counts once if not given
 
     Returns
     -------
@@ -163,8 +168,14 @@ def percentbelowthreshold(
         The percentage of latency values that were below the threshold
     '''
     if(len(latencies) > 0):
-        n = np.count_nonzero(latencies < threshold)
-        percent = n / len(latencies) * 100
+        below_threshold = np.asarray(latencies) < threshold
+        if weights is None:
+            n = np.count_nonzero(below_threshold)
+            total = len(latencies)
+        else:
+            n = np.sum(weights[below_threshold])
+            total = np.sum(weights)
+        percent = n / total * 100
         return float(percent)
     else:
         logging.warning(
@@ -1,14 +1,16 @@
 import os
 import warnings
-import statistics
 
 from typing import Any, Optional
 
 import numpy as np
 from datetime import date, timedelta
 
-import matplotlib.pyplot as plt
-import matplotlib
+from matplotlib.figure import Figure
+
+from stationverification.utilities.latency_statistics import \
+    LatencySummary, summarize_latencies
+from stationverification.utilities.latency_table import latency_weights
 
 warnings.filterwarnings("ignore")
 
@@ -22,7 +24,8 @@ def latency_log_plot(
     network: str,
     timely_threshold: float,
     location: Optional[str] = None,
-    total_availability: Optional[float] = None
+    total_availability: Optional[float] = None,
+    latency_summary: Optional[LatencySummary] = None
 ):
     '''
     Generates a log plot of latency values for a station
@@ -31,6 +34,7 @@ def latency_log_plot(
     ----------
     latencies: Pandas dataframe
          Contains 'network', 'station', 'channel', 'startTime', 'data_latency'
+         and optionally 'weight', the number of packets of each latency value
     station: str
         The station code. For the title and name of file
     network: str
@@ -45,6 +49,8 @@ def latency_log_plot(
         Used to annotate the plot
     timely_threshold: float
         Maximum latency for a packet to be considered timely
+    latency_summary: LatencySummary, optional
+        The latency statistics of the station, if already computed
 
     return
     -------
@@ -69,40 +75,40 @@ def latency_log_plot(
         plottitle = f'Latencies for {network}.{station} \n {startdate} to\
  {enddate - timedelta(days=1)}'
 
-    # Setting up the figure
-    font = {'size': 13}
-
-    matplotlib.rc('font', **font)
-    fig = plt.figure()
-    fig.set_size_inches(18.5, 10.5)
+    # Setting up the figure, with the font sizes set on each text rather
+    # than through the global matplotlib settings
+    fig = Figure(figsize=(18.5, 10.5))
 
     ax1 = fig.add_subplot(111)
-    ax1.set_title(plottitle)  # Add a title to the axes.
+    ax1.set_title(plottitle, fontsize=16)  # Add a title to the axes.
+    ax1.tick_params(labelsize=13)
     ax1.set_xlabel('Latency (seconds)', fontsize=13)
     ax1.set_ylabel('Occurrences', fontsize=13)  # Add a y-label to the axes.
     ax1.set_yscale('log')
+    if latency_summary is None:
+        latency_summary = summarize_latencies(
+            latencies, timely_threshold=timely_threshold)
+    average_latency = latency_summary.station.mean
+    std_of_latency = latency_summary.station.std
     if typeofinstrument.lower() == "titansma":
-        average_latency = statistics.mean(latencies)
-        latencies_as_float64 = np.array(latencies, dtype='float64')
-        std_of_latency = np.std(latencies_as_float64)
         note_content = f'Type of Instrument: TitanSMA\n\
 Data availability: {total_availability}%\n\
 Average latency:{round(np.float64(average_latency), 2)} seconds\n\
 Standard deviation: {round(np.float64(std_of_latency), 1)}'
     elif typeofinstrument.lower() == "fortimus":
         note_content = f'Type of Instrument: Fortimus\n\
-Average latency: {round(latencies.data_latency.mean(),2)} seconds\n\
-Standard deviation: {round(np.std(latencies.data_latency),1)}'
+Average latency: {round(np.float64(average_latency), 2)} seconds\n\
+Standard deviation: {round(np.float64(std_of_latency), 1)}'
 
     ax1.text(0.9, 0.8, note_content, style='italic', fontsize=12,
              transform=ax1.transAxes,
              bbox={'facecolor': 'grey', 'alpha': 0.5, 'pad': 6})
     ax1.set_axisbelow(True)
-    plt.grid(visible=True, which='both', axis='both', linewidth=0.5)
+    ax1.grid(visible=True, which='both', axis='both', linewidth=0.5)
 
     ax1.hist(
-        latencies if typeofinstrument.lower() == "titansma"
-        else latencies.data_latency,
+        np.asarray(latencies.data_latency, dtype='float64'),
+        weights=latency_weights(latencies),
         bins=[0, 0.5, 1, 1.5, 2, 2.5, 3, 3.5, 4, 4.5,
               5, 5.5, 6, 6.5, 7, 7.5, 8, 8.5, 9, 9.5, 10],
         ec='black',
@@ -110,17 +116,15 @@ Standard deviation: {round(np.std(latencies.data_latency),1)}'
 
     # Adding the threshold line
     threshold = timely_threshold
-    plt.axvline(threshold, color='r', linestyle='--', linewidth=1,
+    ax1.axvline(threshold, color='r', linestyle='--', linewidth=1,
                 label=f"Data Timeliness threshold: \
 {timely_threshold} seconds")
     legend = ax1.legend(bbox_to_anchor=(1.1, 1),
                         loc='upper right', fontsize="13")
 
     fig.tight_layout()  # Important for the plot labels to not overlap
-    if not os.path.isdir('./stationvalidation_output/'):
-        os.mkdir('./stationvalidation_output/')
-    plt.savefig(
+    os.makedirs('./stationvalidation_output/', exist_ok=True)
+    fig.savefig(
         f'./stationvalidation_output/{filename}',
         bbox_extra_artists=(legend,),
         bbox_inches='tight')
-    plt.close()
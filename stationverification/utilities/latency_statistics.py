@@ -0,0 +1,302 @@
+'''
+This module computes the latency statistics of a validation period, for
+each channel and for the whole station, in a single grouped pass over the
+combined latency DataFrame. The resulting summary is shared by the JSON
+report, the latency log plot and the CSV of failed latencies, rather than
+each of them filtering the latencies again.
+
+Latency values are weighted by the number of packets they stand for, see
+latency_table.latency_weights.
+
+Classes
+-------
+LatencyStatistics:
+    The statistics of a group of latency values
+LatencySummary:
+    The latency statistics of each channel and of the station
+
+Functions
+---------
+summarize_latencies:
+    Computes the latency statistics of a latency DataFrame
+valid_latency_rows:
+    Returns the rows of a latency DataFrame with a latency and a channel
+'''
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+from pandas.core.frame import DataFrame
+
+from stationverification.config import get_default_parameters
+from stationverification.utilities.latency_table import latency_weights
+
+
+class LatencyStatistics(dict):
+    '''
+    The statistics of a group of latency values. The mean and standard
+    deviation are NaN if the group holds no latency values.
+
+    Properties
+    ----------
+    count: int
+        The number of packets
+    mean: float
+        The average latency, in seconds
+    std: float
+        The standard deviation of the latencies, in seconds
+    timely_percentage: float
+        The percentage of packets with a latency below the timely threshold
+    failed_count: int
+        The number of packets with a latency above the failed threshold
+    percentiles: dict
+        The latency at each requested percentile, in seconds: the smallest
+        latency at or below which that percentage of the packets are
+    '''
+    @property
+    def count(self) -> int:
+        return self["count"]
+
+    @property
+    def mean(self) -> float:
+        return self["mean"]
+
+    @property
+    def std(self) -> float:
+        return self["std"]
+
+    @property
+    def timely_percentage(self) -> float:
+        return self["timely_percentage"]
+
+    @property
+    def failed_count(self) -> int:
+        return self["failed_count"]
+
+    @property
+    def percentiles(self) -> Dict[float, float]:
+        return self["percentiles"]
+
+
+class LatencySummary(dict):
+    '''
+    The latency statistics of a station and of each of its channels
+
+    Properties
+    ----------
+    timely_threshold: float
+        The latency in seconds below which a packet is timely
+    failed_threshold: float
+        The latency in seconds above which a packet has failed
+    station: LatencyStatistics
+        The statistics of all the latencies of the station
+    channels: dict
+        The statistics of the latencies of each channel
+    late_rows: numpy array
+        The positions of the rows above the timely threshold, each repeated
+        once for each packet it stands for
+
+    Functions
+    ---------
+    channel:
+        Returns the statistics of a channel
+    '''
+    @property
+    def timely_threshold(self) -> float:
+        return self["timely_threshold"]
+
+    @property
+    def failed_threshold(self) -> float:
+        return self["failed_threshold"]
+
+    @property
+    def station(self) -> LatencyStatistics:
+        return self["station"]
+
+    @property
+    def channels(self) -> Dict[str, LatencyStatistics]:
+        return self["channels"]
+
+    @property
+    def late_rows(self) -> np.ndarray:
+        return self["late_rows"]
+
+    def channel(self, channel: str) -> LatencyStatistics:
+        '''
+        Get the statistics of a channel, empty if the channel has no
+        latency values
+        '''
+        if channel in self.channels:
+            return self.channels[channel]
+        return _empty_statistics(self.station.percentiles.keys())
+
+
+def summarize_latencies(
+    latency_dataframe: DataFrame,
+    timely_threshold: float,
+    failed_threshold: float = 3.0,
+    percentiles: Optional[Sequence[float]] = None
+) -> LatencySummary:
+    '''
+    Compute the latency statistics of each channel and of the station
+
+    Parameters
+    ----------
+    latency_dataframe: DataFrame
+        A DataFrame with the 'channel' and 'data_latency' columns, and
+        optionally a 'weight' column
+    timely_threshold: float
+        The latency in seconds below which a packet is timely
+    failed_threshold: float
+        The latency in seconds above which a packet has failed
+    percentiles: list, optional
+        The percentiles of the latencies to compute, between 0 and 100.
+        Defaults to VALIDATION_LATENCY_PERCENTILES
+
+    Returns
+    -------
+    LatencySummary:
+        The latency statistics of the station and of its channels
+    '''
+    if percentiles is None:
+        percentiles = get_default_parameters().LATENCY_PERCENTILES
+    percentiles = [float(percentile) for percentile in percentiles]
+    # Rows without a latency or a channel are left out of the statistics
+    valid = valid_latency_rows(latency_dataframe)
+    rows = np.flatnonzero(valid)
+    latencies = np.asarray(latency_dataframe['data_latency'].values,
+                           dtype=np.float64)[valid]
+    weights = np.asarray(latency_weights(latency_dataframe),
+                         dtype=np.int64)[valid]
+    channels, channel_codes = np.unique(
+        np.asarray(latency_dataframe['channel'].values[valid], dtype=str),
+        return_inverse=True)
+    number_of_channels = len(channels)
+
+    # Per channel sums, each accumulated in one pass over the latencies
+    counts = np.bincount(channel_codes, weights=weights,
+                         minlength=number_of_channels)
+    sums = np.bincount(channel_codes, weights=weights * latencies,
+                       minlength=number_of_channels)
+    timely_counts = np.bincount(
+        channel_codes, weights=weights * (latencies < timely_threshold),
+        minlength=number_of_channels)
+    failed_counts = np.bincount(
+        channel_codes, weights=weights * (latencies > failed_threshold),
+        minlength=number_of_channels)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        means = sums / counts
+    squared_deviations = np.bincount(
+        channel_codes,
+        weights=weights * (latencies - means[channel_codes]) ** 2,
+        minlength=number_of_channels)
+
+    # The station statistics combine those of the channels
+    station_count = counts.sum()
+    station_mean = sums.sum() / station_count if station_count else np.nan
+    station_squared_deviations = np.sum(
+        squared_deviations + counts * (means - station_mean) ** 2)
+
+    channel_percentiles = _grouped_percentiles(
+        latencies, weights, channel_codes, number_of_channels, percentiles)
+    station_percentiles = _grouped_percentiles(
+        latencies, weights, np.zeros(len(latencies), dtype=np.int64), 1,
+        percentiles)
+
+    late = latencies > timely_threshold
+    late_rows = np.repeat(rows[late], weights[late])
+
+    return LatencySummary(
+        timely_threshold=timely_threshold,
+        failed_threshold=failed_threshold,
+        station=_statistics(station_count, station_mean,
+                            station_squared_deviations, timely_counts.sum(),
+                            failed_counts.sum(), station_percentiles[0]),
+        channels={
+            channel: _statistics(counts[code], means[code],
+                                 squared_deviations[code],
+                                 timely_counts[code], failed_counts[code],
+                                 channel_percentiles[code])
+            for code, channel in enumerate(channels)},
+        late_rows=late_rows)
+
+
+def valid_latency_rows(latency_dataframe: DataFrame) -> np.ndarray:
+    '''
+    Find the rows of a latency DataFrame with a finite latency and a channel,
+    e.g. leaving out the blank cells of Fortimus latency files
+
+    Parameters
+    ----------
+    latency_dataframe: DataFrame
+        A DataFrame with the 'channel' and 'data_latency' columns
+
+    Returns
+    -------
+    numpy array:
+        True for each row with a latency and a channel
+    '''
+    return np.isfinite(np.asarray(latency_dataframe['data_latency'].values,
+                                  dtype=np.float64)) & \
+        latency_dataframe['channel'].notna().values
+
+
+def _statistics(count: float,
+                mean: float,
+                squared_deviations: float,
+                timely_count: float,
+                failed_count: float,
+                percentiles: Dict[float, float]) -> LatencyStatistics:
+    if not count:
+        return _empty_statistics(percentiles.keys())
+    return LatencyStatistics(
+        count=int(count),
+        mean=float(mean),
+        std=float(np.sqrt(squared_deviations / count)),
+        timely_percentage=float(timely_count / count * 100),
+        failed_count=int(failed_count),
+        percentiles=percentiles)
+
+
+def _empty_statistics(percentiles) -> LatencyStatistics:
+    return LatencyStatistics(
+        count=0,
+        mean=float('nan'),
+        std=float('nan'),
+        timely_percentage=0.0,
+        failed_count=0,
+        percentiles={percentile: float('nan') for percentile in percentiles})
+
+
+def _grouped_percentiles(latencies: np.ndarray,
+                         weights: np.ndarray,
+                         codes: np.ndarray,
+                         number_of_groups: int,
+                         percentiles: List[float]) \
+        -> List[Dict[float, float]]:
+    # The latencies are sorted by group then by value once, and the
+    # percentiles of every group are looked up in the cumulative weights
+    if not percentiles:
+        return [{} for _ in range(number_of_groups)]
+    order = np.lexsort((latencies, codes))
+    sorted_latencies = latencies[order]
+    cumulative_weights = np.cumsum(weights[order])
+    group_ends = np.cumsum(np.bincount(codes, minlength=number_of_groups))
+    group_starts = group_ends - np.bincount(codes,
+                                            minlength=number_of_groups)
+    results = []
+    for start, end in zip(group_starts, group_ends):
+        if start == end:
+            results.append({percentile: float('nan')
+                            for percentile in percentiles})
+            continue
+        offset = cumulative_weights[start - 1] if start else 0
+        group_weights = cumulative_weights[start:end] - offset
+        positions = np.searchsorted(
+            group_weights,
+            np.array(percentiles) / 100 * group_weights[-1],
+            side='left')
+        positions = np.minimum(positions, end - start - 1)
+        results.append({
+            percentile: float(sorted_latencies[start + position])
+            for percentile, position in zip(percentiles, positions)})
+    return results
@@ -0,0 +1,258 @@
+'''
+Columnar storage for the latency values of a validation period
+
+Classes
+-------
+LatencyTable:
+    Holds the latency values of a station as typed column arrays, and hands
+    out per-day and max-only views of those arrays without copying them
+
+Functions
+---------
+latency_weights:
+    Returns the weight of each latency value of a latency DataFrame
+weighted_latency_mean:
+    Returns the mean of weighted latency values
+weighted_latency_std:
+    Returns the standard deviation of weighted latency values
+
+'''
+from typing import List, Optional
+
+import numpy as np
+import pandas as pd
+from pandas.core.frame import DataFrame
+
+LATENCY_COLUMNS = ('network', 'station', 'channel', 'startTime',
+                   'data_latency')
+
+# The number of packets each latency value stands for. Latency DataFrames
+# without this column have one packet per value.
+LATENCY_WEIGHT_COLUMN = 'weight'
+
+
+class LatencyTable():
+    '''
+    Typed, columnar container for latency values.
+
+    Rows are grouped by day. Within a day, the maximum latency of every
+    interval comes first, followed by the remaining (minimum and average)
+    latencies, so that the max-only rows, the rows of a day and the whole
+    table are all contiguous slices of the same arrays.
+
+    Properties
+    ----------
+    network, station, channel: pandas Categorical
+        The network, station and channel codes of each row
+    startTime: numpy array of datetime64[ns]
+        The start time of the interval each latency belongs to
+    data_latency: numpy array of float32
+        The latency values, in seconds
+    weight: numpy array of int32
+        The number of packets each latency value stands for. The average
+        latency of an interval stands for all of its packets but the minimum
+        and the maximum, and is stored once rather than once per packet
+    day_boundaries: numpy array of int64
+        Row offsets at which each day starts, followed by the total number of
+        rows. Day i spans rows day_boundaries[i]:day_boundaries[i + 1]
+    max_latency_counts: numpy array of int64
+        The number of max latency rows at the beginning of each day
+
+    Functions
+    ---------
+    number_of_days:
+        Returns the number of days stored in the table
+    day:
+        Returns a view of the table restricted to a single day
+    daily_tables:
+        Returns a view of the table for each day
+    to_dataframe:
+        Returns the table as a pandas DataFrame
+    daily_dataframes:
+        Returns a pandas DataFrame for each day
+    '''
+
+    def __init__(
+        self,
+        network: pd.Categorical,
+        station: pd.Categorical,
+        channel: pd.Categorical,
+        startTime: np.ndarray,
+        data_latency: np.ndarray,
+        day_boundaries: Optional[np.ndarray] = None,
+        max_latency_counts: Optional[np.ndarray] = None,
+        weight: Optional[np.ndarray] = None
+    ):
+        '''
+        Initialize the LatencyTable object. If no day boundaries are given,
+        the whole table is treated as a single day of max latencies. If no
+        weights are given, each latency value stands for a single packet.
+        '''
+        self.network = network
+        self.station = station
+        self.channel = channel
+        self.startTime = startTime
+        self.data_latency = data_latency
+        if weight is None:
+            weight = np.ones(len(data_latency), dtype=np.int32)
+        self.weight = weight
+        if day_boundaries is None:
+            day_boundaries = np.array([0, len(data_latency)], dtype=np.int64)
+        if max_latency_counts is None:
+            max_latency_counts = np.diff(day_boundaries)
+        self.day_boundaries = day_boundaries
+        self.max_latency_counts = max_latency_counts
+
+    def __len__(self) -> int:
+        return len(self.data_latency)
+
+    def number_of_days(self) -> int:
+        '''
+        Get the number of days stored in the table
+
+        Returns
+        -------
+        int:
+            The number of days in the table
+        '''
+        return len(self.day_boundaries) - 1
+
+    def _slice(self, start: int, stop: int, max_latency_count: int) \
+            -> 'LatencyTable':
+        # Basic slicing of numpy arrays and categoricals returns views, so no
+        # latency data is copied here
+        return LatencyTable(
+            network=self.network[start:stop],
+            station=self.station[start:stop],
+            channel=self.channel[start:stop],
+            startTime=self.startTime[start:stop],
+            data_latency=self.data_latency[start:stop],
+            weight=self.weight[start:stop],
+            day_boundaries=np.array([0, stop - start], dtype=np.int64),
+            max_latency_counts=np.array([max_latency_count], dtype=np.int64))
+
+    def day(self, index: int, max_latency_only: bool = False) \
+            -> 'LatencyTable':
+        '''
+        Get a view of the table for a single day
+
+        Parameters
+        ----------
+        index: int
+            The index of the day, starting at 0 for the first day
+        max_latency_only: bool
+            If True, only the max latency rows of the day are returned
+
+        Returns
+        -------
+        LatencyTable:
+            A view of the rows of the requested day
+        '''
+        start = int(self.day_boundaries[index])
+        max_latency_count = int(self.max_latency_counts[index])
+        if max_latency_only:
+            stop = start + max_latency_count
+        else:
+            stop = int(self.day_boundaries[index + 1])
+        return self._slice(start, stop, max_latency_count)
+
+    def daily_tables(self, max_latency_only: bool = False) \
+            -> List['LatencyTable']:
+        '''
+        Get a view of the table for each day
+
+        Parameters
+        ----------
+        max_latency_only: bool
+            If True, only the max latency rows of each day are returned
+
+        Returns
+        -------
+        list:
+            A list of LatencyTable views, one for each day
+        '''
+        return [self.day(index, max_latency_only)
+                for index in range(self.number_of_days())]
+
+    def to_dataframe(self) -> DataFrame:
+        '''
+        Get the table as a pandas DataFrame with the 'network', 'station',
+        'channel', 'startTime', 'data_latency' and 'weight' columns
+
+        Returns
+        -------
+        DataFrame:
+            The latency values of the table
+        '''
+        return pd.DataFrame(
+            {'network': self.network,
+             'station': self.station,
+             'channel': self.channel,
+             'startTime': self.startTime,
+             'data_latency': self.data_latency,
+             LATENCY_WEIGHT_COLUMN: self.weight},
+            columns=LATENCY_COLUMNS + (LATENCY_WEIGHT_COLUMN,))
+
+    def daily_dataframes(self, max_latency_only: bool = False) \
+            -> List[DataFrame]:
+        '''
+        Get a pandas DataFrame for each day
+
+        Parameters
+        ----------
+        max_latency_only: bool
+            If True, only the max latency rows of each day are included
+
+        Returns
+        -------
+        list:
+            A list of pandas DataFrames, one for each day
+        '''
+        return [table.to_dataframe()
+                for table in self.daily_tables(max_latency_only)]
+
+
+def latency_weights(latency_dataframe: DataFrame) -> np.ndarray:
+    '''
+    Get the number of packets each latency value of a latency DataFrame
+    stands for, to compute statistics and histograms over all the packets
+
+    Parameters
+    ----------
+    latency_dataframe: DataFrame
+        A DataFrame with a 'data_latency' column, and optionally a 'weight'
+        column
+
+    Returns
+    -------
+    numpy array:
+        The weight of each latency value, 1 if the DataFrame has no weights
+    '''
+    if LATENCY_WEIGHT_COLUMN in latency_dataframe:
+        return latency_dataframe[LATENCY_WEIGHT_COLUMN].values
+    return np.ones(len(latency_dataframe), dtype=np.int32)
+
+
+def weighted_latency_mean(latencies: np.ndarray,
+                          weights: np.ndarray) -> float:
+    '''
+    Get the mean of latency values, each counted as many times as its
+    weight. NaN if there are no latency values.
+    '''
+    total_weight = np.sum(weights)
+    if total_weight == 0:
+        return float('nan')
+    return float(np.dot(np.asarray(latencies, dtype=np.float64),
+                        weights) / total_weight)
+
+
+def weighted_latency_std(latencies: np.ndarray,
+                         weights: np.ndarray) -> float:
+    '''
+    Get the population standard deviation of latency values, each counted
+    as many times as its weight. NaN if there are no latency values.
+    '''
+    latencies = np.asarray(latencies, dtype=np.float64)
+    mean = weighted_latency_mean(latencies, weights)
+    return float(np.sqrt(weighted_latency_mean((latencies - mean) ** 2,
+                                               weights)))
@@ -0,0 +1,247 @@
+'''
+This module runs the stages of a validation as a graph. Each stage declares
+the results it takes as inputs and the results it outputs, and a stage is
+started as soon as the stages outputting its inputs have finished, so that
+the stages which do not depend on each other run at the same time, e.g. the
+latency results, ISPAQ and the SOH results, then the metric plots and the
+report.
+
+The stages run in a pool of processes by default, or of threads, and their
+results are passed between them by name:
+
+    Stage(name='metrics', function=gather_stats,
+          inputs={'start': 'metric_start', 'stop': 'metric_stop'},
+          outputs=['station_metric_data'],
+          arguments={'snlc': 'QW.QCC02.x.Hxx'})
+
+Classes
+-------
+Stage:
+    A function of a validation, the results it takes and the results it
+    outputs
+
+Functions
+---------
+run_pipeline:
+    Runs the stages of a graph, each as soon as its inputs are available
+pipeline_order:
+    Checks a graph and returns its stages in an order they can be run in
+'''
+import logging
+import os
+
+from concurrent.futures import (FIRST_COMPLETED, Executor, Future,
+                                ProcessPoolExecutor, ThreadPoolExecutor, wait)
+from multiprocessing import current_process
+from typing import Any, Callable, Dict, List, Optional
+
+from stationverification.config import get_default_parameters
+from stationverification.utilities.exceptions import PipelineError
+
+# The pools the stages can be run in
+EXECUTORS = {'process': ProcessPoolExecutor, 'thread': ThreadPoolExecutor}
+
+
+class Stage(dict):
+    '''
+    A stage of a validation. The function is called with the static
+    arguments and with its inputs, a mapping of keyword arguments to the
+    names of the results of other stages. It returns a single value for a
+    single output, a sequence of values for several outputs, and its return
+    value is ignored when it has no output. The stage also waits for the
+    stages named in after, without taking their results.
+
+    With the process pool, the function must be defined at the top level of
+    a module, and its arguments and results must be picklable.
+    '''
+    @property
+    def name(self) -> str:
+        return self["name"]
+
+    @property
+    def function(self) -> Callable:
+        return self["function"]
+
+    @property
+    def inputs(self) -> Dict[str, str]:
+        return self.get("inputs", {})
+
+    @property
+    def outputs(self) -> List[str]:
+        return self.get("outputs", [])
+
+    @property
+    def after(self) -> List[str]:
+        return self.get("after", [])
+
+    @property
+    def arguments(self) -> dict:
+        return self.get("arguments", {})
+
+
+def run_pipeline(stages: List[Stage],
+                 executor: Optional[str] = None,
+                 workers: Optional[int] = None) -> Dict[str, Any]:
+    '''
+    Run the stages of a graph, each as soon as the stages it depends on have
+    finished. The stages are run one after another in the current process
+    when a single worker is used, or when the current process is itself a
+    pool worker, which can not start a pool.
+
+    Parameters
+    ----------
+    stages: list
+        The Stage objects of the graph
+    executor: str, optional
+        The pool the stages run in, "process" or "thread". Defaults to
+        VALIDATION_PIPELINE_EXECUTOR
+    workers: int, optional
+        The number of stages run at once. Defaults to
+        VALIDATION_PIPELINE_WORKERS, or to the number of cores if it is not
+        set
+
+    Returns
+    -------
+    dict:
+        The outputs of the stages, by name
+
+    Raises
+    ------
+    PipelineError:
+        If the graph is not valid, or if a stage failed
+    '''
+    ordered_stages = pipeline_order(stages)
+    if executor is None:
+        executor = get_default_parameters().PIPELINE_EXECUTOR
+    if executor not in EXECUTORS:
+        raise PipelineError(f'Unknown pipeline executor {executor}, expected \
+one of {", ".join(EXECUTORS)}')
+    if workers is None:
+        workers = get_default_parameters().PIPELINE_WORKERS or \
+            os.cpu_count() or 1
+    workers = max(1, min(workers, len(stages)))
+    results: Dict[str, Any] = {}
+    if workers == 1 or current_process().daemon:
+        for stage in ordered_stages:
+            logging.info(f'Running stage {stage.name}..')
+            try:
+                value = stage.function(**_stage_arguments(stage, results))
+            except Exception as error:
+                raise PipelineError(f'Stage {stage.name} failed: {error}') \
+                    from error
+            _store_outputs(stage, value, results)
+        return results
+    logging.info(f'Running {len(stages)} stages with {workers} {executor} \
+workers..')
+    with EXECUTORS[executor](max_workers=workers) as pool:
+        _run_stages(ordered_stages, pool, results)
+    return results
+
+
+def pipeline_order(stages: List[Stage]) -> List[Stage]:
+    '''
+    Check that the stage names and outputs are unique, and that the inputs
+    of each stage are outputs of other stages, without cycles
+
+    Returns
+    -------
+    list:
+        The stages in an order they can be run in, keeping the order they
+        are given in when they do not depend on each other
+
+    Raises
+    ------
+    PipelineError:
+        If the graph is not valid
+    '''
+    dependencies = _stage_dependencies(stages)
+    ordered_stages: List[Stage] = []
+    done: set = set()
+    remaining = list(stages)
+    while remaining:
+        ready = [stage for stage in remaining
+                 if dependencies[stage.name] <= done]
+        if not ready:
+            raise PipelineError(f'The stages \
+{", ".join(stage.name for stage in remaining)} depend on each other')
+        for stage in ready:
+            ordered_stages.append(stage)
+            done.add(stage.name)
+            remaining.remove(stage)
+    return ordered_stages
+
+
+def _stage_dependencies(stages: List[Stage]) -> Dict[str, set]:
+    # The names of the stages each stage waits for
+    stage_names = set()
+    producers: Dict[str, str] = {}
+    for stage in stages:
+        if stage.name in stage_names:
+            raise PipelineError(f'Duplicate stage {stage.name}')
+        stage_names.add(stage.name)
+        for output in stage.outputs:
+            if output in producers:
+                raise PipelineError(f'{output} is output by both stages \
+{producers[output]} and {stage.name}')
+            producers[output] = stage.name
+    dependencies = {}
+    for stage in stages:
+        for result in stage.inputs.values():
+            if result not in producers:
+                raise PipelineError(f'No stage outputs {result}, an input \
+of stage {stage.name}')
+        for name in stage.after:
+            if name not in stage_names:
+                raise PipelineError(f'Stage {stage.name} runs after unknown \
+stage {name}')
+        dependencies[stage.name] = \
+            {producers[result] for result in stage.inputs.values()} | \
+            set(stage.after)
+    return dependencies
+
+
+def _run_stages(stages: List[Stage], pool: Executor, results: dict):
+    # Submit the stages whose inputs are available, and wait for any running
+    # stage to finish before submitting the stages it unblocks
+    dependencies = _stage_dependencies(stages)
+    waiting = list(stages)
+    running: Dict[Future, Stage] = {}
+    done: set = set()
+    while waiting or running:
+        for stage in list(waiting):
+            if dependencies[stage.name] <= done:
+                logging.info(f'Running stage {stage.name}..')
+                running[pool.submit(
+                    stage.function,
+                    **_stage_arguments(stage, results))] = stage
+                waiting.remove(stage)
+        finished, _ = wait(running, return_when=FIRST_COMPLETED)
+        for future in finished:
+            stage = running.pop(future)
+            try:
+                value = future.result()
+            except Exception as error:
+                # The stages already running are left to finish by the pool
+                raise PipelineError(f'Stage {stage.name} failed: {error}') \
+                    from error
+            _store_outputs(stage, value, results)
+            done.add(stage.name)
+            logging.info(f'Finished stage {stage.name}')
+
+
+def _stage_arguments(stage: Stage, results: dict) -> dict:
+    arguments = dict(stage.arguments)
+    arguments.update({argument: results[result]
+                      for argument, result in stage.inputs.items()})
+    return arguments
+
+
+def _store_outputs(stage: Stage, value: Any, results: dict):
+    if len(stage.outputs) == 1:
+        results[stage.outputs[0]] = value
+    elif stage.outputs:
+        values = list(value)
+        if len(values) != len(stage.outputs):
+            raise PipelineError(f'Stage {stage.name} returned {len(values)} \
+values for the outputs {", ".join(stage.outputs)}')
+        results.update(zip(stage.outputs, values))
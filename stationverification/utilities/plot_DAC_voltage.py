@@ -1,16 +1,21 @@
 import os
 import re
-from typing import List
+from typing import List, Optional
 
 import matplotlib.dates as mdates
-import matplotlib.pyplot as plt
+from matplotlib.figure import Figure
 import obspy
 
+from stationverification.utilities.render_plots import PlotJob, render_plots
 
-def plot_DAC_voltage(list_of_streams: List):
 
-    for stream in list_of_streams:
-        create_line_plot(stream=stream)
+def plot_DAC_voltage(list_of_streams: List, workers: Optional[int] = None):
+    '''
+    Plots the DAC voltage of each day. The plots are rendered in a pool of
+    processes.
+    '''
+    render_plots([PlotJob(render=create_line_plot, arguments=dict(
+        stream=stream)) for stream in list_of_streams], workers=workers)
 
 
 def create_line_plot(stream: obspy.Stream):
@@ -27,10 +32,10 @@ def create_line_plot(stream: obspy.Stream):
     filename = f'{snlc}.{startingdate}'
 
     # Setting up the figure
-    fig = plt.figure(figsize=(18.5, 10.5))
+    fig = Figure(figsize=(18.5, 10.5))
     axes = fig.add_subplot(1, 1, 1)
     axes.plot(trace.times("matplotlib"), trace, "b-")
-    plt.title(
+    axes.set_title(
         f'DAC Voltage\n\
     {filename}')
     # Formatting the X axis
@@ -47,9 +52,7 @@ def create_line_plot(stream: obspy.Stream):
     axes.grid(visible=True, which='both',
               axis='both', linewidth=0.5)
 
-    if not os.path.isdir("./stationvalidation_output"):
-        os.mkdir('./stationvalidation_output')
-    plt.savefig(
+    os.makedirs('./stationvalidation_output', exist_ok=True)
+    fig.savefig(
         f'stationvalidation_output/{filename}.dac_voltage_plot.png',
         dpi=300, bbox_inches='tight')
-    plt.close()
@@ -5,9 +5,11 @@ import obspy
 import numpy as np
 
 from datetime import date, timedelta
-from typing import Any, List
-import matplotlib.pyplot as plt
+from typing import Any, List, Optional
 import matplotlib.dates as mdates
+from matplotlib.figure import Figure
+
+from stationverification.utilities.render_plots import PlotJob, render_plots
 
 
 def plot_clock_offset(
@@ -17,14 +19,18 @@ def plot_clock_offset(
         station: str,
         startdate: date,
         enddate: date,
-        location: Any = None):
-
-    for stream in list_of_streams:
-        create_line_plot(
-            stream=stream,
-            clock_offset_threshold_in_microseconds=clock_offset_threshold_in_microseconds  # noqa
-        )
-    create_bar_graph(
+        location: Any = None,
+        workers: Optional[int] = None):
+    '''
+    Plots the clock offset of each day, and the histogram of the clock
+    offsets of the validation period. The plots are rendered in a pool of
+    processes.
+    '''
+    jobs = [PlotJob(render=create_line_plot, arguments=dict(
+        stream=stream,
+        clock_offset_threshold_in_microseconds=clock_offset_threshold_in_microseconds))  # noqa
+        for stream in list_of_streams]
+    jobs.append(PlotJob(render=create_bar_graph, arguments=dict(
         list_of_streams=list_of_streams,
         clock_offset_threshold_in_microseconds=clock_offset_threshold_in_microseconds,  # noqa
         network=network,
@@ -32,7 +38,8 @@ def plot_clock_offset(
         startdate=startdate,
         enddate=enddate,
         location=location
-    )
+    )))
+    render_plots(jobs, workers=workers)
 
 
 def create_line_plot(stream: obspy.Stream,
@@ -63,10 +70,10 @@ def create_line_plot(stream: obspy.Stream,
     offsets = (abs((trace.data * 24.112654) / 1000))
 
     # Setting up the figure
-    fig = plt.figure(figsize=(18.5, 10.5))
+    fig = Figure(figsize=(18.5, 10.5))
     axes = fig.add_subplot(1, 1, 1)
     axes.plot(trace.times("matplotlib"), offsets, "b-")
-    plt.title(
+    axes.set_title(
         f'Clock Offset\n\
     {filename}')
     # Formatting the X axis
@@ -93,12 +100,10 @@ def create_line_plot(stream: obspy.Stream,
     # Adding a legend
     legend = axes.legend(bbox_to_anchor=(1, 1),
                          loc='upper right', fontsize="18")
-    if not os.path.isdir("./stationvalidation_output"):
-        os.mkdir('./stationvalidation_output')
-    plt.savefig(
+    os.makedirs('./stationvalidation_output', exist_ok=True)
+    fig.savefig(
         f'stationvalidation_output/{filename}.clock_offset_line_plot.png',
         dpi=300, bbox_extra_artists=(legend,), bbox_inches='tight')
-    plt.close()
 
 
 def create_bar_graph(list_of_streams: np.ndarray,
@@ -133,7 +138,7 @@ def create_bar_graph(list_of_streams: np.ndarray,
  {enddate - timedelta(days=1)}'
 
     # Setting up the figure
-    fig = plt.figure()
+    fig = Figure()
     fig.set_size_inches(18.5, 10.5)
 
     ax1 = fig.add_subplot(111)
@@ -141,12 +146,12 @@ def create_bar_graph(list_of_streams: np.ndarray,
     ax1.set_xlabel('Clock Offset (microseconds)', fontsize=13)
     ax1.set_ylabel('Occurrences', fontsize=13)  # Add a y-label to the axes.
     ax1.set_axisbelow(True)
-    plt.grid(visible=True, which='both', axis='both', linewidth=0.5)
+    ax1.grid(visible=True, which='both', axis='both', linewidth=0.5)
     ax1.set_yscale('log')
 
     # Adding the threshold line
     threshold = clock_offset_threshold_in_microseconds
-    plt.axvline(threshold, color='r', linestyle='--', linewidth=1,
+    ax1.axvline(threshold, color='r', linestyle='--', linewidth=1,
                 label=f"Data Timeliness threshold: \
 {clock_offset_threshold_in_microseconds} seconds")
     legend = ax1.legend(bbox_to_anchor=(1.1, 1),
@@ -157,10 +162,8 @@ def create_bar_graph(list_of_streams: np.ndarray,
     # Adding the data
     ax1.hist(flat_list_of_clock_offsets, ec='black')
 
-    if not os.path.isdir('./stationvalidation_output/'):
-        os.mkdir('./stationvalidation_output/')
-    plt.savefig(
+    os.makedirs('./stationvalidation_output/', exist_ok=True)
+    fig.savefig(
         f'./stationvalidation_output/{filename}',
         bbox_extra_artists=(legend,),
         bbox_inches='tight')
-    plt.close()
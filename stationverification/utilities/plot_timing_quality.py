@@ -4,10 +4,10 @@ from datetime import date, timedelta
 from typing import Any, Optional
 
 import matplotlib
-import matplotlib.pyplot as plt
 import matplotlib.ticker as ticker
 import matplotlib.ticker as plticker
 import matplotlib.dates as mdates
+from matplotlib.figure import Figure
 
 
 def plot_timing_quality(network: str,
@@ -23,8 +23,7 @@ def plot_timing_quality(network: str,
     x_axis = np.arange(0, difference.days, 1)
 
     # Create plot
-    fig = plt.figure()
-    fig.set_size_inches(18.5, 10.5)
+    fig = Figure(figsize=(18.5, 10.5))
     ax = fig.add_subplot(111)
     # this locator puts ticks at regular intervals in setps of "base"
     loc = plticker.MultipleLocator(base=10.0)
@@ -48,7 +47,7 @@ def plot_timing_quality(network: str,
         ax.xaxis.set_major_formatter(formatter)
         locator = mdates.DayLocator()
         ax.xaxis.set_major_locator(locator)
-        plt.xticks(rotation=90)
+        ax.tick_params(axis='x', labelrotation=90)
         filename = ""
         if location is None:
             snlc = f'{network}.{station}..'
@@ -61,11 +60,11 @@ def plot_timing_quality(network: str,
 {enddate - timedelta(days=1)}'
         ax.set_title(
             f'Timing Quality [%]\n{filename}', pad=20)
-        plt.ylabel('Timing Quality')
+        ax.set_ylabel('Timing Quality')
         ax.yaxis.set_major_formatter(ticker.PercentFormatter(xmax=100))
         # Add a grid to the plot to make the symmetry more obvious
         ax.set_axisbelow(True)
-        plt.grid(visible=True, which='both', axis='both', linewidth=0.5)
+        ax.grid(visible=True, which='both', axis='both', linewidth=0.5)
 
         # Adding the threshold line
         ax.axhline(threshold, color='r', linewidth="1", linestyle='--',
@@ -76,9 +75,6 @@ def plot_timing_quality(network: str,
         # Save the plot to file and then close it so the next channel's metrics
         # aren't plotted on the same plot
         # Write the plot to the output directory
-        if not os.path.isdir("./stationvalidation_output"):
-            os.mkdir('./stationvalidation_output')
-        # plt.savefig(f'stationvalidation_output/{plot_filename}')
-        plt.savefig(f'stationvalidation_output/{filename}.timing_quality.png',
+        os.makedirs('./stationvalidation_output', exist_ok=True)
+        fig.savefig(f'stationvalidation_output/{filename}.timing_quality.png',
                     dpi=300, bbox_extra_artists=(legend,), bbox_inches='tight')
-        plt.close()
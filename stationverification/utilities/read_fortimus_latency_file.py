@@ -0,0 +1,123 @@
+import logging
+
+import numpy as np
+import pandas as pd
+from pandas.core.frame import DataFrame
+
+from stationverification.utilities.assemble_latency_dataframes import \
+    empty_latency_dataframe
+from stationverification.utilities.latency_table import LATENCY_COLUMNS
+
+FORTIMUS_LATENCY_COLUMNS = ['timestamp', 'channel', 'network latency',
+                            'data latency']
+
+FORTIMUS_LATENCY_DTYPES = {'timestamp': str,
+                           'channel': 'category',
+                           'network latency': np.float64,
+                           'data latency': str}
+
+FORTIMUS_TIMESTAMP_FORMAT = '%Y/%m/%d %H:%M:%S.%f'
+
+# The numerator and denominator of a data latency expression, "=269/100+6.6"
+FORTIMUS_DATA_LATENCY_PATTERN = r'^=([-\d.]+)/([-\d.]+)'
+
+
+def read_fortimus_latency_file(file: str) -> DataFrame:
+    '''
+    Reads a Guralp Fortimus latency CSV file. Only the needed columns are
+    read, and each column is decoded in bulk:
+
+        timestamp: parsed with the fixed format of the Fortimus files,
+            "2022/03/01 00:00:04.350000"
+        channel: the "NET.STA.LOC.CHA" id, split once per unique id into the
+            network, station and channel codes
+        data latency: an expression such as "=269/100+6.6", where the
+            numerator over the denominator is the data latency, added to the
+            network latency
+
+    Parameters
+    ----------
+    file: str
+        The path to the Fortimus latency CSV file
+
+    Returns
+    -------
+    DataFrame:
+        The latencies of the file, with the latency dtypes
+    '''
+    try:
+        fortimus_latency_dataframe = pd.read_csv(
+            file,
+            usecols=FORTIMUS_LATENCY_COLUMNS,
+            dtype=FORTIMUS_LATENCY_DTYPES)
+    except pd.errors.EmptyDataError:
+        logging.warning(f'Latency file is empty: {file}')
+        return empty_latency_dataframe()
+
+    columns = split_fortimus_channel_ids(
+        fortimus_latency_dataframe['channel'].values)
+    columns['startTime'] = pd.to_datetime(
+        fortimus_latency_dataframe['timestamp'],
+        format=FORTIMUS_TIMESTAMP_FORMAT).values
+    columns['data_latency'] = (
+        decode_fortimus_data_latency(
+            fortimus_latency_dataframe['data latency'].values)
+        + fortimus_latency_dataframe['network latency'].values).astype(
+            np.float32)
+    return pd.DataFrame(columns, columns=LATENCY_COLUMNS)
+
+
+def split_fortimus_channel_ids(channel_ids: pd.Categorical) -> dict:
+    '''
+    Splits categorical "NET.STA.LOC.CHA" ids into categorical network, station
+    and channel codes. Only the unique ids are split, and the codes of each
+    row are then remapped, so no string is created per row.
+
+    Parameters
+    ----------
+    channel_ids: Categorical
+        The channel ids of each row
+
+    Returns
+    -------
+    dict:
+        The 'network', 'station' and 'channel' Categoricals
+    '''
+    split_ids = [channel_id.split('.') for channel_id in
+                 channel_ids.categories]
+    columns = {}
+    for column, index in (('network', 0), ('station', 1), ('channel', -1)):
+        values = [split_id[index] for split_id in split_ids]
+        categories = sorted(set(values))
+        codes = np.array([categories.index(value) for value in values],
+                         dtype=np.int16)
+        # Rows without a channel id keep the code -1 of a missing value
+        row_codes = np.full(len(channel_ids.codes), -1, dtype=np.int16)
+        has_id = channel_ids.codes >= 0
+        row_codes[has_id] = codes[channel_ids.codes[has_id]]
+        columns[column] = pd.Categorical.from_codes(
+            row_codes, categories=categories)
+    return columns
+
+
+def decode_fortimus_data_latency(expressions: np.ndarray) -> np.ndarray:
+    '''
+    Decodes the data latency expressions of a Fortimus latency file, such as
+    "=269/100+6.6", into the value of their numerator over their denominator,
+    2.69 here. The trailing network latency is not part of the result.
+
+    Parameters
+    ----------
+    expressions: numpy array
+        The data latency expressions
+
+    Returns
+    -------
+    numpy array:
+        The data latencies, in seconds, NaN for the blank or malformed
+        expressions
+    '''
+    fraction = pd.Series(expressions, dtype=object).str.extract(
+        FORTIMUS_DATA_LATENCY_PATTERN).apply(
+            pd.to_numeric, errors='coerce').values.astype(np.float64)
+    return fraction[:, 0] / fraction[:, 1]
@@ -0,0 +1,231 @@
+'''
+This module reads the metric CSV files written by ISPAQ (simpleMetrics,
+PSDMetrics and sampleRateMetrics) into the results of a StationMetricData
+object. All of them share the same columns:
+
+    target,start,end,metricName,value
+    QW.QCC02..HNZ.D,2022-04-01T00:00:00,2022-04-02T00:00:00,num_gaps,0
+
+The target, start and metricName columns only hold a handful of distinct
+values, so they are read as categories and decoded once per distinct value
+rather than once per row. The parsed columns of a file can be cached next to
+it in a numpy archive, reused as long as the CSV file is unchanged.
+
+Functions
+---------
+read_ispaq_metric_files:
+    Reads several ISPAQ metric CSV files into a single DataFrame
+read_ispaq_metric_file:
+    Reads the columns of one ISPAQ metric CSV file, or of its cache
+metric_columns:
+    Splits the columns of ISPAQ metrics into arrays of codes and values
+metric_dataframe:
+    Builds the metric DataFrame of the columns of one file
+assemble_metric_dataframe:
+    Concatenates metric DataFrames in a single step
+'''
+import logging
+import os
+
+from typing import Dict, Iterable, Optional
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import is_categorical_dtype, union_categoricals
+from pandas.core.frame import DataFrame
+
+from stationverification.config import get_default_parameters
+from stationverification.utilities.file_fingerprint import \
+    file_fingerprint, write_file_atomically
+
+ISPAQ_METRIC_DTYPES = {'target': 'category',
+                       'start': 'category',
+                       'metricName': 'category',
+                       'value': np.float64}
+
+# The fields of the target of a metric, NET.STA.LOC.CHA.Q
+TARGET_FIELDS = ('network', 'station', 'location', 'channel', 'quality')
+
+METRIC_COLUMNS = ['metricName', 'value', 'network', 'station', 'channel']
+
+CATEGORICAL_METRIC_COLUMNS = ('metricName', 'network', 'station', 'channel')
+
+CACHE_SUFFIX = '.npz'
+
+CACHE_VERSION = 1
+
+
+def read_ispaq_metric_files(filenames: Iterable[str],
+                            cache: Optional[bool] = None) -> DataFrame:
+    '''
+    Read ISPAQ metric CSV files into one DataFrame indexed by the start time
+    of each value, with the metricName, value, network, station and channel
+    columns. Rows without a value are dropped.
+
+    Parameters
+    ----------
+    filenames: iterable
+        The paths to the ISPAQ metric CSV files
+    cache: bool, optional
+        Whether to cache the parsed files next to them. Defaults to
+        VALIDATION_ISPAQ_CSV_CACHE
+
+    Returns
+    -------
+    DataFrame:
+        The metric values of all the files, in the order of the files
+    '''
+    if cache is None:
+        cache = get_default_parameters().ISPAQ_CSV_CACHE
+    return assemble_metric_dataframe(
+        metric_dataframe(read_ispaq_metric_file(filename, cache=cache))
+        for filename in filenames)
+
+
+def read_ispaq_metric_file(filename: str,
+                           cache: bool = False) -> Dict[str, np.ndarray]:
+    '''
+    Read the columns of an ISPAQ metric CSV file, each categorical column as
+    an array of codes and an array of its distinct values
+
+    Parameters
+    ----------
+    filename: str
+        The path to the ISPAQ metric CSV file
+    cache: bool
+        Whether to read the columns from, and save them to, the cache file
+        next to the CSV file
+
+    Returns
+    -------
+    dict:
+        The arrays of the columns of the file
+    '''
+    fingerprint = np.array([CACHE_VERSION, *file_fingerprint(filename)],
+                           dtype=np.int64)
+    if cache:
+        columns = _read_cache(filename, fingerprint)
+        if columns is not None:
+            return columns
+    columns = metric_columns(pd.read_csv(filename,
+                                         usecols=list(ISPAQ_METRIC_DTYPES),
+                                         dtype=ISPAQ_METRIC_DTYPES))
+    if cache:
+        _write_cache(filename, fingerprint, columns)
+    return columns
+
+
+def metric_columns(metrics: DataFrame) -> Dict[str, np.ndarray]:
+    '''
+    Split the target, start, metricName and value columns of ISPAQ metrics
+    into arrays, each categorical column as an array of codes and an array
+    of its distinct values
+    '''
+    metrics = metrics.astype(ISPAQ_METRIC_DTYPES, copy=False)
+    columns = {'value': metrics['value'].values.astype(np.float64,
+                                                       copy=False)}
+    for column in ('target', 'start', 'metricName'):
+        categorical = metrics[column].values
+        columns[f'{column}_codes'] = np.asarray(categorical.codes,
+                                                dtype=np.int32)
+        columns[f'{column}_categories'] = np.asarray(
+            categorical.categories, dtype=str)
+    return columns
+
+
+def metric_dataframe(columns: Dict[str, np.ndarray]) -> DataFrame:
+    '''
+    Build the metric DataFrame of the columns of an ISPAQ metric CSV file,
+    splitting each distinct target into its fields only once
+    '''
+    keep = ~np.isnan(columns['value'])
+    for column in ('target', 'start', 'metricName'):
+        keep &= columns[f'{column}_codes'] >= 0
+    target_codes = columns['target_codes'][keep]
+
+    dataframe_columns = {
+        'metricName': pd.Categorical.from_codes(
+            columns['metricName_codes'][keep],
+            categories=columns['metricName_categories']),
+        'value': columns['value'][keep]}
+    target_fields = pd.Series(columns['target_categories'], dtype=object) \
+        .str.split('.', expand=True) \
+        .reindex(columns=range(len(TARGET_FIELDS))).fillna('')
+    for position, field in enumerate(TARGET_FIELDS):
+        if field not in METRIC_COLUMNS:
+            continue
+        categories, target_field_codes = np.unique(
+            target_fields[position].values.astype(str), return_inverse=True)
+        dataframe_columns[field] = pd.Categorical.from_codes(
+            target_field_codes[target_codes], categories=categories)
+    start = pd.DatetimeIndex(
+        pd.to_datetime(columns['start_categories']).values[
+            columns['start_codes'][keep]],
+        name='start')
+    return pd.DataFrame(dataframe_columns, columns=METRIC_COLUMNS,
+                        index=start)
+
+
+def assemble_metric_dataframe(
+        metric_dataframes: Iterable[DataFrame]) -> DataFrame:
+    '''
+    Concatenate metric DataFrames into one DataFrame. The columns are
+    gathered as arrays and concatenated once, merging the categories of the
+    categorical columns.
+
+    Parameters
+    ----------
+    metric_dataframes: iterable of DataFrames
+        DataFrames with the metric columns, indexed by start time
+
+    Returns
+    -------
+    DataFrame:
+        All the metric values, in the order of the DataFrames given
+    '''
+    metric_dataframes = [metric_dataframe for metric_dataframe
+                         in metric_dataframes if not metric_dataframe.empty]
+    if not metric_dataframes:
+        return pd.DataFrame()
+    columns = {}
+    for column in CATEGORICAL_METRIC_COLUMNS:
+        columns[column] = union_categoricals(
+            [metric_dataframe[column]
+             if is_categorical_dtype(metric_dataframe[column])
+             else pd.Categorical(metric_dataframe[column])
+             for metric_dataframe in metric_dataframes])
+    columns['value'] = np.concatenate(
+        [metric_dataframe['value'].values
+         for metric_dataframe in metric_dataframes])
+    start = pd.DatetimeIndex(
+        np.concatenate([metric_dataframe.index.values
+                        for metric_dataframe in metric_dataframes]),
+        name='start')
+    return pd.DataFrame(columns, columns=METRIC_COLUMNS, index=start)
+
+
+def _read_cache(filename: str,
+                fingerprint: np.ndarray) -> Optional[Dict[str, np.ndarray]]:
+    cache_file = f'{filename}{CACHE_SUFFIX}'
+    if not os.path.exists(cache_file):
+        return None
+    try:
+        with np.load(cache_file, allow_pickle=False) as archive:
+            if not np.array_equal(archive['fingerprint'], fingerprint):
+                return None
+            return {name: archive[name] for name in archive.files
+                    if name != 'fingerprint'}
+    except (OSError, ValueError, KeyError):
+        logging.warning(f'Ignoring unreadable cache file {cache_file}')
+        return None
+
+
+def _write_cache(filename: str,
+                 fingerprint: np.ndarray,
+                 columns: Dict[str, np.ndarray]):
+    try:
+        with write_file_atomically(f'{filename}{CACHE_SUFFIX}') as cache_file:
+            np.savez(cache_file, fingerprint=fingerprint, **columns)
+    except OSError:
+        logging.warning(f'Unable to cache {filename} in \
+{os.path.dirname(os.path.abspath(filename))}')
@@ -0,0 +1,86 @@
+'''
+This module renders plots in a pool of processes. The plotting functions
+collect plot jobs, a rendering function with the data it plots, instead of
+drawing each figure one after another, and the jobs are then rendered at
+once.
+
+Rendering functions draw on their own matplotlib Figure instances rather than
+through the global pyplot state, so that any number of them can run in the
+same process, and the workers use the non-interactive Agg backend.
+
+Classes
+-------
+PlotJob:
+    A rendering function and the keyword arguments it is called with
+
+Functions
+---------
+render_plots:
+    Renders plot jobs in a pool of processes
+render_plot:
+    Renders a single plot job
+'''
+import logging
+import os
+
+from multiprocessing import Pool, current_process
+from typing import Callable, List, Optional
+
+import matplotlib
+
+from stationverification.config import get_default_parameters
+
+
+class PlotJob(dict):
+    '''
+    A plot to render. The rendering function must be defined at the top
+    level of a module, and its arguments must be picklable, to be sent to
+    the workers.
+    '''
+    @property
+    def render(self) -> Callable:
+        return self["render"]
+
+    @property
+    def arguments(self) -> dict:
+        return self["arguments"]
+
+
+def render_plots(jobs: List[PlotJob], workers: Optional[int] = None):
+    '''
+    Render plot jobs in a pool of processes. The jobs are rendered in the
+    current process when a single worker is used, or when the current
+    process is itself a pool worker, which can not start a pool.
+
+    Parameters
+    ----------
+    jobs: list
+        The PlotJob objects to render
+    workers: int, optional
+        The number of processes rendering the plots. Defaults to
+        VALIDATION_PLOT_WORKERS, or to the number of cores if it is not set
+    '''
+    if not jobs:
+        return
+    if workers is None:
+        workers = get_default_parameters().PLOT_WORKERS or \
+            os.cpu_count() or 1
+    workers = max(1, min(workers, len(jobs)))
+    if workers == 1 or current_process().daemon:
+        for job in jobs:
+            render_plot(job)
+        return
+    logging.info(f'Rendering {len(jobs)} plots with {workers} workers..')
+    with Pool(processes=workers, initializer=_use_agg_backend) as pool:
+        pool.map(render_plot, jobs, chunksize=1)
+
+
+def render_plot(job: PlotJob):
+    '''
+    Render a single plot job in the current process
+    '''
+    job.render(**job.arguments)
+
+
+def _use_agg_backend():
+    matplotlib.use('Agg')
@@ -0,0 +1,137 @@
+'''
+This module converts StationXML inventories into the RESP files ISPAQ reads,
+and caches the conversion. The RESP files of an inventory are stored in a
+directory named after a hash of the StationXML file, so they are reused for
+as long as the inventory does not change.
+
+Functions
+---------
+get_resp_directory:
+    Returns the directory holding the RESP files of a StationXML file,
+    converting it only if it is not cached yet
+convert_station_xml_to_resp:
+    Converts a StationXML file into RESP files
+'''
+import hashlib
+import logging
+import os
+import shutil
+import subprocess
+import tempfile
+
+from typing import List, Optional
+
+import obspy
+from obspy.io.xseed import Parser
+
+from stationverification import XML_CONVERTER
+from stationverification.config import get_default_parameters
+
+HASH_BLOCK_SIZE = 1 << 20
+
+
+def get_resp_directory(station_xml: str,
+                       network: Optional[str] = None,
+                       stations: Optional[List[str]] = None,
+                       cache_directory: Optional[str] = None) -> str:
+    '''
+    Get the directory holding the RESP files of a StationXML file. The
+    directory is looked up in the cache by the hash of the StationXML file,
+    and the file is only converted when the inventory has changed.
+
+    The conversion is written to a temporary directory that is renamed into
+    the cache once complete, so runs sharing the cache never read a partial
+    conversion. If two runs convert the same inventory at the same time, the
+    first one to finish is kept.
+
+    Parameters
+    ----------
+    station_xml: str
+        The path to the StationXML file
+    network: str, optional
+        With stations, the network of the stations to convert
+    stations: list, optional
+        Only convert the responses of these stations, instead of the whole
+        inventory. Each subset is cached separately.
+    cache_directory: str, optional
+        The directory of the cache. Defaults to VALIDATION_RESP_CACHE
+
+    Returns
+    -------
+    str:
+        The path to the directory holding the RESP files
+    '''
+    if cache_directory is None:
+        cache_directory = get_default_parameters().RESP_CACHE
+    resp_directory = os.path.join(
+        cache_directory,
+        resp_cache_key(station_xml=station_xml, network=network,
+                       stations=stations))
+    if os.path.isdir(resp_directory):
+        logging.info(f'Using cached RESP files from {resp_directory}')
+        return resp_directory
+
+    logging.info(f'Converting {station_xml} to RESP files..')
+    os.makedirs(cache_directory, exist_ok=True)
+    temporary_directory = tempfile.mkdtemp(dir=cache_directory,
+                                           prefix='.conversion-')
+    try:
+        if stations:
+            # Convert a copy of the inventory restricted to the stations
+            inventory = obspy.read_inventory(station_xml)
+            subset = obspy.Inventory(networks=[], source=inventory.source)
+            for station in stations:
+                subset += inventory.select(network=network, station=station)
+            station_xml = os.path.join(temporary_directory, 'subset.xml')
+            subset.write(station_xml, format='STATIONXML')
+        converted_directory = os.path.join(temporary_directory, 'resp')
+        convert_station_xml_to_resp(station_xml=station_xml,
+                                    folder=converted_directory)
+        try:
+            os.rename(converted_directory, resp_directory)
+        except OSError:
+            # Another run published the same conversion first
+            if not os.path.isdir(resp_directory):
+                raise
+    finally:
+        shutil.rmtree(temporary_directory, ignore_errors=True)
+    return resp_directory
+
+
+def resp_cache_key(station_xml: str,
+                   network: Optional[str] = None,
+                   stations: Optional[List[str]] = None) -> str:
+    '''
+    Returns the name of the cache directory of a StationXML file: a hash of
+    its content, of the converter and of the stations converted
+    '''
+    digest = hashlib.sha256()
+    with open(station_xml, 'rb') as file:
+        for block in iter(lambda: file.read(HASH_BLOCK_SIZE), b''):
+            digest.update(block)
+    digest.update(os.path.basename(XML_CONVERTER).encode())
+    if stations:
+        digest.update(
+            f'{network}:{",".join(sorted(set(stations)))}'.encode())
+    return digest.hexdigest()
+
+
+def convert_station_xml_to_resp(station_xml: str, folder: str):
+    '''
+    Converts a StationXML file into RESP files, going through a dataless
+    SEED volume generated by the stationxml-seed-converter
+
+    Parameters
+    ----------
+    station_xml: str
+        The path to the StationXML file
+    folder: str
+        The directory to write the RESP files to. It is created if needed
+    '''
+    os.makedirs(folder, exist_ok=True)
+    dataless = os.path.join(folder, 'stationXML.dataless')
+    subprocess.getoutput(f'java -jar {XML_CONVERTER} --input \
+    {station_xml} --output {dataless}')
+    pars = Parser(dataless)
+    os.remove(dataless)
+    pars.write_resp(folder=folder, zipped=False)
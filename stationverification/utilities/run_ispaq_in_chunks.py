@@ -0,0 +1,538 @@
+'''
+This module runs ISPAQ over a validation period split into chunks of days.
+Each chunk is a separate ISPAQ run, with output directories of its own, and
+the chunks are run in a pool of processes. Their csv files are then merged
+into the files a single ISPAQ run over the whole period would have written,
+and their PSD files are moved to the PSD directory.
+
+The aggregated PDFs need the PSDs of the whole period, so the pdf metric is
+left out of the chunks and computed last, by a run reading the merged PSDs.
+
+With a cache of the metrics of each SNCL and day, see ispaq_metric_cache,
+the chunks only cover the days missing from the cache. With a metric
+database, see ispaq_metric_database, the chunks write their metrics to
+databases merged into it.
+
+Classes
+-------
+ISPAQChunk:
+    The period and output directories of a chunk of an ISPAQ run
+
+Functions
+---------
+run_ispaq_in_chunks:
+    Runs ISPAQ over a period, in chunks of days run in a pool of processes
+ispaq_chunks:
+    Splits a period into chunks of days
+contiguous_periods:
+    Returns the periods of consecutive days of a list of days
+ispaq_metric_names:
+    Returns the names of the metrics of a metric set of a preference file
+chunk_preferences:
+    Returns the output preferences of a chunk
+write_chunk_preference_file:
+    Writes a copy of a preference file with other metrics and preferences
+merge_ispaq_chunk_outputs:
+    Merges the outputs of the chunks into the ISPAQ output directory
+ispaq_csv_filename:
+    Returns the name of a csv file written by ISPAQ
+'''
+import logging
+import os
+import re
+import shutil
+
+from datetime import date, timedelta
+from multiprocessing import Pool, current_process
+from typing import Callable, List, Optional, Sequence, Tuple
+
+import pandas as pd
+
+from stationverification.config import get_default_parameters
+from stationverification.utilities.handle_running_ispaq_command import \
+    ISPAQ_CSV_SUFFIXES, handle_running_ispaq_command, ispaq_output_snlc, \
+    ispaq_snlc
+from stationverification.utilities.ispaq_metric_cache import \
+    ispaq_cache_fingerprints, restore_ispaq_cache_entries, \
+    stale_ispaq_days, store_ispaq_chunk_outputs
+from stationverification.utilities.ispaq_metric_database import \
+    merge_ispaq_database
+
+# Metric set the chunks are run with, defined in their preference files
+CHUNK_METRIC_SET = 'validation_chunk'
+# Metric computed last, from the PSDs of all the chunks
+PDF_METRIC = 'pdf'
+# Database the metrics of a chunk are written to, with a metric database
+CHUNK_DATABASE = 'ispaq.db'
+
+
+class ISPAQChunk(dict):
+    '''
+    A chunk of an ISPAQ run, with the function running ISPAQ and the
+    arguments it is run with
+    '''
+    @property
+    def startdate(self) -> date:
+        return self["startdate"]
+
+    @property
+    def enddate(self) -> date:
+        return self["enddate"]
+
+    @property
+    def directory(self) -> str:
+        return self["directory"]
+
+    @property
+    def command(self) -> Callable[..., int]:
+        return self["command"]
+
+    @property
+    def arguments(self) -> dict:
+        return self["arguments"]
+
+
+def run_ispaq_in_chunks(
+        ispaqloc: str,
+        metrics: str,
+        startdate: date,
+        enddate: date,
+        pfile: str,
+        pdfinterval: str,
+        miniseedarchive: str,
+        network: str = None,
+        station: str = None,
+        location: str = None,
+        station_url: str = None,
+        stationconf: str = None,
+        snlc: str = None,
+        chunk_days: Optional[int] = None,
+        workers: Optional[int] = None,
+        ispaq_output_directory: str = './ispaq_outputs',
+        cache_directory: Optional[str] = None,
+        database: Optional[str] = None,
+        ispaq_command: Callable[..., int] = handle_running_ispaq_command):
+    '''
+    Run ISPAQ over a period in chunks of days, run in a pool of processes,
+    and merge their outputs into the files a single run would have written.
+    ISPAQ is run once over the whole period if chunking and the cache are
+    disabled and the period fits in a single chunk, or if the metadata comes
+    from a station config file.
+
+    With a cache, ISPAQ only runs over the days missing from the cache or
+    stale, and the outputs of every day are assembled from the cache.
+
+    With a database, each chunk writes its metrics to a SQLite database of
+    its own, merged into the database once the chunk is done, instead of
+    writing csv files. The database keeps the metrics of the previous runs,
+    so the cache is not used.
+
+    Parameters
+    ----------
+    ispaqloc, metrics, startdate, enddate, pfile, pdfinterval,
+    miniseedarchive, network, station, location, station_url, stationconf,
+    snlc:
+        The arguments of handle_running_ispaq_command
+    chunk_days: int, optional
+        The number of days of each chunk, 1 or 7 to run ISPAQ by day or by
+        week. Defaults to VALIDATION_ISPAQ_CHUNK_DAYS. 0 disables chunking.
+    workers: int, optional
+        The number of chunks run at once. Defaults to
+        VALIDATION_ISPAQ_WORKERS, or to the number of cores if it is not set.
+    ispaq_output_directory: str, optional
+        The directory of the outputs, as set in the preference file
+    cache_directory: str, optional
+        The directory of the cache of the metrics of each SNCL and day.
+        Defaults to VALIDATION_ISPAQ_METRIC_CACHE, unset to disable the cache
+    database: str, optional
+        The SQLite database the metrics are stored in. Defaults to
+        VALIDATION_ISPAQ_DATABASE, the metrics are written to csv files if it
+        is not set
+    ispaq_command: function, optional
+        The function running ISPAQ, called with the arguments of
+        handle_running_ispaq_command and returning the exit status of ISPAQ
+    '''
+    if chunk_days is None:
+        chunk_days = get_default_parameters().ISPAQ_CHUNK_DAYS
+    if cache_directory is None:
+        cache_directory = get_default_parameters().ISPAQ_METRIC_CACHE
+    if database is None:
+        database = get_default_parameters().ISPAQ_DATABASE
+    arguments = dict(ispaqloc=ispaqloc,
+                     metrics=metrics,
+                     startdate=startdate,
+                     enddate=enddate,
+                     pfile=pfile,
+                     pdfinterval=pdfinterval,
+                     miniseedarchive=miniseedarchive,
+                     network=network,
+                     station=station,
+                     location=location,
+                     station_url=station_url,
+                     stationconf=stationconf,
+                     snlc=snlc)
+    single_run = len(ispaq_chunks(startdate=startdate,
+                                  enddate=enddate,
+                                  chunk_days=chunk_days)) <= 1
+    if stationconf is not None and database:
+        logging.warning(f'The metrics of ISPAQ runs with a station config \
+file are written to csv files, not to {database}')
+    if stationconf is not None or \
+            (single_run and not cache_directory and not database):
+        ispaq_command(**arguments)
+        return
+    if snlc is None:
+        if network is None or station is None:
+            raise ValueError(
+                'ISPAQ needs either an snlc, or a network and a station')
+        snlc = ispaq_snlc(network=network, station=station, location=location)
+    metric_names = ispaq_metric_names(pfile=pfile, metrics=metrics)
+    chunk_metric_names = [name for name in metric_names
+                          if name != PDF_METRIC]
+    chunks_directory = os.path.join(ispaq_output_directory, 'chunks')
+    shutil.rmtree(chunks_directory, ignore_errors=True)
+
+    periods = [(startdate, enddate)]
+    fingerprints = {}
+    if database and cache_directory:
+        logging.info(f'The ISPAQ metrics are stored in {database}, the \
+metric cache is not used')
+        cache_directory = None
+    if cache_directory:
+        fingerprints = ispaq_cache_fingerprints(
+            snlcs=snlc.split(','),
+            metrics=metrics,
+            pfile=pfile,
+            miniseedarchive=miniseedarchive,
+            startdate=startdate,
+            enddate=enddate)
+        if any(fingerprint is None for fingerprint in fingerprints.values()):
+            logging.warning(f'The ISPAQ metrics of {snlc} can not be cached')
+            cache_directory = None
+        else:
+            periods = contiguous_periods(stale_ispaq_days(
+                cache_directory=cache_directory,
+                metrics=metrics,
+                fingerprints=fingerprints))
+
+    ispaq_chunks_to_run = []
+    for period_startdate, period_enddate in periods:
+        for chunk_startdate, chunk_enddate in ispaq_chunks(
+                startdate=period_startdate,
+                enddate=period_enddate,
+                chunk_days=chunk_days):
+            directory = os.path.join(chunks_directory,
+                                     f'{chunk_startdate}_{chunk_enddate}')
+            chunk_pfile = write_chunk_preference_file(
+                pfile=pfile,
+                path=os.path.join(directory, 'preferences.txt'),
+                metric_names=chunk_metric_names,
+                preferences=chunk_preferences(directory, database))
+            ispaq_chunks_to_run.append(ISPAQChunk(
+                startdate=chunk_startdate,
+                enddate=chunk_enddate,
+                directory=directory,
+                command=ispaq_command,
+                arguments=dict(arguments,
+                               metrics=CHUNK_METRIC_SET,
+                               startdate=chunk_startdate,
+                               enddate=chunk_enddate,
+                               pfile=chunk_pfile,
+                               snlc=snlc)))
+    exit_statuses: Sequence[Optional[int]] = [None] * len(ispaq_chunks_to_run)
+    if chunk_metric_names and ispaq_chunks_to_run:
+        exit_statuses = _run_ispaq_chunks(ispaq_chunks_to_run,
+                                          workers=workers)
+
+    chunk_directories = [chunk.directory for chunk in ispaq_chunks_to_run]
+    if database:
+        for chunk in ispaq_chunks_to_run:
+            _merge_chunk_database(chunk.directory, database)
+    if cache_directory:
+        # Only the days of the chunks ISPAQ completed are cached, and the
+        # outputs of the other chunks are merged as they are
+        chunk_directories = []
+        for chunk, exit_status in zip(ispaq_chunks_to_run, exit_statuses):
+            if exit_status == 0:
+                store_ispaq_chunk_outputs(cache_directory=cache_directory,
+                                          chunk_directory=chunk.directory,
+                                          metrics=metrics,
+                                          fingerprints=fingerprints,
+                                          startdate=chunk.startdate,
+                                          enddate=chunk.enddate)
+            else:
+                logging.warning(f'ISPAQ failed from {chunk.startdate} to \
+{chunk.enddate}, its metrics are not cached')
+                chunk_directories.append(chunk.directory)
+        # The directories of the days and chunks are named after their
+        # first day, and merged in order
+        chunk_directories = sorted(restore_ispaq_cache_entries(
+            cache_directory=cache_directory,
+            metrics=metrics,
+            fingerprints=fingerprints,
+            directory=os.path.join(chunks_directory, 'cache')) +
+            chunk_directories, key=os.path.basename)
+    merge_ispaq_chunk_outputs(
+        chunk_directories=chunk_directories,
+        metrics=metrics,
+        snlc=ispaq_output_snlc(snlc),
+        startdate=startdate,
+        enddate=enddate,
+        ispaq_output_directory=ispaq_output_directory)
+
+    if PDF_METRIC in metric_names:
+        # The PDFs are computed from the merged PSDs, over the whole period
+        logging.info(f'Generating the PDFs of {startdate} to {enddate}..')
+        directory = os.path.join(chunks_directory, PDF_METRIC)
+        preferences = chunk_preferences(directory, database)
+        preferences.update(
+            psd_dir=os.path.join(ispaq_output_directory, 'PSDs'),
+            pdf_dir=os.path.join(ispaq_output_directory, 'PDFs'))
+        ispaq_command(**dict(
+            arguments,
+            metrics=CHUNK_METRIC_SET,
+            pfile=write_chunk_preference_file(
+                pfile=pfile,
+                path=os.path.join(directory, 'preferences.txt'),
+                metric_names=[PDF_METRIC],
+                preferences=preferences),
+            snlc=snlc))
+        if database:
+            _merge_chunk_database(directory, database)
+    shutil.rmtree(chunks_directory, ignore_errors=True)
+
+
+def ispaq_chunks(startdate: date,
+                 enddate: date,
+                 chunk_days: int) -> List[Tuple[date, date]]:
+    '''
+    Split the period from startdate to enddate, excluded, into chunks of
+    chunk_days days. The last chunk ends at enddate. A chunk_days of 0 keeps
+    the period whole.
+    '''
+    if chunk_days <= 0:
+        return [(startdate, enddate)]
+    chunks = []
+    chunk_startdate = startdate
+    while chunk_startdate < enddate:
+        chunk_enddate = min(chunk_startdate + timedelta(days=chunk_days),
+                            enddate)
+        chunks.append((chunk_startdate, chunk_enddate))
+        chunk_startdate = chunk_enddate
+    return chunks
+
+
+def contiguous_periods(days: List[date]) -> List[Tuple[date, date]]:
+    '''
+    Returns the periods of consecutive days of a sorted list of days, each
+    from its first day to the day after its last day
+    '''
+    periods: List[Tuple[date, date]] = []
+    for day in days:
+        if periods and periods[-1][1] == day:
+            periods[-1] = (periods[-1][0], day + timedelta(days=1))
+        else:
+            periods.append((day, day + timedelta(days=1)))
+    return periods
+
+
+def chunk_preferences(directory: str, database: Optional[str] = None) \
+        -> dict:
+    '''
+    Returns the csv, PSD and PDF directories of a chunk, and with a database
+    the output preferences writing its metrics to a database of its own
+    '''
+    preferences = {'csv_dir': os.path.join(directory, 'csv'),
+                   'psd_dir': os.path.join(directory, 'PSDs'),
+                   'pdf_dir': os.path.join(directory, 'PDFs')}
+    if database:
+        preferences.update(output='db',
+                           db_name=os.path.join(directory, CHUNK_DATABASE))
+    return preferences
+
+
+def ispaq_metric_names(pfile: str, metrics: str) -> List[str]:
+    '''
+    Returns the names of the metrics of a metric set of the Metrics section
+    of a preference file. If the preference file has no such set, metrics is
+    taken as comma separated metric names, as ISPAQ does.
+    '''
+    section = None
+    with open(pfile) as file:
+        for line in file:
+            header = re.match(r'^(\w+):\s*(#.*)?$', line)
+            if header:
+                section = header.group(1)
+                continue
+            if section != 'Metrics':
+                continue
+            name, _, value = line.split('#')[0].partition(':')
+            if name.strip() == metrics:
+                return [metric.strip() for metric in value.split(',')
+                        if metric.strip()]
+    return [metric.strip() for metric in metrics.split(',') if metric.strip()]
+
+
+def write_chunk_preference_file(pfile: str,
+                                path: str,
+                                metric_names: List[str],
+                                preferences: dict) -> str:
+    '''
+    Write a copy of a preference file, with the metric set of the chunks and
+    output preferences of its own
+
+    Parameters
+    ----------
+    pfile: str
+        The preference file to copy
+    path: str
+        The path of the copy
+    metric_names: list
+        The metrics of the CHUNK_METRIC_SET metric set of the copy
+    preferences: dict
+        The values of the Preferences section replaced in the copy, such as
+        csv_dir, psd_dir and pdf_dir
+
+    Returns
+    -------
+    str:
+        The path of the copy
+    '''
+    lines = []
+    section = None
+    with open(pfile) as file:
+        for line in file:
+            header = re.match(r'^(\w+):\s*(#.*)?$', line)
+            if header:
+                section = header.group(1)
+                lines.append(line)
+                if section == 'Metrics':
+                    lines.append(f'  {CHUNK_METRIC_SET}: \
+{", ".join(metric_names)}\n')
+                continue
+            name = line.split(':')[0].strip()
+            if section == 'Preferences' and name in preferences:
+                indentation = line[:len(line) - len(line.lstrip())]
+                # ISPAQ expects the directories to end with a separator
+                separator = '/' if name.endswith('_dir') else ''
+                line = f'{indentation}{name}: {preferences[name]}\
+{separator}\n'
+            lines.append(line)
+    for name, directory in preferences.items():
+        if name.endswith('_dir'):
+            os.makedirs(directory, exist_ok=True)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w') as file:
+        file.writelines(lines)
+    return path
+
+
+def merge_ispaq_chunk_outputs(chunk_directories: List[str],
+                              metrics: str,
+                              snlc: str,
+                              startdate: date,
+                              enddate: date,
+                              ispaq_output_directory: str = './ispaq_outputs'):
+    '''
+    Merge the outputs of the chunks of an ISPAQ run into the ISPAQ output
+    directory. The rows of the csv files of the chunks are written, in the
+    order of the chunks, to the csv files gather_stats reads for the whole
+    period, and the PSD and PDF files of the chunks are moved to the PSD and
+    PDF directories.
+
+    Parameters
+    ----------
+    chunk_directories: list
+        The directories of the chunks, in chronological order
+    metrics: str
+        The metric set of the whole run
+    snlc: str
+        The SNCL of the whole run, as in the names of the csv files
+    startdate: date
+        The start of the whole run
+    enddate: date
+        The end of the whole run, excluded
+    ispaq_output_directory: str, optional
+        The directory the outputs are merged into
+    '''
+    csv_directory = os.path.join(ispaq_output_directory, 'csv')
+    os.makedirs(csv_directory, exist_ok=True)
+    for suffix in ISPAQ_CSV_SUFFIXES:
+        chunk_csv_files = [
+            os.path.join(directory, 'csv', filename)
+            for directory in chunk_directories
+            if os.path.isdir(os.path.join(directory, 'csv'))
+            for filename in sorted(os.listdir(os.path.join(directory, 'csv')))
+            if filename.endswith(f'_{suffix}')]
+        if not chunk_csv_files:
+            continue
+        # The values are kept as they were written by ISPAQ
+        pd.concat([pd.read_csv(file, dtype=str, keep_default_na=False)
+                   for file in chunk_csv_files],
+                  ignore_index=True, sort=False).to_csv(
+            ispaq_csv_filename(ispaq_output_directory=ispaq_output_directory,
+                               metrics=metrics,
+                               snlc=snlc,
+                               start=startdate,
+                               stop=enddate,
+                               suffix=suffix),
+            index=False)
+    for name in ('PSDs', 'PDFs'):
+        for directory in chunk_directories:
+            _move_files(os.path.join(directory, name),
+                        os.path.join(ispaq_output_directory, name))
+
+
+def ispaq_csv_filename(ispaq_output_directory: str,
+                       metrics: str,
+                       snlc: str,
+                       start: date,
+                       stop: Optional[date],
+                       suffix: str) -> str:
+    '''
+    Returns the name of a csv file written by ISPAQ for a period. The name
+    of the file of a single day only contains the day, while the name of the
+    file of several days contains the first and last day.
+    '''
+    if stop is None or start == stop + timedelta(days=-1):
+        return f'{ispaq_output_directory}/csv/{metrics}_{snlc}_{start}_\
+{suffix}'
+    return f'{ispaq_output_directory}/csv/{metrics}_{snlc}_{start}_\
+{(stop + timedelta(days=-1))}_{suffix}'
+
+
+def _run_ispaq_chunks(chunks: List[ISPAQChunk],
+                      workers: Optional[int]) -> List[int]:
+    if workers is None:
+        workers = get_default_parameters().ISPAQ_WORKERS or \
+            os.cpu_count() or 1
+    workers = max(1, min(workers, len(chunks)))
+    logging.info(f'Running ISPAQ in {len(chunks)} chunks with {workers} \
+workers..')
+    if workers == 1 or current_process().daemon:
+        return [_run_ispaq_chunk(chunk) for chunk in chunks]
+    with Pool(processes=workers) as pool:
+        return pool.map(_run_ispaq_chunk, chunks, chunksize=1)
+
+
+def _run_ispaq_chunk(chunk: ISPAQChunk) -> int:
+    logging.info(f'Running ISPAQ from {chunk.startdate} to {chunk.enddate}..')
+    return chunk.command(**chunk.arguments)
+
+
+def _merge_chunk_database(directory: str, database: str):
+    chunk_database = os.path.join(directory, CHUNK_DATABASE)
+    if os.path.exists(chunk_database):
+        merge_ispaq_database(source=chunk_database, database=database)
+    else:
+        logging.warning(f'No ISPAQ metric database found in {directory}')
+
+
+def _move_files(source: str, destination: str):
+    # Move the files of a directory tree, keeping their relative paths
+    for directory, _, filenames in os.walk(source):
+        target = os.path.join(destination, os.path.relpath(directory, source))
+        os.makedirs(target, exist_ok=True)
+        for filename in filenames:
+            os.replace(os.path.join(directory, filename),
+                       os.path.join(target, filename))
@@ -0,0 +1,227 @@
+'''
+This module reads Apollo latency JSON files incrementally. An Apollo latency
+file holds an "availability" entry for every channel of every station on the
+server, while a validation only needs the entries of one station. The
+scanner reads the file in chunks and hands out the raw text of one entry at a
+time, so only the entries that are needed get decoded, and the memory used is
+bounded by the largest entry rather than by the whole file.
+
+Functions
+---------
+iterate_apollo_availability_entries:
+    Yields the id and raw JSON text of each entry of the availability array
+average_percent_availability_of_entry_text:
+    Returns the average percentAvailability of a raw availability entry
+'''
+import json
+import re
+
+from typing import IO, Iterator, List, Tuple
+
+import numpy as np
+
+from stationverification.utilities import exceptions
+
+CHUNK_SIZE = 1 << 20
+
+QUOTE, BACKSLASH = ord('"'), ord('\\')
+OPENING_BRACKETS = (ord('{'), ord('['))
+
+IS_BRACKET = np.zeros(256, dtype=bool)
+IS_BRACKET[[ord(bracket) for bracket in '{}[]']] = True
+
+CLOSING_BRACKETS = {ord('}'): ord('{'), ord(']'): ord('[')}
+
+AVAILABILITY_KEY = re.compile(rb'"availability"\s*:\s*$')
+
+ENTRY_ID = re.compile(rb'"id"\s*:\s*("(?:[^"\\]|\\.)*")')
+
+PERCENT_AVAILABILITY = re.compile(
+    r'"percentAvailability"\s*:\s*(-?\d+(?:\.\d*)?(?:[eE][-+]?\d+)?)')
+
+# Depths of the brackets enclosing the availability array, and each of its
+# entries: {"availability": [{"id": ..., "intervals": [...]}, ...]}
+AVAILABILITY_DEPTH = 2
+ENTRY_DEPTH = 3
+
+
+def iterate_apollo_availability_entries(
+        file: str,
+        chunk_size: int = CHUNK_SIZE) -> Iterator[Tuple[str, str]]:
+    '''
+    Scan an Apollo latency JSON file and yield the entries of its
+    "availability" array one at a time, without decoding them.
+
+    Only the structure of the document is checked while scanning: the
+    entries themselves are validated when they are decoded.
+
+    Parameters
+    ----------
+    file: str
+        The path to the Apollo latency JSON file
+    chunk_size: int
+        The number of bytes read from the file at once
+
+    Yields
+    ------
+    tuple:
+        The "id" of the entry, such as "QW.QCC01.HNN", and the raw JSON text
+        of the entry
+    '''
+    with open(file, 'rb') as json_latency_file:
+        try:
+            yield from _scan_availability_entries(json_latency_file,
+                                                  chunk_size)
+        except ValueError:
+            raise exceptions.LatencyFileError(
+                f'Problem detected in latency file: {file}')
+
+
+def _scan_availability_entries(
+        json_latency_file: IO[bytes],
+        chunk_size: int) -> Iterator[Tuple[str, str]]:
+    buffer = b''
+    # Whether the end of the buffer is inside a string, right after an
+    # escaping backslash, and at which bracket depth
+    in_string, escaped, depth = False, False, 0
+    # The opening brackets enclosing the current position, down to the
+    # entries of the availability array. Deeper brackets are only counted.
+    brackets: List[int] = []
+    # The end of the last bracket followed, where the current segment of
+    # keys and scalar values starts
+    segment_start = 0
+    in_availability = False
+    found_availability = False
+    entry_start = None
+    entry_id = None
+    while True:
+        chunk = json_latency_file.read(chunk_size)
+        if not chunk:
+            if in_string or depth != 0 or not found_availability:
+                raise ValueError('Incomplete latency file')
+            return
+        # Only the entry being scanned, or the text since the last bracket
+        # followed, needs to be kept in memory
+        keep = entry_start if entry_start is not None else segment_start
+        scanned = len(buffer) - keep
+        buffer = buffer[keep:] + chunk
+        segment_start -= keep
+        if entry_start is not None:
+            entry_start = 0
+        positions, in_string, escaped = _find_brackets(
+            buffer, scanned, in_string, escaped)
+        if len(positions) == 0:
+            continue
+        openings = np.isin(_buffer_array(buffer)[positions], OPENING_BRACKETS)
+        depths = depth + np.cumsum(np.where(openings, 1, -1))
+        if depths.min() < 0:
+            raise ValueError('Unbalanced brackets in latency file')
+        # The depth of the container of each bracket pair. Only the brackets
+        # down to the entries are followed one by one.
+        levels = depths - openings
+        depth = int(depths[-1])
+        for position in positions[levels <= ENTRY_DEPTH].tolist():
+            token = buffer[position]
+            current_segment_start, segment_start = \
+                segment_start, position + 1
+            depth_before = len(brackets)
+            if entry_start is not None and depth_before == ENTRY_DEPTH \
+                    and entry_id is None:
+                # The keys and scalar values of the entry itself, between two
+                # of its nested arrays or objects
+                id_match = ENTRY_ID.search(
+                    buffer, current_segment_start, position)
+                if id_match is not None:
+                    entry_id = json.loads(id_match.group(1))
+            if token in OPENING_BRACKETS:
+                if token == ord('[') and depth_before == 1 and \
+                        AVAILABILITY_KEY.search(
+                            buffer, current_segment_start, position):
+                    in_availability = True
+                elif in_availability and depth_before == AVAILABILITY_DEPTH:
+                    if token != ord('{'):
+                        raise ValueError(
+                            'Availability entry is not an object')
+                    entry_start = position
+                    entry_id = None
+                brackets.append(token)
+            else:
+                if not brackets or brackets.pop() != CLOSING_BRACKETS[token]:
+                    raise ValueError('Mismatched bracket in latency file')
+                if entry_start is not None and depth_before == ENTRY_DEPTH:
+                    entry_text = buffer[entry_start:position + 1].decode()
+                    entry_start = None
+                    yield entry_id or '', entry_text
+                elif in_availability and depth_before == AVAILABILITY_DEPTH:
+                    in_availability = False
+                    found_availability = True
+
+
+def _buffer_array(buffer: bytes) -> np.ndarray:
+    return np.frombuffer(buffer, dtype=np.uint8)
+
+
+def _find_brackets(buffer: bytes,
+                   start: int,
+                   in_string: bool,
+                   escaped: bool) -> Tuple[np.ndarray, bool, bool]:
+    '''
+    Find the brackets of buffer[start:] that are not inside a string. The
+    quotes and brackets are located with vectorized byte comparisons, and
+    only the rare quotes that follow a backslash are looked at one by one.
+
+    Returns the positions of the brackets in the buffer, and whether the end
+    of the buffer is inside a string and right after an escaping backslash.
+    '''
+    data = _buffer_array(buffer)[start:]
+    quotes = np.flatnonzero(data == QUOTE)
+    # A quote is escaped when it follows an odd number of backslashes. Those
+    # are always inside a string, as backslashes are not valid elsewhere.
+    escaped_quotes = []
+    for quote in quotes[
+            data[np.maximum(quotes - 1, 0)] == BACKSLASH].tolist() + (
+            [0] if len(quotes) and quotes[0] == 0 and escaped else []):
+        backslashes = _count_backslashes_before(data, quote)
+        if backslashes == quote:
+            backslashes += escaped
+        if backslashes % 2:
+            escaped_quotes.append(quote)
+    if escaped_quotes:
+        quotes = np.setdiff1d(quotes, escaped_quotes)
+    brackets = np.flatnonzero(IS_BRACKET[data])
+    # A bracket is outside of any string when an even number of quotes,
+    # counting the string left open by the previous chunk, precede it
+    outside = (np.searchsorted(quotes, brackets) + in_string) % 2 == 0
+    trailing_backslashes = _count_backslashes_before(data, len(data))
+    if trailing_backslashes == len(data):
+        trailing_backslashes += escaped
+    return brackets[outside] + start, \
+        bool((len(quotes) + in_string) % 2), \
+        bool(trailing_backslashes % 2)
+
+
+def _count_backslashes_before(data: np.ndarray, position: int) -> int:
+    count = 0
+    while count < position and data[position - count - 1] == BACKSLASH:
+        count += 1
+    return count
+
+
+def average_percent_availability_of_entry_text(entry_text: str) -> float:
+    '''
+    Get the average percentAvailability of the intervals of a raw
+    availability entry, without decoding the entry
+
+    Parameters
+    ----------
+    entry_text: str
+        The raw JSON text of an availability entry
+
+    Returns
+    -------
+    float:
+        The average percent availability of the channel
+    '''
+    percent_availability = [
+        float(value) for value in PERCENT_AVAILABILITY.findall(entry_text)]
+    return sum(percent_availability) / len(percent_availability)
@@ -0,0 +1,587 @@
+'''
+This module computes the data coverage of a station from the fixed headers of
+its miniSEED records alone. The files of the archive are memory-mapped and
+the start time, number of samples and sample rate of every record are read
+without decompressing any sample, which gives the gaps, overlaps and percent
+availability of each channel and day long before ISPAQ has run.
+
+When every record of a file has the same length, which is the case of the
+files written by the digitizers, the headers of the whole file are read at
+once as a numpy structured array laid over the mapped file. Other files are
+read record by record.
+
+Classes
+-------
+MiniSEEDRecordHeaders:
+    The timing of each data record of a miniSEED file
+ChannelDayCoverage:
+    The coverage, gaps and overlaps of a channel for a day
+MiniSEEDCoverage:
+    The coverage of every channel of a station for every day of a period
+
+Functions
+---------
+scan_miniseed_archive:
+    Computes the coverage of a station from the headers of its archive
+miniseed_data_period:
+    Returns the part of a validation period with miniSEED data
+read_miniseed_record_headers:
+    Reads the fixed headers of the data records of a miniSEED file
+channel_day_coverage:
+    Computes the coverage of a channel for a day from its record times
+miniseed_byte_order:
+    Returns the byte order of a miniSEED fixed header
+miniseed_record_length:
+    Returns the record length given by the blockette 1000 of a record
+'''
+import logging
+import mmap
+import struct
+
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from stationverification.config import get_default_parameters
+from stationverification.utilities.archive_index import get_archive_index
+
+FIXED_HEADER_LENGTH = 48
+DEFAULT_RECORD_LENGTH = 512
+SECONDS_PER_DAY = 86400
+
+# Data quality indicators of the data records
+DATA_QUALITY_INDICATORS = (b'D', b'R', b'Q', b'M')
+
+# Bit of the activity flags set when the time correction is already applied
+TIME_CORRECTION_APPLIED = 0x02
+
+
+def _fixed_header_dtype(byte_order: str, record_length: int) -> np.dtype:
+    return np.dtype({
+        'names': ['quality', 'station', 'location', 'channel', 'network',
+                  'year', 'day', 'hour', 'minute', 'second', 'fraction',
+                  'number_of_samples', 'rate_factor', 'rate_multiplier',
+                  'activity_flags', 'time_correction', 'first_blockette'],
+        'formats': ['S1', 'S5', 'S2', 'S3', 'S2',
+                    f'{byte_order}u2', f'{byte_order}u2', 'u1', 'u1', 'u1',
+                    f'{byte_order}u2', f'{byte_order}u2', f'{byte_order}i2',
+                    f'{byte_order}i2', 'u1', f'{byte_order}i4',
+                    f'{byte_order}u2'],
+        'offsets': [6, 8, 13, 15, 18, 20, 22, 24, 25, 26, 28, 30, 32, 34,
+                    36, 40, 46],
+        'itemsize': record_length})
+
+
+class MiniSEEDRecordHeaders(dict):
+    '''
+    The timing of the data records of a miniSEED file, one entry per record
+
+    Properties
+    ----------
+    channels: numpy array of str
+        The NET.STA.LOC.CHA id of each record
+    starttimes: numpy array of float64
+        The time of the first sample of each record, in POSIX seconds
+    endtimes: numpy array of float64
+        The time following the last sample of each record, in POSIX seconds
+    sample_rates: numpy array of float64
+        The sample rate of each record
+    '''
+    @property
+    def channels(self) -> np.ndarray:
+        return self["channels"]
+
+    @property
+    def starttimes(self) -> np.ndarray:
+        return self["starttimes"]
+
+    @property
+    def endtimes(self) -> np.ndarray:
+        return self["endtimes"]
+
+    @property
+    def sample_rates(self) -> np.ndarray:
+        return self["sample_rates"]
+
+
+class ChannelDayCoverage(dict):
+    '''
+    The coverage of a channel for a day, computed like the ISPAQ metrics of
+    the same names. The missing data at the start and end of the day count
+    as gaps.
+
+    Properties
+    ----------
+    channel: str
+        The NET.STA.LOC.CHA id of the channel
+    day: date
+        The day covered
+    sample_rate: float
+        The sample rate of the channel
+    intervals: list
+        The [start, end] POSIX times of each continuous segment of data in
+        the day
+    num_gaps: int
+        The number of gaps longer than half a sample period
+    max_gap: float
+        The length in seconds of the longest gap, 0 without gaps
+    num_overlaps: int
+        The number of traces overlapping the data before them
+    percent_availability: float
+        The percentage of the day covered by the data
+    '''
+    @property
+    def channel(self) -> str:
+        return self["channel"]
+
+    @property
+    def day(self) -> date:
+        return self["day"]
+
+    @property
+    def sample_rate(self) -> float:
+        return self["sample_rate"]
+
+    @property
+    def intervals(self) -> List[List[float]]:
+        return self["intervals"]
+
+    @property
+    def num_gaps(self) -> int:
+        return self["num_gaps"]
+
+    @property
+    def max_gap(self) -> float:
+        return self["max_gap"]
+
+    @property
+    def num_overlaps(self) -> int:
+        return self["num_overlaps"]
+
+    @property
+    def percent_availability(self) -> float:
+        return self["percent_availability"]
+
+
+class MiniSEEDCoverage(dict):
+    '''
+    The coverage of the channels of a station for each day of a period
+
+    Properties
+    ----------
+    startdate: date
+        The first day scanned
+    enddate: date
+        The end of the period scanned, non-inclusive
+    coverages: list
+        The ChannelDayCoverage of each channel and day with data, ordered by
+        day and channel
+
+    Functions
+    ---------
+    days_with_data:
+        Returns the days with data for at least one channel
+    days_without_data:
+        Returns the days without data for any channel
+    data_period:
+        Returns the period from the first to the last day with data
+    '''
+    @property
+    def startdate(self) -> date:
+        return self["startdate"]
+
+    @property
+    def enddate(self) -> date:
+        return self["enddate"]
+
+    @property
+    def coverages(self) -> List[ChannelDayCoverage]:
+        return self["coverages"]
+
+    def days_with_data(self) -> List[date]:
+        '''
+        Get the days with data for at least one channel
+        '''
+        return sorted({coverage.day for coverage in self.coverages
+                       if coverage.percent_availability > 0})
+
+    def days_without_data(self) -> List[date]:
+        '''
+        Get the days of the period without data for any channel
+        '''
+        days_with_data = set(self.days_with_data())
+        return [self.startdate + timedelta(days=index)
+                for index in range((self.enddate - self.startdate).days)
+                if self.startdate + timedelta(days=index)
+                not in days_with_data]
+
+    def data_period(self) -> Optional[Tuple[date, date]]:
+        '''
+        Get the first day with data and the day after the last day with
+        data, None if there is no data in the period
+        '''
+        days_with_data = self.days_with_data()
+        if not days_with_data:
+            return None
+        return days_with_data[0], days_with_data[-1] + timedelta(days=1)
+
+
+def scan_miniseed_archive(miniseed_directory: str,
+                          network: str,
+                          station: str,
+                          startdate: date,
+                          enddate: date,
+                          location: Optional[str] = None,
+                          channel: str = 'H??') -> MiniSEEDCoverage:
+    '''
+    Compute the coverage of the channels of a station for each day of a
+    period, from the headers of the daily files of a miniSEED archive
+
+    Parameters
+    ----------
+    miniseed_directory: str
+        The root directory of the YYYY/MM/DD miniSEED archive
+    network: str
+        Network code
+    station: str
+        Station code
+    startdate: date
+        The first day to scan
+    enddate: date
+        The end of the period to scan, non-inclusive
+    location: str, optional
+        Location code. If None, every location is scanned
+    channel: str
+        Channel code, which may contain wildcards. Defaults to the high
+        rate channels validated by ISPAQ
+
+    Returns
+    -------
+    MiniSEEDCoverage:
+        The coverage of each channel and day with data
+    '''
+    archive_index = get_archive_index(miniseed_directory, startdate, enddate)
+    coverages: List[ChannelDayCoverage] = []
+    iterdate = startdate
+    while iterdate < enddate:
+        records: Dict[str, List[MiniSEEDRecordHeaders]] = {}
+        for file in archive_index.find(day=iterdate,
+                                       network=network,
+                                       station=station,
+                                       location=location,
+                                       channel=channel):
+            try:
+                headers = read_miniseed_record_headers(file)
+            except (OSError, ValueError, struct.error) as e:
+                logging.warning(f'Unable to read the headers of {file}: {e}')
+                continue
+            for channel_id in _unique_channels(headers.channels):
+                records.setdefault(channel_id, []).append(
+                    _select_records(headers, headers.channels == channel_id))
+        for channel_id in sorted(records):
+            channel_records = records[channel_id]
+            coverages.append(channel_day_coverage(
+                channel=channel_id,
+                day=iterdate,
+                starttimes=np.concatenate(
+                    [headers.starttimes for headers in channel_records]),
+                endtimes=np.concatenate(
+                    [headers.endtimes for headers in channel_records]),
+                sample_rates=np.concatenate(
+                    [headers.sample_rates for headers in channel_records])))
+        iterdate += timedelta(days=+1)
+    return MiniSEEDCoverage(startdate=startdate,
+                            enddate=enddate,
+                            coverages=coverages)
+
+
+def miniseed_data_period(miniseed_directory: str,
+                         network: str,
+                         station: str,
+                         startdate: date,
+                         enddate: date,
+                         location: Optional[str] = None) \
+        -> Optional[Tuple[date, date]]:
+    '''
+    Get the part of a validation period ISPAQ has to run over, from the first
+    to the last day with miniSEED data for the station. The days without
+    data are logged. The whole period is returned if
+    VALIDATION_MINISEED_PRECHECK is disabled.
+
+    Returns
+    -------
+    tuple:
+        The first day with data and the day after the last day with data,
+        None if the station has no data during the period
+    '''
+    if not get_default_parameters().MINISEED_PRECHECK:
+        return startdate, enddate
+    coverage = scan_miniseed_archive(miniseed_directory=miniseed_directory,
+                                     network=network,
+                                     station=station,
+                                     startdate=startdate,
+                                     enddate=enddate,
+                                     location=location)
+    for channel_coverage in coverage.coverages:
+        logging.debug(f'{channel_coverage.channel} {channel_coverage.day}: \
+{channel_coverage.percent_availability:.2f}% available, \
+{channel_coverage.num_gaps} gaps, {channel_coverage.num_overlaps} overlaps')
+    days_without_data = coverage.days_without_data()
+    if days_without_data:
+        logging.warning(f'No miniSEED data for {network}.{station} on \
+{", ".join(str(day) for day in days_without_data)}')
+    return coverage.data_period()
+
+
+def read_miniseed_record_headers(file: str) -> MiniSEEDRecordHeaders:
+    '''
+    Read the timing of the data records of a miniSEED file from their fixed
+    headers, without decompressing their samples. The records without
+    samples, such as log records, are left out.
+
+    Parameters
+    ----------
+    file: str
+        The path of the miniSEED file
+
+    Returns
+    -------
+    MiniSEEDRecordHeaders:
+        The channel, start time, end time and sample rate of each record
+    '''
+    with open(file, 'rb') as fp:
+        try:
+            mapped_file = mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # Empty files can not be mapped
+            return _record_headers(np.zeros(
+                0, dtype=_fixed_header_dtype('>', FIXED_HEADER_LENGTH)))
+        try:
+            fields = _read_fixed_headers(mapped_file)
+        finally:
+            mapped_file.close()
+    return _record_headers(fields)
+
+
+def channel_day_coverage(channel: str,
+                         day: date,
+                         starttimes: np.ndarray,
+                         endtimes: np.ndarray,
+                         sample_rates: np.ndarray) -> ChannelDayCoverage:
+    '''
+    Compute the coverage of a channel for a day from the start and end times
+    of its records. The records are clipped to the day.
+
+    Parameters
+    ----------
+    channel: str
+        The NET.STA.LOC.CHA id of the channel
+    day: date
+        The day to compute the coverage of
+    starttimes, endtimes: numpy array
+        The POSIX time of the first sample of each record, and the time
+        following its last sample, in the order of the records in the files
+    sample_rates: numpy array
+        The sample rate of each record
+
+    Returns
+    -------
+    ChannelDayCoverage:
+        The continuous segments, gaps, overlaps and availability of the day
+    '''
+    day_start = datetime(day.year, day.month, day.day,
+                         tzinfo=timezone.utc).timestamp()
+    day_end = day_start + SECONDS_PER_DAY
+    inside = (endtimes > day_start) & (starttimes < day_end)
+    sample_rate = float(np.median(sample_rates[inside])) \
+        if inside.any() else 0.0
+    tolerance = 0.5 / sample_rate if sample_rate > 0 else 0.0
+    if not inside.any():
+        return ChannelDayCoverage(channel=channel, day=day,
+                                  sample_rate=sample_rate, intervals=[],
+                                  num_gaps=1, max_gap=float(SECONDS_PER_DAY),
+                                  num_overlaps=0, percent_availability=0.0)
+
+    # The records following each other in the files make up the traces, as
+    # obspy merges them, and the gaps and overlaps are between the traces
+    starttimes, endtimes = starttimes[inside], endtimes[inside]
+    breaks = np.flatnonzero(
+        np.abs(starttimes[1:] - endtimes[:-1]) > tolerance) + 1
+    trace_starts = starttimes[np.concatenate(([0], breaks))]
+    trace_ends = endtimes[np.concatenate((breaks - 1, [len(endtimes) - 1]))]
+    order = np.argsort(trace_starts, kind='stable')
+    starts = np.clip(trace_starts[order], day_start, day_end)
+    ends = np.clip(trace_ends[order], day_start, day_end)
+
+    # The end of the data up to each trace
+    data_ends = np.maximum.accumulate(ends)
+    jumps = starts[1:] - data_ends[:-1]
+    gap_lengths = np.concatenate(
+        ([starts[0] - day_start], jumps, [day_end - data_ends[-1]]))
+    gaps = gap_lengths[gap_lengths > tolerance]
+    num_overlaps = int(np.count_nonzero(jumps < -tolerance))
+
+    # Continuous segments are split at the gaps between traces
+    splits = np.flatnonzero(jumps > tolerance) + 1
+    segment_starts = starts[np.concatenate(([0], splits))]
+    segment_ends = data_ends[np.concatenate((splits - 1, [len(ends) - 1]))]
+    covered = float(np.sum(segment_ends - segment_starts))
+    return ChannelDayCoverage(
+        channel=channel,
+        day=day,
+        sample_rate=sample_rate,
+        intervals=np.column_stack(
+            (segment_starts, segment_ends)).tolist(),
+        num_gaps=int(len(gaps)),
+        max_gap=float(gaps.max()) if len(gaps) else 0.0,
+        num_overlaps=num_overlaps,
+        percent_availability=min(covered / SECONDS_PER_DAY * 100, 100.0))
+
+
+def miniseed_byte_order(header: bytes) -> str:
+    '''
+    Get the struct byte order of a miniSEED fixed header, '>' or '<', as the
+    one giving a plausible year
+    '''
+    year, = struct.unpack('>H', header[20:22])
+    return '>' if 1900 <= year <= 2100 else '<'
+
+
+def miniseed_record_length(header: bytes,
+                           byte_order: str,
+                           default: int = DEFAULT_RECORD_LENGTH) -> int:
+    '''
+    Get the record length given by the blockette 1000 of a miniSEED record
+
+    Parameters
+    ----------
+    header: bytes
+        The fixed header of the record, followed by its blockettes
+    byte_order: str
+        The struct byte order of the record
+    default: int
+        The length returned if the record has no blockette 1000
+
+    Returns
+    -------
+    int:
+        The length of the record in bytes
+    '''
+    offset, = struct.unpack(f'{byte_order}H', header[46:48])
+    while 0 < offset and offset + 8 <= len(header):
+        blockette_type, next_blockette = struct.unpack(
+            f'{byte_order}HH', header[offset:offset + 4])
+        if blockette_type == 1000:
+            return 2 ** header[offset + 6]
+        if next_blockette <= offset:
+            break
+        offset = next_blockette
+    return default
+
+
+def _read_fixed_headers(mapped_file: mmap.mmap) -> np.ndarray:
+    byte_order = miniseed_byte_order(mapped_file[:FIXED_HEADER_LENGTH])
+    record_length = miniseed_record_length(
+        mapped_file[:DEFAULT_RECORD_LENGTH], byte_order)
+    if len(mapped_file) % record_length == 0:
+        # Every header of the file is read at once, if the file is made of
+        # records of a single length
+        headers = np.frombuffer(
+            mapped_file, dtype=_fixed_header_dtype(byte_order, record_length),
+            count=len(mapped_file) // record_length)
+        fields = headers.astype(
+            _fixed_header_dtype(byte_order, FIXED_HEADER_LENGTH))
+        del headers
+        if np.isin(fields['quality'], DATA_QUALITY_INDICATORS).all():
+            return fields
+    return _read_fixed_headers_of_each_record(mapped_file)
+
+
+def _read_fixed_headers_of_each_record(mapped_file: mmap.mmap) -> np.ndarray:
+    records = []
+    offset = 0
+    while offset + FIXED_HEADER_LENGTH <= len(mapped_file):
+        header = mapped_file[offset:offset + DEFAULT_RECORD_LENGTH]
+        byte_order = miniseed_byte_order(header)
+        record_length = max(miniseed_record_length(header, byte_order),
+                            FIXED_HEADER_LENGTH)
+        if header[6:7] not in DATA_QUALITY_INDICATORS:
+            offset += record_length
+            continue
+        record = np.frombuffer(
+            header[:FIXED_HEADER_LENGTH],
+            dtype=_fixed_header_dtype(byte_order, FIXED_HEADER_LENGTH))
+        records.append(record.astype(
+            _fixed_header_dtype('>', FIXED_HEADER_LENGTH)))
+        offset += record_length
+    if not records:
+        return np.zeros(0, dtype=_fixed_header_dtype('>', FIXED_HEADER_LENGTH))
+    return np.concatenate(records)
+
+
+def _record_headers(fields: np.ndarray) -> MiniSEEDRecordHeaders:
+    sample_rates = _sample_rates(fields['rate_factor'].astype(np.float64),
+                                 fields['rate_multiplier'].astype(np.float64))
+    number_of_samples = fields['number_of_samples'].astype(np.float64)
+    data_records = (sample_rates > 0) & (number_of_samples > 0)
+    fields = fields[data_records]
+    sample_rates = sample_rates[data_records]
+    number_of_samples = number_of_samples[data_records]
+
+    # BTIME: year, day of year, hour, minute, second and 0.0001 seconds
+    days = (fields['year'].astype(np.int64) - 1970).astype('datetime64[Y]') \
+        .astype('datetime64[D]').astype(np.int64) + \
+        fields['day'].astype(np.int64) - 1
+    starttimes = days * SECONDS_PER_DAY + \
+        fields['hour'].astype(np.int64) * 3600 + \
+        fields['minute'].astype(np.int64) * 60 + \
+        fields['second'].astype(np.int64) + \
+        fields['fraction'].astype(np.float64) / 10000
+    not_applied = (fields['activity_flags'] & TIME_CORRECTION_APPLIED) == 0
+    starttimes = starttimes + np.where(
+        not_applied, fields['time_correction'].astype(np.float64) / 10000, 0)
+    # The ids are built once for each distinct channel of the records,
+    # usually a single one
+    codes = fields[['network', 'station', 'location', 'channel']]
+    if len(codes) and (codes == codes[0]).all():
+        unique_codes, channel_of_records = codes[:1], np.zeros(
+            len(codes), dtype=np.int64)
+    else:
+        unique_codes, channel_of_records = np.unique(
+            codes, return_inverse=True)
+    channels = np.array(
+        ['.'.join(code.decode('ascii', errors='ignore').strip()
+                  for code in channel_codes)
+         for channel_codes in unique_codes], dtype=str)[channel_of_records]
+    return MiniSEEDRecordHeaders(
+        channels=channels,
+        starttimes=starttimes,
+        endtimes=starttimes + number_of_samples / sample_rates,
+        sample_rates=sample_rates)
+
+
+def _sample_rates(factors: np.ndarray, multipliers: np.ndarray) \
+        -> np.ndarray:
+    # The sample rate of a record is given by its rate factor and
+    # multiplier, a negative value meaning a division
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rates = np.where(factors > 0, factors, -1 / factors)
+        rates = np.where(multipliers > 0, rates * multipliers,
+                         -rates / multipliers)
+    rates[(factors == 0) | (multipliers == 0)] = 0.0
+    return rates
+
+
+def _unique_channels(channels: np.ndarray) -> List[str]:
+    if len(channels) and (channels == channels[0]).all():
+        return [str(channels[0])]
+    return [str(channel) for channel in np.unique(channels)]
+
+
+def _select_records(headers: MiniSEEDRecordHeaders,
+                    selection: np.ndarray) -> MiniSEEDRecordHeaders:
+    return MiniSEEDRecordHeaders(channels=headers.channels[selection],
+                                 starttimes=headers.starttimes[selection],
+                                 endtimes=headers.endtimes[selection],
+                                 sample_rates=headers.sample_rates[selection])
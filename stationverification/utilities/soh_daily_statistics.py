@@ -0,0 +1,138 @@
+'''
+This module evaluates SOH channels over a whole validation period at once.
+The data of each day is stacked into one row of a masked days by samples
+matrix, padded with masked samples up to the length of the longest day, so
+that the daily aggregates of every day are each computed with a single numpy
+reduction.
+
+Classes
+-------
+DailySOHStatistics:
+    The daily aggregates of a SOH channel
+
+Functions
+---------
+daily_soh_statistics:
+    Computes the daily aggregates of the data of each day of a SOH channel
+stack_daily_data:
+    Stacks the data of each day into a masked days by samples matrix
+'''
+from typing import List
+
+import numpy as np
+import numpy.ma as ma
+
+
+class DailySOHStatistics(dict):
+    '''
+    The daily aggregates of a SOH channel. Each aggregate holds one value
+    for each day, NaN for the days without any sample.
+
+    Properties
+    ----------
+    data: numpy masked array
+        The days by samples matrix of the channel
+    average: numpy array
+        The average of the samples of each day
+    minimum: numpy array
+        The minimum sample of each day
+    maximum: numpy array
+        The maximum sample of each day
+    sample_counts: numpy array
+        The number of samples, without the gaps, of each day
+
+    Functions
+    ---------
+    count_below:
+        Returns the number of samples below a value for each day
+    count_above:
+        Returns the number of samples above a value for each day
+    '''
+    @property
+    def data(self) -> ma.MaskedArray:
+        return self["data"]
+
+    @property
+    def average(self) -> np.ndarray:
+        return self["average"]
+
+    @property
+    def minimum(self) -> np.ndarray:
+        return self["minimum"]
+
+    @property
+    def maximum(self) -> np.ndarray:
+        return self["maximum"]
+
+    @property
+    def sample_counts(self) -> np.ndarray:
+        return self["sample_counts"]
+
+    def count_below(self, value: float) -> np.ndarray:
+        '''
+        Get the number of samples of each day strictly below a value
+        '''
+        return (self.data < value).filled(False).sum(axis=1)
+
+    def count_above(self, value: float) -> np.ndarray:
+        '''
+        Get the number of samples of each day strictly above a value
+        '''
+        return (self.data > value).filled(False).sum(axis=1)
+
+
+def daily_soh_statistics(list_of_data: List[np.ndarray]) \
+        -> DailySOHStatistics:
+    '''
+    Compute the daily aggregates of a SOH channel
+
+    Parameters
+    ----------
+    list_of_data: list
+        The merged data of each day, as numpy arrays or masked arrays
+
+    Returns
+    -------
+    DailySOHStatistics:
+        The average, minimum, maximum and number of samples of each day
+    '''
+    data = stack_daily_data(list_of_data)
+    return DailySOHStatistics(
+        data=data,
+        average=data.mean(axis=1).filled(np.nan),
+        minimum=data.min(axis=1).filled(np.nan),
+        maximum=data.max(axis=1).filled(np.nan),
+        sample_counts=data.count(axis=1))
+
+
+def stack_daily_data(list_of_data: List[np.ndarray]) -> ma.MaskedArray:
+    '''
+    Stack the data of each day into the rows of a float64 masked matrix.
+    Gaps in the data of a day, and the samples padding the days shorter
+    than the longest day, are masked.
+
+    Parameters
+    ----------
+    list_of_data: list
+        The merged data of each day, as numpy arrays or masked arrays
+
+    Returns
+    -------
+    numpy masked array:
+        The days by samples matrix
+    '''
+    lengths = np.array([len(data) for data in list_of_data], dtype=np.int64)
+    number_of_samples = int(lengths.max()) if len(lengths) else 0
+    values = np.zeros((len(list_of_data), number_of_samples),
+                      dtype=np.float64)
+    mask = np.ones((len(list_of_data), number_of_samples), dtype=bool)
+    if lengths.sum():
+        # Every sample is written at its (day, sample) position at once
+        rows = np.repeat(np.arange(len(list_of_data)), lengths)
+        columns = np.arange(lengths.sum()) - np.repeat(
+            np.cumsum(lengths) - lengths, lengths)
+        values[rows, columns] = np.concatenate(
+            [ma.getdata(data) for data in list_of_data])
+        mask[rows, columns] = np.concatenate(
+            [ma.getmaskarray(data) for data in list_of_data])
+    return ma.array(values, mask=mask)
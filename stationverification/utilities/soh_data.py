@@ -0,0 +1,242 @@
+'''
+This module decodes the daily SOH miniSEED files (LCE, GST, LCQ, GNS, LEO,
+LEP, LED, ...) into merged numpy arrays. Each file is decoded and merged only
+once per process: the decoded data is kept in memory, keyed by the path, size
+and modification time of the file, and can also be cached on disk so that
+later runs skip decoding unchanged files altogether.
+
+The SOH metrics and plots read their data from this module, as arrays or as
+single trace obspy Streams built around the cached arrays.
+
+Classes
+-------
+SOHData:
+    The merged data of a daily SOH file, with its timing metadata
+
+Functions
+---------
+read_soh_files:
+    Reads the merged data of a list of SOH files
+read_soh_file:
+    Reads the merged data of one SOH file, decoding it only once
+clear_soh_data_cache:
+    Empties the in-memory cache of decoded SOH files
+'''
+import logging
+import os
+
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import numpy.ma as ma
+import obspy
+from obspy.core.utcdatetime import UTCDateTime
+
+from stationverification.config import get_default_parameters
+from stationverification.utilities import exceptions
+from stationverification.utilities.file_fingerprint import \
+    file_fingerprint, write_file_atomically
+
+CACHE_SUFFIX = '.npz'
+
+CACHE_VERSION = 1
+
+# Decoded SOH files, keyed by their path and fingerprint
+_soh_data_cache: Dict[Tuple[str, Tuple[int, ...]], 'SOHData'] = {}
+
+
+class SOHData(dict):
+    '''
+    The merged data of a daily SOH file. The data array is shared by every
+    reader of the file and must not be modified.
+    '''
+    @property
+    def file(self) -> str:
+        return self["file"]
+
+    @property
+    def network(self) -> str:
+        return self["network"]
+
+    @property
+    def station(self) -> str:
+        return self["station"]
+
+    @property
+    def location(self) -> str:
+        return self["location"]
+
+    @property
+    def channel(self) -> str:
+        return self["channel"]
+
+    @property
+    def starttime(self) -> UTCDateTime:
+        return self["starttime"]
+
+    @property
+    def sampling_rate(self) -> float:
+        return self["sampling_rate"]
+
+    @property
+    def data(self) -> np.ndarray:
+        '''
+        The samples of the file, a masked array if the file has gaps
+        '''
+        return self["data"]
+
+    def to_stream(self) -> obspy.Stream:
+        '''
+        Get the data as an already merged obspy Stream of a single trace
+        '''
+        return obspy.Stream(traces=[obspy.Trace(
+            data=self.data,
+            header={'network': self.network,
+                    'station': self.station,
+                    'location': self.location,
+                    'channel': self.channel,
+                    'starttime': self.starttime,
+                    'sampling_rate': self.sampling_rate})])
+
+
+def read_soh_files(files: List[str],
+                   cache_directory: Optional[str] = None) -> List[SOHData]:
+    '''
+    Read the merged data of daily SOH files
+
+    Parameters
+    ----------
+    files: list
+        The paths to the SOH files, one for each day
+    cache_directory: str, optional
+        The directory of the on-disk cache of decoded files. Defaults to
+        VALIDATION_SOH_CACHE, files are only cached in memory if it is not set
+
+    Returns
+    -------
+    list:
+        The SOHData of each file, in the order of the files
+    '''
+    if len(files) < 1:
+        raise exceptions.StreamError(
+            'Can not fetch any streams. The list of files passed to fetch \
+streams from was empty')
+    return [read_soh_file(file, cache_directory=cache_directory)
+            for file in files]
+
+
+def read_soh_file(file: str,
+                  cache_directory: Optional[str] = None) -> SOHData:
+    '''
+    Read the merged data of a daily SOH file. The file is only decoded if it
+    is not already cached, or if it changed since it was cached.
+
+    Parameters
+    ----------
+    file: str
+        The path to the SOH file
+    cache_directory: str, optional
+        The directory of the on-disk cache of decoded files. Defaults to
+        VALIDATION_SOH_CACHE
+
+    Returns
+    -------
+    SOHData:
+        The merged data of the file
+    '''
+    if cache_directory is None:
+        cache_directory = get_default_parameters().SOH_CACHE
+    fingerprint = np.array([CACHE_VERSION, *file_fingerprint(file)],
+                           dtype=np.int64)
+    key = (os.path.abspath(file), tuple(fingerprint.tolist()))
+    if key in _soh_data_cache:
+        return _soh_data_cache[key]
+    soh_data = None
+    if cache_directory:
+        soh_data = _read_cache(file, cache_directory, fingerprint)
+    if soh_data is None:
+        soh_data = _decode_soh_file(file)
+        if cache_directory:
+            _write_cache(soh_data, cache_directory, fingerprint)
+    _soh_data_cache[key] = soh_data
+    return soh_data
+
+
+def clear_soh_data_cache():
+    '''
+    Empty the in-memory cache of decoded SOH files
+    '''
+    _soh_data_cache.clear()
+
+
+def _decode_soh_file(file: str) -> SOHData:
+    stream = obspy.read(file)
+    stream.merge(method=1)
+    if len(stream) == 0:
+        raise exceptions.StreamError(
+            f'There were no traces found in the stream passed.\
+             {stream}')
+    trace = stream[0]
+    return SOHData(file=file,
+                   network=trace.stats.network,
+                   station=trace.stats.station,
+                   location=trace.stats.location,
+                   channel=trace.stats.channel,
+                   starttime=trace.stats.starttime,
+                   sampling_rate=trace.stats.sampling_rate,
+                   data=trace.data)
+
+
+def _cache_file(file: str, cache_directory: str) -> str:
+    return os.path.join(cache_directory,
+                        f'{os.path.basename(file)}{CACHE_SUFFIX}')
+
+
+def _read_cache(file: str,
+                cache_directory: str,
+                fingerprint: np.ndarray) -> Optional[SOHData]:
+    cache_file = _cache_file(file, cache_directory)
+    if not os.path.exists(cache_file):
+        return None
+    try:
+        with np.load(cache_file, allow_pickle=False) as archive:
+            if not np.array_equal(archive['fingerprint'], fingerprint):
+                return None
+            network, station, location, channel = \
+                archive['codes'].tolist()
+            starttime, sampling_rate = archive['timing'].tolist()
+            data = archive['data']
+            if 'mask' in archive.files:
+                data = ma.array(data, mask=archive['mask'])
+    except (OSError, ValueError, KeyError):
+        logging.warning(f'Ignoring unreadable cache file {cache_file}')
+        return None
+    return SOHData(file=file,
+                   network=network,
+                   station=station,
+                   location=location,
+                   channel=channel,
+                   starttime=UTCDateTime(starttime),
+                   sampling_rate=sampling_rate,
+                   data=data)
+
+
+def _write_cache(soh_data: SOHData,
+                 cache_directory: str,
+                 fingerprint: np.ndarray):
+    columns = dict(
+        fingerprint=fingerprint,
+        codes=np.array([soh_data.network, soh_data.station,
+                        soh_data.location, soh_data.channel], dtype=str),
+        timing=np.array([soh_data.starttime.timestamp,
+                         soh_data.sampling_rate], dtype=np.float64),
+        data=ma.getdata(soh_data.data))
+    if ma.is_masked(soh_data.data):
+        columns['mask'] = ma.getmaskarray(soh_data.data)
+    try:
+        with write_file_atomically(
+                _cache_file(soh_data.file, cache_directory)) as cache_file:
+            np.savez(cache_file, **columns)
+    except OSError:
+        logging.warning(f'Unable to cache {soh_data.file} in \
+{cache_directory}')
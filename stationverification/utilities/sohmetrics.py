@@ -1,14 +1,16 @@
 import obspy
 import logging
-import subprocess
 import numpy as np
-import numpy.ma as ma
 from datetime import date, timedelta
 from typing import List, Any, Optional
 
 from stationverification.utilities import exceptions
+from stationverification.utilities.archive_index import get_archive_index
 from stationverification.utilities.plot_timing_quality import\
     plot_timing_quality
+from stationverification.utilities.soh_daily_statistics import \
+    daily_soh_statistics
+from stationverification.utilities.soh_data import read_soh_files
 
 
 class MetricResults(dict):
@@ -74,24 +76,16 @@ def getsohfiles(
     '''
 
     files: List[str] = []
+    archive_index = get_archive_index(soh_directory, startdate, enddate)
     iterdate = startdate
-    if location is None:
-        snlc = f'{network}.{station}.*.{channel}'
-    else:
-        snlc = f'{network}.{station}.{location}.{channel}'
     # Loop through all the dates
     while iterdate < enddate:
-        # Get the julian day and convert it to a 3 digit string
-        jday = "%03d" % iterdate.timetuple().tm_yday
         # Search for the file for the specific day
-        command = f'ls {soh_directory}/{iterdate.strftime("%Y/%m/%d")}/{snlc}\
-.{iterdate.year}.{jday} 2>/dev/null'
-        logging.debug(command)
-        output = subprocess.getoutput(command)
-        if len(output) > 0:
-            # Add the file to a list
-            files = files + output.split('\n')
-
+        files = files + archive_index.find(day=iterdate,
+                                           network=network,
+                                           station=station,
+                                           location=location,
+                                           channel=channel)
         iterdate = iterdate + timedelta(days=+1)
     # Raise an error if no files were collected
     if len(files) < 1:
@@ -107,7 +101,8 @@ def get_list_of_streams_from_list_of_files(files: List[str]) -> \
     '''
     Gets a list of files, and returns a list of streams. There will be a \
         single merged trace for each file passed.
-    Each stream returned represents 1 day of data
+    Each stream returned represents 1 day of data. The files are decoded \
+        and merged only once, see soh_data.read_soh_file
 
 
     Parameters
@@ -120,17 +115,7 @@ def get_list_of_streams_from_list_of_files(files: List[str]) -> \
     list: List[obspy.Stream]
         Merged Obspy streams from the given files
     '''
-    if len(files) < 1:
-        raise exceptions.StreamError(
-            'Can not fetch any streams. The list of files passed to fetch \
-streams from was empty')
-    list_of_merged_streams = []
-    # For each file, get the stream, and merge the traces
-    for file in files:
-        stream = obspy.read(file)
-        merged_stream = get_merged_stream(stream)
-        list_of_merged_streams.append(merged_stream)
-    return list_of_merged_streams
+    return [soh_data.to_stream() for soh_data in read_soh_files(files)]
 
 
 def getstats(
@@ -174,8 +159,10 @@ def get_merged_stream(stream: obspy.Stream) -> obspy.Stream:
         Streams with 1 single trace of data, consisting of all the merged\
              samples
     '''
-    # Merge the traces in the stream passed into one trace
-    stream.merge(method=1)
+    # Merge the traces in the stream passed into one trace, unless it is
+    # already merged
+    if len(stream) != 1 or len(stream[0]) == 0:
+        stream.merge(method=1)
     # throw an exception if the stream has no traces
     if len(stream) == 0:
         raise exceptions.StreamError(f'There were no traces found in the stream passed.\
@@ -265,16 +252,10 @@ def check_timing_quality(list_of_streams: List[obspy.Stream],
         list
             List of the results for the metric
     '''
-    results: Any = np.array([])
-    details = []
-    passed = True
-    # Loop though the streams
-    for stream in list_of_streams:
-        # Get the stats for the stream and append the average to an np array
-        stats = getstats(stream)
-        results = np.append(results, round(stats.average, 2))
-        # Count how many of the days have an average timing quality below the
-        # threshold
+    # The daily averages of all the days are computed at once
+    statistics = daily_soh_statistics(
+        get_list_of_data_from_list_of_streams(list_of_streams))
+    results = np.round(statistics.average, 2)
     plot_timing_quality(network=network,
                         station=station,
                         startdate=startdate,
@@ -283,12 +264,11 @@ def check_timing_quality(list_of_streams: List[obspy.Stream],
                         threshold=threshold,
                         location=location
                         )
-    for index, value in enumerate(results):
-        if value < threshold:
-            passed = False
-            details.append(
-                f'Timing quality below {threshold}% on \
-{startdate + timedelta(days=index)}')
+    # Find the days with an average timing quality below the threshold
+    failed_days = np.flatnonzero(results < threshold)
+    passed = failed_days.size == 0
+    details = [f'Timing quality below {threshold}% on \
+{startdate + timedelta(days=int(index))}' for index in failed_days]
 
     return MetricResults(passed=passed,
                          details=details,
@@ -322,25 +302,18 @@ def check_clock_locked(
         list
             List of the results for the metric
     '''
-    results: Any = np.array([])
-    # Loop through the streams
-    for stream in list_of_streams:
-        # Count how many times the clock is locked for a day
-        stream_data = get_stream_data_of_merged_streams(stream)
-        values = ma.array(stream_data)
-        count = np.count_nonzero(values < 2)
-        results = np.append(results, count)
-    results = results.tolist()
+    # Count how many times the clock is locked for every day at once
+    statistics = daily_soh_statistics(
+        get_list_of_data_from_list_of_streams(list_of_streams))
+    counts = statistics.count_below(2)
     # Check each day to see if the clock is locked enough times
-    passed = True
-    details = []
-    for index, numberOfTimesLocked in enumerate(results):
-        testdate = startdate + timedelta(days=index)
-        if numberOfTimesLocked > threshold:
-            details.append(f'Clock unlocked {int(numberOfTimesLocked)} times on {testdate}. \
-[threshold: {threshold}]')
-            passed = False
-    return MetricResults(passed=passed, details=details, results=results)
+    failed_days = np.flatnonzero(counts > threshold)
+    passed = failed_days.size == 0
+    details = [f'Clock unlocked {int(counts[index])} times on \
+{startdate + timedelta(days=int(index))}. [threshold: {threshold}]'
+               for index in failed_days]
+    return MetricResults(passed=passed, details=details,
+                         results=counts.astype(np.float64).tolist())
 
 
 def check_clock_offset(list_of_streams: List[obspy.Stream],
@@ -378,19 +351,15 @@ def check_clock_offset(list_of_streams: List[obspy.Stream],
         List of the results for the metric
     '''
 
-    passed = True
-    offsets = []
-    details = []
-    for stream in list_of_streams:
-        stats = getstats(stream)
-        offsets.append(stats.average)
-    for index, clockPhaseError in enumerate(offsets):
-        testdate = startdate + timedelta(index)
-        if clockPhaseError > threshold:
-            passed = False
-            details.append(f'Average clock phase error too high on \
-{testdate}')
-    return MetricResults(passed=passed, details=details, results=offsets)
+    statistics = daily_soh_statistics(
+        get_list_of_data_from_list_of_streams(list_of_streams))
+    offsets = statistics.average
+    failed_days = np.flatnonzero(offsets > threshold)
+    passed = failed_days.size == 0
+    details = [f'Average clock phase error too high on \
+{startdate + timedelta(days=int(index))}' for index in failed_days]
+    return MetricResults(passed=passed, details=details,
+                         results=offsets.tolist())
 
 
 def check_number_of_satellites(
@@ -418,18 +387,21 @@ def check_number_of_satellites(
             List of the results for the metric
     '''
 
-    passed = True
-    details = []
-    results = []
-
-    for stream in list_of_streams:
-        stats = getstats(stream)
-        results.append(int(stats.average))
-
-    for index, numberOfSatellites in enumerate(results):
-        testdate = startdate + timedelta(days=index)
-        if numberOfSatellites < threshold:
-            passed = False
-            details.append(f'Average number of GNS satellites used was {numberOfSatellites} on \
-{testdate} [threshold: {threshold}]')
-    return MetricResults(passed=passed, details=details, results=results)
+    statistics = daily_soh_statistics(
+        get_list_of_data_from_list_of_streams(list_of_streams))
+    # The daily averages are truncated to whole satellites. The days without
+    # any sample have no average, and fail with a None value
+    no_data = np.isnan(statistics.average)
+    results = np.trunc(np.where(no_data, 0, statistics.average)).astype(
+        np.int64)
+    failed_days = np.flatnonzero(no_data | (results < threshold))
+    passed = failed_days.size == 0
+    details = [f'No GNS satellites data on \
+{startdate + timedelta(days=int(index))}' if no_data[index]
+               else f'Average number of GNS satellites used was \
+{results[index]} on {startdate + timedelta(days=int(index))} \
+[threshold: {threshold}]'
+               for index in failed_days]
+    return MetricResults(passed=passed, details=details,
+                         results=[None if no_data[index] else int(result)
+                                  for index, result in enumerate(results)])
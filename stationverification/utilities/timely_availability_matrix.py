@@ -0,0 +1,171 @@
+'''
+This module computes the timely availability of every channel of a station
+for every day of a validation period, as a single days by channels matrix.
+The start time of each latency is binned into its day and grouped with its
+channel in one pass over the combined latency DataFrame, for any set of
+channels.
+
+Classes
+-------
+TimelyAvailabilityMatrix:
+    The timely availability of each channel for each day
+
+Functions
+---------
+timely_availability_matrix:
+    Computes the timely availability matrix of a latency DataFrame
+channel_order:
+    Sort key ordering channels by band and instrument, then N, E, Z
+'''
+from datetime import date
+from typing import List, Optional
+
+import numpy as np
+from pandas.core.frame import DataFrame
+
+from stationverification.utilities.assemble_latency_dataframes import \
+    latency_start_times
+from stationverification.utilities.latency_statistics import \
+    valid_latency_rows
+from stationverification.utilities.latency_table import latency_weights
+
+# Components of the channels in the order they are plotted, other components
+# come after them in alphabetical order
+COMPONENT_ORDER = 'NEZ'
+
+
+class TimelyAvailabilityMatrix(dict):
+    '''
+    The timely availability of each channel of a station for each day
+
+    Properties
+    ----------
+    days: numpy array of datetime64[D]
+        The days of the rows of the matrix
+    channels: list
+        The channel codes of the columns of the matrix
+    percentages: numpy array of float64
+        The percentage of packets of each day (row) and channel (column)
+        with a latency at or below the timely threshold, rounded to one
+        decimal. 0 for the days without any latency for the channel
+    counts: numpy array of int64
+        The number of packets of each day and channel
+
+    Functions
+    ---------
+    channel:
+        Returns the daily timely availability of a channel
+    '''
+    @property
+    def days(self) -> np.ndarray:
+        return self["days"]
+
+    @property
+    def channels(self) -> List[str]:
+        return self["channels"]
+
+    @property
+    def percentages(self) -> np.ndarray:
+        return self["percentages"]
+
+    @property
+    def counts(self) -> np.ndarray:
+        return self["counts"]
+
+    def channel(self, channel: str) -> np.ndarray:
+        '''
+        Get the timely availability percentage of each day for a channel
+        '''
+        return self.percentages[:, self.channels.index(channel)]
+
+
+def timely_availability_matrix(
+    latencies: DataFrame,
+    threshold: float,
+    startdate: Optional[date] = None,
+    enddate: Optional[date] = None
+) -> TimelyAvailabilityMatrix:
+    '''
+    Compute the timely availability of each channel for each day
+
+    Parameters
+    ----------
+    latencies: DataFrame
+        A DataFrame with the 'channel', 'startTime' and 'data_latency'
+        columns, and optionally a 'weight' column
+    threshold: float
+        The maximum latency in seconds of a timely packet
+    startdate: date, optional
+        The first day of the matrix. Defaults to the day of the earliest
+        latency
+    enddate: date, optional
+        The day after the last day of the matrix. Defaults to the day after
+        the latest latency
+
+    Returns
+    -------
+    TimelyAvailabilityMatrix:
+        The timely availability of each day and channel
+    '''
+    start_days = latency_start_times(latencies).astype('datetime64[D]')
+    if startdate is not None:
+        first_day = np.datetime64(startdate, 'D')
+    elif len(start_days):
+        first_day = start_days.min()
+    else:
+        first_day = np.datetime64('NaT', 'D')
+    if enddate is not None:
+        end_day = np.datetime64(enddate, 'D')
+    elif len(start_days):
+        end_day = start_days.max() + np.timedelta64(1, 'D')
+    else:
+        end_day = first_day
+    number_of_days = max(int((end_day - first_day).astype(np.int64)), 0) \
+        if not np.isnat(first_day) else 0
+    days = first_day + np.arange(number_of_days).astype('timedelta64[D]')
+
+    # Rows without a latency or a channel are left out of the matrix
+    valid = valid_latency_rows(latencies)
+    channels, channel_codes = np.unique(
+        np.asarray(latencies['channel'].values[valid], dtype=str),
+        return_inverse=True)
+    order = sorted(range(len(channels)),
+                   key=lambda code: channel_order(channels[code]))
+    columns = np.empty(len(channels), dtype=np.int64)
+    columns[order] = np.arange(len(channels))
+    number_of_channels = len(channels)
+
+    # Latencies outside of the days of the matrix are left out
+    rows = (start_days[valid] - first_day).astype(np.int64)
+    inside = (rows >= 0) & (rows < number_of_days)
+    cells = rows[inside] * number_of_channels + \
+        columns[channel_codes[inside]]
+    weights = latency_weights(latencies)[valid][inside]
+    timely = np.asarray(latencies['data_latency'].values,
+                        dtype=np.float64)[valid][inside] <= threshold
+    size = number_of_days * number_of_channels
+    counts = np.bincount(cells, weights=weights, minlength=size)
+    timely_counts = np.bincount(cells, weights=weights * timely,
+                                minlength=size)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        percentages = np.where(
+            counts > 0, np.round(timely_counts / counts * 100, 1), 0.0)
+
+    return TimelyAvailabilityMatrix(
+        days=days,
+        channels=[str(channels[code]) for code in order],
+        percentages=percentages.reshape(number_of_days, number_of_channels),
+        counts=counts.astype(np.int64).reshape(number_of_days,
+                                               number_of_channels))
+
+
+def channel_order(channel: str) -> tuple:
+    '''
+    Sort key of a channel code, grouping the channels by band and instrument
+    codes and ordering their components N, E, Z, then alphabetically
+    '''
+    component = channel[-1:]
+    position = COMPONENT_ORDER.find(component)
+    if position < 0:
+        position = len(COMPONENT_ORDER)
+    return (channel[:-1], position, component)
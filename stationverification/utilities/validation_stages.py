@@ -0,0 +1,391 @@
+'''
+This module defines the stages the validations are made of, and the graphs
+of stages of stationverification, stationverificationlatency and
+stationverificationCN, run with run_pipeline. The graph of a station
+validation is:
+
+    latency, ispaq and soh       run at once
+    metrics                      after ispaq
+    metric_plots                 after metrics
+    timely_availability          after latency and metrics
+    report                       after latency, metrics and soh
+    cleanup, then upload to S3   after all the other stages
+
+Functions
+---------
+station_validation_stages:
+    Returns the stages of a station validation
+psd_validation_stages:
+    Returns the stages of a validation producing the PSD plots only
+latency_validation_stages:
+    Returns the stages of a latency validation
+station_validation_stages_CN:
+    Returns the stages of a validation of a CN station
+latency_results:
+    Generates the latency results and plots of a station
+ispaq_metrics:
+    Runs ISPAQ over the validation period
+plot_station_metrics:
+    Plots the metrics of each channel of a station
+'''
+import logging
+import queue
+
+from datetime import date
+from typing import Any, List, Optional, Tuple
+
+from pandas.core.frame import DataFrame
+
+from stationverification.utilities.cleanup_directory import \
+    cleanup_directory, cleanup_directory_after_latency_call, \
+    get_validation_output_directory
+from stationverification.utilities.fetch_arguments import UserInput
+from stationverification.utilities.fetch_arguments_CN import \
+    UserInput as UserInputCN
+from stationverification.utilities.generate_latency_results import \
+    generate_latency_results
+from stationverification.utilities.generate_plots import (
+    PlotParameters, plot_metrics_of_channels)
+from stationverification.utilities.generate_report import \
+    StationMetricData, gather_stats, report
+from stationverification.utilities.generate_soh_results import \
+    generate_soh_results
+from stationverification.utilities.handle_running_ispaq_command_CN import \
+    handle_running_ispaq_command_CN
+from stationverification.utilities.pipeline import Stage
+from stationverification.utilities.run_ispaq_in_chunks import \
+    run_ispaq_in_chunks
+from stationverification.utilities.scan_miniseed_headers import \
+    miniseed_data_period
+from stationverification.utilities.timely_availability_plot import \
+    timely_availability_plot
+from stationverification.utilities.upload_results_to_s3 import \
+    upload_results_to_s3
+
+
+def station_validation_stages(user_inputs: UserInput) -> List[Stage]:
+    '''
+    Returns the stages of a station validation: the latency results, ISPAQ
+    and the SOH results, then the metric plots, the timely availability plot
+    and the report, then the cleanup and the upload to S3
+    '''
+    timely_threshold = user_inputs.thresholds.getfloat(
+        'thresholds', 'data_timeliness', fallback=3)
+    # Read the files generated from ISPAQ and populate the dictionary object
+    if user_inputs.location is None:
+        snlc = f'{user_inputs.network}.{user_inputs.station}.x.Hxx'
+    else:
+        snlc = f'{user_inputs.network}.\
+{user_inputs.station}.{user_inputs.location}.Hxx'
+    return [
+        Stage(name='latency',
+              function=latency_results,
+              outputs=['latencies', 'latency_summary'],
+              arguments=dict(
+                  typeofinstrument=user_inputs.typeofinstrument,
+                  network=user_inputs.network,
+                  station=user_inputs.station,
+                  startdate=user_inputs.startdate,
+                  enddate=user_inputs.enddate,
+                  path=user_inputs.latencyFiles,
+                  timely_threshold=timely_threshold,
+                  location=user_inputs.location)),
+        Stage(name='ispaq',
+              function=ispaq_metrics,
+              outputs=['metric_start', 'metric_stop'],
+              arguments=dict(
+                  scan_miniseed_headers=True,
+                  **_ispaq_arguments(user_inputs))),
+        Stage(name='soh',
+              function=generate_soh_results,
+              outputs=['soh_results'],
+              arguments=dict(
+                  typeofinstrument=user_inputs.typeofinstrument,
+                  network=user_inputs.network,
+                  station=user_inputs.station,
+                  location=user_inputs.location,
+                  startdate=user_inputs.startdate,
+                  enddate=user_inputs.enddate,
+                  soh_directory=user_inputs.soharchive,
+                  miniseed_directory=user_inputs.miniseedarchive,
+                  thresholds=user_inputs.thresholds,
+                  timingSource=user_inputs.timingSource)),
+        _metrics_stage(user_inputs, snlc),
+        _metric_plots_stage(user_inputs),
+        Stage(name='timely_availability',
+              function=timely_availability_plot,
+              inputs={'latencies': 'latencies',
+                      'stationMetricData': 'station_metric_data'},
+              arguments=dict(
+                  station=user_inputs.station,
+                  startdate=user_inputs.startdate,
+                  enddate=user_inputs.enddate,
+                  network=user_inputs.network,
+                  timely_threshold=timely_threshold,
+                  location=user_inputs.location)),
+        Stage(name='report',
+              function=report,
+              inputs={
+                  'combined_latency_dataframe_for_all_days': 'latencies',
+                  'latency_summary': 'latency_summary',
+                  'stationmetricdata': 'station_metric_data',
+                  'soh_results': 'soh_results',
+                  'metric_start': 'metric_start'},
+              arguments=dict(
+                  typeofinstrument=user_inputs.typeofinstrument,
+                  network=user_inputs.network,
+                  station=user_inputs.station,
+                  location=user_inputs.location,
+                  start=user_inputs.startdate,
+                  end=user_inputs.enddate,
+                  thresholds=user_inputs.thresholds,
+                  soharchive=user_inputs.soharchive,
+                  miniseed_directory=user_inputs.miniseedarchive,
+                  timingSource=user_inputs.timingSource)),
+        _cleanup_stage(user_inputs, after=[
+            'latency', 'soh', 'metric_plots', 'timely_availability',
+            'report']),
+    ] + _upload_stages(user_inputs)
+
+
+def psd_validation_stages(user_inputs: UserInput) -> List[Stage]:
+    '''
+    Returns the stages of a validation producing the PSD plots only, ISPAQ
+    with the eew_only_psd metrics then the cleanup
+    '''
+    arguments = _ispaq_arguments(user_inputs)
+    arguments.update(metrics='eew_only_psd')
+    return [
+        Stage(name='ispaq',
+              function=ispaq_metrics,
+              outputs=['metric_start', 'metric_stop'],
+              arguments=arguments),
+        _cleanup_stage(user_inputs, after=['ispaq']),
+    ]
+
+
+def latency_validation_stages(user_inputs: UserInput) -> List[Stage]:
+    '''
+    Returns the stages of a latency validation, the latency results then the
+    cleanup and the upload to S3
+    '''
+    return [
+        Stage(name='latency',
+              function=latency_results,
+              outputs=['latencies', 'latency_summary'],
+              arguments=dict(
+                  typeofinstrument=user_inputs.typeofinstrument,
+                  network=user_inputs.network,
+                  station=user_inputs.station,
+                  startdate=user_inputs.startdate,
+                  enddate=user_inputs.enddate,
+                  path=user_inputs.latencyFiles,
+                  timely_threshold=user_inputs.thresholds.getfloat(
+                      'thresholds', 'data_timeliness', fallback=3))),
+        Stage(name='cleanup',
+              function=cleanup_directory_after_latency_call,
+              after=['latency'],
+              arguments=dict(
+                  startdate=user_inputs.startdate,
+                  enddate=user_inputs.enddate,
+                  network=user_inputs.network,
+                  station=user_inputs.station,
+                  outputdir=user_inputs.outputdir)),
+    ] + _upload_stages(user_inputs)
+
+
+def station_validation_stages_CN(user_inputs: UserInputCN) -> List[Stage]:
+    '''
+    Returns the stages of a validation of a CN station, ISPAQ with the
+    channels of every band, then the metric plots and the cleanup
+    '''
+    if user_inputs.location is None:
+        snlc = f'{user_inputs.network}.{user_inputs.station}.x.xxx'
+    else:
+        snlc = f'{user_inputs.network}.\
+{user_inputs.station}.{user_inputs.location}.xxx'
+    return [
+        Stage(name='ispaq',
+              function=ispaq_metrics,
+              outputs=['metric_start', 'metric_stop'],
+              arguments=dict(
+                  ispaqloc=user_inputs.ispaqloc,
+                  metrics=user_inputs.metrics,
+                  startdate=user_inputs.startdate,
+                  enddate=user_inputs.enddate,
+                  pfile=user_inputs.pfile,
+                  pdfinterval=user_inputs.pdfinterval,
+                  miniseedarchive=user_inputs.miniseedarchive,
+                  network=user_inputs.network,
+                  station=user_inputs.station,
+                  snlc=f'{user_inputs.network}.{user_inputs.station}.*.***',
+                  ispaq_command=handle_running_ispaq_command_CN)),
+        _metrics_stage(user_inputs, snlc),
+        _metric_plots_stage(user_inputs),
+        Stage(name='cleanup',
+              function=cleanup_directory,
+              after=['metric_plots'],
+              arguments=dict(
+                  network=user_inputs.network,
+                  station=user_inputs.station,
+                  startdate=user_inputs.startdate,
+                  enddate=user_inputs.enddate,
+                  outputdir=user_inputs.outputdir)),
+    ]
+
+
+def latency_results(typeofinstrument: str,
+                    network: str,
+                    station: str,
+                    startdate: date,
+                    enddate: date,
+                    path: str,
+                    timely_threshold: float,
+                    location: Optional[str] = None) \
+        -> Tuple[Optional[DataFrame], Optional[dict]]:
+    '''
+    Generate the latency results and plots of a station
+
+    Returns
+    -------
+    tuple:
+        The combined latency dataframe for all days and the latency
+        summary, both None if no latency files were found
+    '''
+    latency_queue: queue.Queue = queue.Queue()
+    generate_latency_results(typeofinstrument=typeofinstrument,
+                             network=network,
+                             station=station,
+                             startdate=startdate,
+                             enddate=enddate,
+                             path=path,
+                             timely_threshold=timely_threshold,
+                             location=location,
+                             queue=latency_queue)
+    latencies, latency_summary = latency_queue.get()
+    return latencies, latency_summary
+
+
+def ispaq_metrics(scan_miniseed_headers: bool = False,
+                  **arguments) -> Tuple[date, date]:
+    '''
+    Run ISPAQ over the validation period with run_ispaq_in_chunks, called
+    with the keyword arguments
+
+    Parameters
+    ----------
+    scan_miniseed_headers: bool, optional
+        Whether to run ISPAQ over the days with data only, found from the
+        miniSEED headers. ISPAQ is skipped if there is no data.
+
+    Returns
+    -------
+    tuple:
+        The first day of the metrics and the day after their last day
+    '''
+    period = (arguments['startdate'], arguments['enddate'])
+    if scan_miniseed_headers:
+        data_period = miniseed_data_period(
+            miniseed_directory=arguments['miniseedarchive'],
+            network=arguments['network'],
+            station=arguments['station'],
+            startdate=arguments['startdate'],
+            enddate=arguments['enddate'],
+            location=arguments.get('location'))
+        if data_period is None:
+            logging.warning("No miniSEED data found. Skipping ISPAQ..")
+            return period
+        period = data_period
+        arguments.update(startdate=period[0], enddate=period[1])
+    logging.info("Generating ISPAQ results..")
+    run_ispaq_in_chunks(**arguments)
+    logging.info("Finished generating ISPAQ results")
+    return period
+
+
+def plot_station_metrics(network: str,
+                         station: str,
+                         location: Optional[str],
+                         stationMetricData: StationMetricData,
+                         start: date,
+                         stop: date):
+    '''
+    Plot the metrics of each channel of a station
+    '''
+    logging.info("Plotting metrics..")
+    plot_metrics_of_channels([
+        PlotParameters(network=network,
+                       station=station,
+                       location=location,
+                       channel=channel,
+                       stationMetricData=stationMetricData,
+                       start=start,
+                       stop=stop)
+        for channel in stationMetricData.get_channels(
+            network=network,
+            station=station)])
+
+
+def _ispaq_arguments(user_inputs: UserInput) -> dict:
+    return dict(ispaqloc=user_inputs.ispaqloc,
+                metrics=user_inputs.metrics,
+                startdate=user_inputs.startdate,
+                enddate=user_inputs.enddate,
+                pfile=user_inputs.pfile,
+                pdfinterval=user_inputs.pdfinterval,
+                miniseedarchive=user_inputs.miniseedarchive,
+                network=user_inputs.network,
+                station=user_inputs.station,
+                location=user_inputs.location,
+                station_url=user_inputs.station_url)
+
+
+def _metrics_stage(user_inputs: Any, snlc: str) -> Stage:
+    return Stage(name='metrics',
+                 function=gather_stats,
+                 inputs={'start': 'metric_start', 'stop': 'metric_stop'},
+                 outputs=['station_metric_data'],
+                 arguments=dict(snlc=snlc, metrics=user_inputs.metrics,
+                                pfile=user_inputs.pfile))
+
+
+def _metric_plots_stage(user_inputs: Any) -> Stage:
+    return Stage(name='metric_plots',
+                 function=plot_station_metrics,
+                 inputs={'stationMetricData': 'station_metric_data',
+                         'start': 'metric_start',
+                         'stop': 'metric_stop'},
+                 arguments=dict(network=user_inputs.network,
+                                station=user_inputs.station,
+                                location=user_inputs.location))
+
+
+def _cleanup_stage(user_inputs: UserInput, after: List[str]) -> Stage:
+    # Delete temporary files and links and package the output in a tarball
+    return Stage(name='cleanup',
+                 function=cleanup_directory,
+                 after=after,
+                 arguments=dict(network=user_inputs.network,
+                                station=user_inputs.station,
+                                startdate=user_inputs.startdate,
+                                enddate=user_inputs.enddate,
+                                outputdir=user_inputs.outputdir,
+                                instrumentGain=user_inputs.instrument_gain))
+
+
+def _upload_stages(user_inputs: UserInput) -> List[Stage]:
+    if user_inputs.uploadresultstos3 is not True:
+        return []
+    validation_output_directory = get_validation_output_directory(
+        network=user_inputs.network,
+        station=user_inputs.station,
+        startdate=user_inputs.startdate,
+        enddate=user_inputs.enddate,
+        outputdir=user_inputs.outputdir)
+    return [Stage(name='upload',
+                  function=upload_results_to_s3,
+                  after=['cleanup'],
+                  arguments=dict(
+                      path_of_folder_to_upload=validation_output_directory,
+                      bucketName=user_inputs.bucketName,
+                      s3directory=user_inputs.s3directory))]
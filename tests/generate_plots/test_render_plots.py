@@ -0,0 +1,32 @@
+import os
+
+import matplotlib.pyplot as plt
+from matplotlib.figure import Figure
+
+from stationverification.utilities.render_plots import PlotJob, render_plots
+
+
+def line_plot(filename: str, values: list):
+    figure = Figure()
+    axes = figure.add_subplot(111)
+    axes.plot(values)
+    figure.savefig(filename)
+
+
+def test_render_plots(tmp_path):
+    filenames = [str(tmp_path / f'plot_{index}.png') for index in range(4)]
+    figures_before = plt.get_fignums()
+    render_plots([PlotJob(render=line_plot, arguments=dict(
+        filename=filename, values=[index, index + 1]))
+        for index, filename in enumerate(filenames)], workers=2)
+    assert all(os.path.getsize(filename) > 0 for filename in filenames)
+    # The figures are not registered with pyplot
+    assert plt.get_fignums() == figures_before
+
+
+def test_render_plots_in_process(tmp_path):
+    filename = str(tmp_path / 'plot.png')
+    render_plots([PlotJob(render=line_plot, arguments=dict(
+        filename=filename, values=[1, 2]))], workers=1)
+    assert os.path.exists(filename)
+    render_plots([])
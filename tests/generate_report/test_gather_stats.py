@@ -13,3 +13,43 @@ def test_gather_stats(gather_stats_parameters):
     assert 'QCC02' in smd.get_stations('QW')
     assert 'pct_above_nhnm' in smd.get_metricNames()
     assert 'num_gaps' in smd.get_metricNames()
+
+
+def test_select_station(gather_stats_parameters):
+    smd = gather_stats(
+        start=gather_stats_parameters.startdate,
+        stop=gather_stats_parameters.enddate,
+        snlc=gather_stats_parameters.snlc,
+        metrics=gather_stats_parameters.metrics,
+        ispaq_output_directory=gather_stats_parameters.ispaq_output_directory,
+    )
+    station_smd = smd.select(network='QW', station='QCC02')
+    assert station_smd.get_stations('QW') == ['QCC02']
+    assert sorted(station_smd.get_metricNames()) == sorted(smd.get_metricNames())
+    assert station_smd.get_values(metric='num_gaps', channel='HNZ') == \
+        smd.get_values(metric='num_gaps', network='QW', station='QCC02', channel='HNZ')
+    assert smd.select(network='QW', station='QCC01').results.empty
+
+
+def test_get_values_matches_results(gather_stats_parameters):
+    smd = gather_stats(
+        start=gather_stats_parameters.startdate,
+        stop=gather_stats_parameters.enddate,
+        snlc=gather_stats_parameters.snlc,
+        metrics=gather_stats_parameters.metrics,
+        ispaq_output_directory=gather_stats_parameters.ispaq_output_directory,
+    )
+    results = smd.results
+    for metric in smd.get_metricNames():
+        metric_results = results[results.metricName == metric]
+        assert smd.get_values(metric=metric) == list(metric_results.value)
+        for channel in smd.get_channels(network='QW', station='QCC02'):
+            channel_results = metric_results[
+                metric_results.channel == channel]
+            assert smd.get_values(metric=metric, channel=channel) == \
+                list(channel_results.value)
+            assert smd.get_values(metric=metric, network='QW',
+                                  station='QCC02', channel=channel) == \
+                list(channel_results.value)
+    assert smd.get_values(metric='num_gaps', station='QCC01') == []
+    assert smd.get_values(metric='unknown_metric') == []
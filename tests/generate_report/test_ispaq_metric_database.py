@@ -0,0 +1,71 @@
+# flake8:noqa
+import sqlite3
+from datetime import date
+
+import pandas as pd
+
+from stationverification.utilities.generate_report import gather_stats
+from stationverification.utilities.ispaq_metric_database import merge_ispaq_database
+
+CSV_DIRECTORY = 'tests/data/ispaq_outputs/csv'
+
+
+def write_run_database(path, metrics):
+    # Writes the metrics the way ISPAQ does with the db output, one table per
+    # metric
+    with sqlite3.connect(path) as connection:
+        for metric, rows in metrics.groupby('metricName'):
+            connection.execute(f'CREATE TABLE "{metric}" (target TEXT, start TEXT, end TEXT, value, lddate TEXT)')
+            connection.executemany(f'INSERT INTO "{metric}" VALUES (?, ?, ?, ?, ?)',
+                                   [(row.target, row.start, row.end, row.value, '2022-04-04T00:00:00')
+                                    for row in rows.itertuples()])
+
+
+def test_gather_stats_from_database(tmp_path):
+    metrics = pd.concat([pd.read_csv(f'{CSV_DIRECTORY}/eew_test_QW.QCC02.x.Hxx_2022-04-01_2022-04-03_{suffix}.csv')
+                         for suffix in ('simpleMetrics', 'PSDMetrics')], ignore_index=True)
+    database = str(tmp_path / 'metrics.db')
+    write_run_database(str(tmp_path / 'run.db'), metrics)
+    merge_ispaq_database(source=str(tmp_path / 'run.db'), database=database)
+
+    csv_smd = gather_stats(start=date(2022, 4, 1), stop=date(2022, 4, 4), snlc='QW.QCC02.x.Hxx',
+                           metrics='eew_test', ispaq_output_directory='tests/data/ispaq_outputs', database='')
+    smd = gather_stats(start=date(2022, 4, 1), stop=date(2022, 4, 4), snlc='QW.QCC02.x.Hxx', database=database)
+    assert sorted(smd.get_metricNames()) == sorted(csv_smd.get_metricNames())
+    for metric in csv_smd.get_metricNames():
+        for channel in csv_smd.get_channels('QW', 'QCC02'):
+            assert smd.get_values(metric, 'QW', 'QCC02', channel) == \
+                csv_smd.get_values(metric, 'QW', 'QCC02', channel)
+
+    # The metrics of a day computed again replace the previous ones, and the
+    # other days are kept
+    rerun = metrics[metrics['start'].str.startswith('2022-04-02')].copy()
+    rerun['value'] = 1234
+    write_run_database(str(tmp_path / 'rerun.db'), rerun)
+    merge_ispaq_database(source=str(tmp_path / 'rerun.db'), database=database)
+    smd = gather_stats(start=date(2022, 4, 1), stop=date(2022, 4, 4), snlc='QW.QCC02.x.Hxx', database=database)
+    assert smd.get_values('num_gaps', 'QW', 'QCC02', 'HNZ') == [0, 1234, 0]
+    assert gather_stats(start=date(2022, 4, 2), stop=date(2022, 4, 3), snlc='QW.QCC02.x.Hxx',
+                        database=database).get_values('num_gaps', 'QW', 'QCC02', 'HNZ') == [1234]
+    with sqlite3.connect(database) as connection:
+        assert connection.execute('SELECT name FROM sqlite_master WHERE type = \'index\' '
+                                  'AND tbl_name = \'num_gaps\'').fetchall() == [('num_gaps_target_start',)]
+
+
+def test_gather_stats_from_database_reads_the_metric_set(tmp_path):
+    metrics = pd.read_csv(f'{CSV_DIRECTORY}/eew_test_QW.QCC02.x.Hxx_2022-04-01_2022-04-03_simpleMetrics.csv')
+    # An earlier run of another metric set left sample_unique in the database
+    other_run = metrics[metrics['metricName'] == 'num_gaps'].copy()
+    other_run['metricName'] = 'sample_unique'
+    database = str(tmp_path / 'metrics.db')
+    write_run_database(str(tmp_path / 'run.db'), pd.concat([metrics, other_run], ignore_index=True))
+    merge_ispaq_database(source=str(tmp_path / 'run.db'), database=database)
+
+    smd = gather_stats(start=date(2022, 4, 1), stop=date(2022, 4, 4), snlc='QW.QCC02.x.Hxx', metrics='eew_test',
+                       database=database, pfile='stationverification/data/eew_preferences.txt')
+    assert 'sample_unique' not in smd.get_metricNames()
+    assert sorted(smd.get_metricNames()) == sorted(metrics['metricName'].unique())
+    smd = gather_stats(start=date(2022, 4, 1), stop=date(2022, 4, 4), snlc='QW.QCC02.x.Hxx', metrics='eew_only_psd',
+                       database=database, pfile='stationverification/data/eew_preferences.txt')
+    assert 'sample_unique' in smd.get_metricNames()
+    assert 'num_gaps' not in smd.get_metricNames()
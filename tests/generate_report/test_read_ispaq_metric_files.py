@@ -0,0 +1,56 @@
+import os
+import shutil
+
+import pandas as pd
+
+from stationverification.utilities.read_ispaq_metric_files import \
+    CACHE_SUFFIX, read_ispaq_metric_files
+
+CSV_DIRECTORY = 'tests/data/ispaq_outputs/csv'
+
+SIMPLE_METRICS = f'{CSV_DIRECTORY}/eew_test_QW.QCC02.x.Hxx_2022-04-01_2022-04-03_simpleMetrics.csv'  # noqa
+PSD_METRICS = f'{CSV_DIRECTORY}/eew_test_QW.QCC02.x.Hxx_2022-04-01_2022-04-03_PSDMetrics.csv'  # noqa
+
+
+def read_with_target_split(filenames):
+    dataframes = []
+    for filename in filenames:
+        dataframe = pd.read_csv(filename, index_col='start',
+                                parse_dates=['start'])
+        dataframe[['network', 'station', 'location', 'channel',
+                   'quality']] = dataframe['target'].str.split(
+                       '.', expand=True)
+        dataframe.drop(['end', 'target', 'location', 'quality'], axis=1,
+                       inplace=True)
+        dataframes.append(dataframe)
+    return pd.concat(dataframes, sort=False).dropna(subset=['value'])
+
+
+def test_read_ispaq_metric_files():
+    filenames = [SIMPLE_METRICS, PSD_METRICS]
+    metrics = read_ispaq_metric_files(filenames, cache=False)
+    expected = read_with_target_split(filenames)
+    assert list(metrics.columns) == list(expected.columns)
+    assert metrics.index.equals(expected.index)
+    for column in metrics.columns:
+        assert list(metrics[column]) == list(expected[column])
+
+
+def test_read_ispaq_metric_files_cache(tmp_path):
+    filename = str(tmp_path / os.path.basename(SIMPLE_METRICS))
+    shutil.copy(SIMPLE_METRICS, filename)
+    metrics = read_ispaq_metric_files([filename], cache=True)
+    assert os.path.exists(f'{filename}{CACHE_SUFFIX}')
+    assert read_ispaq_metric_files([filename], cache=True).equals(metrics)
+
+    # The cache is not used anymore once the csv file changes
+    with open(filename, 'a') as csv:
+        csv.write('QW.QCC02..HNZ.D,2022-04-03T00:00:00,'
+                  '2022-04-04T00:00:00,num_gaps,5\n')
+    updated_metrics = read_ispaq_metric_files([filename], cache=True)
+    assert len(updated_metrics) == len(metrics) + 1
+    assert updated_metrics['value'].iloc[-1] == 5
+
+
+def test_read_ispaq_metric_files_without_files():
+    assert read_ispaq_metric_files([], cache=False).empty
@@ -0,0 +1,54 @@
+# flake8:noqa
+import os
+import shutil
+from datetime import date
+
+import numpy as np
+import pandas as pd
+from stationverification.utilities.assemble_latency_dataframes import iterate_daily_latency_dataframes, \
+    latency_day, latency_start_times
+from stationverification.utilities.get_latencies_from_guralp import get_latencies_from_guralp
+from stationverification.utilities.read_fortimus_latency_file import read_fortimus_latency_file
+
+
+def test_get_latencies_from_guralp(latency_test_files_guralp):
+    combined_latency_dataframe, array_of_daily_latency_dataframes = get_latencies_from_guralp(
+        files=latency_test_files_guralp, startdate=date(2022, 3, 1), enddate=date(2022, 3, 3))
+    assert combined_latency_dataframe.data_latency.dtype == np.float32
+    assert combined_latency_dataframe.startTime.dtype == np.dtype('datetime64[ns]')
+    assert combined_latency_dataframe.channel.dtype.name == 'category'
+    assert sorted(combined_latency_dataframe.channel.cat.categories) == ['HNE', 'HNN', 'HNZ']
+    assert len(array_of_daily_latency_dataframes) == 2
+    assert sum(len(day) for day in array_of_daily_latency_dataframes) == len(combined_latency_dataframe)
+    # "=576/100+2.5" is 5.76 seconds of data latency on top of 2.5 seconds of network latency
+    assert combined_latency_dataframe.data_latency.iloc[0] == np.float32(8.26)
+
+
+def test_iterate_daily_latency_dataframes(latency_test_files_guralp, tmp_path):
+    # Laying out the sample files in day directories, as in a latency archive
+    files = []
+    for file in latency_test_files_guralp:
+        day_directory = tmp_path / ('2022/03/01' if file.endswith('_1.csv') else '2022/03/02')
+        day_directory.mkdir(parents=True, exist_ok=True)
+        copied_file = day_directory / os.path.basename(file)
+        shutil.copy(file, copied_file)
+        files.append(str(copied_file))
+    daily_latency_dataframes = list(iterate_daily_latency_dataframes(files, read_fortimus_latency_file))
+    assert len(daily_latency_dataframes) == 2
+    for day, daily_latency_dataframe in zip((date(2022, 3, 1), date(2022, 3, 2)), daily_latency_dataframes):
+        assert sorted(daily_latency_dataframe.channel.unique()) == ['HNE', 'HNN', 'HNZ']
+        assert (daily_latency_dataframe.startTime.dt.date == day).all()
+
+
+def test_latency_start_times():
+    latency_dataframe = pd.DataFrame({
+        'startTime': ['2022-04-01T23:59:59.500Z', '2022-04-02T00:00:00Z']})
+    start_times = latency_start_times(latency_dataframe)
+    assert start_times.dtype == np.dtype('datetime64[ns]')
+    assert list(start_times) == [
+        np.datetime64('2022-04-01T23:59:59.500'),
+        np.datetime64('2022-04-02T00:00:00')]
+    assert latency_day(latency_dataframe) == date(2022, 4, 1)
+
+    latency_dataframe = pd.DataFrame({'startTime': start_times})
+    assert (latency_start_times(latency_dataframe) == start_times).all()
@@ -19,10 +19,13 @@ def test_get_latencies_from_apollo(latency_parameters_nanometrics,
             network=latency_parameters_nanometrics.network,
             station=latency_parameters_nanometrics.station)
 
-    ar = np.array(combined_latency_dataframe_for_all_days_dataframe)
+    # Averaged latencies are stored once, weighted by their number of packets
+    ar = np.repeat(
+        combined_latency_dataframe_for_all_days_dataframe.data_latency.values,
+        combined_latency_dataframe_for_all_days_dataframe.weight.values)
     br = np.array([
         3.5, 1.5, 2.0, 2.0, 6.0, 2.0, 3.0, 3.0, 4.5, 2.6, 3.0, 3.0, 3.0])
-    assert ar.all() == br.all()
+    np.testing.assert_array_almost_equal(np.sort(ar), np.sort(br))
     with pytest.raises(exceptions.LatencyFileError):
         get_latencies_from_apollo(
             files=latency_test_file_nanometrics_bad_file,
@@ -0,0 +1,23 @@
+# flake8:noqa
+import numpy as np
+from stationverification.utilities.get_latencies_from_apollo import get_latency_table_from_apollo_files
+from stationverification.utilities.ingest_apollo_latency_files import ingest_apollo_latency_files
+
+
+def test_ingest_apollo_latency_files(latency_parameters_nanometrics, latency_test_files_nanometrics):
+    serial_latency_table = get_latency_table_from_apollo_files(
+        files=latency_test_files_nanometrics,
+        network=latency_parameters_nanometrics.network,
+        station=latency_parameters_nanometrics.station)
+    for workers in (1, 2):
+        latency_ingestion = ingest_apollo_latency_files(
+            files=latency_test_files_nanometrics,
+            network=latency_parameters_nanometrics.network,
+            station=latency_parameters_nanometrics.station,
+            workers=workers)
+        assert latency_ingestion.total_availability == 26.96
+        latency_table = latency_ingestion.latency_table
+        # The days are merged in the order of the files
+        np.testing.assert_array_equal(latency_table.day_boundaries, serial_latency_table.day_boundaries)
+        np.testing.assert_array_equal(latency_table.data_latency, serial_latency_table.data_latency)
+        np.testing.assert_array_equal(latency_table.startTime, serial_latency_table.startTime)
@@ -0,0 +1,51 @@
+# flake8:noqa
+import numpy as np
+import pandas as pd
+from stationverification.utilities.get_latencies_from_apollo import get_latency_table_from_apollo_files
+from stationverification.utilities.latency import percentbelowthreshold
+from stationverification.utilities.latency_statistics import summarize_latencies
+
+
+def test_summarize_latencies(latency_parameters_nanometrics, latency_test_files_nanometrics):
+    dataframe = get_latency_table_from_apollo_files(
+        files=latency_test_files_nanometrics,
+        network=latency_parameters_nanometrics.network,
+        station=latency_parameters_nanometrics.station).to_dataframe()
+    latency_summary = summarize_latencies(dataframe, timely_threshold=3, percentiles=[0, 50, 95, 100])
+    assert sorted(latency_summary.channels) == ['HNE', 'HNN', 'HNZ']
+    # The statistics match those of the latencies of every packet
+    expanded = dataframe.loc[dataframe.index.repeat(dataframe.weight)]
+    for channel in ['HNE', 'HNN', 'HNZ', None]:
+        latencies = (expanded if channel is None
+                     else expanded[expanded.channel == channel]).data_latency.values.astype(np.float64)
+        statistics = latency_summary.station if channel is None else latency_summary.channel(channel)
+        assert statistics.count == len(latencies)
+        assert np.isclose(statistics.mean, latencies.mean())
+        assert np.isclose(statistics.std, np.std(latencies))
+        assert np.isclose(statistics.timely_percentage, percentbelowthreshold('QCC02', latencies, 3))
+        assert statistics.failed_count == np.count_nonzero(latencies > 3)
+        for percentile, value in statistics.percentiles.items():
+            assert value == np.percentile(latencies, percentile, method='inverted_cdf')
+    np.testing.assert_array_equal(
+        dataframe.data_latency.values[latency_summary.late_rows],
+        expanded.data_latency.values[expanded.data_latency.values > 3])
+
+    # Channels without latencies have empty statistics
+    assert latency_summary.channel('HHZ').count == 0
+    assert np.isnan(latency_summary.channel('HHZ').mean)
+    assert summarize_latencies(dataframe.iloc[:0], timely_threshold=3).station.count == 0
+
+
+def test_summarize_latencies_without_latency_or_channel():
+    dataframe = pd.DataFrame({'channel': ['HNZ', 'HNZ', None, 'HNZ', 'HNE'],
+                              'data_latency': [1.0, np.nan, 10.0, 2.0, 5.0]})
+    latency_summary = summarize_latencies(dataframe, timely_threshold=3, percentiles=[50])
+    # The rows without a latency or a channel are left out
+    assert sorted(latency_summary.channels) == ['HNE', 'HNZ']
+    assert latency_summary.channel('HNZ').count == 2
+    assert latency_summary.channel('HNZ').mean == 1.5
+    assert latency_summary.channel('HNZ').timely_percentage == 100
+    assert latency_summary.station.count == 3
+    assert latency_summary.station.mean == 8 / 3
+    assert latency_summary.station.percentiles == {50.0: 2.0}
+    np.testing.assert_array_equal(latency_summary.late_rows, [4])
@@ -0,0 +1,47 @@
+# flake8:noqa
+import numpy as np
+from stationverification.utilities.get_latencies_from_apollo import get_latency_table_from_apollo_files
+from stationverification.utilities.latency import percentbelowthreshold
+from stationverification.utilities.latency_table import weighted_latency_mean, weighted_latency_std
+
+
+def test_latency_table(latency_parameters_nanometrics, latency_test_files_nanometrics,
+                       latency_test_file_nanometrics_over_3_packets):
+    latency_table = get_latency_table_from_apollo_files(
+        files=latency_test_files_nanometrics,
+        network=latency_parameters_nanometrics.network,
+        station=latency_parameters_nanometrics.station)
+    assert latency_table.number_of_days() == 3
+    assert latency_table.data_latency.dtype == np.float32
+    assert latency_table.startTime.dtype == np.dtype('datetime64[ns]')
+    assert sorted(latency_table.channel.categories) == ['HNE', 'HNN', 'HNZ']
+    # The daily and max latency views share the memory of the whole table
+    for index in range(latency_table.number_of_days()):
+        assert np.shares_memory(latency_table.day(index).data_latency,
+                                latency_table.data_latency)
+        assert np.shares_memory(latency_table.day(index, max_latency_only=True).data_latency,
+                                latency_table.data_latency)
+    assert sum(len(day) for day in latency_table.daily_tables()) == len(latency_table)
+
+    # An interval with 4 packets is stored as its max, its min and its
+    # average, which stands for the 2 remaining packets
+    latency_table = get_latency_table_from_apollo_files(
+        files=latency_test_file_nanometrics_over_3_packets,
+        network=latency_parameters_nanometrics.network,
+        station=latency_parameters_nanometrics.station)
+    dataframe = latency_table.to_dataframe()
+    assert list(dataframe[dataframe.channel == 'HNE'].data_latency) == [3.5, 1.5, 2.0]
+    assert list(dataframe[dataframe.channel == 'HNE'].weight) == [1, 1, 2]
+    assert list(latency_table.day(0, max_latency_only=True).to_dataframe().channel) == ['HNE', 'HNN', 'HNZ']
+
+
+def test_weighted_latency_statistics():
+    latencies = np.array([3.5, 1.5, 2.0, 6.0], dtype=np.float32)
+    weights = np.array([1, 1, 3, 2], dtype=np.int32)
+    # The weighted statistics match those of the latencies of every packet
+    expanded = np.repeat(latencies, weights).astype(np.float64)
+    assert np.isclose(weighted_latency_mean(latencies, weights), expanded.mean())
+    assert np.isclose(weighted_latency_std(latencies, weights), np.std(expanded))
+    assert percentbelowthreshold('QCC02', latencies, 3, weights=weights) == \
+        percentbelowthreshold('QCC02', expanded, 3)
+    assert np.isnan(weighted_latency_mean(latencies[:0], weights[:0]))
@@ -0,0 +1,44 @@
+# flake8:noqa
+import numpy as np
+import pandas as pd
+from stationverification.utilities.read_fortimus_latency_file import decode_fortimus_data_latency, read_fortimus_latency_file
+
+
+def test_decode_fortimus_data_latency():
+    np.testing.assert_allclose(
+        decode_fortimus_data_latency(np.array(['=269/100+6.6', '=5/2+1', '=0/100+2.5'], dtype=object)),
+        [2.69, 2.5, 0.0])
+
+
+def test_read_fortimus_latency_file(latency_test_files_guralp):
+    latency_dataframe = read_fortimus_latency_file(latency_test_files_guralp[0])
+    raw_dataframe = pd.read_csv(latency_test_files_guralp[0])
+    expected_latencies = raw_dataframe['data latency'].str.extract('=(.*)/', expand=False).astype(float) / 100 \
+        + raw_dataframe['network latency']
+    np.testing.assert_allclose(latency_dataframe.data_latency, expected_latencies, rtol=1e-6)
+    assert list(latency_dataframe.startTime) == list(pd.to_datetime(raw_dataframe['timestamp']))
+    assert set(latency_dataframe.network) == {'QW'}
+    assert set(latency_dataframe.station) == {'QCN08'}
+    assert set(latency_dataframe.channel) == {'HNE'}
+
+
+def test_read_empty_fortimus_latency_file():
+    latency_dataframe = read_fortimus_latency_file(
+        'tests/latency/test_data/guralp/archive/latency/2022/03/01/QW_QCN08_0N_HNE_2022_060.csv')
+    assert len(latency_dataframe) == 0
+    assert latency_dataframe.data_latency.dtype == np.float32
+
+
+def test_read_fortimus_latency_file_with_blank_cells(tmp_path):
+    latency_file = tmp_path / 'QW_QCN08_0N_HNE_2022_060.csv'
+    latency_file.write_text('timestamp,channel,network latency,data latency\n'
+                            '2022/03/01 00:00:04.350000,QW.QCN08.0N.HNE,2.5,=576/100+2.5\n'
+                            '2022/03/01 00:00:10.110000,QW.QCN08.0N.HNE,2.4,\n'
+                            '2022/03/01 00:00:16.320000,,2.6,=590/100+2.6\n'
+                            '2022/03/01 00:00:22.540000,QW.QCN08.0N.HNZ,2.3,=bad/100+2.3\n')
+    latency_dataframe = read_fortimus_latency_file(str(latency_file))
+    # The blank or malformed latencies are NaN, and the row without a channel
+    # has no network, station and channel codes
+    np.testing.assert_allclose(latency_dataframe.data_latency, [8.26, np.nan, 8.5, np.nan], rtol=1e-6)
+    assert list(latency_dataframe.channel.astype(object).fillna('')) == ['HNE', 'HNE', '', 'HNZ']
+    assert list(latency_dataframe.station.astype(object).fillna('')) == ['QCN08', 'QCN08', '', 'QCN08']
@@ -0,0 +1,53 @@
+# flake8:noqa
+import json
+
+import pytest
+from stationverification.utilities.exceptions import LatencyFileError
+from stationverification.utilities.get_latencies_from_apollo import parse_apollo_latency_file
+from stationverification.utilities.scan_apollo_latency_file import average_percent_availability_of_entry_text, iterate_apollo_availability_entries
+
+
+def test_iterate_apollo_availability_entries(latency_test_files_nanometrics):
+    for file in latency_test_files_nanometrics:
+        with open(file) as json_latency_file:
+            expected_entries = json.load(json_latency_file)['availability']
+        # Small chunks cut strings and entries at every possible position
+        for chunk_size in (1, 7, 4096):
+            entries = list(iterate_apollo_availability_entries(file, chunk_size=chunk_size))
+            assert [entry_id for entry_id, _ in entries] == [entry['id'] for entry in expected_entries]
+            assert [json.loads(entry_text) for _, entry_text in entries] == expected_entries
+
+
+def test_parse_multi_station_apollo_latency_file(latency_test_files_nanometrics, tmp_path):
+    with open(latency_test_files_nanometrics[0]) as json_latency_file:
+        latency_data = json.load(json_latency_file)
+    other_station = json.loads(json.dumps(latency_data['availability']).replace('QCC02', 'QCC0\\"1'))
+    file = tmp_path / 'QW.2022.091.json'
+    file.write_text(json.dumps({'availability': other_station + latency_data['availability']}))
+
+    # Escaped quotes in the ids are not mistaken for the end of a string, even when cut from their backslash
+    for chunk_size in (1, 3, 4096):
+        assert [entry_id for entry_id, _ in iterate_apollo_availability_entries(str(file), chunk_size=chunk_size)] == \
+            ['QW.QCC0"1.HNE', 'QW.QCC0"1.HNN', 'QW.QCC0"1.HNZ', 'QW.QCC02.HNE', 'QW.QCC02.HNN', 'QW.QCC02.HNZ']
+
+    latency_file = parse_apollo_latency_file(file=str(file), network='QW', station='QCC02')
+    assert [channel[:3] for channel in latency_file.channels] == \
+        [('QW', 'QCC02', 'HNE'), ('QW', 'QCC02', 'HNN'), ('QW', 'QCC02', 'HNZ')]
+    # The availability of the skipped entries is still accounted for
+    assert len(latency_file.channel_percent_availability) == 6
+    assert latency_file.channel_percent_availability[:3] == latency_file.channel_percent_availability[3:]
+
+
+def test_average_percent_availability_of_entry_text():
+    entry_text = json.dumps({'id': 'QW.QCC02.HNE',
+                             'intervals': [{'percentAvailability': 35}, {'percentAvailability': 20.5}]})
+    assert average_percent_availability_of_entry_text(entry_text) == 27.75
+
+
+@pytest.mark.parametrize('content', ['', '{"availability": [{"id": "QW.QCC02.HNE", "intervals": [', '{"other": []}',
+                                     '{"availability": [{"id": "QW.QCC02.HNE"]]}'])
+def test_invalid_apollo_latency_file(content, tmp_path):
+    file = tmp_path / 'QW.QCC02.2022.092.json'
+    file.write_text(content)
+    with pytest.raises(LatencyFileError):
+        list(iterate_apollo_availability_entries(str(file)))
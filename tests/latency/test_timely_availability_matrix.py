@@ -0,0 +1,54 @@
+# flake8:noqa
+from datetime import date
+
+import numpy as np
+import pandas as pd
+from stationverification.utilities.get_latencies_from_apollo import get_latency_table_from_apollo_files
+from stationverification.utilities.timely_availability_matrix import timely_availability_matrix
+
+
+def test_timely_availability_matrix(latency_parameters_nanometrics, latency_test_files_nanometrics):
+    latency_table = get_latency_table_from_apollo_files(
+        files=latency_test_files_nanometrics,
+        network=latency_parameters_nanometrics.network,
+        station=latency_parameters_nanometrics.station)
+    matrix = timely_availability_matrix(latency_table.to_dataframe(), threshold=3)
+    assert matrix.channels == ['HNN', 'HNE', 'HNZ']
+    assert matrix.percentages.shape == (latency_table.number_of_days(), 3)
+    # Each cell matches the share of timely packets of the day and channel
+    for row, day in enumerate(latency_table.daily_dataframes()):
+        assert matrix.days[row] == day.startTime.values[0].astype('datetime64[D]')
+        for column, channel in enumerate(matrix.channels):
+            latencies = day[day.channel == channel]
+            latencies = np.repeat(latencies.data_latency.values, latencies.weight.values)
+            assert matrix.counts[row, column] == len(latencies)
+            assert matrix.percentages[row, column] == \
+                round(float(np.count_nonzero(latencies <= 3) / len(latencies) * 100), 1)
+
+
+def test_timely_availability_matrix_of_any_channels():
+    latencies = pd.DataFrame({
+        'channel': ['HHZ', 'HH1', 'HHZ', 'HH2', 'HHZ'],
+        'startTime': ['2022-04-01T10:00:00.000Z', '2022-04-01T11:00:00.000Z', '2022-04-03T00:00:00.000Z',
+                      '2022-04-03T01:00:00.000Z', '2022-04-05T00:00:00.000Z'],
+        'data_latency': [1.0, 5.0, 2.0, 1.0, 1.0]})
+    matrix = timely_availability_matrix(latencies, threshold=3, startdate=date(2022, 4, 1),
+                                        enddate=date(2022, 4, 4))
+    assert matrix.channels == ['HHZ', 'HH1', 'HH2']
+    # Days without latencies have no timely availability, and latencies
+    # after the period are left out
+    np.testing.assert_array_equal(matrix.percentages, [[100, 0, 0], [0, 0, 0], [100, 0, 100]])
+    assert matrix.counts.sum() == 4
+
+
+def test_timely_availability_matrix_without_latency_or_channel():
+    latencies = pd.DataFrame({
+        'channel': ['HHZ', 'HHZ', None, 'HHZ'],
+        'startTime': ['2022-04-01T10:00:00.000Z', '2022-04-01T11:00:00.000Z', '2022-04-01T12:00:00.000Z',
+                      '2022-04-01T13:00:00.000Z'],
+        'data_latency': [1.0, np.nan, 1.0, 5.0]})
+    matrix = timely_availability_matrix(latencies, threshold=3)
+    # The rows without a latency or a channel are left out
+    assert matrix.channels == ['HHZ']
+    np.testing.assert_array_equal(matrix.counts, [[2]])
+    np.testing.assert_array_equal(matrix.percentages, [[50]])
@@ -1,14 +1,14 @@
 # flake8=noqa
 import subprocess
 from datetime import date, timedelta
+
+import matplotlib
+import numpy as np
 from stationverification.utilities.generate_report import gather_stats
 from stationverification.utilities.get_latency_files import get_latency_files
 
-from stationverification.utilities.timely_availability_plot import timely_availability_plot
+from stationverification.utilities.timely_availability_plot import daily_percent_availability, timely_availability_plot
 from stationverification.utilities.get_latencies_from_apollo import get_latencies_from_apollo
-from stationverification.utilities.\
-    convert_array_of_latency_objects_into_array_of_dataframes \
-    import convert_array_of_latency_objects_into_array_of_dataframes
 
 
 def test_timely_availability_plot(latency_parameters_nanometrics_timely_availability, latency_test_files_timely_availability):
@@ -28,11 +28,8 @@ def test_timely_availability_plot(latency_parameters_nanometrics_timely_availabi
             files=latency_test_files_timely_availability,
             network=latency_parameters_nanometrics_timely_availability.network,
             station=latency_parameters_nanometrics_timely_availability.station)
-    array_of_daily_latency_dataframes = \
-        convert_array_of_latency_objects_into_array_of_dataframes(
-            array_of_latencies=array_of_daily_latency_objects_all_latencies)
     timely_availability_plot(
-        latencies=array_of_daily_latency_dataframes,
+        latencies=combined_latency_dataframe_for_all_days_dataframe,
         stationMetricData=stationMetricData,
         network=latency_parameters_nanometrics_timely_availability.network,
         station=latency_parameters_nanometrics_timely_availability.station,
@@ -40,6 +37,23 @@ def test_timely_availability_plot(latency_parameters_nanometrics_timely_availabi
         enddate=latency_parameters_nanometrics_timely_availability.enddate,
         timely_threshold=latency_parameters_nanometrics_timely_availability.timely_threshold
     )
+    # The plot leaves the global matplotlib settings of other plots alone
+    assert matplotlib.rcParams['font.size'] == matplotlib.rcParamsDefault['font.size']
 
     # subprocess.getoutput(
     #     "rm -rf 'stationvalidation_output'")
+
+
+def test_daily_percent_availability():
+    # ISPAQ ran over the days with data only, the first of the four days
+    # has no metrics
+    stationMetricData = gather_stats(snlc='QW.QCC02.x.Hxx', start=date(2022, 4, 1), stop=date(2022, 4, 4),
+                                     metrics='eew_test', ispaq_output_directory='tests/data/ispaq_outputs/',
+                                     database='')
+    stationMetricData.results = stationMetricData.results[stationMetricData.results.index >= '2022-04-02']
+    days = np.datetime64('2022-04-01') + np.arange(4).astype('timedelta64[D]')
+    percent_availability = daily_percent_availability(stationMetricData=stationMetricData, network='QW',
+                                                      station='QCC02', channel='HNZ', days=days)
+    np.testing.assert_array_equal(
+        percent_availability,
+        [np.nan] + stationMetricData.get_values('percent_availability', 'QW', 'QCC02', 'HNZ') + [np.nan])
@@ -0,0 +1,92 @@
+# flake8: noqa
+import os
+import sys
+import time
+from multiprocessing import Pool, Process
+
+import pytest
+
+from stationverification.utilities.exceptions import ISPAQWorkerError
+from stationverification.utilities.ispaq_worker import run_ispaq_command, serve_ispaq_jobs
+
+# Stands in for run_ispaq.py, writing its arguments and process to the
+# current directory, and exiting with the status given
+FAKE_ISPAQ = f'''#!{sys.executable}
+import os
+import sys
+import time
+
+if __name__ == '__main__':
+    time.sleep(float(sys.argv[2]))
+    with open(f'ispaq_{{sys.argv[1]}}.txt', 'w') as file:
+        file.write(f'{{os.getpid()}} {{os.getppid()}} {{" ".join(sys.argv[1:])}}')
+    sys.exit(int(sys.argv[1]))
+'''
+
+
+def write_fake_ispaq(directory):
+    script = os.path.join(directory, 'run_ispaq.py')
+    with open(script, 'w') as file:
+        file.write(FAKE_ISPAQ)
+    os.chmod(script, 0o755)
+    return script
+
+
+def start_worker(socket_path, script):
+    worker = Process(target=serve_ispaq_jobs, args=(socket_path, script), kwargs=dict(preload=False))
+    worker.start()
+    for _ in range(100):
+        if os.path.exists(socket_path):
+            break
+        time.sleep(0.05)
+    return worker
+
+
+def run_job(arguments):
+    socket_path, cmd, cwd = arguments
+    os.chdir(cwd)
+    return run_ispaq_command(cmd, socket_path=socket_path)
+
+
+def test_run_ispaq_command_in_worker(tmp_path, monkeypatch):
+    script = write_fake_ispaq(str(tmp_path))
+    socket_path = str(tmp_path / 'ispaq.sock')
+    run_directory = tmp_path / 'run'
+    os.makedirs(run_directory)
+    monkeypatch.chdir(run_directory)
+    worker = start_worker(socket_path, script)
+    try:
+        # The jobs run in children of the worker, from the directory of the
+        # caller, and return the exit status of ISPAQ
+        assert run_ispaq_command(f'{script} 0 0 -M eew_test', socket_path=socket_path) == 0
+        pid, parent, arguments = (run_directory / 'ispaq_0.txt').read_text().split(' ', 2)
+        assert int(parent) == worker.pid
+        assert arguments == '0 0 -M eew_test'
+        assert run_ispaq_command(f'{script} 3 0', socket_path=socket_path) == 3
+
+        # Several jobs run at once
+        start = time.time()
+        with Pool(processes=3) as pool:
+            assert pool.map(run_job, [(socket_path, f'{script} {status} 1', str(run_directory))
+                                      for status in (4, 5, 6)]) == [4, 5, 6]
+        assert time.time() - start < 2.5
+    finally:
+        worker.terminate()
+        worker.join()
+    # The worker removes its socket when terminated
+    assert not os.path.exists(socket_path)
+
+    # Without a worker, ISPAQ runs as a subprocess
+    assert run_ispaq_command(f'{script} 7 0', socket_path=socket_path) == 7
+    _, parent, _ = (run_directory / 'ispaq_7.txt').read_text().split(' ', 2)
+    assert int(parent) != worker.pid
+
+
+def test_ispaq_worker_without_ispaq_modules(tmp_path):
+    # The ispaq modules are not next to the fake run_ispaq.py, so the worker
+    # does not start rather than failing every job
+    script = write_fake_ispaq(str(tmp_path))
+    socket_path = str(tmp_path / 'ispaq.sock')
+    with pytest.raises(ISPAQWorkerError, match='Unable to import'):
+        serve_ispaq_jobs(socket_path, script)
+    assert not os.path.exists(socket_path)
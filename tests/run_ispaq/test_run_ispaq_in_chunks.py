@@ -0,0 +1,151 @@
+# flake8: noqa
+import os
+import re
+import shutil
+import sqlite3
+from datetime import date, timedelta
+
+import pytest
+
+from stationverification import ISPAQ_PREF
+from stationverification.utilities.archive_index import get_archive_index
+from stationverification.utilities.generate_report import gather_stats
+from stationverification.utilities.run_ispaq_in_chunks import \
+    ispaq_chunks, ispaq_metric_names, run_ispaq_in_chunks
+
+
+def preference(pfile, name):
+    with open(pfile) as file:
+        return re.search(rf'^\s*{name}:\s*(\S.*?)\s*(#.*)?$', file.read(), re.M).group(1).rstrip('/')
+
+
+def fake_ispaq(metrics, startdate, enddate, pfile, snlc, **kwargs):
+    # Stands in for ISPAQ, writing a row of metrics and a PSD file per day,
+    # and failing on the days listed in the fail file
+    metric_names = ispaq_metric_names(pfile=pfile, metrics=metrics)
+    csv_dir = preference(pfile, 'csv_dir')
+    psd_dir = preference(pfile, 'psd_dir')
+    pdf_dir = preference(pfile, 'pdf_dir')
+    with open('runs', 'a') as file:
+        file.write(f'{startdate},{enddate},{"+".join(metric_names)}\n')
+    if 'pdf' in metric_names:
+        os.makedirs(f'{pdf_dir}/QW/QCC02', exist_ok=True)
+        with open(f'{pdf_dir}/QW/QCC02/PDF.txt', 'w') as file:
+            file.write('\n'.join(sorted(os.listdir(f'{psd_dir}/QW/QCC02'))))
+        return 0
+    days = [startdate + timedelta(days=day) for day in range((enddate - startdate).days)]
+    last_day = '' if len(days) == 1 else f'_{days[-1]}'
+    os.makedirs(f'{psd_dir}/QW/QCC02', exist_ok=True)
+    rows = [('QW.QCC02..HNZ.D', f'{day}T00:00:00', f'{day + timedelta(days=1)}T00:00:00', day.day) for day in days]
+    for day in days:
+        open(f'{psd_dir}/QW/QCC02/QW.QCC02..HNZ.D_{day}_PSDCorrected.csv', 'w').close()
+    if preference(pfile, 'output') == 'db':
+        with sqlite3.connect(preference(pfile, 'db_name')) as connection:
+            connection.execute('CREATE TABLE num_gaps (target TEXT, start TEXT, end TEXT, value, lddate TEXT)')
+            connection.executemany('INSERT INTO num_gaps VALUES (?, ?, ?, ?, \'\')', rows)
+    else:
+        with open(f'{csv_dir}/{metrics}_QW.QCC02.x.Hxx_{startdate}{last_day}_simpleMetrics.csv', 'w') as file:
+            file.write('target,start,end,metricName,value\n')
+            for target, start, end, value in rows:
+                file.write(f'{target},{start},{end},num_gaps,{value}\n')
+    failed_days = open('fail').read().split() if os.path.exists('fail') else []
+    return 1 if any(str(day) in failed_days for day in days) else 0
+
+
+def read_runs():
+    with open('runs') as file:
+        runs = sorted(file.read().splitlines())
+    os.remove('runs')
+    return [run.split(',') for run in runs]
+
+
+def run_ispaq(startdate, enddate, database='', **kwargs):
+    run_ispaq_in_chunks(ispaqloc='run_ispaq.py', metrics='eew_test', startdate=startdate, enddate=enddate,
+                        pfile=ISPAQ_PREF, pdfinterval='aggregated', miniseedarchive='miniseed',
+                        network='QW', station='QCC02', ispaq_command=fake_ispaq, database=database, **kwargs)
+    return gather_stats(snlc='QW.QCC02.x.Hxx', start=startdate, stop=enddate, metrics='eew_test',
+                        database=database).get_values('num_gaps', 'QW', 'QCC02', 'HNZ')
+
+
+def test_ispaq_chunks():
+    assert ispaq_chunks(date(2022, 4, 1), date(2022, 4, 17), 7) == [
+        (date(2022, 4, 1), date(2022, 4, 8)),
+        (date(2022, 4, 8), date(2022, 4, 15)),
+        (date(2022, 4, 15), date(2022, 4, 17))]
+    assert ispaq_chunks(date(2022, 4, 1), date(2022, 4, 17), 0) == [
+        (date(2022, 4, 1), date(2022, 4, 17))]
+
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_run_ispaq_in_chunks(tmp_path, monkeypatch, workers):
+    monkeypatch.chdir(tmp_path)
+
+    # The merged csv file is the one a single run would have written
+    assert run_ispaq(date(2022, 4, 1), date(2022, 4, 11), chunk_days=3, workers=workers,
+                     cache_directory='') == list(range(1, 11))
+
+    runs = read_runs()
+    assert [run[:2] for run in runs] == [
+        ['2022-04-01', '2022-04-04'], ['2022-04-01', '2022-04-11'],
+        ['2022-04-04', '2022-04-07'], ['2022-04-07', '2022-04-10'], ['2022-04-10', '2022-04-11']]
+    # The PDFs are left out of the chunks, and computed last from all the PSDs
+    assert runs[1][2] == 'pdf'
+    assert 'pdf' not in runs[0][2].split('+')
+    with open('ispaq_outputs/PDFs/QW/QCC02/PDF.txt') as file:
+        assert len(file.read().splitlines()) == 10
+    assert not os.path.exists('ispaq_outputs/chunks')
+
+
+def test_run_ispaq_with_metric_cache(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    day_directory = tmp_path / 'miniseed' / '2022' / '04' / '05'
+    os.makedirs(day_directory)
+    (day_directory / 'QW.QCC02.00.HNZ.2022.095').write_bytes(b'0' * 512)
+    cache_directory = str(tmp_path / 'cache')
+
+    assert run_ispaq(date(2022, 4, 1), date(2022, 4, 8), chunk_days=0,
+                     cache_directory=cache_directory) == list(range(1, 8))
+    assert [run[:2] for run in read_runs()] == [['2022-04-01', '2022-04-08']] * 2
+
+    # Extending the window only runs ISPAQ over the new days
+    shutil.rmtree('ispaq_outputs')
+    get_archive_index.cache_clear()
+    assert run_ispaq(date(2022, 4, 1), date(2022, 4, 11), chunk_days=0,
+                     cache_directory=cache_directory) == list(range(1, 11))
+    assert [run[:2] for run in read_runs()] == [['2022-04-01', '2022-04-11'], ['2022-04-08', '2022-04-11']]
+    with open('ispaq_outputs/PDFs/QW/QCC02/PDF.txt') as file:
+        assert len(file.read().splitlines()) == 10
+
+    # A day whose miniSEED files changed is computed again, and a day ISPAQ
+    # failed on is not cached
+    (day_directory / 'QW.QCC02.00.HNZ.2022.095').write_bytes(b'0' * 1024)
+    get_archive_index.cache_clear()
+    with open('fail', 'w') as file:
+        file.write('2022-04-05')
+    assert run_ispaq(date(2022, 4, 1), date(2022, 4, 11), chunk_days=0,
+                     cache_directory=cache_directory) == list(range(1, 11))
+    assert [run[:2] for run in read_runs()] == [['2022-04-01', '2022-04-11'], ['2022-04-05', '2022-04-06']]
+    os.remove('fail')
+    get_archive_index.cache_clear()
+    assert run_ispaq(date(2022, 4, 1), date(2022, 4, 11), chunk_days=0,
+                     cache_directory=cache_directory) == list(range(1, 11))
+    assert [run[:2] for run in read_runs()] == [['2022-04-01', '2022-04-11'], ['2022-04-05', '2022-04-06']]
+
+
+def test_run_ispaq_with_metric_database(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    database = str(tmp_path / 'metrics.db')
+
+    # The chunks write databases of their own, merged into the database
+    assert run_ispaq(date(2022, 4, 1), date(2022, 4, 8), chunk_days=3, workers=2, cache_directory='',
+                     database=database) == list(range(1, 8))
+    assert len(read_runs()) == 4
+    assert not os.path.exists('ispaq_outputs/csv') or not os.listdir('ispaq_outputs/csv')
+    with open('ispaq_outputs/PDFs/QW/QCC02/PDF.txt') as file:
+        assert len(file.read().splitlines()) == 7
+
+    # The database accumulates the metrics of every run, even in a single run
+    assert run_ispaq(date(2022, 4, 8), date(2022, 4, 11), chunk_days=0, cache_directory='',
+                     database=database) == [8, 9, 10]
+    assert gather_stats(snlc='QW.QCC02.x.Hxx', start=date(2022, 4, 1), stop=date(2022, 4, 11),
+                        database=database).get_values('num_gaps', 'QW', 'QCC02', 'HNZ') == list(range(1, 11))
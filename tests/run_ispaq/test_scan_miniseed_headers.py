@@ -0,0 +1,88 @@
+# flake8: noqa
+import os
+from datetime import date
+
+import numpy as np
+import obspy
+from obspy.core.utcdatetime import UTCDateTime
+
+from stationverification.utilities.scan_miniseed_headers import \
+    read_miniseed_record_headers, scan_miniseed_archive
+
+DAY = UTCDateTime('2021-01-01T00:00:00')
+
+
+def trace(channel: str, starttime: UTCDateTime, seconds: int) -> obspy.Trace:
+    return obspy.Trace(
+        data=np.arange(seconds * 100, dtype=np.int32) % 1000,
+        header={"network": "QW", "station": "QCC02", "location": "00",
+                "channel": channel, "starttime": starttime,
+                "sampling_rate": 100.0})
+
+
+def test_scan_miniseed_archive(tmp_path):
+    day_directory = tmp_path / '2021' / '01' / '01'
+    os.makedirs(day_directory)
+    # HNZ: 1 hour, a 1 hour gap, 10 minutes overlapping the previous 5
+    # minutes, then nothing until the end of the day
+    obspy.Stream(traces=[trace('HNZ', DAY, 3600),
+                         trace('HNZ', DAY + 7200, 600),
+                         trace('HNZ', DAY + 7500, 600)]).write(
+        str(day_directory / 'QW.QCC02.00.HNZ.2021.001'), format='MSEED',
+        reclen=512, encoding='STEIM2')
+    obspy.Stream(traces=[trace('HNE', DAY, 86400)]).write(
+        str(day_directory / 'QW.QCC02.00.HNE.2021.001'), format='MSEED',
+        reclen=4096, encoding='STEIM2')
+
+    coverage = scan_miniseed_archive(miniseed_directory=str(tmp_path),
+                                     network="QW",
+                                     station="QCC02",
+                                     startdate=date(2021, 1, 1),
+                                     enddate=date(2021, 1, 3),
+                                     location="00")
+
+    hne, hnz = coverage.coverages
+    assert hne.channel == 'QW.QCC02.00.HNE'
+    assert (hne.num_gaps, hne.max_gap, hne.num_overlaps) == (0, 0.0, 0)
+    assert hne.percent_availability == 100.0
+    assert hnz.channel == 'QW.QCC02.00.HNZ'
+    assert hnz.sample_rate == 100.0
+    assert hnz.intervals == [[DAY.timestamp, DAY.timestamp + 3600],
+                             [DAY.timestamp + 7200, DAY.timestamp + 8100]]
+    assert hnz.num_gaps == 2
+    assert hnz.max_gap == 86400 - 8100
+    assert hnz.num_overlaps == 1
+    assert np.isclose(hnz.percent_availability, 4500 / 86400 * 100)
+    assert coverage.days_with_data() == [date(2021, 1, 1)]
+    assert coverage.days_without_data() == [date(2021, 1, 2)]
+    assert coverage.data_period() == (date(2021, 1, 1), date(2021, 1, 2))
+
+
+def test_read_miniseed_record_headers_of_mixed_record_lengths(tmp_path):
+    short_records = str(tmp_path / 'short')
+    long_records = str(tmp_path / 'long')
+    obspy.Stream(traces=[trace('HNZ', DAY, 600)]).write(
+        short_records, format='MSEED', reclen=512, encoding='STEIM2')
+    obspy.Stream(traces=[trace('HNZ', DAY + 600, 600)]).write(
+        long_records, format='MSEED', reclen=4096, encoding='STEIM2',
+        byteorder='<')
+    mixed_records = str(tmp_path / 'mixed')
+    with open(mixed_records, 'wb') as mixed:
+        for file in (short_records, long_records):
+            with open(file, 'rb') as records:
+                mixed.write(records.read())
+
+    headers = read_miniseed_record_headers(mixed_records)
+    expected = [read_miniseed_record_headers(file)
+                for file in (short_records, long_records)]
+    np.testing.assert_array_equal(
+        headers.starttimes,
+        np.concatenate([records.starttimes for records in expected]))
+    np.testing.assert_array_equal(
+        headers.endtimes,
+        np.concatenate([records.endtimes for records in expected]))
+    assert set(headers.channels) == {'QW.QCC02.00.HNZ'}
+    assert headers.starttimes[0] == DAY.timestamp
+    assert headers.endtimes[-1] == DAY.timestamp + 1200
+    # Every sample is covered by exactly one record
+    assert np.isclose(np.sum(headers.endtimes - headers.starttimes), 1200)
@@ -1,4 +1,5 @@
-from typing import List
+import struct
+from typing import Callable, List
 import pytest
 from datetime import date
 import obspy
@@ -150,3 +151,39 @@ def list_of_streams_clock_offset() -> List[obspy.Stream]:
     list_of_streams.append(stream4)
 
     return list_of_streams
+
+
+def write_fortimus_soh_file(path: str,
+                            text: str,
+                            station: str = "QCC02",
+                            location: str = "00",
+                            network: str = "QW",
+                            record_length: int = 512,
+                            text_per_record: int = 0) -> str:
+    '''
+    Write text to a Fortimus SOH file of ASCII log records, each with
+    blockettes 1000 and 1001 like the records of the Fortimus. The text is
+    split into full records, or into pieces of text_per_record characters.
+    '''
+    data_offset = 64
+    capacity = text_per_record or record_length - data_offset
+    encoded = text.encode()
+    with open(path, 'wb') as fp:
+        for sequence, start in enumerate(range(0, len(encoded), capacity)):
+            data = encoded[start:start + capacity]
+            header = f'{sequence + 1:06d}D {station:<5}{location:<2}SOH\
+{network:<2}'.encode()
+            header += struct.pack('>HHBBBBHHhhBBBBiHH', 2021, 1, 0, 0, 0, 0,
+                                  0, len(data), 0, 0, 0, 0, 0, 2, 0,
+                                  data_offset, 48)
+            header += struct.pack('>HHBBBB', 1000, 56, 0, 1,
+                                  record_length.bit_length() - 1, 0)
+            header += struct.pack('>HHBbBB', 1001, 0, 100, 0, 0, 0)
+            fp.write(header + data.ljust(record_length - data_offset,
+                                         b'\x00'))
+    return path
+
+
+@pytest.fixture(scope="session")
+def fortimus_soh_writer() -> Callable[..., str]:
+    return write_fortimus_soh_file
@@ -0,0 +1,64 @@
+# flake8: noqa
+import os
+from configparser import ConfigParser
+from datetime import date
+
+import numpy as np
+import obspy
+from obspy.core.utcdatetime import UTCDateTime
+
+from stationverification.utilities.generate_soh_results import generate_soh_results
+
+
+def write_soh_archive(soh_directory, channels, days):
+    for day in days:
+        day_directory = os.path.join(soh_directory, day.strftime('%Y/%m/%d'))
+        os.makedirs(day_directory, exist_ok=True)
+        for channel, data in channels.items():
+            trace = obspy.Trace(data=np.array(data, dtype=np.int32), header={
+                "network": "QW", "station": "QCC02", "location": "00",
+                "channel": channel, "starttime": UTCDateTime(day)})
+            obspy.Stream(traces=[trace]).write(os.path.join(
+                day_directory, f'QW.QCC02.00.{channel}.{day.strftime("%Y.%j")}'),
+                format='MSEED')
+
+
+def test_generate_soh_results(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    soh_directory = str(tmp_path / 'soh')
+    write_soh_archive(soh_directory,
+                      # A full day of minute samples for the timing error plot
+                      channels={"LCE": np.tile([0, 2, 4, 6], 360),
+                                "GST": np.tile([1, 1, 3, 3], 360),
+                                "LCQ": [100, 100, 60, 60],
+                                "GNS": [8, 9, 8, 9]},
+                      days=[date(2021, 1, 1), date(2021, 1, 2)])
+    thresholds = ConfigParser()
+    thresholds.read_dict({'thresholds': {}})
+    arguments = dict(typeofinstrument="titansma",
+                     network="QW",
+                     station="QCC02",
+                     location="00",
+                     startdate=date(2021, 1, 1),
+                     enddate=date(2021, 1, 3),
+                     soh_directory=soh_directory,
+                     miniseed_directory=str(tmp_path / 'miniseed'),
+                     thresholds=thresholds,
+                     timingSource="GNSS")
+
+    serial_results = generate_soh_results(workers=1, **arguments)
+    pooled_results = generate_soh_results(workers=4, **arguments)
+
+    # The channels are merged in the report order, whatever the workers
+    assert list(serial_results) == ['clock_offset', 'clock_locked',
+                                    'timing_quality', 'satellites_locked']
+    assert pooled_results == serial_results
+    assert list(pooled_results) == list(serial_results)
+    assert serial_results['clock_offset']['values'] == [3.0, 3.0]
+    assert serial_results['clock_offset']['passed'] is False
+    assert serial_results['clock_locked']['values'] == [720.0, 720.0]
+    assert serial_results['timing_quality']['values'] == [80.0, 80.0]
+    assert serial_results['satellites_locked']['values'] == [8, 8]
+    plots = os.listdir('stationvalidation_output')
+    assert any(plot.endswith('timing_quality.png') for plot in plots)
+    assert any('timing_error' in plot for plot in plots)
@@ -0,0 +1,57 @@
+# flake8: noqa
+from stationverification.utilities.handle_fortimus_soh_files import \
+    FortimusSOHParser, handle_fortimus_soh_files
+
+
+def status_report(satellites: int, clock_quality: str, status: str) -> str:
+    return f"""Status report
+GNSS status
+  Satellites used: {satellites}
+  Clock quality: {clock_quality}
+  Status: {status}
+PTP status
+  Status: Disabled
+Sensor
+  Temperature: 20
+"""
+
+
+def test_handle_fortimus_soh_files(tmp_path, fortimus_soh_writer):
+    text = status_report(9, "Fine locked", "Locked") + \
+        status_report(4, "Coarse locked", "Unlocked") + \
+        status_report(12, "Fine locked", "Locked") + \
+        "Status report\nGNSS status\n  Satellites used: 3\n"
+    # Full records, and records cutting the lines anywhere
+    full_records = fortimus_soh_writer(
+        str(tmp_path / 'QW.QCC02.00.SOH.2021.001'), text)
+    short_records = fortimus_soh_writer(
+        str(tmp_path / 'QW.QCC02.00.SOH.2021.002'), text, text_per_record=7)
+    other_station = fortimus_soh_writer(
+        str(tmp_path / 'QW.QCC03.00.SOH.2021.003'), text, station="QCC03")
+
+    results = handle_fortimus_soh_files(
+        fortimus_soh_files=[full_records, short_records, other_station],
+        station="qcc02",
+        location="00")
+
+    # The section cut short by the end of the file is left out
+    expected = {"number_of_satellites_used": [9, 4, 12],
+                "timing_quality": ["Fine locked", "Coarse locked", "Fine locked"],
+                "clock_locked_status": ["Locked", "Unlocked", "Locked"]}
+    assert results[0] == dict(expected, file='QW.QCC02.00.SOH.2021.001')
+    assert results[1] == dict(expected, file='QW.QCC02.00.SOH.2021.002')
+    assert results[2] == {"number_of_satellites_used": [],
+                          "timing_quality": [],
+                          "clock_locked_status": [],
+                          "file": 'QW.QCC03.00.SOH.2021.003'}
+
+
+def test_fortimus_soh_parser_sections_on_one_line():
+    parser = FortimusSOHParser()
+    parser.feed("GNSS status Satellites used: 7 PTP status GNSS status")
+    parser.feed(" Status: Locked\nPTP sta")
+    parser.feed("tus\n")
+    parser.close()
+    assert parser.number_of_satellites_used == [7]
+    assert parser.timing_quality == []
+    assert parser.clock_locked_status == ["Locked"]
@@ -0,0 +1,113 @@
+# flake8: noqa
+# This script benchmarks the single-pass Fortimus SOH parser against the
+# previous implementation, which read the whole file, ran a regex over its
+# text and wrote the GNSS sections to a temporary file. Both must give the
+# same results on files written in full records.
+#
+# usage: python -m tests.sohmetrics.test_scripts.benchmark_fortimus_soh_parser
+import os
+import re
+import tempfile
+import time
+from typing import Any, List
+
+from stationverification.utilities.handle_fortimus_soh_files import \
+    handle_fortimus_soh_files
+from tests.sohmetrics.conftest import write_fortimus_soh_file
+
+STATION = "QCC02"
+LOCATION = "00"
+NUMBER_OF_FILES = 3
+# Status reports of each daily file, about 4 MB of text
+REPORTS_PER_FILE = 12000
+
+
+def previous_handle_fortimus_soh_files(fortimus_soh_files: List[str],
+                                       station: str,
+                                       location: str) -> List[Any]:
+    results = []
+    for file in fortimus_soh_files:
+        with open(file, 'rb') as fp:
+            content = fp.read()
+        split_by = f'{station.upper()}{location.upper()}SOH'.encode()
+        data = b''.join(line[46:-8] for line in content.split(split_by)) \
+            .decode('utf-8', errors="ignore")
+        sections = re.findall('%s((.|\n)*?)(?=%s)' %
+                              ('GNSS status', 'PTP status'), data)
+        temp = tempfile.TemporaryFile(mode='w+t')
+        try:
+            for section in sections:
+                temp.writelines(section[0])
+            temp.seek(0)
+            lines = temp.readlines()
+        finally:
+            temp.close()
+        results.append({
+            "number_of_satellites_used": [
+                int(re.search('((?<=Satellites used:).*)', line.strip()).group())
+                for line in lines if "Satellites used" in line],
+            "timing_quality": [
+                re.search('((?<=Clock quality:).*)', line.strip()).group().strip()
+                for line in lines if "Clock quality" in line],
+            "clock_locked_status": [
+                re.search('((?<=Status:).*)', line.strip()).group().strip()
+                for line in lines if "Status" in line],
+            "file": re.findall("([^\/]+$)", file)[0]})
+    return results
+
+
+def status_reports(number_of_reports: int) -> str:
+    reports = []
+    for index in range(number_of_reports):
+        reports.append(f"""Fortimus status report {index}
+System
+  Uptime: {index * 60} s
+  Supply voltage: 12.{index % 10} V
+GNSS status
+  Antenna: OK
+  Satellites used: {4 + index % 9}
+  Clock quality: {'Fine locked' if index % 50 else 'Coarse locked'}
+  Status: {'Locked' if index % 70 else 'Unlocked'}
+  Latitude: 45.4215
+  Longitude: -75.6972
+PTP status
+  Status: Disabled
+Sensor
+  Temperature: {20 + index % 5} C
+  Mass positions: 0.1 0.2 -0.1
+""")
+    return ''.join(reports)
+
+
+def benchmark(function, files: List[str], repeat: int = 3):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        results = function(fortimus_soh_files=files,
+                           station=STATION,
+                           location=LOCATION)
+        timings.append(time.perf_counter() - start)
+    return min(timings), results
+
+
+def main():
+    with tempfile.TemporaryDirectory() as directory:
+        files = [write_fortimus_soh_file(
+            os.path.join(directory, f'QW.{STATION}.{LOCATION}.SOH.2021.{day:03d}'),
+            status_reports(REPORTS_PER_FILE), station=STATION,
+            location=LOCATION)
+            for day in range(1, NUMBER_OF_FILES + 1)]
+        size = sum(os.path.getsize(file) for file in files) / 2 ** 20
+        previous_time, previous_results = benchmark(
+            previous_handle_fortimus_soh_files, files)
+        streaming_time, streaming_results = benchmark(
+            handle_fortimus_soh_files, files)
+        assert streaming_results == previous_results
+        print(f'{NUMBER_OF_FILES} files, {size:.1f} MB')
+        print(f'previous implementation: {previous_time:.3f} s')
+        print(f'single-pass parser:      {streaming_time:.3f} s')
+        print(f'speedup:                 {previous_time / streaming_time:.1f}x')
+
+
+if __name__ == '__main__':
+    main()
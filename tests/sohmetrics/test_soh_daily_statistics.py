@@ -0,0 +1,48 @@
+# flake8: noqa
+from datetime import date
+
+import numpy as np
+import numpy.ma as ma
+import obspy
+
+from stationverification.utilities import sohmetrics
+from stationverification.utilities.soh_daily_statistics import daily_soh_statistics, stack_daily_data
+
+
+def test_daily_soh_statistics():
+    random = np.random.default_rng(0)
+    list_of_data = [random.integers(0, 12, size=length) for length in (5, 8, 3)]
+    list_of_data[1] = ma.array(list_of_data[1], mask=[0, 1, 1, 0, 0, 0, 0, 0])
+    statistics = daily_soh_statistics(list_of_data)
+    assert statistics.data.shape == (3, 8)
+    # The padding and the gaps are masked, and never counted
+    np.testing.assert_array_equal(statistics.sample_counts, [5, 6, 3])
+    for index, data in enumerate(list_of_data):
+        assert np.isclose(statistics.average[index], float(np.average(data)))
+        assert statistics.minimum[index] == np.min(data)
+        assert statistics.maximum[index] == np.max(data)
+        assert statistics.count_below(2)[index] == np.count_nonzero(ma.array(data).compressed() < 2)
+        assert statistics.count_above(9)[index] == np.count_nonzero(ma.array(data).compressed() > 9)
+    assert stack_daily_data([]).shape == (0, 0)
+
+
+def test_check_soh_metrics_of_daily_streams():
+    list_of_streams = [obspy.Stream(traces=[obspy.Trace(data=np.array(data))])
+                       for data in ([1, 1, 5, 9], [8.5, 9, 9.5], [1, 1, 1])]
+    results = sohmetrics.check_clock_locked(list_of_streams, threshold=2, startdate=date(2021, 1, 1))
+    assert results.results == [2.0, 0.0, 3.0]
+    assert results.details == ['Clock unlocked 3 times on 2021-01-03. [threshold: 2]']
+    results = sohmetrics.check_clock_offset(list_of_streams, threshold=4, startdate=date(2021, 1, 1))
+    assert results.results == [4.0, 9.0, 1.0]
+    assert results.details == ['Average clock phase error too high on 2021-01-02']
+    results = sohmetrics.check_number_of_satellites(list_of_streams, threshold=4, startdate=date(2021, 1, 1))
+    assert results.results == [4, 9, 1]
+    assert not results.passed
+    assert results.details == ['Average number of GNS satellites used was 1 on 2021-01-03 [threshold: 4]']
+
+    # A day without any sample has no value and fails
+    list_of_streams.append(obspy.Stream(traces=[obspy.Trace(data=ma.masked_all(3))]))
+    results = sohmetrics.check_number_of_satellites(list_of_streams, threshold=1, startdate=date(2021, 1, 1))
+    assert results.results == [4, 9, 1, None]
+    assert not results.passed
+    assert results.details == ['No GNS satellites data on 2021-01-04']
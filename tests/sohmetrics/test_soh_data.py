@@ -0,0 +1,45 @@
+# flake8: noqa
+import os
+
+import numpy as np
+import numpy.ma as ma
+import obspy
+from obspy.core.utcdatetime import UTCDateTime
+
+from stationverification.utilities import soh_data
+
+
+def test_read_soh_file(tmp_path):
+    soh_data.clear_soh_data_cache()
+    trace1 = obspy.Trace(data=np.array([1, 2, 3], dtype=np.int32), header={
+        "network": "QW", "station": "QCC02", "channel": "LCQ",
+        "starttime": UTCDateTime('2021-01-01T00:00:00')})
+    trace2 = obspy.Trace(data=np.array([5, 6, 7], dtype=np.int32), header={
+        "network": "QW", "station": "QCC02", "channel": "LCQ",
+        "starttime": UTCDateTime('2021-01-01T00:00:04')})
+    file = str(tmp_path / 'QW.QCC02..LCQ.2021.001')
+    obspy.Stream(traces=[trace1, trace2]).write(file, format='MSEED')
+    cache_directory = str(tmp_path / 'cache')
+
+    decoded = soh_data.read_soh_file(file, cache_directory=cache_directory)
+    assert decoded.channel == 'LCQ'
+    assert decoded.starttime == UTCDateTime('2021-01-01T00:00:00')
+    assert (decoded.data == ma.array([1, 2, 3, 4, 5, 6, 7], mask=[0, 0, 0, 1, 0, 0, 0])).all()
+    # The file is decoded only once
+    assert soh_data.read_soh_file(file, cache_directory=cache_directory) is decoded
+
+    # The on-disk cache holds the same data and timing metadata
+    soh_data.clear_soh_data_cache()
+    cached = soh_data.read_soh_file(file, cache_directory=cache_directory)
+    assert cached is not decoded
+    assert cached.starttime == decoded.starttime
+    assert cached.sampling_rate == decoded.sampling_rate
+    np.testing.assert_array_equal(ma.getmaskarray(cached.data), ma.getmaskarray(decoded.data))
+    np.testing.assert_array_equal(cached.data.compressed(), decoded.data.compressed())
+    stream = cached.to_stream()
+    assert len(stream) == 1 and stream[0].id == 'QW.QCC02..LCQ'
+
+    # A modified file is decoded again
+    obspy.Stream(traces=[trace1]).write(file, format='MSEED')
+    os.utime(file, ns=(0, os.stat(file).st_mtime_ns + 1))
+    assert list(soh_data.read_soh_file(file, cache_directory=cache_directory).data) == [1, 2, 3]
@@ -0,0 +1,58 @@
+# flake8:noqa
+import json
+import os
+from datetime import date
+
+from stationverification.utilities.archive_index import ArchiveIndex, parse_archive_filename
+
+
+def test_parse_archive_filename():
+    assert parse_archive_filename('QW.QCC02.2022.091.json') == \
+        ('QW', 'QCC02', None, None, '2022', '091', '.json')
+    assert parse_archive_filename('QW_QCN08_0N_HNE_2022_060.csv') == \
+        ('QW', 'QCN08', '0N', 'HNE', '2022', '060', '.csv')
+    assert parse_archive_filename('QW.BCV13..LCE.2022.204') == \
+        ('QW', 'BCV13', '', 'LCE', '2022', '204', '')
+    assert parse_archive_filename('README') is None
+
+
+def test_archive_index():
+    archive_index = ArchiveIndex(path='tests/latency/test_data/guralp/archive/latency',
+                                 startdate=date(2022, 3, 1),
+                                 enddate=date(2022, 3, 3))
+    assert archive_index.find(day=date(2022, 3, 2), network='QW', station='QCN08',
+                              channel='H??', extension='.csv') == \
+        ['tests/latency/test_data/guralp/archive/latency/2022/03/02/QW_QCN08_0N_HNE_2022_061.csv',
+         'tests/latency/test_data/guralp/archive/latency/2022/03/02/QW_QCN08_0N_HNN_2022_061.csv',
+         'tests/latency/test_data/guralp/archive/latency/2022/03/02/QW_QCN08_0N_HNZ_2022_061.csv']
+    assert archive_index.find(day=date(2022, 3, 2), network='QW', station='QCN08',
+                              location='0N', channel='HNZ', extension='.csv') == \
+        ['tests/latency/test_data/guralp/archive/latency/2022/03/02/QW_QCN08_0N_HNZ_2022_061.csv']
+    assert archive_index.find(day=date(2022, 3, 2), network='QW', station='QCN08',
+                              location='00', extension='.csv') == []
+
+
+def test_archive_index_cache(tmp_path):
+    day_directory = tmp_path / 'archive' / '2022' / '04' / '01'
+    day_directory.mkdir(parents=True)
+    (day_directory / 'QW.QCC02..LCE.2022.091').write_bytes(b'')
+    cache_file = str(tmp_path / 'archive_index.json')
+
+    archive_index = ArchiveIndex(path=str(tmp_path / 'archive'),
+                                 startdate=date(2022, 4, 1),
+                                 enddate=date(2022, 4, 2),
+                                 cache_file=cache_file)
+    assert len(archive_index.find(date(2022, 4, 1), 'QW', 'QCC02', channel='LCE')) == 1
+    with open(cache_file) as file:
+        cached_directories = json.load(file)['directories']
+    assert cached_directories[str(day_directory)]['names'] == ['QW.QCC02..LCE.2022.091']
+
+    # Adding a file changes the modification time of the directory, which
+    # invalidates the cached listing
+    (day_directory / 'QW.QCC02..GST.2022.091').write_bytes(b'')
+    os.utime(day_directory, ns=(0, 0))
+    archive_index = ArchiveIndex(path=str(tmp_path / 'archive'),
+                                 startdate=date(2022, 4, 1),
+                                 enddate=date(2022, 4, 2),
+                                 cache_file=cache_file)
+    assert len(archive_index.find(date(2022, 4, 1), 'QW', 'QCC02', channel='GST')) == 1
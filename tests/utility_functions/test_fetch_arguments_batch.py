@@ -0,0 +1,24 @@
+# flake8:noqa
+import sys
+
+import pytest
+
+from stationverification.utilities.fetch_arguments_batch import expand_station_selection, fetch_batch_arguments
+
+
+def test_expand_station_selection():
+    station_xml = 'stationverification/data/CN.xml'
+    assert expand_station_selection(network='CN', station_selection='ELFO*', station_xml=station_xml) == \
+        ['ELFO1', 'ELFO2', 'ELFO3', 'ELFO4']
+    # Explicit codes are kept as given, and stations matched twice are only validated once
+    assert expand_station_selection(network='CN', station_selection='qcc02, YKAI?,YKAI1', station_xml=station_xml) == \
+        ['QCC02', 'YKAI2', 'YKAI1', 'YKAI3', 'YKAI4', 'YKAI5', 'YKAI7', 'YKAI6']
+    assert expand_station_selection(network='QW', station_selection='ELFO*', station_xml=station_xml) == []
+
+
+def test_fetch_batch_arguments_rejects_psd_only(monkeypatch, capsys):
+    monkeypatch.setattr(sys, 'argv', ['stationverificationbatch', '-N', 'QW', '-S', 'QCC02', '-d', '2022-04-01',
+                                      '-e', '2022-04-02', '--psdOnly', 'True'])
+    with pytest.raises(SystemExit):
+        fetch_batch_arguments()
+    assert '--psdOnly is not supported' in capsys.readouterr().err
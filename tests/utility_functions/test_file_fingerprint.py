@@ -0,0 +1,35 @@
+# flake8:noqa
+import os
+
+import pytest
+
+from stationverification.utilities.file_fingerprint import file_fingerprint, write_file_atomically
+
+
+def test_file_fingerprint(tmp_path):
+    file = tmp_path / 'QW_QCC02_00_LCE_2022_091.mseed'
+    file.write_bytes(b'1234')
+    os.utime(file, ns=(0, 1_000_000_000))
+    assert file_fingerprint(str(file)) == [4, 1_000_000_000]
+    # The fingerprint changes with the content or the modification time
+    file.write_bytes(b'12345')
+    os.utime(file, ns=(0, 1_000_000_000))
+    assert file_fingerprint(str(file)) == [5, 1_000_000_000]
+    os.utime(file, ns=(0, 2_000_000_000))
+    assert file_fingerprint(str(file)) == [5, 2_000_000_000]
+
+
+def test_write_file_atomically(tmp_path):
+    file = tmp_path / 'cache' / 'index.json'
+    with write_file_atomically(str(file), mode='w') as temporary:
+        temporary.write('{}')
+        # The file is only replaced once written
+        assert not file.exists()
+    assert file.read_text() == '{}'
+    # The file is left as it was, without a temporary file, if the writing fails
+    with pytest.raises(ValueError):
+        with write_file_atomically(str(file), mode='w') as temporary:
+            temporary.write('{"version"')
+            raise ValueError('interrupted')
+    assert file.read_text() == '{}'
+    assert os.listdir(tmp_path / 'cache') == ['index.json']
@@ -0,0 +1,99 @@
+# flake8:noqa
+import os
+import pickle
+import threading
+from configparser import ConfigParser
+from datetime import date
+
+import pytest
+
+from stationverification.utilities.exceptions import PipelineError
+from stationverification.utilities.fetch_arguments import UserInput
+from stationverification.utilities.pipeline import Stage, pipeline_order, run_pipeline
+from stationverification.utilities.validation_stages import station_validation_stages
+
+# Released once both independent stages are running
+BARRIER = threading.Barrier(2, timeout=10)
+
+
+def wait_for_other_stage(value):
+    BARRIER.wait()
+    return value
+
+
+def add(first, second):
+    return first + second
+
+
+def divide(dividend, divisor):
+    return dividend // divisor, dividend % divisor
+
+
+def process_id(**results):
+    return os.getpid()
+
+
+def fail():
+    raise ValueError('no data')
+
+
+def arithmetic_stages():
+    return [
+        Stage(name='remainder', function=divide, inputs={'dividend': 'sum', 'divisor': 'three'},
+              outputs=['quotient', 'remainder']),
+        Stage(name='sum', function=add, inputs={'first': 'four'}, outputs=['sum'], arguments={'second': 10}),
+        Stage(name='four', function=wait_for_other_stage, outputs=['four'], arguments={'value': 4}),
+        Stage(name='three', function=wait_for_other_stage, outputs=['three'], arguments={'value': 3}),
+    ]
+
+
+def test_run_pipeline():
+    # The independent stages run at once, or they would wait on the barrier
+    # until it times out
+    assert run_pipeline(arithmetic_stages(), executor='thread', workers=4) == \
+        {'four': 4, 'three': 3, 'sum': 14, 'quotient': 4, 'remainder': 2}
+    assert [stage.name for stage in pipeline_order(arithmetic_stages())] == ['four', 'three', 'sum', 'remainder']
+
+    # The stages run in a pool of processes, or one after another in the
+    # current process
+    stages = [Stage(name='first', function=process_id, outputs=['first']),
+              Stage(name='second', function=process_id, outputs=['second'], after=['first'])]
+    results = run_pipeline(stages, executor='process', workers=2)
+    assert os.getpid() not in results.values()
+    assert run_pipeline(stages, workers=1) == {'first': os.getpid(), 'second': os.getpid()}
+
+
+def test_run_pipeline_errors():
+    with pytest.raises(PipelineError, match='No stage outputs total'):
+        run_pipeline([Stage(name='sum', function=add, inputs={'first': 'total'}, arguments={'second': 1})])
+    with pytest.raises(PipelineError, match='depend on each other'):
+        run_pipeline([Stage(name='a', function=add, inputs={'first': 'b'}, outputs=['a'], arguments={'second': 1}),
+                      Stage(name='b', function=add, inputs={'first': 'a'}, outputs=['b'], arguments={'second': 1})])
+    with pytest.raises(PipelineError, match='Unknown pipeline executor'):
+        run_pipeline([Stage(name='fail', function=fail)], executor='cluster')
+    for workers in (1, 2):
+        with pytest.raises(PipelineError, match='Stage fail failed: no data'):
+            run_pipeline([Stage(name='fail', function=fail),
+                          Stage(name='after', function=process_id, after=['fail'])],
+                         executor='thread', workers=workers)
+
+
+def test_station_validation_stages():
+    thresholds = ConfigParser()
+    thresholds.read_string('[thresholds]\ndata_timeliness = 3\n')
+    user_inputs = UserInput(network='QW', station='QCC02', location=None, startdate=date(2022, 4, 1),
+                            enddate=date(2022, 4, 4), ispaqloc='run_ispaq.py', metrics='eew_test',
+                            pfile='preference_files/eew_preferences.txt', thresholds=thresholds,
+                            latencyFiles='latency', pdfinterval='aggregated', station_url='QW.xml',
+                            typeofinstrument='APOLLO', miniseedarchive='miniseed', soharchive='soh',
+                            outputdir='/validation', uploadresultstos3=True, bucketName='bucket',
+                            s3directory='results', timingSource='GNSS', instrument_gain=None)
+    stages = station_validation_stages(user_inputs)
+    assert [stage.name for stage in pipeline_order(stages)] == \
+        ['latency', 'ispaq', 'soh', 'metrics', 'metric_plots', 'timely_availability', 'report', 'cleanup', 'upload']
+    upload = stages[-1]
+    assert upload.arguments['path_of_folder_to_upload'] == '/validation/QW/QCC02/2022-04-01-2022-04-03'
+    metrics = [stage for stage in stages if stage.name == 'metrics'][0]
+    assert metrics.arguments['snlc'] == 'QW.QCC02.x.Hxx'
+    # The stages can be sent to a pool of processes
+    assert [stage.name for stage in pickle.loads(pickle.dumps(stages))] == [stage.name for stage in stages]
@@ -0,0 +1,59 @@
+# flake8:noqa
+import os
+import shutil
+
+import obspy
+from stationverification.utilities import resp_cache
+from stationverification.utilities.resp_cache import get_resp_directory
+
+
+def fake_conversion(conversions):
+    # Stands in for the java converter, writing one file per station converted
+    def convert_station_xml_to_resp(station_xml, folder):
+        conversions.append(station_xml)
+        os.makedirs(folder)
+        for network in obspy.read_inventory(station_xml):
+            for station in network:
+                open(os.path.join(folder, f'RESP.{network.code}.{station.code}'), 'w').close()
+    return convert_station_xml_to_resp
+
+
+def test_get_resp_directory(tmp_path, monkeypatch):
+    conversions: list = []
+    monkeypatch.setattr(resp_cache, 'convert_station_xml_to_resp', fake_conversion(conversions))
+    station_xml = str(tmp_path / 'CN.xml')
+    shutil.copy('stationverification/data/CN.xml', station_xml)
+    cache_directory = str(tmp_path / 'resp_cache')
+
+    resp_directory = get_resp_directory(station_xml=station_xml, network='CN', stations=['ELFO1', 'YKAI2'],
+                                        cache_directory=cache_directory)
+    assert sorted(os.listdir(resp_directory)) == ['RESP.CN.ELFO1', 'RESP.CN.YKAI2']
+    # The conversion is reused for the same stations, in any order
+    assert get_resp_directory(station_xml=station_xml, network='CN', stations=['YKAI2', 'ELFO1'],
+                              cache_directory=cache_directory) == resp_directory
+    assert len(conversions) == 1
+    # Only complete conversions are left in the cache
+    assert os.listdir(cache_directory) == [os.path.basename(resp_directory)]
+
+    # A change to the inventory invalidates the conversion
+    with open(station_xml, 'a') as file:
+        file.write('\n')
+    assert get_resp_directory(station_xml=station_xml, network='CN', stations=['ELFO1', 'YKAI2'],
+                              cache_directory=cache_directory) != resp_directory
+    assert len(conversions) == 2
+
+
+def test_get_resp_directory_published_concurrently(tmp_path, monkeypatch):
+    cache_directory = str(tmp_path / 'resp_cache')
+    station_xml = 'stationverification/data/CN.xml'
+    resp_directory = os.path.join(cache_directory, resp_cache.resp_cache_key(station_xml))
+
+    def convert_station_xml_to_resp(station_xml, folder):
+        os.makedirs(folder)
+        # Another run publishes the same conversion while this one converts
+        os.makedirs(os.path.join(resp_directory, 'RESP.CN.ELFO1'))
+    monkeypatch.setattr(resp_cache, 'convert_station_xml_to_resp', convert_station_xml_to_resp)
+
+    assert get_resp_directory(station_xml=station_xml, cache_directory=cache_directory) == resp_directory
+    assert os.listdir(resp_directory) == ['RESP.CN.ELFO1']
+    assert os.listdir(cache_directory) == [os.path.basename(resp_directory)]